@@ -4,6 +4,8 @@ from app.api.endpoints import products
 from app.api.endpoints import inventory
 from app.api.endpoints import alerts
 from app.api.endpoints import reports # Nueva importacion
+from app.api.endpoints import reservations
+from app.api.endpoints import events
 
 api_router = APIRouter()
 
@@ -26,4 +28,14 @@ api_router.include_router(
     reports.router,
     prefix="/v1/reportes",
     tags=["Reportes"]
-)
\ No newline at end of file
+)
+api_router.include_router(
+    reservations.router,
+    prefix="/v1/reservas",
+    tags=["Reservas"]
+)
+api_router.include_router(
+    events.router,
+    prefix="/v1/eventos",
+    tags=["Eventos"]
+)
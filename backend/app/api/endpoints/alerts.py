@@ -1,16 +1,66 @@
 import logging
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
 import app.services.alerts as alerts_service
+import app.services.reglas_alertas as reglas_service
+import app.crud.crud_regla_alerta as crud_regla_alerta
 from app.api.deps import get_db
-from app.schemas.alerta import AlertaInDB # Nueva importacion
+from app.core.config import get_settings
+from app.schemas.alerta import AlertaInDB, AlertaHistorial, PaginaAlertas # Nueva importacion
+from app.schemas.regla_alerta import ReglaAlerta, ReglaAlertaCreate, ResultadoRegla
+from app.core.exceptions import InvalidCursorError, InvalidAlertRuleError
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+@router.get(
+    "",
+    response_model=PaginaAlertas,
+    summary="Listado de alertas paginado por cursor"
+)
+def list_alerts(
+    db: Session = Depends(get_db),
+    tipo_alerta: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(
+        None,
+        description=(
+            "Solo alertas creadas o cambiadas despues de este instante "
+            "(el sincronizado_hasta de la sincronizacion anterior)"
+        )
+    ),
+    incluir_resueltas: bool = Query(
+        False,
+        description="Incluir las alertas desactivadas (util junto con since)"
+    ),
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la pagina anterior"),
+    limit: int = Query(100, gt=0, le=1000)
+) -> PaginaAlertas:
+    """
+    Obtiene las alertas ordenadas por fecha de creacion, por paginas.
+    Para la siguiente pagina se envia el `siguiente_cursor` recibido; para
+    la proxima sincronizacion, `since` = `sincronizado_hasta`.
+    """
+    logger.info("Procesando peticion de listado de alertas...")
+    try:
+        return alerts_service.listar_alertas(
+            db=db,
+            tipo_alerta=tipo_alerta,
+            desde=since,
+            incluir_resueltas=incluir_resueltas,
+            cursor=cursor,
+            limit=limit
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except Exception as e:
+        logger.error(f"Error inesperado al listar alertas: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor al listar alertas.")
+
+
 @router.get(
     "/stock-minimo",
     response_model=List[AlertaInDB],
@@ -49,17 +99,141 @@ def get_expiring_lotes_alert(
 ) -> List[AlertaInDB]:
     """
     Obtiene una lista de alertas de todos los lotes que estan
-    por vencer dentro del umbral de dias especificado.
+    por vencer dentro del umbral de dias especificado (cualquier valor
+    hasta el mayor tramo de severidad), de la mas proxima a la mas lejana.
     """
     logger.info(
         f"Procesando peticion de alerta de lotes por vencer "
         f"(umbral: {days} dias)..."
     )
+    mayor_tramo = max(get_settings().ALERT_EXPIRY_TIERS_DAYS)
+    if days > mayor_tramo:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Umbral de {days} dias fuera de los tramos de alerta (maximo {mayor_tramo} dias)."
+        )
     try:
-        alertas = alerts_service.get_alertas_activas_read(db=db, tipo_alerta=f"por_vencer_{days}", days_threshold=days)
+        alertas = alerts_service.get_alertas_por_vencer_read(db=db, dias=days)
         return alertas
     except HTTPException as e:
         raise e
     except Exception as e:
         logger.error(f"Error inesperado al obtener alertas de lotes por vencer: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Error interno del servidor al obtener alertas de lotes por vencer.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error interno del servidor al obtener alertas de lotes por vencer.")
+
+
+@router.get(
+    "/historial",
+    response_model=List[AlertaHistorial],
+    summary="Historial de alertas (vivas y archivadas)"
+)
+def get_alerts_history(
+    db: Session = Depends(get_db),
+    entidad_tipo: Optional[str] = Query(None, description='"producto" o "lote"'),
+    entidad_id: Optional[int] = Query(None),
+    tipo_alerta: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, gt=0, le=1000)
+) -> List[AlertaHistorial]:
+    """
+    Obtiene el historial de alertas, de la mas reciente a la mas antigua,
+    incluyendo las ya archivadas por la politica de retencion.
+    """
+    logger.info("Procesando peticion de historial de alertas...")
+    try:
+        return alerts_service.get_historial_alertas_read(
+            db=db,
+            entidad_tipo=entidad_tipo,
+            entidad_id=entidad_id,
+            tipo_alerta=tipo_alerta,
+            skip=skip,
+            limit=limit
+        )
+    except Exception as e:
+        logger.error(f"Error inesperado al obtener historial de alertas: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor al obtener historial de alertas.")
+
+
+@router.get(
+    "/reglas",
+    response_model=List[ReglaAlerta],
+    summary="Listar reglas de alerta"
+)
+def list_alert_rules(
+    db: Session = Depends(get_db)
+) -> List[ReglaAlerta]:
+    """
+    Obtiene las reglas de alerta declarativas configuradas.
+    """
+    logger.debug("Buscando lista de reglas de alerta")
+    return crud_regla_alerta.get_reglas(db)
+
+
+@router.post(
+    "/reglas",
+    response_model=ReglaAlerta,
+    status_code=201,
+    summary="Crear una regla de alerta"
+)
+def create_alert_rule(
+    *,
+    db: Session = Depends(get_db),
+    regla_in: ReglaAlertaCreate
+) -> ReglaAlerta:
+    """
+    Crea una regla de alerta declarativa (condiciones sobre campos del
+    producto o del lote). Se evalua en el siguiente barrido de alertas
+    o con POST /alertas/reglas/evaluar.
+    """
+    if crud_regla_alerta.get_regla_by_nombre(db, regla_in.nombre):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Una regla de alerta con el nombre '{regla_in.nombre}' ya existe."
+        )
+    try:
+        return reglas_service.crear_regla(db=db, regla_in=regla_in)
+    except InvalidAlertRuleError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except Exception as e:
+        logger.error(f"Error inesperado al crear regla de alerta: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor al crear la regla de alerta.")
+
+
+@router.delete(
+    "/reglas/{regla_id}",
+    response_model=ReglaAlerta,
+    summary="Borrar una regla de alerta"
+)
+def delete_alert_rule(
+    regla_id: int,
+    db: Session = Depends(get_db)
+) -> ReglaAlerta:
+    """
+    Borra una regla de alerta y cierra sus alertas activas.
+    """
+    db_regla = crud_regla_alerta.get_regla(db, regla_id)
+    if not db_regla:
+        raise HTTPException(status_code=404, detail="Regla de alerta no encontrada")
+    return reglas_service.borrar_regla(db=db, db_regla=db_regla)
+
+
+@router.post(
+    "/reglas/evaluar",
+    response_model=List[ResultadoRegla],
+    summary="Evaluar las reglas de alerta ahora"
+)
+def evaluate_alert_rules(
+    db: Session = Depends(get_db)
+) -> List[ResultadoRegla]:
+    """
+    Evalua todas las reglas de alerta (una sentencia por regla para todas
+    las entidades) y devuelve cuantas alertas creo o cerro cada una y su
+    duracion en milisegundos.
+    """
+    logger.info("Procesando peticion de evaluacion de reglas de alerta...")
+    try:
+        return alerts_service.evaluar_reglas_alertas(db=db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error inesperado al evaluar reglas de alerta: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor al evaluar reglas de alerta.")
@@ -0,0 +1,58 @@
+# sistema-inventarios/backend/app/api/endpoints/events.py
+import logging
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional
+
+from app.core.config import get_settings
+from app.services.eventos_tiempo_real import difusor_eventos
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get(
+    "",
+    summary="Stream SSE de cambios de stock y alertas",
+    response_class=StreamingResponse
+)
+async def stream_events(
+    request: Request,
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    desde_id: Optional[int] = Query(
+        None,
+        ge=0,
+        description="Reanudar despues de este id de evento (alternativa a Last-Event-ID)"
+    )
+) -> StreamingResponse:
+    """
+    Stream Server-Sent Events con los cambios de stock ("stock") y de
+    alertas ("alertas") a medida que ocurren, para que los clientes solo
+    vuelvan a pedir datos cuando algo cambio. Envia un comentario de
+    keepalive periodico. Los ids son globales: al reconectar con
+    Last-Event-ID (o `desde_id`) a cualquier worker se reenvian los eventos
+    perdidos; si ya no estan disponibles se envia un evento "reinicio" y el
+    cliente debe recargar todo.
+    """
+    ultimo_id = last_event_id if last_event_id is not None else desde_id
+    logger.info(f"Cliente SSE conectado (reanuda desde: {ultimo_id}).")
+
+    async def generar() -> AsyncIterator[str]:
+        yield "retry: 3000\n\n"
+        async for evento in difusor_eventos.suscribir(
+            ultimo_id=ultimo_id,
+            keepalive_segundos=get_settings().SSE_KEEPALIVE_SECONDS
+        ):
+            if evento is None:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+            else:
+                yield evento.formatear_sse()
+        logger.info("Cliente SSE desconectado.")
+
+    return StreamingResponse(
+        generar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,20 +1,106 @@
 # sistema-inventarios/backend/app/api/endpoints/inventory.py
+import io
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+import tempfile
+from contextlib import contextmanager
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 # Importamos los schemas de Lote de Modulo 1
 from app.schemas.lote import LoteCreate, Lote 
 from app.schemas.inventory import InventoryExitRequest, SmartDispatchReq
 from app.schemas.movimiento import Movimiento
-from typing import List
+from app.schemas.reserva import Disponibilidad
+from app.schemas.reconciliacion import ReporteReconciliacion
+from app.schemas.importacion import ResumenImportacion
+from app.schemas.simulacion import SimulacionDespachosReq, ResultadoSimulacion
+from typing import Any, List, Literal, Optional
 import app.crud.crud_inventory as crud_inventory
+import app.services.idempotency as idempotency_service
+import app.services.group_commit as group_commit_service
+import app.services.reservations as reservations_service
+import app.services.reconciliation as reconciliation_service
+import app.services.importacion as importacion_service
+import app.services.simulacion as simulacion_service
 from app.api.deps import get_db
-from app.core.exceptions import InsufficientStockError
+from app.core.config import get_settings
+from app.core.exceptions import (
+    InsufficientStockError, IdempotencyKeyConflictError, IdempotencyKeyInProgressError,
+    GroupCommitTimeoutError
+)
 
 router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
+def _respuesta_repetida(
+    db: Session,
+    *,
+    endpoint: str,
+    clave: Optional[str],
+    peticion: BaseModel
+) -> Optional[JSONResponse]:
+    """
+    Si la peticion trae Idempotency-Key y ya fue procesada, devuelve
+    la respuesta guardada sin volver a ejecutar la operacion. Si es la
+    primera vez, reserva la clave (antes de la operacion) y devuelve None.
+    Un duplicado concurrente, mientras la original no termina, recibe 409.
+    """
+    if not clave:
+        return None
+    try:
+        guardada = idempotency_service.reservar_o_repetir(
+            db, endpoint=endpoint, clave=clave, peticion=peticion
+        )
+    except IdempotencyKeyConflictError as e:
+        raise HTTPException(status_code=422, detail=e.message)
+    except IdempotencyKeyInProgressError as e:
+        raise HTTPException(status_code=409, detail=e.message)
+    if guardada is None:
+        return None
+    return JSONResponse(
+        status_code=guardada["codigo_estado"],
+        content=guardada["respuesta"],
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+def _comitear_con_respuesta(
+    db: Session,
+    *,
+    endpoint: str,
+    clave: str,
+    codigo_estado: int,
+    respuesta: Any
+) -> None:
+    """
+    Guarda la respuesta idempotente en la transaccion de la operacion (aun
+    sin comitear) y comitea ambas juntas: no queda una operacion aplicada
+    con su clave "en curso". Si la reserva se perdio (vencio y otro
+    reintento la tomo), la operacion no se confirma y se responde 409.
+    """
+    try:
+        idempotency_service.guardar_respuesta(
+            db, endpoint=endpoint, clave=clave, codigo_estado=codigo_estado, respuesta=respuesta
+        )
+    except IdempotencyKeyInProgressError as e:
+        raise HTTPException(status_code=409, detail=e.message)
+    db.commit()
+
+@contextmanager
+def _liberar_clave_si_falla(db: Session, *, endpoint: str, clave: Optional[str]):
+    """
+    Si la operacion falla (excepcion o error HTTP) se deshace sin aplicar
+    cambios y se libera la clave reservada para que el reintento la ejecute.
+    """
+    try:
+        yield
+    except Exception:
+        if clave:
+            idempotency_service.liberar_clave(db, endpoint=endpoint, clave=clave)
+        raise
+
 @router.get(
     "/lotes",
     response_model=List[Lote]
@@ -51,6 +137,103 @@ def read_lote_by_id(
         raise HTTPException(status_code=404, detail="Lote no encontrado")
     return lote
 
+@router.get(
+    "/disponibilidad/{producto_id}",
+    response_model=Disponibilidad
+)
+def read_available_to_promise(
+    *,
+    db: Session = Depends(get_db),
+    producto_id: int
+) -> Disponibilidad:
+    """
+    Obtiene el stock disponible para prometer de un producto
+    (stock actual menos reservas activas).
+    """
+    disponibilidad = reservations_service.get_disponibilidad(db, producto_id=producto_id)
+    if not disponibilidad:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    return disponibilidad
+
+@router.get(
+    "/reconciliacion",
+    response_model=ReporteReconciliacion
+)
+def read_stock_reconciliation(
+    *,
+    db: Session = Depends(get_db)
+) -> ReporteReconciliacion:
+    """
+    Reporta los productos cuyo stock no coincide con la suma de sus lotes
+    o con su libro de movimientos. No modifica nada.
+    """
+    return reconciliation_service.reconciliar_stock(db, corregir=False)
+
+@router.post(
+    "/reconciliacion",
+    response_model=ReporteReconciliacion
+)
+def run_stock_reconciliation(
+    *,
+    db: Session = Depends(get_db)
+) -> ReporteReconciliacion:
+    """
+    Reconcilia el stock: reporta las diferencias y ajusta el stock de
+    los productos a la suma de sus lotes con una actualizacion masiva.
+    """
+    try:
+        return reconciliation_service.reconciliar_stock(db, corregir=True)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error al reconciliar stock: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Error interno del servidor al reconciliar stock."
+        )
+
+@router.post(
+    "/lotes/importar",
+    response_model=ResumenImportacion
+)
+async def import_lotes(
+    request: Request,
+    db: Session = Depends(get_db),
+    formato: Literal["csv", "ndjson"] = Query(
+        "csv",
+        description="Formato del cuerpo: CSV con cabecera o un objeto JSON por linea"
+    ),
+    tamano_bloque: Optional[int] = Query(
+        None,
+        gt=0,
+        description="Filas por commit (por defecto IMPORT_BATCH_SIZE)"
+    )
+) -> ResumenImportacion:
+    """
+    Importacion masiva de lotes. El cuerpo de la peticion es el archivo
+    (CSV o NDJSON con los campos de LoteCreate). Se recibe en streaming a un
+    archivo temporal y se procesa por bloques, con memoria constante.
+    """
+    logger.info(f"Recibiendo archivo de importacion de lotes ({formato})...")
+    with tempfile.TemporaryFile() as archivo_binario:
+        async for trozo in request.stream():
+            archivo_binario.write(trozo)
+        archivo_binario.seek(0)
+        archivo = io.TextIOWrapper(archivo_binario, encoding="utf-8-sig", newline="")
+        try:
+            return await run_in_threadpool(
+                importacion_service.importar_lotes,
+                db,
+                archivo,
+                formato=formato,
+                tamano_bloque=tamano_bloque
+            )
+        except Exception as e:
+            logger.error(f"Error inesperado al importar lotes: {e}", exc_info=True)
+            raise HTTPException(
+                status_code=500,
+                detail="Error interno del servidor al importar lotes."
+            )
+
 @router.post(
     "/entradas",
     response_model=Lote,
@@ -59,21 +242,42 @@ def read_lote_by_id(
 def register_new_entry(
     *,
     db: Session = Depends(get_db),
-    entry_in: LoteCreate  # Usamos el schema LoteCreate como body
+    entry_in: LoteCreate,  # Usamos el schema LoteCreate como body
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ) -> Lote:
     """
     Registra una nueva entrada de inventario.
     Crea un Lote y un Movimiento, y actualiza el stock del Producto.
+    Con la cabecera Idempotency-Key, los reintentos devuelven la respuesta original.
     """
-    # Llamamos a nuestra nueva funcion de logica de negocio
-    lote = crud_inventory.register_entry(db=db, entry_in=entry_in)
-    
-    if not lote:
-        # Esto ocurre si crud_product.get_product devolvio None
-        raise HTTPException(
-            status_code=404, 
-            detail="Producto no encontrado. No se pudo registrar la entrada."
+    repetida = _respuesta_repetida(
+        db, endpoint="entradas", clave=idempotency_key, peticion=entry_in
+    )
+    if repetida:
+        return repetida
+
+    with _liberar_clave_si_falla(db, endpoint="entradas", clave=idempotency_key):
+        # Llamamos a nuestra nueva funcion de logica de negocio
+        # (con Idempotency-Key, se comitea junto con la respuesta)
+        lote = crud_inventory.register_entry(
+            db=db, entry_in=entry_in, commit=not idempotency_key
         )
+
+        if not lote:
+            # Esto ocurre si crud_product.get_product devolvio None
+            raise HTTPException(
+                status_code=404,
+                detail="Producto no encontrado. No se pudo registrar la entrada."
+            )
+
+        if idempotency_key:
+            _comitear_con_respuesta(
+                db,
+                endpoint="entradas",
+                clave=idempotency_key,
+                codigo_estado=201,
+                respuesta=Lote.model_validate(lote).model_dump(mode="json")
+            )
     return lote
 
 @router.post(
@@ -84,28 +288,87 @@ def register_new_entry(
 def register_new_exit(
     *,
     db: Session = Depends(get_db),
-    exit_in: InventoryExitRequest
+    exit_in: InventoryExitRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ) -> Movimiento:
     """
     Registra una nueva salida de inventario (despacho).
     Crea un Movimiento de 'salida' y actualiza el stock.
+    Con la cabecera Idempotency-Key, los reintentos devuelven la respuesta original.
     """
-    try:
-        movimiento = crud_inventory.register_exit(db=db, exit_in=exit_in)
-    except InsufficientStockError as e:
-        # Atrapar el error y convertirlo en un HTTP 400
-        raise HTTPException(
-            status_code=400,
-            detail=e.message
-        )
-    
-    if not movimiento:
-        raise HTTPException(
-            status_code=404,
-            detail="Lote no encontrado. No se pudo registrar la salida."
-        )
+    repetida = _respuesta_repetida(
+        db, endpoint="salidas", clave=idempotency_key, peticion=exit_in
+    )
+    if repetida:
+        return repetida
+
+    with _liberar_clave_si_falla(db, endpoint="salidas", clave=idempotency_key):
+        try:
+            if get_settings().GROUP_COMMIT_ENABLED:
+                # La salida se aplica junto con otras en una transaccion
+                # compartida; la respuesta idempotente se guarda en ella
+                al_aplicar = None
+                if idempotency_key:
+                    def al_aplicar(db_lote: Session, db_movimiento) -> None:
+                        idempotency_service.guardar_respuesta(
+                            db,
+                            endpoint="salidas",
+                            clave=idempotency_key,
+                            codigo_estado=201,
+                            respuesta=Movimiento.model_validate(db_movimiento).model_dump(mode="json"),
+                            db_operacion=db_lote
+                        )
+                movimiento = group_commit_service.obtener_cola_salidas().registrar(
+                    exit_in,
+                    timeout=get_settings().GROUP_COMMIT_TIMEOUT_SECONDS,
+                    al_aplicar=al_aplicar
+                )
+            else:
+                movimiento = crud_inventory.register_exit(
+                    db=db, exit_in=exit_in, commit=not idempotency_key
+                )
+        except InsufficientStockError as e:
+            # Atrapar el error y convertirlo en un HTTP 400
+            raise HTTPException(
+                status_code=400,
+                detail=e.message
+            )
+        except IdempotencyKeyInProgressError as e:
+            raise HTTPException(status_code=409, detail=e.message)
+        except GroupCommitTimeoutError as e:
+            raise HTTPException(status_code=503, detail=e.message)
+
+        if not movimiento:
+            raise HTTPException(
+                status_code=404,
+                detail="Lote no encontrado. No se pudo registrar la salida."
+            )
+
+        if idempotency_key and not get_settings().GROUP_COMMIT_ENABLED:
+            _comitear_con_respuesta(
+                db,
+                endpoint="salidas",
+                clave=idempotency_key,
+                codigo_estado=201,
+                respuesta=Movimiento.model_validate(movimiento).model_dump(mode="json")
+            )
     return movimiento
 
+@router.post(
+    "/simular-despachos",
+    response_model=ResultadoSimulacion
+)
+def simulate_dispatches(
+    *,
+    db: Session = Depends(get_db),
+    simulacion_in: SimulacionDespachosReq
+) -> ResultadoSimulacion:
+    """
+    Simula despachos FEFO sobre el stock actual sin escribir nada:
+    que lotes consumiria cada pedido y cuanto stock por vencer quedaria.
+    """
+    return simulacion_service.simular_despachos(db, simulacion_in=simulacion_in)
+
 @router.post(
     "/despachar",
     response_model=List[Movimiento], # Devuelve una lista de movimientos
@@ -114,29 +377,50 @@ def register_new_exit(
 def smart_dispatch_inventory(
     *,
     db: Session = Depends(get_db),
-    dispatch_in: SmartDispatchReq
+    dispatch_in: SmartDispatchReq,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ) -> List[Movimiento]:
     """
     Registra una nueva salida de inventario "inteligente" (FEFO).
+    Con la cabecera Idempotency-Key, los reintentos devuelven la respuesta original.
     """
-    try:
-        movimientos = crud_inventory.smart_dispatch_fefo(
-            db=db, dispatch_in=dispatch_in
-        )
-        return movimientos
-    except InsufficientStockError as e:
-        # Atrapar el error y convertirlo en un HTTP 400
-        raise HTTPException(
-            status_code=400,
-            detail=e.message
-        )
-    except ValueError as e:
-        # Atrapar el error interno que lanzamos desde el CRUD
-        logger.error(
-            f"Error interno en smart_dispatch_fefo: {e}", 
-            exc_info=True  # Esto anadira el traceback al log
-        )
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error interno del servidor: {e}"
-        )
\ No newline at end of file
+    repetida = _respuesta_repetida(
+        db, endpoint="despachar", clave=idempotency_key, peticion=dispatch_in
+    )
+    if repetida:
+        return repetida
+
+    with _liberar_clave_si_falla(db, endpoint="despachar", clave=idempotency_key):
+        try:
+            movimientos = crud_inventory.smart_dispatch_fefo(
+                db=db, dispatch_in=dispatch_in, commit=not idempotency_key
+            )
+        except InsufficientStockError as e:
+            # Atrapar el error y convertirlo en un HTTP 400
+            raise HTTPException(
+                status_code=400,
+                detail=e.message
+            )
+        except ValueError as e:
+            # Atrapar el error interno que lanzamos desde el CRUD
+            logger.error(
+                f"Error interno en smart_dispatch_fefo: {e}",
+                exc_info=True  # Esto anadira el traceback al log
+            )
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error interno del servidor: {e}"
+            )
+
+        if idempotency_key:
+            _comitear_con_respuesta(
+                db,
+                endpoint="despachar",
+                clave=idempotency_key,
+                codigo_estado=200,
+                respuesta=[
+                    Movimiento.model_validate(m).model_dump(mode="json")
+                    for m in movimientos
+                ]
+            )
+    return movimientos
\ No newline at end of file
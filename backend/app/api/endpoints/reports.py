@@ -1,21 +1,53 @@
 # sistema-inventarios/backend/app/api/endpoints/reports.py
 import logging
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import date # Nueva importacion
+from typing import List, Literal, Optional
+from datetime import date, datetime # Nueva importacion
 
 import app.services.reports as reports_service
+import app.services.snapshots as snapshots_service
+import app.services.exportacion as exportacion
 import app.schemas.producto as product_schema
 import app.schemas.lote as lote_schema # Importar el schema de lote
 import app.schemas.movimiento as movimiento_schema # Nueva importacion
+import app.schemas.snapshot_stock as snapshot_schema
+import app.schemas.vencimiento as vencimiento_schema
 
 
 from app.api.deps import get_db
+from app.core.config import get_settings
+from app.core.exceptions import ExportFormatUnavailableError
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+FormatoReporte = Literal["json", "csv", "ndjson", "parquet", "arrow"]
+
+_DESCRIPCION_FORMATO = (
+    "json (lista completa), csv/ndjson (descarga en streaming) o parquet/arrow "
+    "(columnar, para cargar directo en pandas; requiere pyarrow en el servidor)"
+)
+
+def _respuesta_exportacion(formato: str, columnas, filas, nombre_archivo: str) -> StreamingResponse:
+    """Arma la descarga en streaming de un reporte en un formato de exportacion."""
+    try:
+        contenido = exportacion.generar(
+            formato,
+            columnas,
+            filas,
+            filas_por_bloque=get_settings().EXPORT_BATCH_SIZE
+        )
+    except ExportFormatUnavailableError as e:
+        logger.warning(e.message)
+        raise HTTPException(status_code=501, detail=e.message)
+    return StreamingResponse(
+        contenido,
+        media_type=exportacion.MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre_archivo}.{formato}"'}
+    )
+
 @router.get(
     "/top-productos-disponibles",
     response_model=List[product_schema.Producto], # O un schema mas simple si solo se necesita lo basico
@@ -47,13 +79,21 @@ def get_top_available_products_report(
     summary="Reporte basico de inventario por producto"
 )
 def get_basic_inventory_report(
-    db: Session = Depends(get_db)
-) -> List[product_schema.Producto]:
+    db: Session = Depends(get_db),
+    formato: FormatoReporte = Query("json", description=_DESCRIPCION_FORMATO)
+):
     """
     Genera un reporte basico del inventario, mostrando el stock actual
     por cada producto.
     """
-    logger.info("Generando reporte basico de inventario...")
+    logger.info(f"Generando reporte basico de inventario ({formato})...")
+    if formato != "json":
+        return _respuesta_exportacion(
+            formato,
+            reports_service.COLUMNAS_INVENTARIO,
+            reports_service.iter_inventory_rows(db=db),
+            "inventario"
+        )
     try:
         products = reports_service.get_current_stock_per_product(db=db)
         return products
@@ -86,6 +126,26 @@ def get_expiring_lotes_report(
         logger.error(f"Error inesperado al generar reporte de lotes por vencer: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor al generar reporte de lotes por vencer.")
 
+@router.get(
+    "/vencimientos-por-dia",
+    response_model=List[vencimiento_schema.DiaVencimiento],
+    summary="Histograma diario de unidades y lotes por vencer"
+)
+def get_expiry_histogram_report(
+    db: Session = Depends(get_db),
+    dias: int = Query(30, gt=0, le=3650, description="Numero de dias hacia adelante")
+) -> List[vencimiento_schema.DiaVencimiento]:
+    """
+    Genera un histograma con las unidades y lotes que vencen cada dia
+    de los proximos `dias` dias.
+    """
+    logger.info(f"Generando histograma de vencimientos ({dias} dias)...")
+    try:
+        return reports_service.get_expiry_histogram(db=db, dias=dias)
+    except Exception as e:
+        logger.error(f"Error inesperado al generar histograma de vencimientos: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor al generar histograma de vencimientos.")
+
 @router.get(
     "/movimientos-por-rango-fecha",
     response_model=List[movimiento_schema.Movimiento], # Usar el schema de movimiento
@@ -94,13 +154,24 @@ def get_expiring_lotes_report(
 def get_movement_report(
     db: Session = Depends(get_db),
     fecha_inicio: date = Query(..., description="Fecha de inicio (YYYY-MM-DD)"),
-    fecha_fin: date = Query(..., description="Fecha de fin (YYYY-MM-DD)")
-) -> List[movimiento_schema.Movimiento]:
+    fecha_fin: date = Query(..., description="Fecha de fin (YYYY-MM-DD)"),
+    formato: FormatoReporte = Query("json", description=_DESCRIPCION_FORMATO)
+):
     """
     Genera un reporte de todos los movimientos de inventario (entradas y salidas)
     dentro de un rango de fechas especificado.
+    Con los demas formatos las filas se leen de la BD y se envian por
+    bloques a medida que se generan, sin armar la lista en memoria
+    (en parquet/arrow, un row group o record batch por bloque).
     """
-    logger.info(f"Generando reporte de movimientos entre {fecha_inicio} y {fecha_fin}...")
+    logger.info(f"Generando reporte de movimientos entre {fecha_inicio} y {fecha_fin} ({formato})...")
+    if formato != "json":
+        return _respuesta_exportacion(
+            formato,
+            reports_service.COLUMNAS_MOVIMIENTOS,
+            reports_service.iter_movement_rows(db=db, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin),
+            f"movimientos_{fecha_inicio}_{fecha_fin}"
+        )
     try:
         movimientos = reports_service.get_movement_report_by_date_range(
             db=db,
@@ -111,3 +182,61 @@ def get_movement_report(
     except Exception as e:
         logger.error(f"Error inesperado al generar reporte de movimientos: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor al generar reporte de movimientos.")
+
+@router.get(
+    "/movimientos-resumen",
+    response_model=List[movimiento_schema.ResumenMovimientos],
+    summary="Totales de movimientos por periodo, producto y tipo"
+)
+def get_movement_summary_report(
+    db: Session = Depends(get_db),
+    fecha_inicio: date = Query(..., description="Fecha de inicio (YYYY-MM-DD)"),
+    fecha_fin: date = Query(..., description="Fecha de fin, incluida (YYYY-MM-DD)"),
+    periodo: Literal["dia", "semana", "mes"] = Query("dia", description="Agrupacion temporal"),
+    producto_id: Optional[int] = Query(None, description="Limitar a un producto")
+) -> List[movimiento_schema.ResumenMovimientos]:
+    """
+    Genera los totales de entradas y salidas por periodo y producto dentro
+    de un rango de fechas, agregados en la base de datos.
+    """
+    logger.info(f"Generando resumen de movimientos por {periodo} entre {fecha_inicio} y {fecha_fin}...")
+    if fecha_fin < fecha_inicio:
+        raise HTTPException(status_code=400, detail="fecha_fin no puede ser anterior a fecha_inicio.")
+    try:
+        return reports_service.get_movement_summary(
+            db=db,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            periodo=periodo,
+            producto_id=producto_id
+        )
+    except Exception as e:
+        logger.error(f"Error inesperado al generar resumen de movimientos: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor al generar resumen de movimientos.")
+
+@router.get(
+    "/stock-en-fecha",
+    response_model=snapshot_schema.ReporteStockEnFecha,
+    summary="Stock por producto (y lote) en una fecha pasada"
+)
+def get_stock_at_date_report(
+    db: Session = Depends(get_db),
+    fecha: datetime = Query(..., description="Instante a consultar (ISO 8601; sin zona se asume UTC)"),
+    producto_id: Optional[int] = Query(None, description="Limitar a un producto"),
+    detalle_lotes: bool = Query(False, description="Incluir el stock por lote")
+) -> snapshot_schema.ReporteStockEnFecha:
+    """
+    Reconstruye el stock en una fecha a partir del snapshot mas cercano
+    y de los movimientos posteriores a ese snapshot.
+    """
+    logger.info(f"Generando reporte de stock en fecha {fecha}...")
+    try:
+        return snapshots_service.stock_en_fecha(
+            db,
+            fecha=fecha,
+            producto_id=producto_id,
+            detalle_lotes=detalle_lotes
+        )
+    except Exception as e:
+        logger.error(f"Error inesperado al generar reporte de stock en fecha: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor al generar reporte de stock en fecha.")
@@ -0,0 +1,105 @@
+# sistema-inventarios/backend/app/api/endpoints/reservations.py
+import logging
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+
+import app.services.reservations as reservations_service
+from app.crud import crud_reserva
+from app.api.deps import get_db
+from app.models.reserva import Reserva as ReservaModel
+from app.schemas.reserva import ReservaCreate, Reserva
+from app.schemas.movimiento import Movimiento
+from app.core.exceptions import InsufficientStockError, ReservationNotActiveError
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def get_reserva_or_404(
+    reserva_id: int,
+    db: Session = Depends(get_db)
+) -> ReservaModel:
+    """
+    Dependencia que obtiene una reserva por ID o lanza un 404.
+    """
+    db_reserva = crud_reserva.get_reserva(db, reserva_id=reserva_id)
+    if not db_reserva:
+        logger.warning(f"Reserva no encontrada con id: {reserva_id}")
+        raise HTTPException(status_code=404, detail="Reserva no encontrada")
+    return db_reserva
+
+@router.post(
+    "/",
+    response_model=Reserva,
+    status_code=201
+)
+def create_reservation(
+    *,
+    db: Session = Depends(get_db),
+    reserva_in: ReservaCreate
+) -> Reserva:
+    """
+    Reserva stock de un producto durante un tiempo limitado.
+    Reduce el disponible sin crear movimientos.
+    """
+    try:
+        reserva = reservations_service.crear_reserva(db, reserva_in=reserva_in)
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+
+    if not reserva:
+        raise HTTPException(
+            status_code=404,
+            detail="Producto no encontrado. No se pudo crear la reserva."
+        )
+    return reserva
+
+@router.get(
+    "/{reserva_id}",
+    response_model=Reserva
+)
+def read_reservation(
+    *,
+    db_reserva: ReservaModel = Depends(get_reserva_or_404)
+) -> Reserva:
+    """
+    Obtiene una reserva por su ID.
+    """
+    return db_reserva
+
+@router.delete(
+    "/{reserva_id}",
+    response_model=Reserva
+)
+def release_reservation(
+    *,
+    db: Session = Depends(get_db),
+    db_reserva: ReservaModel = Depends(get_reserva_or_404)
+) -> Reserva:
+    """
+    Libera una reserva activa y devuelve su stock al disponible.
+    """
+    try:
+        return crud_reserva.release_reserva(db, db_reserva=db_reserva)
+    except ReservationNotActiveError as e:
+        raise HTTPException(status_code=409, detail=e.message)
+
+@router.post(
+    "/{reserva_id}/confirmar",
+    response_model=List[Movimiento],
+    status_code=200
+)
+def confirm_reservation(
+    *,
+    db: Session = Depends(get_db),
+    db_reserva: ReservaModel = Depends(get_reserva_or_404)
+) -> List[Movimiento]:
+    """
+    Confirma una reserva: la cierra y despacha su cantidad con FEFO.
+    """
+    try:
+        return reservations_service.confirmar_reserva(db, db_reserva=db_reserva)
+    except ReservationNotActiveError as e:
+        raise HTTPException(status_code=409, detail=e.message)
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=400, detail=e.message)
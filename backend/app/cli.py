@@ -0,0 +1,258 @@
+# sistema-inventarios/backend/app/cli.py
+"""
+Comandos de mantenimiento del inventario.
+
+Uso (desde la carpeta backend):
+    python app/cli.py reconciliar [--corregir]
+    python app/cli.py importar-lotes ARCHIVO [--formato csv|ndjson] [--tamano-bloque N]
+    python app/cli.py snapshot-stock [--fecha-corte ISO8601]
+    python app/cli.py sincronizar-alertas
+    python app/cli.py purgar-alertas [--dias N] [--borrar] [--tamano-lote N]
+    python app/cli.py barrer-vencidos [--tamano-lote N]
+    python app/cli.py reconstruir-resumen-diario [--tamano-lote N]
+    python app/cli.py consumir-outbox [--continuo] [--intervalo SEGUNDOS] [--tamano-lote N] [--reactivar-fallidos]
+    python app/cli.py programador
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+script_path = Path(__file__).resolve()
+backend_root = script_path.parent.parent
+sys.path.append(str(backend_root))
+
+from sqlalchemy.orm import Session
+from app.core.logging_setup import setup_logging
+from app.db.session import SessionLocal
+import app.models
+
+
+def cmd_reconciliar(db: Session, args: argparse.Namespace) -> None:
+    """Reporta (y opcionalmente corrige) las diferencias de stock."""
+    from app.services.reconciliation import reconciliar_stock
+
+    reporte = reconciliar_stock(db, corregir=args.corregir)
+    print(f"Productos revisados: {reporte.productos_revisados}")
+    print(f"Productos con diferencias: {len(reporte.diferencias)}")
+    for d in reporte.diferencias:
+        print(
+            f"  {d.sku} (id {d.producto_id}): producto={d.cantidad_producto} "
+            f"lotes={d.suma_lotes} movimientos={d.suma_movimientos}"
+        )
+    if args.corregir:
+        print(f"Productos corregidos: {reporte.productos_corregidos}")
+
+
+def cmd_importar_lotes(db: Session, args: argparse.Namespace) -> None:
+    """Importa lotes desde un archivo CSV o NDJSON en streaming."""
+    from app.services.importacion import importar_lotes
+
+    formato = args.formato or ("ndjson" if args.archivo.suffix in (".ndjson", ".jsonl") else "csv")
+
+    def mostrar_progreso(resumen) -> None:
+        print(
+            f"\r{resumen.filas_leidas} filas leidas, {resumen.filas_importadas} importadas, "
+            f"{resumen.filas_con_error} con error",
+            end="",
+            flush=True
+        )
+
+    with open(args.archivo, encoding="utf-8-sig", newline="") as archivo:
+        resumen = importar_lotes(
+            db,
+            archivo,
+            formato=formato,
+            tamano_bloque=args.tamano_bloque,
+            on_progreso=mostrar_progreso
+        )
+    print()
+    for error in resumen.errores:
+        print(f"  Fila {error.fila}: {error.error}")
+    if resumen.errores_truncados:
+        print(f"  ... ({resumen.filas_con_error - len(resumen.errores)} errores mas)")
+
+
+def cmd_snapshot_stock(db: Session, args: argparse.Namespace) -> None:
+    """Toma un snapshot de stock por producto y por lote."""
+    from app.services.snapshots import tomar_snapshot
+
+    corte = tomar_snapshot(db, fecha_corte=args.fecha_corte)
+    print(f"Snapshot a {corte.fecha_corte.isoformat()}")
+    print(f"  Movimientos nuevos incluidos: {corte.movimientos_incluidos}")
+    print(f"  Productos con stock: {corte.productos}")
+    print(f"  Lotes con stock: {corte.lotes}")
+
+
+def cmd_sincronizar_alertas(db: Session, args: argparse.Namespace) -> None:
+    """Recalcula toda la tabla de alertas (barrido completo)."""
+    from app.services.alerts import sincronizar_alertas
+
+    sincronizar_alertas(db)
+    print("Alertas sincronizadas.")
+
+
+def cmd_purgar_alertas(db: Session, args: argparse.Namespace) -> None:
+    """Archiva (o borra) las alertas inactivas mas antiguas que la retencion."""
+    from app.services.alerts import purgar_alertas_inactivas
+
+    total = purgar_alertas_inactivas(
+        db,
+        dias_retencion=args.dias,
+        archivar=False if args.borrar else None,
+        tamano_lote=args.tamano_lote
+    )
+    print(f"Alertas purgadas: {total}")
+
+
+def cmd_barrer_vencidos(db: Session, args: argparse.Namespace) -> None:
+    """Pone en cuarentena los lotes vencidos con stock."""
+    from app.services.vencidos import barrer_lotes_vencidos
+
+    total = barrer_lotes_vencidos(db, tamano_lote=args.tamano_lote)
+    print(f"Lotes puestos en cuarentena: {total}")
+
+
+def cmd_reconstruir_resumen_diario(db: Session, args: argparse.Namespace) -> None:
+    """Reconstruye desde cero el resumen diario de movimientos."""
+    from app.services.resumen_diario import reconstruir_resumen_diario
+
+    total = reconstruir_resumen_diario(db, tamano_lote=args.tamano_lote)
+    print(f"Movimientos consolidados en el resumen diario: {total}")
+
+
+def cmd_consumir_outbox(db: Session, args: argparse.Namespace) -> None:
+    """Procesa los eventos de stock pendientes (una vez o en bucle)."""
+    from app.crud.crud_outbox import reactivar_fallidos
+    from app.services.outbox import consumir_outbox, consumir_continuamente
+
+    if args.reactivar_fallidos:
+        print(f"Eventos fallidos reactivados: {reactivar_fallidos(db)}")
+    if args.continuo:
+        consumir_continuamente(db, intervalo_segundos=args.intervalo, tamano_lote=args.tamano_lote)
+    else:
+        total = consumir_outbox(db, tamano_lote=args.tamano_lote)
+        print(f"Eventos procesados: {total}")
+
+
+def cmd_programador(db: Session, args: argparse.Namespace) -> None:
+    """
+    Ejecuta las tareas periodicas globales (y el despachador de
+    notificaciones) hasta que se detenga el proceso.
+    Debe haber un solo programador por despliegue (los workers de la API
+    no las ejecutan salvo con SCHEDULER_ENABLED).
+    """
+    from app.core.config import get_settings
+    from app.core.scheduler import ProgramadorTareas
+    from app.services.notificaciones import despachador_notificaciones
+    from app.services.tasks import registrar_tareas_periodicas
+
+    async def ejecutar() -> None:
+        if get_settings().NOTIFY_ENABLED:
+            despachador_notificaciones.iniciar(asyncio.get_running_loop())
+        programador = ProgramadorTareas()
+        registrar_tareas_periodicas(programador)
+        programador.iniciar()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await programador.detener()
+            despachador_notificaciones.detener()
+
+    try:
+        asyncio.run(ejecutar())
+    except KeyboardInterrupt:
+        print("Programador detenido.")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Comandos de mantenimiento del inventario.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    reconciliar = subparsers.add_parser("reconciliar", help="Reconciliar el stock de productos")
+    reconciliar.add_argument(
+        "--corregir",
+        action="store_true",
+        help="Ajustar el stock de los productos a la suma de sus lotes"
+    )
+    reconciliar.set_defaults(funcion=cmd_reconciliar)
+
+    importar = subparsers.add_parser("importar-lotes", help="Importar lotes desde CSV/NDJSON")
+    importar.add_argument("archivo", type=Path)
+    importar.add_argument("--formato", choices=["csv", "ndjson"], default=None)
+    importar.add_argument("--tamano-bloque", type=int, default=None)
+    importar.set_defaults(funcion=cmd_importar_lotes)
+
+    snapshot = subparsers.add_parser("snapshot-stock", help="Tomar un snapshot de stock")
+    snapshot.add_argument(
+        "--fecha-corte",
+        type=datetime.fromisoformat,
+        default=None,
+        help="Instante del corte (por defecto, ahora menos SNAPSHOT_LAG_SECONDS)"
+    )
+    snapshot.set_defaults(funcion=cmd_snapshot_stock)
+
+    alertas = subparsers.add_parser("sincronizar-alertas", help="Recalcular todas las alertas")
+    alertas.set_defaults(funcion=cmd_sincronizar_alertas)
+
+    purgar = subparsers.add_parser("purgar-alertas", help="Archivar alertas inactivas antiguas")
+    purgar.add_argument(
+        "--dias",
+        type=float,
+        default=None,
+        help="Retencion en dias (por defecto ALERT_RETENTION_DAYS)"
+    )
+    purgar.add_argument(
+        "--borrar",
+        action="store_true",
+        help="Borrar en lugar de archivar en alertas_historico"
+    )
+    purgar.add_argument("--tamano-lote", type=int, default=None)
+    purgar.set_defaults(funcion=cmd_purgar_alertas)
+
+    vencidos = subparsers.add_parser("barrer-vencidos", help="Poner en cuarentena los lotes vencidos")
+    vencidos.add_argument("--tamano-lote", type=int, default=None)
+    vencidos.set_defaults(funcion=cmd_barrer_vencidos)
+
+    resumen = subparsers.add_parser(
+        "reconstruir-resumen-diario", help="Reconstruir el resumen diario de movimientos"
+    )
+    resumen.add_argument("--tamano-lote", type=int, default=None)
+    resumen.set_defaults(funcion=cmd_reconstruir_resumen_diario)
+
+    consumir = subparsers.add_parser("consumir-outbox", help="Procesar eventos de stock del outbox")
+    consumir.add_argument(
+        "--continuo",
+        action="store_true",
+        help="Quedarse procesando eventos (consumidor en un proceso separado)"
+    )
+    consumir.add_argument("--intervalo", type=float, default=None)
+    consumir.add_argument("--tamano-lote", type=int, default=None)
+    consumir.add_argument(
+        "--reactivar-fallidos",
+        action="store_true",
+        help="Devolver a la cola los eventos fallidos (dead letter) antes de procesar"
+    )
+    consumir.set_defaults(funcion=cmd_consumir_outbox)
+
+    programador = subparsers.add_parser(
+        "programador", help="Ejecutar las tareas periodicas globales (un proceso por despliegue)"
+    )
+    programador.set_defaults(funcion=cmd_programador)
+
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    setup_logging()
+    db = SessionLocal()
+    try:
+        args.funcion(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
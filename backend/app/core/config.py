@@ -2,6 +2,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 from pathlib import Path
+from typing import Dict, List
 
 # 1. Encontrar la ruta al directorio 'backend'
 # __file__ es .../backend/app/core/config.py
@@ -34,6 +35,125 @@ class Settings(BaseSettings):
 
     LOG_LEVEL: str = "INFO"
 
+    # Tiempo de vida (segundos) de las respuestas guardadas por Idempotency-Key
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    # Vigencia (segundos) de una clave reservada sin respuesta: si el proceso
+    # muere a mitad de la operacion, pasado este tiempo el reintento la ejecuta
+    IDEMPOTENCY_PENDING_TTL_SECONDS: int = 60
+
+    # Modo "group commit" para salidas: agrupa salidas concurrentes en una transaccion
+    GROUP_COMMIT_ENABLED: bool = False
+    GROUP_COMMIT_WINDOW_MS: float = 5
+    GROUP_COMMIT_MAX_BATCH: int = 200
+    # Espera maxima (segundos) de una salida encolada antes de responder 503
+    GROUP_COMMIT_TIMEOUT_SECONDS: float = 10
+
+    # Tareas periodicas globales (barridos, consolidaciones, outbox...). Deben
+    # correr en un solo proceso por despliegue: `python app/cli.py programador`.
+    # Activarlo en la API solo si corre con un unico worker.
+    SCHEDULER_ENABLED: bool = False
+
+    # Reservas de stock: TTL por defecto, frecuencia del barrido y de la resincronizacion del heap
+    RESERVATION_TTL_SECONDS: int = 900
+    RESERVATION_SWEEP_INTERVAL_SECONDS: float = 5
+    RESERVATION_RESYNC_SECONDS: float = 300
+
+    # Contadores de stock repartidos para productos muy concurridos (0 = desactivado).
+    # Con N > 0, los cambios de stock van a N ranuras por producto y se consolidan
+    # en Producto.cantidad_actual cada STOCK_COUNTER_FOLD_INTERVAL_SECONDS. Las salidas
+    # se descuentan del cupo de una ranura y solo bloquean el producto si no alcanza.
+    STOCK_COUNTER_SHARDS: int = 0
+    STOCK_COUNTER_FOLD_INTERVAL_SECONDS: float = 5
+
+    # Importacion masiva de lotes: filas por commit y maximo de errores detallados
+    IMPORT_BATCH_SIZE: int = 5000
+    IMPORT_MAX_REPORTED_ERRORS: int = 1000
+
+    # Snapshots de stock: cada cuanto se toman y cuanto se atrasa el corte
+    # respecto a "ahora" para no dejar fuera transacciones aun en curso.
+    SNAPSHOT_INTERVAL_SECONDS: float = 86400
+    SNAPSHOT_LAG_SECONDS: float = 60
+
+    # Outbox de eventos de stock: frecuencia del consumidor, eventos por lote
+    # y cuanto se conservan los eventos ya procesados. Un evento cuyos
+    # manejadores fallan se reintenta con espera exponencial (base
+    # OUTBOX_RETRY_BACKOFF_SECONDS) hasta OUTBOX_MAX_ATTEMPTS veces; despues
+    # queda como fallido (dead letter).
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_RETENTION_SECONDS: float = 86400
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETRY_BACKOFF_SECONDS: float = 5
+
+    # Alertas: las mantiene una tarea periodica; los GET solo leen la tabla.
+    # ALERT_EXPIRY_TIERS_DAYS son los tramos de severidad de "por vencer": cada
+    # lote queda en el tramo mas estrecho que lo incluye (por_vencer_<dias>).
+    # ALERT_SINCE_LAG_SECONDS: el listado devuelve como `sincronizado_hasta`
+    # "ahora" menos este margen (mayor que la transaccion mas larga que
+    # escribe alertas), porque fecha_actualizacion se fija antes del commit.
+    ALERT_SYNC_INTERVAL_SECONDS: float = 60
+    ALERT_EXPIRY_TIERS_DAYS: List[int] = [7, 15, 30, 60]
+    ALERT_SINCE_LAG_SECONDS: float = 60
+
+    # Retencion de alertas: las inactivas resueltas hace mas de ALERT_RETENTION_DAYS
+    # se archivan en alertas_historico (o se borran si ALERT_ARCHIVE es False),
+    # en lotes de ALERT_PURGE_BATCH_SIZE con una pausa entre lotes.
+    ALERT_RETENTION_DAYS: float = 90
+    ALERT_ARCHIVE: bool = True
+    ALERT_PURGE_BATCH_SIZE: int = 1000
+    ALERT_PURGE_SLEEP_SECONDS: float = 0.1
+    ALERT_PURGE_INTERVAL_SECONDS: float = 3600
+
+    # Resumen diario de movimientos: cada cuanto se consolidan los movimientos
+    # aun no consolidados y cuantos por transaccion.
+    MOVEMENT_ROLLUP_INTERVAL_SECONDS: float = 60
+    MOVEMENT_ROLLUP_BATCH_SIZE: int = 10000
+
+    # Exportaciones en streaming (CSV/NDJSON): filas por lectura del cursor
+    # del servidor y por bloque enviado al cliente.
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Barrido diario de lotes vencidos (cuarentena): frecuencia y lotes por transaccion
+    EXPIRED_SWEEP_INTERVAL_SECONDS: float = 86400
+    EXPIRED_SWEEP_BATCH_SIZE: int = 1000
+
+    # Calendario de vencimientos en memoria: cada cuanto se recarga desde la BD
+    EXPIRY_CALENDAR_RESYNC_SECONDS: float = 300
+
+    # Stream SSE de cambios de stock y alertas: keepalive, cada cuanto lee
+    # cada worker los eventos nuevos de la BD, cuanto se conservan (para
+    # reanudar con Last-Event-ID), maximo de eventos reenviados al reanudar
+    # (si faltan mas se pide recargar todo) y maximo en cola por cliente.
+    SSE_KEEPALIVE_SECONDS: float = 15
+    SSE_POLL_INTERVAL_SECONDS: float = 1
+    SSE_RETENTION_SECONDS: float = 3600
+    SSE_RESUME_MAX_EVENTS: int = 1000
+    SSE_SUBSCRIBER_QUEUE_SIZE: int = 100
+
+    # Notificaciones de alertas nuevas: se agrupan en resumenes por ventana y
+    # destinatario. NOTIFY_ROUTES da a cada destinatario los prefijos de
+    # tipo_alerta que recibe ("*" = todos); NOTIFY_SINKS elige los canales
+    # ("archivo", "webhook", "smtp"). La cola acotada frena la lectura de
+    # alertas nuevas si los envios se atrasan (quedan en la BD hasta la
+    # siguiente vuelta). Corre con las tareas globales; una alerta reclamada
+    # y no entregada en NOTIFY_CLAIM_SECONDS se vuelve a enviar.
+    NOTIFY_ENABLED: bool = True
+    NOTIFY_ROUTES: Dict[str, List[str]] = {"inventario@localhost": ["*"]}
+    NOTIFY_SINKS: List[str] = ["archivo"]
+    NOTIFY_POLL_INTERVAL_SECONDS: float = 10
+    NOTIFY_DIGEST_WINDOW_SECONDS: float = 60
+    NOTIFY_DIGEST_MAX_ALERTS: int = 500
+    NOTIFY_QUEUE_SIZE: int = 1000
+    NOTIFY_MAX_RETRIES: int = 3
+    NOTIFY_RETRY_BACKOFF_SECONDS: float = 2
+    NOTIFY_CLAIM_SECONDS: float = 600
+    NOTIFY_FILE_PATH: str = "notificaciones.jsonl"
+    NOTIFY_WEBHOOK_URL: str = "http://localhost:8001/notificaciones"
+    NOTIFY_WEBHOOK_TIMEOUT_SECONDS: float = 5
+    NOTIFY_SMTP_HOST: str = "localhost"
+    NOTIFY_SMTP_PORT: int = 1025
+    NOTIFY_SMTP_FROM: str = "alertas@inventario.local"
+
 @lru_cache()
 def get_settings() -> Settings:
     """
@@ -9,4 +9,75 @@ class InsufficientStockError(Exception):
             f"Stock insuficiente para {item_sku}. "
             f"Solicitado: {requested}, Disponible: {available}"
         )
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+class IdempotencyKeyConflictError(Exception):
+    """Excepcion para cuando una clave de idempotencia se reutiliza con otra peticion."""
+    def __init__(self, clave: str, endpoint: str):
+        self.clave = clave
+        self.endpoint = endpoint
+        self.message = (
+            f"La clave de idempotencia '{clave}' ya fue usada en '{endpoint}' "
+            f"con una peticion diferente."
+        )
+        super().__init__(self.message)
+
+
+class IdempotencyKeyInProgressError(Exception):
+    """Excepcion para cuando otra peticion con la misma clave de idempotencia aun no termina."""
+    def __init__(self, clave: str, endpoint: str):
+        self.clave = clave
+        self.endpoint = endpoint
+        self.message = (
+            f"La peticion con clave de idempotencia '{clave}' en '{endpoint}' "
+            f"todavia esta en curso (o se interrumpio); reintente mas tarde o use otra clave."
+        )
+        super().__init__(self.message)
+
+
+class ReservationNotActiveError(Exception):
+    """Excepcion para cuando se opera sobre una reserva que ya no esta activa."""
+    def __init__(self, reserva_id: int, estado: str):
+        self.reserva_id = reserva_id
+        self.estado = estado
+        self.message = f"La reserva {reserva_id} no esta activa (estado: {estado})."
+        super().__init__(self.message)
+
+
+class InvalidCursorError(Exception):
+    """Excepcion para cuando un cursor de paginacion no se puede decodificar."""
+    def __init__(self, cursor: str):
+        self.cursor = cursor
+        self.message = f"Cursor de paginacion invalido: '{cursor}'."
+        super().__init__(self.message)
+
+
+class InvalidAlertRuleError(Exception):
+    """Excepcion para cuando una regla de alerta no se puede compilar a SQL."""
+    def __init__(self, nombre: str, motivo: str):
+        self.nombre = nombre
+        self.motivo = motivo
+        self.message = f"Regla de alerta '{nombre}' invalida: {motivo}"
+        super().__init__(self.message)
+
+
+class ExportFormatUnavailableError(Exception):
+    """Excepcion para cuando un formato de exportacion requiere una dependencia no instalada."""
+    def __init__(self, formato: str, dependencia: str):
+        self.formato = formato
+        self.dependencia = dependencia
+        self.message = (
+            f"El formato '{formato}' no esta disponible: falta la dependencia opcional '{dependencia}'."
+        )
+        super().__init__(self.message)
+
+
+class GroupCommitTimeoutError(Exception):
+    """Excepcion para cuando la cola de salidas agrupadas no responde a tiempo."""
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.message = (
+            f"La cola de salidas agrupadas no respondio en {timeout} s; "
+            f"reintente la salida (con Idempotency-Key para no duplicarla)."
+        )
+        super().__init__(self.message)
@@ -0,0 +1,73 @@
+# sistema-inventarios/backend/app/core/scheduler.py
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class TareaPeriodica:
+    """Una funcion de mantenimiento que se ejecuta cada `intervalo_segundos`."""
+    nombre: str
+    intervalo_segundos: float
+    funcion: Callable[[Session], object]
+
+
+class ProgramadorTareas:
+    """
+    Programador de tareas periodicas basado en asyncio.
+    Cada tarea corre en un hilo (asyncio.to_thread) con su propia sesion
+    de BD, para no bloquear el event loop de la API.
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None):
+        self._session_factory = session_factory
+        self._tareas: List[TareaPeriodica] = []
+        self._ejecuciones: List[asyncio.Task] = []
+
+    def registrar(
+        self,
+        nombre: str,
+        intervalo_segundos: float,
+        funcion: Callable[[Session], object]
+    ) -> None:
+        """Registra una tarea. Debe llamarse antes de iniciar()."""
+        self._tareas.append(TareaPeriodica(nombre, intervalo_segundos, funcion))
+        logger.debug(f"Tarea periodica registrada: {nombre} (cada {intervalo_segundos}s)")
+
+    def ejecutar_tarea(self, tarea: TareaPeriodica) -> None:
+        """Ejecuta una tarea una vez con una sesion nueva. Nunca lanza errores."""
+        if self._session_factory is None:
+            from app.db.session import SessionLocal
+            self._session_factory = SessionLocal
+        db = self._session_factory()
+        try:
+            tarea.funcion(db)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error en la tarea periodica '{tarea.nombre}': {e}", exc_info=True)
+        finally:
+            db.close()
+
+    async def _bucle(self, tarea: TareaPeriodica) -> None:
+        while True:
+            await asyncio.to_thread(self.ejecutar_tarea, tarea)
+            await asyncio.sleep(tarea.intervalo_segundos)
+
+    def iniciar(self) -> None:
+        """Lanza un bucle asyncio por tarea registrada (requiere un event loop activo)."""
+        for tarea in self._tareas:
+            self._ejecuciones.append(
+                asyncio.create_task(self._bucle(tarea), name=f"tarea-{tarea.nombre}")
+            )
+        logger.info(f"Programador iniciado con {len(self._tareas)} tareas periodicas.")
+
+    async def detener(self) -> None:
+        """Cancela los bucles de todas las tareas."""
+        for ejecucion in self._ejecuciones:
+            ejecucion.cancel()
+        await asyncio.gather(*self._ejecuciones, return_exceptions=True)
+        self._ejecuciones.clear()
+        logger.info("Programador de tareas detenido.")
@@ -1,10 +1,13 @@
 # sistema-inventarios/backend/app/crud/crud_alerta.py
 import logging
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update
-from typing import List, Optional, Dict, Any
+from sqlalchemy import select, update, delete, insert, literal, and_, or_, union_all, ColumnElement, FromClause
+from typing import Iterable, List, Optional, Dict, Any, Tuple, Union
+from datetime import date, datetime, timedelta
 
+from app.db.dialects import upsert_insert
 from app.models.alerta import Alerta
+from app.models.alerta_historica import AlertaHistorica
 from app.schemas.alerta import AlertaCreate, AlertaUpdate
 
 logger = logging.getLogger(__name__)
@@ -48,6 +51,98 @@ def create_alerta(db: Session, alerta: AlertaCreate) -> Alerta:
     logger.info(f"Alerta creada: {db_alerta.tipo_alerta} para {db_alerta.entidad_tipo} ID {db_alerta.entidad_id}")
     return db_alerta
 
+def upsert_alertas(
+    db: Session,
+    *,
+    tipo_alerta: Union[str, ColumnElement[str]],
+    entidad_tipo: str,
+    entidad_id: ColumnElement[int],
+    mensaje: ColumnElement[str],
+    metadata_json: ColumnElement[Any],
+    condicion: ColumnElement[bool],
+    fecha_vencimiento: Optional[ColumnElement[date]] = None,
+    desde: Optional[FromClause] = None
+) -> int:
+    """
+    Crea con un solo INSERT ... SELECT las alertas activas de las entidades
+    que cumplen `condicion`, sin leer antes las alertas existentes.
+    El indice unico parcial de alertas activas resuelve los conflictos:
+    si la alerta ya existe solo se actualiza su mensaje/metadata cuando
+    cambiaron (ON CONFLICT DO UPDATE ... WHERE). No comitea.
+    `tipo_alerta` puede ser un texto fijo o una expresion por fila (p. ej.
+    el tramo de vencimiento de cada lote). `desde` fija el FROM del SELECT
+    cuando las expresiones vienen de un JOIN (p. ej. reglas con agregados).
+    Devuelve el numero de alertas creadas o actualizadas.
+    """
+    if isinstance(tipo_alerta, str):
+        tipo_alerta = literal(tipo_alerta)
+    if fecha_vencimiento is None:
+        fecha_vencimiento = literal(None, Alerta.fecha_vencimiento.type)
+    ahora = literal(datetime.now(), Alerta.fecha_creacion.type)
+    origen = select(
+        tipo_alerta,
+        entidad_id,
+        literal(entidad_tipo),
+        mensaje,
+        metadata_json,
+        fecha_vencimiento,
+        literal(True),
+        literal(False),
+        ahora,
+        ahora
+    ).where(condicion)
+    if desde is not None:
+        origen = origen.select_from(desde)
+    stmt = upsert_insert(db, Alerta).from_select(
+        ["tipo_alerta", "entidad_id", "entidad_tipo", "mensaje", "metadata_json",
+         "fecha_vencimiento", "esta_activa", "notificada", "fecha_creacion", "fecha_actualizacion"],
+        origen
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Alerta.tipo_alerta, Alerta.entidad_tipo, Alerta.entidad_id],
+        index_where=(Alerta.esta_activa == True),
+        set_={
+            "mensaje": stmt.excluded.mensaje,
+            "metadata_json": stmt.excluded.metadata_json,
+            "fecha_vencimiento": stmt.excluded.fecha_vencimiento,
+            "fecha_actualizacion": stmt.excluded.fecha_actualizacion,
+        },
+        where=(Alerta.mensaje != stmt.excluded.mensaje)
+    )
+    return db.execute(stmt).rowcount
+
+def deactivate_alertas_resueltas(
+    db: Session,
+    *,
+    tipo_alerta: Union[str, ColumnElement[bool]],
+    entidad_tipo: str,
+    sigue_vigente: ColumnElement[bool],
+    entidad_ids: Optional[Iterable[int]] = None
+) -> int:
+    """
+    Desactiva con un solo UPDATE las alertas activas de un tipo cuya
+    condicion `sigue_vigente` (un EXISTS correlacionado con Alerta) ya no se
+    cumple, opcionalmente solo para `entidad_ids`. No comitea.
+    `tipo_alerta` es un tipo concreto o una condicion sobre Alerta.tipo_alerta
+    (p. ej. todos los tramos de vencimiento).
+    Devuelve el numero de alertas desactivadas.
+    """
+    if isinstance(tipo_alerta, str):
+        tipo_alerta = Alerta.tipo_alerta == tipo_alerta
+    stmt = update(Alerta).where(
+        tipo_alerta,
+        Alerta.entidad_tipo == entidad_tipo,
+        Alerta.esta_activa == True,
+        ~sigue_vigente
+    )
+    if entidad_ids is not None:
+        stmt = stmt.where(Alerta.entidad_id.in_(entidad_ids))
+    result = db.execute(
+        stmt.values(esta_activa=False, fecha_resolucion=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
 def deactivate_alerta(db: Session, alerta_id: int) -> Optional[Alerta]:
     """
     Desactiva una alerta existente por su ID.
@@ -55,6 +150,7 @@ def deactivate_alerta(db: Session, alerta_id: int) -> Optional[Alerta]:
     db_alerta = db.get(Alerta, alerta_id)
     if db_alerta:
         db_alerta.esta_activa = False
+        db_alerta.fecha_resolucion = datetime.now()
         db.add(db_alerta)
         db.commit()
         db.refresh(db_alerta)
@@ -75,7 +171,7 @@ def deactivate_alertas_by_tipo_entidad(
         Alerta.entidad_id == entidad_id,
         Alerta.entidad_tipo == entidad_tipo,
         Alerta.esta_activa == True
-    ).values(esta_activa=False)
+    ).values(esta_activa=False, fecha_resolucion=datetime.now())
     db.execute(stmt)
     db.commit()
     logger.info(
@@ -97,3 +193,197 @@ def get_active_alertas(
         stmt = stmt.where(Alerta.tipo_alerta == tipo_alerta)
     return db.scalars(stmt.offset(skip).limit(limit)).all()
 
+def get_active_alertas_por_vencer(
+    db: Session,
+    *,
+    prefijo_tipo: str,
+    hasta: date,
+    skip: int = 0,
+    limit: int = 100
+) -> List[Alerta]:
+    """
+    Obtiene las alertas activas de vencimiento (tipos que empiezan por
+    `prefijo_tipo`) cuya fecha de vencimiento es anterior o igual a `hasta`,
+    de la mas proxima a la mas lejana.
+    """
+    stmt = select(Alerta).where(
+        Alerta.esta_activa == True,
+        Alerta.tipo_alerta.startswith(prefijo_tipo),
+        Alerta.fecha_vencimiento <= hasta
+    ).order_by(Alerta.fecha_vencimiento, Alerta.id)
+    return db.scalars(stmt.offset(skip).limit(limit)).all()
+
+# Columnas que se copian de alertas a alertas_historico al archivar
+_COLUMNAS_ARCHIVO = [
+    "id", "tipo_alerta", "entidad_id", "entidad_tipo", "mensaje", "fecha_creacion",
+    "esta_activa", "metadata_json", "fecha_vencimiento", "fecha_resolucion",
+    "fecha_actualizacion",
+]
+
+def purgar_lote_alertas_inactivas(
+    db: Session,
+    *,
+    antes_de: datetime,
+    limite: int,
+    archivar: bool = True
+) -> int:
+    """
+    Archiva en alertas_historico (o borra, si `archivar` es False) hasta
+    `limite` alertas inactivas resueltas antes de `antes_de`, y comitea.
+    Las desactivadas antes de existir fecha_resolucion se juzgan por su
+    fecha de creacion. Devuelve el numero de alertas purgadas (0 = no quedan).
+    Las alertas del lote se bloquean con FOR UPDATE SKIP LOCKED: dos purgas
+    concurrentes toman lotes disjuntos y no archivan dos veces la misma
+    alerta (choque con la llave primaria de alertas_historico).
+    """
+    alerta_ids = db.scalars(
+        select(Alerta.id).where(
+            Alerta.esta_activa == False,
+            or_(
+                Alerta.fecha_resolucion < antes_de,
+                and_(Alerta.fecha_resolucion.is_(None), Alerta.fecha_creacion < antes_de)
+            )
+        ).order_by(Alerta.id).limit(limite).with_for_update(skip_locked=True)
+    ).all()
+    if not alerta_ids:
+        db.rollback()
+        return 0
+    if archivar:
+        db.execute(
+            insert(AlertaHistorica).from_select(
+                _COLUMNAS_ARCHIVO + ["fecha_archivado"],
+                select(
+                    *[getattr(Alerta, c) for c in _COLUMNAS_ARCHIVO],
+                    literal(datetime.now(), AlertaHistorica.fecha_archivado.type)
+                ).where(Alerta.id.in_(alerta_ids))
+            )
+        )
+    db.execute(
+        delete(Alerta).where(Alerta.id.in_(alerta_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return len(alerta_ids)
+
+def get_historial_alertas(
+    db: Session,
+    *,
+    entidad_tipo: Optional[str] = None,
+    entidad_id: Optional[int] = None,
+    tipo_alerta: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> List[Dict[str, Any]]:
+    """
+    Historial de alertas (las de la tabla viva y las archivadas), de la mas
+    reciente a la mas antigua, opcionalmente filtrado por entidad y tipo.
+    """
+    def consulta(modelo, fecha_archivado):
+        stmt = select(
+            *[getattr(modelo, c) for c in _COLUMNAS_ARCHIVO],
+            fecha_archivado.label("fecha_archivado")
+        )
+        if entidad_tipo:
+            stmt = stmt.where(modelo.entidad_tipo == entidad_tipo)
+        if entidad_id is not None:
+            stmt = stmt.where(modelo.entidad_id == entidad_id)
+        if tipo_alerta:
+            stmt = stmt.where(modelo.tipo_alerta == tipo_alerta)
+        return stmt
+
+    historial = union_all(
+        consulta(Alerta, literal(None, AlertaHistorica.fecha_archivado.type)),
+        consulta(AlertaHistorica, AlertaHistorica.fecha_archivado)
+    ).subquery()
+    stmt = select(historial).order_by(
+        historial.c.fecha_creacion.desc(), historial.c.id.desc()
+    ).offset(skip).limit(limit)
+    return [dict(fila) for fila in db.execute(stmt).mappings()]
+
+def reclamar_alertas_por_notificar(
+    db: Session,
+    *,
+    limite: int,
+    duracion_segundos: float
+) -> List[Alerta]:
+    """
+    Reclama hasta `limite` alertas sin notificar (y sin un reclamo vigente)
+    durante `duracion_segundos`, en orden de id. Las candidatas se leen con
+    FOR UPDATE SKIP LOCKED y el UPDATE repite la condicion, asi que dos
+    despachadores nunca reclaman la misma alerta. Si el despachador cae
+    antes de marcarlas (marcar_alertas_notificadas), al vencer el reclamo
+    se vuelven a reclamar: entrega al menos una vez. No comitea.
+    """
+    ahora = datetime.now()
+    pendiente = and_(
+        Alerta.notificada == False,
+        or_(
+            Alerta.notificacion_reclamada_hasta.is_(None),
+            Alerta.notificacion_reclamada_hasta < ahora
+        )
+    )
+    candidatas = (
+        select(Alerta.id)
+        .where(pendiente)
+        .order_by(Alerta.id)
+        .limit(limite)
+        .with_for_update(skip_locked=True)
+    )
+    alertas = db.scalars(
+        update(Alerta)
+        .where(Alerta.id.in_(candidatas.scalar_subquery()), pendiente)
+        .values(
+            notificacion_reclamada_hasta=ahora + timedelta(seconds=duracion_segundos),
+            # No es un cambio de la alerta para los clientes ("since")
+            fecha_actualizacion=Alerta.fecha_actualizacion
+        )
+        .returning(Alerta)
+        .execution_options(synchronize_session=False)
+    ).all()
+    return sorted(alertas, key=lambda a: a.id)
+
+def marcar_alertas_notificadas(db: Session, alerta_ids: Iterable[int]) -> None:
+    """Marca las alertas como notificadas (su resumen ya se entrego) y comitea."""
+    db.execute(
+        update(Alerta)
+        .where(Alerta.id.in_(list(alerta_ids)))
+        .values(
+            notificada=True,
+            notificacion_reclamada_hasta=None,
+            fecha_actualizacion=Alerta.fecha_actualizacion
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def get_alertas_paginadas(
+    db: Session,
+    *,
+    tipo_alerta: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    incluir_resueltas: bool = False,
+    despues_de: Optional[Tuple[datetime, int]] = None,
+    limit: int = 100
+) -> List[Alerta]:
+    """
+    Pagina de alertas ordenadas por (fecha_creacion, id), empezando despues
+    de la clave `despues_de` (paginacion por cursor, sin OFFSET).
+    Con `desde`, solo las creadas o cambiadas despues de ese instante.
+    """
+    stmt = select(Alerta)
+    if not incluir_resueltas:
+        stmt = stmt.where(Alerta.esta_activa == True)
+    if tipo_alerta:
+        stmt = stmt.where(Alerta.tipo_alerta == tipo_alerta)
+    if desde is not None:
+        stmt = stmt.where(Alerta.fecha_actualizacion > desde)
+    if despues_de is not None:
+        fecha, alerta_id = despues_de
+        stmt = stmt.where(
+            or_(
+                Alerta.fecha_creacion > fecha,
+                and_(Alerta.fecha_creacion == fecha, Alerta.id > alerta_id)
+            )
+        )
+    stmt = stmt.order_by(Alerta.fecha_creacion, Alerta.id).limit(limit)
+    return db.scalars(stmt).all()
@@ -0,0 +1,256 @@
+# sistema-inventarios/backend/app/crud/crud_contador_stock.py
+import logging
+import random
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, update, func, bindparam
+from typing import Optional, Sequence
+
+from app.core.config import get_settings
+from app.db.dialects import upsert_insert
+from app.models.contador_stock import ContadorStock
+from app.models.producto import Producto
+from app.schemas.producto import Producto as ProductoSchema
+
+logger = logging.getLogger(__name__)
+
+def stock_pendiente_expr():
+    """
+    Subconsulta correlacionada con la suma de las ranuras aun no consolidadas
+    de cada producto (0 si no hay).
+    """
+    return (
+        select(func.coalesce(func.sum(ContadorStock.delta), 0))
+        .where(ContadorStock.producto_id == Producto.id)
+        .scalar_subquery()
+    )
+
+def stock_efectivo_expr():
+    """Expresion SQL del stock efectivo: cantidad_actual + ranuras pendientes."""
+    return func.coalesce(Producto.cantidad_actual, 0) + stock_pendiente_expr()
+
+def producto_con_stock_efectivo(db_product: Producto, stock_efectivo: int) -> ProductoSchema:
+    """
+    Schema de lectura del producto con cantidad_actual = stock efectivo. No
+    modifica el objeto ORM (el valor no se escribe en la BD al comitear).
+    """
+    return ProductoSchema.model_validate(db_product).model_copy(
+        update={"cantidad_actual": stock_efectivo}
+    )
+
+def stock_disponible_expr():
+    """
+    Expresion SQL del stock disponible para salidas: stock efectivo menos
+    lo apartado por reservas activas y lo que esta en cuarentena.
+    """
+    return stock_efectivo_expr() - Producto.cantidad_reservada - Producto.cantidad_cuarentena
+
+def cupo_expr():
+    """Subconsulta correlacionada con la suma de los cupos de las ranuras del producto."""
+    return (
+        select(func.coalesce(func.sum(ContadorStock.cupo), 0))
+        .where(ContadorStock.producto_id == Producto.id)
+        .scalar_subquery()
+    )
+
+def stock_libre_expr():
+    """
+    Expresion SQL del disponible que no esta apartado como cupo de ninguna
+    ranura: lo que pueden tomar las reservas y las salidas que bloquean la
+    fila del producto. Las salidas y entradas por ranura no lo cambian (mueven
+    lo mismo en el delta y en el cupo), asi que solo varia con la fila del
+    producto bloqueada.
+    """
+    return stock_disponible_expr() - cupo_expr()
+
+def liberar_cupos(db: Session, producto_ids: Optional[Sequence[int]] = None) -> int:
+    """
+    Devuelve al disponible libre los cupos de las ranuras de los productos
+    indicados (de todos, si `producto_ids` es None). Se llama con la fila del
+    producto ya bloqueada (o actualizada), siempre producto -> ranuras, el
+    mismo orden que la consolidacion. No comitea. Devuelve las ranuras tocadas.
+    """
+    stmt = update(ContadorStock).where(ContadorStock.cupo != 0)
+    if producto_ids is not None:
+        stmt = stmt.where(ContadorStock.producto_id.in_(producto_ids))
+    return db.execute(stmt.values(cupo=0).execution_options(synchronize_session=False)).rowcount
+
+def bloquear_stock_libre(db: Session, producto_id: int, cantidad: int) -> Optional[int]:
+    """
+    Bloquea la fila del producto (SELECT ... FOR UPDATE) y devuelve su stock
+    libre si alcanza para `cantidad`; si no alcanza, antes recupera los cupos
+    de sus ranuras. Devuelve None, sin modificar nada, si ni asi alcanza.
+    No comitea: el cerrojo dura hasta el fin de la transaccion.
+    """
+    consulta = (
+        select(stock_libre_expr())
+        .where(Producto.id == producto_id)
+        .with_for_update(of=Producto)
+    )
+    libre = db.scalar(consulta)
+    if libre is None:
+        return None
+    if libre < cantidad and liberar_cupos(db, [producto_id]):
+        libre = db.scalar(consulta)
+    return libre if libre >= cantidad else None
+
+def _descontar_de_ranura(db: Session, producto_id: int, ranura: int, cantidad: int) -> bool:
+    """
+    Descuenta `cantidad` del delta y del cupo de una ranura solo si su cupo
+    alcanza (UPDATE condicional sobre la fila de la ranura). No toca la fila
+    del producto. No comitea.
+    """
+    result = db.execute(
+        update(ContadorStock)
+        .where(
+            ContadorStock.producto_id == producto_id,
+            ContadorStock.ranura == ranura,
+            ContadorStock.cupo >= cantidad
+        )
+        .values(delta=ContadorStock.delta - cantidad, cupo=ContadorStock.cupo - cantidad)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def descontar_disponible(db: Session, db_product: Producto, cantidad: int) -> bool:
+    """
+    Descuenta `cantidad` del stock de un producto solo si su stock disponible
+    alcanza, sin ventana frente a reservas u otras salidas concurrentes.
+    Con STOCK_COUNTER_SHARDS > 0 la salida se descuenta primero del cupo de
+    una ranura aleatoria, sin tocar la fila del producto; solo si ese cupo no
+    alcanza se bloquea la fila del producto, se valida contra el stock libre
+    y se reparte a la ranura una parte de lo que sobra como cupo nuevo.
+    Sin contadores repartidos siempre se bloquea la fila. No comitea.
+    Devuelve False, sin modificar nada, si el disponible no alcanza.
+    """
+    ranuras = get_settings().STOCK_COUNTER_SHARDS
+    if ranuras > 0 and _descontar_de_ranura(db, db_product.id, random.randrange(ranuras), cantidad):
+        return True
+
+    libre = bloquear_stock_libre(db, db_product.id, cantidad)
+    if libre is None:
+        return False
+    if ranuras > 0:
+        ajustar_stock(db, db_product, -cantidad, cupo=(libre - cantidad) // ranuras)
+    else:
+        db.execute(
+            update(Producto)
+            .where(Producto.id == db_product.id)
+            .values(cantidad_actual=Producto.cantidad_actual - cantidad)
+            .execution_options(synchronize_session=False)
+        )
+        db.expire(db_product, ["cantidad_actual"])
+    return True
+
+def get_stock_disponible(db: Session, db_product: Producto) -> int:
+    """Stock disponible de un producto (efectivo - reservado - en cuarentena)."""
+    return (
+        get_stock_efectivo(db, db_product)
+        - db_product.cantidad_reservada
+        - db_product.cantidad_cuarentena
+    )
+
+def ajustar_stock(db: Session, db_product: Producto, delta: int, *, cupo: int = 0) -> None:
+    """
+    Aplica un cambio de stock a un producto dentro de la transaccion en curso.
+    Sin contadores repartidos modifica Producto.cantidad_actual (bloquea la fila
+    del producto). Con STOCK_COUNTER_SHARDS > 0 suma el delta (y `cupo`
+    unidades de cupo, p. ej. lo que aporta una entrada) a una ranura
+    aleatoria, de modo que los escritores concurrentes se reparten entre
+    N filas en lugar de esperar por una sola.
+    """
+    ranuras = get_settings().STOCK_COUNTER_SHARDS
+    if ranuras <= 0:
+        db_product.cantidad_actual += delta
+        db.add(db_product)
+        return
+
+    stmt = upsert_insert(db, ContadorStock).values(
+        producto_id=db_product.id,
+        ranura=random.randrange(ranuras),
+        delta=delta,
+        cupo=cupo
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ContadorStock.producto_id, ContadorStock.ranura],
+        set_={
+            "delta": ContadorStock.delta + stmt.excluded.delta,
+            "cupo": ContadorStock.cupo + stmt.excluded.cupo
+        }
+    )
+    db.execute(stmt)
+
+def get_stock_efectivo(db: Session, db_product: Producto) -> int:
+    """
+    Stock efectivo de un producto: cantidad_actual mas sus ranuras pendientes.
+    La suma recorre como mucho N filas por llave primaria.
+    """
+    pendiente = db.scalar(
+        select(func.coalesce(func.sum(ContadorStock.delta), 0))
+        .where(ContadorStock.producto_id == db_product.id)
+    )
+    return (db_product.cantidad_actual or 0) + pendiente
+
+def consolidar_contadores(db: Session) -> int:
+    """
+    Vuelca el delta de las ranuras en Producto.cantidad_actual; los cupos se
+    conservan (el stock libre no cambia). Se bloquean primero los productos
+    y luego sus ranuras (el orden de las salidas que bloquean el producto),
+    y se resta de cada ranura el delta leido con ella bloqueada, asi que un
+    delta escrito en una ranura nueva durante la consolidacion queda para la
+    siguiente pasada. Las ranuras sin delta ni cupo se borran.
+    Devuelve el numero de productos actualizados.
+    """
+    con_delta = select(ContadorStock.producto_id).where(ContadorStock.delta != 0)
+    producto_ids = db.scalars(
+        select(Producto.id)
+        .where(Producto.id.in_(con_delta))
+        .order_by(Producto.id)
+        .with_for_update()
+    ).all()
+    if not producto_ids:
+        db.rollback()
+        return 0
+    filas = db.execute(
+        select(ContadorStock.producto_id, ContadorStock.ranura, ContadorStock.delta)
+        .where(ContadorStock.producto_id.in_(producto_ids), ContadorStock.delta != 0)
+        .order_by(ContadorStock.producto_id, ContadorStock.ranura)
+        .with_for_update()
+    ).all()
+    deltas_por_producto = defaultdict(int)
+    for producto_id, _, delta in filas:
+        deltas_por_producto[producto_id] += delta
+
+    tabla = ContadorStock.__table__
+    db.execute(
+        tabla.update()
+        .where(tabla.c.producto_id == bindparam("b_producto_id"), tabla.c.ranura == bindparam("b_ranura"))
+        .values(delta=tabla.c.delta - bindparam("b_delta")),
+        [
+            {"b_producto_id": producto_id, "b_ranura": ranura, "b_delta": delta}
+            for producto_id, ranura, delta in filas
+        ]
+    )
+    db.execute(
+        delete(ContadorStock)
+        .where(ContadorStock.producto_id.in_(producto_ids), ContadorStock.delta == 0, ContadorStock.cupo == 0)
+        .execution_options(synchronize_session=False)
+    )
+    deltas_por_producto = {p: d for p, d in deltas_por_producto.items() if d != 0}
+    if deltas_por_producto:
+        tabla = Producto.__table__
+        db.execute(
+            tabla.update()
+            .where(tabla.c.id == bindparam("b_producto_id"))
+            .values(cantidad_actual=tabla.c.cantidad_actual + bindparam("b_delta")),
+            [
+                {"b_producto_id": producto_id, "b_delta": delta}
+                for producto_id, delta in deltas_por_producto.items()
+            ]
+        )
+    db.commit()
+    logger.info(
+        f"Contadores de stock consolidados: {len(filas)} ranuras, "
+        f"{len(deltas_por_producto)} productos actualizados."
+    )
+    return len(deltas_por_producto)
@@ -0,0 +1,70 @@
+# sistema-inventarios/backend/app/crud/crud_eventos_tiempo_real.py
+import logging
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, delete, func
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+
+from app.crud.crud_marca_agua import bloquear_marca, get_marca
+from app.models.evento_tiempo_real import EventoTiempoReal
+
+logger = logging.getLogger(__name__)
+
+# Fila de marcas_agua de los eventos: cerrojo de los escritores y id del
+# ultimo evento purgado (reanudar desde antes obliga a recargar todo)
+MARCA_EVENTOS_TIEMPO_REAL = "eventos_tiempo_real"
+
+def registrar_eventos(db: Session, eventos: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """
+    Inserta los eventos (tipo, datos) sin comitear. Se llama justo antes del
+    commit y con el cerrojo de la marca tomado hasta el fin de la
+    transaccion: otro escritor espera, asi que los ids quedan en orden de
+    commit y un lector por id no se salta eventos comiteados tarde.
+    """
+    bloquear_marca(db, MARCA_EVENTOS_TIEMPO_REAL)
+    db.execute(
+        insert(EventoTiempoReal),
+        [{"tipo": tipo, "datos": datos, "fecha_creacion": datetime.now()} for tipo, datos in eventos]
+    )
+
+def get_ultimo_id(db: Session) -> int:
+    """Id del ultimo evento guardado (o purgado, si la tabla esta vacia)."""
+    ultimo = db.scalar(select(func.max(EventoTiempoReal.id)))
+    return ultimo if ultimo is not None else get_marca(db, MARCA_EVENTOS_TIEMPO_REAL)
+
+def get_eventos_desde(
+    db: Session,
+    *,
+    ultimo_id: int,
+    hasta_id: Optional[int] = None,
+    limite: int = 1000
+) -> List[EventoTiempoReal]:
+    """Eventos con id > `ultimo_id` (y <= `hasta_id`), en orden de id."""
+    stmt = select(EventoTiempoReal).where(EventoTiempoReal.id > ultimo_id)
+    if hasta_id is not None:
+        stmt = stmt.where(EventoTiempoReal.id <= hasta_id)
+    return db.scalars(stmt.order_by(EventoTiempoReal.id).limit(limite)).all()
+
+def get_purgado_hasta(db: Session) -> int:
+    """Id del ultimo evento purgado: los anteriores ya no se pueden reenviar."""
+    return get_marca(db, MARCA_EVENTOS_TIEMPO_REAL)
+
+def purgar_eventos(db: Session, *, antiguedad_segundos: float) -> int:
+    """
+    Borra los eventos de mas de `antiguedad_segundos` y guarda en la marca el
+    id del ultimo borrado. Comitea. Devuelve el numero de eventos borrados.
+    """
+    limite = datetime.now() - timedelta(seconds=antiguedad_segundos)
+    marca = bloquear_marca(db, MARCA_EVENTOS_TIEMPO_REAL)
+    ultimo_borrado = db.scalar(
+        select(func.max(EventoTiempoReal.id)).where(EventoTiempoReal.fecha_creacion < limite)
+    )
+    if ultimo_borrado is None:
+        db.rollback()
+        return 0
+    result = db.execute(delete(EventoTiempoReal).where(EventoTiempoReal.id <= ultimo_borrado))
+    marca.ultimo_id = ultimo_borrado
+    marca.fecha_actualizacion = datetime.now(timezone.utc)
+    db.commit()
+    logger.info(f"Eventos de tiempo real purgados: {result.rowcount}")
+    return result.rowcount
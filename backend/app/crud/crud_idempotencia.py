@@ -0,0 +1,133 @@
+# sistema-inventarios/backend/app/crud/crud_idempotencia.py
+import logging
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, update, and_, ColumnElement
+from typing import Optional, Dict, Any
+from datetime import datetime, timedelta
+
+from app.db.dialects import upsert_insert
+from app.models.idempotencia import ClaveIdempotencia
+
+logger = logging.getLogger(__name__)
+
+def get_clave_vigente(
+    db: Session,
+    *,
+    endpoint: str,
+    clave: str
+) -> Optional[ClaveIdempotencia]:
+    """
+    Obtiene una clave de idempotencia no expirada por su llave primaria.
+    Es una lectura simple: no toma bloqueos de fila.
+    """
+    db_clave = db.get(ClaveIdempotencia, (endpoint, clave), populate_existing=True)
+    if db_clave and db_clave.fecha_expiracion <= datetime.now():
+        logger.debug(f"Clave de idempotencia expirada: {endpoint}/{clave}")
+        return None
+    return db_clave
+
+def reservar_clave(
+    db: Session,
+    *,
+    endpoint: str,
+    clave: str,
+    hash_peticion: str,
+    ttl_seconds: int
+) -> Optional[datetime]:
+    """
+    Reserva la clave (fila pendiente, sin respuesta) con un
+    INSERT ... ON CONFLICT DO NOTHING comiteado antes de ejecutar la operacion.
+    La reserva vence a los `ttl_seconds`: si el proceso muere antes de guardar
+    la respuesta, un reintento posterior puede volver a reservarla.
+    Devuelve la fecha de la reserva (identifica a esta peticion al completar
+    o liberar la clave), o None si ya existia (otra peticion la reservo o ya
+    guardo su respuesta).
+    """
+    ahora = datetime.now()
+    # Una clave expirada con el mismo nombre se reemplaza
+    db.execute(
+        delete(ClaveIdempotencia).where(
+            ClaveIdempotencia.endpoint == endpoint,
+            ClaveIdempotencia.clave == clave,
+            ClaveIdempotencia.fecha_expiracion <= ahora
+        )
+    )
+    stmt = upsert_insert(db, ClaveIdempotencia.__table__).values(
+        endpoint=endpoint,
+        clave=clave,
+        hash_peticion=hash_peticion,
+        codigo_estado=None,
+        respuesta_json=None,
+        fecha_creacion=ahora,
+        fecha_expiracion=ahora + timedelta(seconds=ttl_seconds)
+    ).on_conflict_do_nothing(index_elements=["endpoint", "clave"])
+    reservada = db.execute(stmt).rowcount == 1
+    db.commit()
+    if not reservada:
+        return None
+    logger.debug(f"Clave de idempotencia reservada: {endpoint}/{clave}")
+    return ahora
+
+def _es_reserva(endpoint: str, clave: str, reservada_en: datetime) -> ColumnElement[bool]:
+    """Predicado de la reserva pendiente hecha por una peticion concreta."""
+    return and_(
+        ClaveIdempotencia.endpoint == endpoint,
+        ClaveIdempotencia.clave == clave,
+        ClaveIdempotencia.fecha_creacion == reservada_en,
+        ClaveIdempotencia.codigo_estado.is_(None)
+    )
+
+def completar_clave(
+    db: Session,
+    *,
+    endpoint: str,
+    clave: str,
+    reservada_en: datetime,
+    codigo_estado: int,
+    respuesta: Dict[str, Any],
+    ttl_seconds: int
+) -> bool:
+    """
+    Guarda la respuesta de una clave reservada y extiende su vigencia a
+    `ttl_seconds`. No comitea: va en la misma transaccion que la operacion,
+    asi que ambas se confirman o se deshacen juntas.
+    Devuelve False si la reserva ya no es de esta peticion (vencio y otro
+    reintento la tomo): la operacion no se debe confirmar.
+    """
+    completada = db.execute(
+        update(ClaveIdempotencia)
+        .where(_es_reserva(endpoint, clave, reservada_en))
+        .values(
+            codigo_estado=codigo_estado,
+            respuesta_json=respuesta,
+            fecha_expiracion=datetime.now() + timedelta(seconds=ttl_seconds)
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+    if completada:
+        logger.debug(f"Clave de idempotencia guardada: {endpoint}/{clave}")
+    return completada
+
+def liberar_clave(db: Session, *, endpoint: str, clave: str, reservada_en: datetime) -> None:
+    """
+    Deshace la operacion en curso y borra la reserva pendiente de esta
+    peticion, para que un reintento con la misma clave vuelva a ejecutarla.
+    """
+    db.rollback()
+    db.execute(delete(ClaveIdempotencia).where(_es_reserva(endpoint, clave, reservada_en)))
+    db.commit()
+    logger.debug(f"Clave de idempotencia liberada: {endpoint}/{clave}")
+
+def purgar_claves_expiradas(db: Session) -> int:
+    """
+    Borra las claves de idempotencia expiradas (usa el indice de fecha_expiracion).
+    Devuelve el numero de filas borradas.
+    """
+    result = db.execute(
+        delete(ClaveIdempotencia).where(
+            ClaveIdempotencia.fecha_expiracion <= datetime.now()
+        )
+    )
+    db.commit()
+    logger.info(f"Claves de idempotencia expiradas borradas: {result.rowcount}")
+    return result.rowcount
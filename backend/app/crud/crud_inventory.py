@@ -1,14 +1,19 @@
 # sistema-inventarios/backend/app/crud/crud_inventory.py
 import logging
+from collections import defaultdict
+from datetime import date
 from sqlalchemy.orm import Session
+from sqlalchemy import select, update, bindparam, and_, or_, ColumnElement
 from app.models.producto import Producto
 from app.models.lote import Lote
 from app.models.movimiento import Movimiento
 from app.schemas.lote import LoteCreate
 from app.schemas.inventory import InventoryExitRequest, SmartDispatchReq
 import app.crud.crud_product as crud_product
+import app.crud.crud_contador_stock as crud_contador_stock
+import app.crud.crud_outbox as crud_outbox
 from app.core.exceptions import InsufficientStockError
-from typing import List
+from typing import Dict, List, Optional, Sequence, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -26,10 +31,11 @@ def get_lote(db: Session, lote_id: int) -> Lote | None:
     logger.debug(f"Buscando lote con id: {lote_id}")
     return db.query(Lote).filter(Lote.id == lote_id).first()
 
-def register_entry(db: Session, *, entry_in: LoteCreate) -> Lote | None:
+def register_entry(db: Session, *, entry_in: LoteCreate, commit: bool = True) -> Lote | None:
     """
     Registra una entrada de inventario, creando un Lote, un Movimiento
     y actualizando el stock del Producto.
+    Con commit=False solo envia los cambios (flush) y el llamador comitea.
     """
     logger.info(
         f"Registrando entrada de {entry_in.cantidad_recibida} "
@@ -64,28 +70,43 @@ def register_entry(db: Session, *, entry_in: LoteCreate) -> Lote | None:
     )
     
     # 5. Actualizar el stock del Producto
-    stock_anterior = db_product.cantidad_actual
-    db_product.cantidad_actual += entry_in.cantidad_recibida
+    #    (con contadores repartidos, las unidades nuevas son cupo de la ranura)
+    crud_contador_stock.ajustar_stock(
+        db, db_product, entry_in.cantidad_recibida, cupo=entry_in.cantidad_recibida
+    )
     
-    # 6. Añadir los objetos restantes a la sesion y comitear la transaccion
+    # 6. Añadir los objetos restantes (y el evento de outbox) a la sesion
+    #    y comitear la transaccion
     db.add(db_movimiento)
-    db.add(db_product)
-    db.commit()
+    crud_outbox.registrar_evento(
+        db,
+        tipo_evento="entrada",
+        producto_id=db_product.id,
+        lote_ids=[db_lote.id],
+        delta=entry_in.cantidad_recibida
+    )
+    if commit:
+        db.commit()
+    else:
+        db.flush()
     
     logger.info(
         f"Entrada registrada para lote id: {db_lote.id}. "
-        f"Stock de producto {db_product.sku} actualizado: "
-        f"{stock_anterior} -> {db_product.cantidad_actual}"
+        f"Stock de producto {db_product.sku} ajustado en "
+        f"+{entry_in.cantidad_recibida}"
     )
 
     # 7. Refrescar el lote para devolverlo con todos sus datos
     db.refresh(db_lote)
     return db_lote
 
-def register_exit(db: Session, *, exit_in: InventoryExitRequest) -> Movimiento | None:
+def apply_exit(db: Session, *, exit_in: InventoryExitRequest) -> Movimiento | None:
     """
-    Registra una salida de inventario, creando un Movimiento
-    y actualizando el stock del Lote y del Producto.
+    Aplica una salida de inventario en la sesion sin comitear:
+    crea el Movimiento y descuenta el stock del Lote y del Producto.
+    La salida no puede tomar unidades reservadas ni en cuarentena (salvo
+    que el lote este vencido: entonces sale de la cuarentena). Un
+    InsufficientStockError deja la sesion intacta.
     
     Lanza InsufficientStockError si no hay stock.
     """
@@ -99,57 +120,211 @@ def register_exit(db: Session, *, exit_in: InventoryExitRequest) -> Movimiento |
     if not db_lote:
         logger.warning(f"Lote no encontrado: {exit_in.lote_id}")
         return None # El endpoint lanzara un 404
-    
-    if db_lote.cantidad_actual < exit_in.cantidad:
-        logger.warning(
-            f"Stock insuficiente para {db_lote.producto.sku}. "
-            f"Solicitado: {exit_in.cantidad}, Disponible: {db_lote.cantidad_actual}"
-        )
-        raise InsufficientStockError(
-            item_sku=db_lote.producto.sku,
-            requested=exit_in.cantidad,
-            available=db_lote.cantidad_actual
-        )
-    
+
     # 2. Obtener el Producto (via la relacion del lote)
     db_product = db_lote.producto
-    
-    # 3. Crear el Movimiento
+    stock_lote_anterior = db_lote.cantidad_actual
+
+    # 3. Descontar con actualizaciones condicionales dentro de un savepoint:
+    #    si el lote o el disponible del producto no alcanzan, se deshace
+    #    solo esta salida y la sesion queda como estaba.
+    try:
+        with db.begin_nested():
+            fila = db.execute(
+                update(Lote)
+                .where(Lote.id == db_lote.id, Lote.cantidad_actual >= exit_in.cantidad)
+                .values(cantidad_actual=Lote.cantidad_actual - exit_in.cantidad)
+                .returning(Lote.esta_vencido)
+                .execution_options(synchronize_session=False)
+            ).first()
+            if fila is None:
+                raise InsufficientStockError(
+                    item_sku=db_product.sku,
+                    requested=exit_in.cantidad,
+                    available=db_lote.cantidad_actual
+                )
+            if fila.esta_vencido:
+                # Baja de stock en cuarentena (p. ej. descarte de un lote vencido)
+                crud_contador_stock.ajustar_stock(db, db_product, -exit_in.cantidad)
+                db_product.cantidad_cuarentena = Producto.cantidad_cuarentena - exit_in.cantidad
+                db.flush()
+            elif not crud_contador_stock.descontar_disponible(db, db_product, exit_in.cantidad):
+                # Las unidades reservadas o en cuarentena no se pueden sacar
+                db.refresh(db_product)
+                raise InsufficientStockError(
+                    item_sku=db_product.sku,
+                    requested=exit_in.cantidad,
+                    available=crud_contador_stock.get_stock_disponible(db, db_product)
+                )
+    except InsufficientStockError as e:
+        db.expire(db_lote)
+        logger.warning(e.message)
+        raise
+    db.expire(db_lote, ["cantidad_actual"])
+
+    # 4. Crear el Movimiento
     db_movimiento = Movimiento(
         lote_id=db_lote.id,
         tipo="salida",
         cantidad=exit_in.cantidad
     )
-    
-    # 4. Actualizar el stock
-    stock_lote_anterior = db_lote.cantidad_actual
-    stock_prod_anterior = db_product.cantidad_actual
-    
-    db_lote.cantidad_actual -= exit_in.cantidad
-    db_product.cantidad_actual -= exit_in.cantidad
-    
-    # 5. Comitear la transaccion
+
+    # 5. Enviar el movimiento y su evento de outbox a la BD (sin comitear)
     db.add(db_movimiento)
-    db.add(db_lote)
-    db.add(db_product)
-    db.commit()
+    crud_outbox.registrar_evento(
+        db,
+        tipo_evento="salida",
+        producto_id=db_product.id,
+        lote_ids=[db_lote.id],
+        delta=-exit_in.cantidad
+    )
+    db.flush()
     
     logger.info(
-        f"Salida registrada. Lote {db_lote.id} actualizado: "
+        f"Salida aplicada. Lote {db_lote.id} actualizado: "
         f"{stock_lote_anterior} -> {db_lote.cantidad_actual}. "
-        f"Producto {db_product.sku} actualizado: "
-        f"{stock_prod_anterior} -> {db_product.cantidad_actual}"
+        f"Stock de producto {db_product.sku} ajustado en -{exit_in.cantidad}"
     )
+    return db_movimiento
+
+def register_exit(
+    db: Session, *, exit_in: InventoryExitRequest, commit: bool = True
+) -> Movimiento | None:
+    """
+    Registra una salida de inventario, creando un Movimiento
+    y actualizando el stock del Lote y del Producto.
+    Con commit=False deja la salida aplicada sin comitear (apply_exit).
+    
+    Lanza InsufficientStockError si no hay stock.
+    """
+    db_movimiento = apply_exit(db, exit_in=exit_in)
+    if db_movimiento is None or not commit:
+        return db_movimiento
+
+    # Comitear la transaccion
+    db.commit()
+    logger.info(f"Salida registrada con movimiento id: {db_movimiento.id}")
     
     db.refresh(db_movimiento)
     return db_movimiento
 
+# Orden de consumo FEFO: primero los lotes que vencen antes
+# (el ID desempata para que el orden sea estable entre consultas).
+ORDEN_FEFO = (Lote.fecha_vencimiento.asc(), Lote.id.asc())
+
+def lote_despachable(hoy: Optional[date] = None) -> ColumnElement[bool]:
+    """
+    Predicado de lotes candidatos a despacho: con stock y no vencidos.
+    Coincide con el indice parcial ix_lotes_despachables; la condicion de
+    fecha cubre los lotes vencidos desde el ultimo barrido de vencidos.
+    """
+    hoy = hoy or date.today()
+    return and_(
+        Lote.cantidad_actual > 0,
+        Lote.esta_vencido == False,
+        or_(Lote.fecha_vencimiento.is_(None), Lote.fecha_vencimiento >= hoy)
+    )
+
+def marcar_lotes_vencidos(
+    db: Session, *, hoy: date, limite: int
+) -> Tuple[int, Dict[int, int]]:
+    """
+    Marca como vencidos (cuarentena) hasta `limite` lotes con stock cuya
+    fecha de vencimiento ya paso, y suma sus unidades a
+    Producto.cantidad_cuarentena. Un UPDATE ... RETURNING por bloque, sin
+    ventana entre leer la cantidad del lote y marcarlo. No comitea.
+    Devuelve (lotes marcados, {producto_id: unidades puestas en cuarentena}).
+    """
+    # El predicado se repite en el UPDATE: con barridos concurrentes, el
+    # segundo relee la fila bloqueada y ya no la cuenta dos veces.
+    pendiente = and_(
+        Lote.esta_vencido == False,
+        Lote.cantidad_actual > 0,
+        Lote.fecha_vencimiento < hoy
+    )
+    candidatos = (
+        select(Lote.id)
+        .where(pendiente)
+        .order_by(Lote.id)
+        .limit(limite)
+    )
+    filas = db.execute(
+        update(Lote)
+        .where(Lote.id.in_(candidatos.scalar_subquery()), pendiente)
+        .values(esta_vencido=True)
+        .returning(Lote.producto_id, Lote.cantidad_actual)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    unidades_por_producto: Dict[int, int] = defaultdict(int)
+    for producto_id, cantidad in filas:
+        unidades_por_producto[producto_id] += cantidad
+    if unidades_por_producto:
+        tabla = Producto.__table__
+        db.execute(
+            tabla.update()
+            .where(tabla.c.id == bindparam("b_producto_id"))
+            .values(cantidad_cuarentena=tabla.c.cantidad_cuarentena + bindparam("b_cantidad")),
+            [
+                {"b_producto_id": producto_id, "b_cantidad": cantidad}
+                for producto_id, cantidad in unidades_por_producto.items()
+            ]
+        )
+        # Las unidades en cuarentena pudieron estar apartadas como cupo
+        crud_contador_stock.liberar_cupos(db, list(unidades_por_producto))
+    return len(filas), dict(unidades_por_producto)
+
+def planificar_fefo(
+    lotes: Sequence[Tuple[int, int]], cantidad: int
+) -> List[Tuple[int, int]]:
+    """
+    Reparte `cantidad` entre los lotes (lote_id, cantidad_actual), ya
+    ordenados segun ORDEN_FEFO. Devuelve (lote_id, cantidad_a_tomar)
+    por cada lote tocado. Funcion pura: no consulta ni modifica la BD.
+    """
+    plan = []
+    pendiente = cantidad
+    for lote_id, cantidad_lote in lotes:
+        if pendiente == 0:
+            break
+        cantidad_a_tomar = min(cantidad_lote, pendiente)
+        if cantidad_a_tomar > 0:
+            plan.append((lote_id, cantidad_a_tomar))
+            pendiente -= cantidad_a_tomar
+    return plan
+
+# Veces que se vuelve a planificar un despacho FEFO si una salida
+# concurrente se adelanta en alguno de sus lotes
+INTENTOS_DESPACHO_FEFO = 3
+
+def descontar_lotes(db: Session, plan: Sequence[Tuple[int, int]]) -> bool:
+    """
+    Descuenta el plan (lote_id, cantidad) con un UPDATE condicional por lote
+    (cantidad_actual >= cantidad y no vencido) dentro de un savepoint. Si
+    algun lote ya no alcanza (otra salida se adelanto), deshace todo el plan
+    y devuelve False. No comitea.
+    """
+    savepoint = db.begin_nested()
+    for lote_id, cantidad in plan:
+        result = db.execute(
+            update(Lote)
+            .where(Lote.id == lote_id, Lote.cantidad_actual >= cantidad, Lote.esta_vencido == False)
+            .values(cantidad_actual=Lote.cantidad_actual - cantidad)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            savepoint.rollback()
+            return False
+    savepoint.commit()
+    return True
+
 def smart_dispatch_fefo(
-    db: Session, *, dispatch_in: SmartDispatchReq
+    db: Session, *, dispatch_in: SmartDispatchReq, commit: bool = True
 ) -> List[Movimiento]:
     """
     Procesa un despacho inteligente usando la logica FEFO
     (First Expired, First Out).
+    Con commit=False solo envia los cambios (flush) y el llamador comitea.
     """
     cantidad_a_despachar = dispatch_in.cantidad
     logger.info(
@@ -163,72 +338,114 @@ def smart_dispatch_fefo(
         logger.error(f"Producto no encontrado: {dispatch_in.producto_id}")
         raise ValueError("Producto no encontrado") # Re-lanzar para la API
         
-    if db_product.cantidad_actual < cantidad_a_despachar:
+    # Las unidades apartadas por reservas activas o en cuarentena (lotes
+    # vencidos) no se pueden despachar
+    disponible = crud_contador_stock.get_stock_disponible(db, db_product)
+    if disponible < cantidad_a_despachar:
         logger.warning(
             f"Stock insuficiente (FEFO) para {db_product.sku}. "
-            f"Solicitado: {cantidad_a_despachar}, Disponible: {db_product.cantidad_actual}"
+            f"Solicitado: {cantidad_a_despachar}, Disponible: {disponible}"
         )
         raise InsufficientStockError(
             item_sku=db_product.sku,
             requested=cantidad_a_despachar,
-            available=db_product.cantidad_actual
+            available=disponible
         )
         
-    # 2. Obtener todos los lotes para este producto que tienen stock,
-    #    ordenados por fecha de vencimiento (los mas proximos primero).
-    lotes_disponibles = (
-        db.query(Lote)
-        .filter(Lote.producto_id == dispatch_in.producto_id)
-        .filter(Lote.cantidad_actual > 0)
-        .order_by(Lote.fecha_vencimiento.asc())
-        .all()
-    )
-    
-    logger.debug(f"Encontrados {len(lotes_disponibles)} lotes para despachar.")
-    
+    # 2. Planificar sobre los lotes despachables (con stock y no vencidos),
+    #    los que vencen antes primero, y descontarlos con actualizaciones
+    #    condicionales. Si una salida concurrente se adelanta en algun lote,
+    #    se deshace lo descontado y se vuelve a planificar con el stock actual.
+    for intento in range(1, INTENTOS_DESPACHO_FEFO + 1):
+        lotes_disponibles = db.execute(
+            select(Lote.id, Lote.cantidad_actual, Lote.fecha_vencimiento)
+            .where(Lote.producto_id == dispatch_in.producto_id, lote_despachable())
+            .order_by(*ORDEN_FEFO)
+        ).all()
+        logger.debug(f"Encontrados {len(lotes_disponibles)} lotes para despachar.")
+
+        # 3. Planificar que cantidad se "consume" de cada lote
+        plan = planificar_fefo(
+            [(lote.id, lote.cantidad_actual) for lote in lotes_disponibles],
+            cantidad_a_despachar
+        )
+        # Lotes vencidos despues del ultimo barrido aun no estan en cuarentena:
+        # el stock del producto alcanza pero sus lotes despachables no.
+        en_lotes = sum(cantidad for _, cantidad in plan)
+        if en_lotes < cantidad_a_despachar:
+            logger.warning(
+                f"Lotes despachables insuficientes (FEFO) para {db_product.sku}. "
+                f"Solicitado: {cantidad_a_despachar}, En lotes: {en_lotes}"
+            )
+            raise InsufficientStockError(
+                item_sku=db_product.sku,
+                requested=cantidad_a_despachar,
+                available=en_lotes
+            )
+        if descontar_lotes(db, plan):
+            break
+        logger.info(
+            f"Despacho FEFO de {db_product.sku}: un lote cambio durante el despacho "
+            f"(intento {intento} de {INTENTOS_DESPACHO_FEFO}); se vuelve a planificar."
+        )
+    else:
+        db.rollback()
+        raise InsufficientStockError(
+            item_sku=db_product.sku,
+            requested=cantidad_a_despachar,
+            available=en_lotes
+        )
+
+    vencimientos = {lote.id: lote.fecha_vencimiento for lote in lotes_disponibles}
     movimientos_creados = []
     cantidad_despachada_total = 0
     
-    # 3. Iterar sobre los lotes y "consumir" el stock
-    for lote in lotes_disponibles:
-        if cantidad_a_despachar == 0:
-            break
-            
-        cantidad_a_tomar_del_lote = min(lote.cantidad_actual, cantidad_a_despachar)
-        
+    for lote_id, cantidad_a_tomar_del_lote in plan:
         logger.debug(
-            f"Tomando {cantidad_a_tomar_del_lote} de Lote {lote.id} "
-            f"(expira: {lote.fecha_vencimiento})"
+            f"Tomando {cantidad_a_tomar_del_lote} de Lote {lote_id} "
+            f"(expira: {vencimientos[lote_id]})"
         )
         
         # 4. Crear el movimiento de salida
         db_movimiento = Movimiento(
-            lote_id=lote.id,
+            lote_id=lote_id,
             tipo="salida",
             cantidad=cantidad_a_tomar_del_lote
         )
-        
-        # 5. Actualizar los stocks
-        cantidad_a_despachar -= cantidad_a_tomar_del_lote
         cantidad_despachada_total += cantidad_a_tomar_del_lote
-        
-        lote.cantidad_actual -= cantidad_a_tomar_del_lote
-        
         db.add(db_movimiento)
-        db.add(lote)
         movimientos_creados.append(db_movimiento)
 
-    # Actualizar el producto una sola vez al final
-    stock_prod_anterior = db_product.cantidad_actual
-    db_product.cantidad_actual -= cantidad_despachada_total
-    db.add(db_product)
+    # Actualizar el producto una sola vez al final, condicionado a que el
+    # disponible siga alcanzando (reservas o salidas concurrentes)
+    if not crud_contador_stock.descontar_disponible(db, db_product, cantidad_despachada_total):
+        db.rollback()
+        disponible = crud_contador_stock.get_stock_disponible(db, db_product)
+        logger.warning(
+            f"Stock insuficiente (FEFO) para {db_product.sku}. "
+            f"Solicitado: {cantidad_a_despachar}, Disponible: {disponible}"
+        )
+        raise InsufficientStockError(
+            item_sku=db_product.sku,
+            requested=cantidad_a_despachar,
+            available=disponible
+        )
+    crud_outbox.registrar_evento(
+        db,
+        tipo_evento="despacho",
+        producto_id=db_product.id,
+        lote_ids=[lote_id for lote_id, _ in plan],
+        delta=-cantidad_despachada_total
+    )
     
-    db.commit()
+    if commit:
+        db.commit()
+    else:
+        db.flush()
     
     logger.info(
         f"Despacho FEFO completado. {cantidad_despachada_total} unidades despachadas. "
-        f"Producto {db_product.sku} actualizado: "
-        f"{stock_prod_anterior} -> {db_product.cantidad_actual}"
+        f"Stock de producto {db_product.sku} ajustado en -{cantidad_despachada_total}"
     )
     
     for m in movimientos_creados:
@@ -0,0 +1,32 @@
+# sistema-inventarios/backend/app/crud/crud_marca_agua.py
+import logging
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from datetime import datetime, timezone
+
+from app.db.dialects import upsert_insert
+from app.models.resumen_movimientos import MarcaAgua
+
+logger = logging.getLogger(__name__)
+
+def bloquear_marca(db: Session, nombre: str) -> MarcaAgua:
+    """
+    Obtiene la fila `nombre` de marcas_agua, creandola (ultimo_id = 0) si
+    falta, y la bloquea (SELECT ... FOR UPDATE) hasta el fin de la
+    transaccion. Sirve de cerrojo entre procesos. No comitea.
+    """
+    db.execute(
+        upsert_insert(db, MarcaAgua.__table__)
+        .values(nombre=nombre, ultimo_id=0, fecha_actualizacion=datetime.now(timezone.utc))
+        .on_conflict_do_nothing(index_elements=["nombre"])
+    )
+    return db.scalars(
+        select(MarcaAgua)
+        .where(MarcaAgua.nombre == nombre)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    ).one()
+
+def get_marca(db: Session, nombre: str) -> int:
+    """Valor (ultimo_id) de la marca `nombre`, 0 si aun no existe. Sin bloqueo."""
+    return db.scalar(select(MarcaAgua.ultimo_id).where(MarcaAgua.nombre == nombre)) or 0
@@ -0,0 +1,136 @@
+# sistema-inventarios/backend/app/crud/crud_outbox.py
+import logging
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete, or_
+from typing import List, Optional
+from datetime import datetime, timedelta
+
+from app.models.evento_outbox import EventoOutbox
+
+logger = logging.getLogger(__name__)
+
+def registrar_evento(
+    db: Session,
+    *,
+    tipo_evento: str,
+    producto_id: int,
+    lote_ids: List[int],
+    delta: int
+) -> EventoOutbox:
+    """
+    Agrega un evento de cambio de stock a la sesion, sin comitear:
+    se confirma (o se descarta) junto con el cambio que lo origina.
+    """
+    db_evento = EventoOutbox(
+        tipo_evento=tipo_evento,
+        producto_id=producto_id,
+        lote_ids=lote_ids,
+        delta=delta
+    )
+    db.add(db_evento)
+    return db_evento
+
+def get_eventos_pendientes(db: Session, *, limite: int) -> List[EventoOutbox]:
+    """
+    Obtiene los eventos pendientes mas antiguos y los bloquea para esta
+    transaccion. Con SKIP LOCKED (PostgreSQL) varios consumidores pueden
+    drenar la tabla a la vez sin pisarse; SQLite ignora el bloqueo.
+    Se saltan los fallidos y los que esperan su proximo reintento.
+    """
+    stmt = (
+        select(EventoOutbox)
+        .where(
+            EventoOutbox.procesado == False,
+            EventoOutbox.fallido == False,
+            or_(EventoOutbox.proximo_intento.is_(None), EventoOutbox.proximo_intento <= datetime.now())
+        )
+        .order_by(EventoOutbox.id)
+        .limit(limite)
+        .with_for_update(skip_locked=True)
+    )
+    return db.scalars(stmt).all()
+
+def hay_eventos_pendientes(db: Session) -> bool:
+    """True si queda algun evento sin procesar (sin contar los fallidos)."""
+    return db.scalar(
+        select(
+            select(EventoOutbox.id)
+            .where(EventoOutbox.procesado == False, EventoOutbox.fallido == False)
+            .exists()
+        )
+    )
+
+def marcar_procesados(db: Session, *, evento_ids: List[int]) -> None:
+    """Marca los eventos como procesados (sin comitear)."""
+    db.execute(
+        update(EventoOutbox)
+        .where(EventoOutbox.id.in_(evento_ids))
+        .values(procesado=True, fecha_procesado=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+
+def registrar_fallo(
+    db: Session,
+    evento: EventoOutbox,
+    *,
+    error: str,
+    max_intentos: int,
+    espera_base_segundos: float
+) -> None:
+    """
+    Anota un intento fallido del evento (sin comitear). Se reintenta tras
+    espera_base_segundos * 2^(intentos - 1); al llegar a `max_intentos`
+    queda como fallido (dead letter) y el consumidor ya no lo lee.
+    """
+    evento.intentos += 1
+    evento.ultimo_error = error[:1000]
+    if evento.intentos >= max_intentos:
+        evento.fallido = True
+        evento.proximo_intento = None
+        logger.error(
+            f"Evento de outbox {evento.id} marcado como fallido tras {evento.intentos} intentos: {error}"
+        )
+    else:
+        espera = espera_base_segundos * 2 ** (evento.intentos - 1)
+        evento.proximo_intento = datetime.now() + timedelta(seconds=espera)
+        logger.warning(
+            f"Evento de outbox {evento.id} fallo (intento {evento.intentos}); "
+            f"se reintenta en {espera:.0f}s: {error}"
+        )
+
+def reactivar_fallidos(db: Session, *, evento_ids: Optional[List[int]] = None) -> int:
+    """
+    Devuelve a la cola los eventos fallidos (todos o los indicados), con
+    los intentos a cero, p. ej. tras corregir la causa. Comitea.
+    Devuelve el numero de eventos reactivados.
+    """
+    stmt = (
+        update(EventoOutbox)
+        .where(EventoOutbox.fallido == True)
+        .values(fallido=False, intentos=0, proximo_intento=None)
+        .execution_options(synchronize_session=False)
+    )
+    if evento_ids is not None:
+        stmt = stmt.where(EventoOutbox.id.in_(evento_ids))
+    result = db.execute(stmt)
+    db.commit()
+    if result.rowcount:
+        logger.info(f"Eventos de outbox fallidos reactivados: {result.rowcount}")
+    return result.rowcount
+
+def purgar_eventos_procesados(db: Session, *, antiguedad_segundos: float) -> int:
+    """
+    Borra los eventos ya procesados hace mas de `antiguedad_segundos`.
+    Devuelve el numero de eventos borrados.
+    """
+    limite = datetime.now() - timedelta(seconds=antiguedad_segundos)
+    result = db.execute(
+        delete(EventoOutbox).where(
+            EventoOutbox.procesado == True,
+            EventoOutbox.fecha_procesado < limite
+        )
+    )
+    db.commit()
+    if result.rowcount:
+        logger.info(f"Eventos de outbox procesados purgados: {result.rowcount}")
+    return result.rowcount
@@ -1,12 +1,18 @@
 # sistema-inventarios/backend/app/crud/crud_product.py
 import logging  # <-- 1. Importar
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from app.models.producto import Producto
-from app.schemas.producto import ProductoCreate, ProductoUpdate
+from app.schemas.producto import Producto as ProductoSchema, ProductoCreate, ProductoUpdate
+import app.crud.crud_contador_stock as crud_contador_stock
+import app.crud.crud_outbox as crud_outbox
 from typing import List
 
 logger = logging.getLogger(__name__)  # <-- 2. Obtener el logger
 
+# Campos cuya modificacion puede abrir o cerrar una alerta del producto
+CAMPOS_QUE_AFECTAN_ALERTAS = {"cantidad_actual", "stock_minimo", "nombre", "sku"}
+
 def create_product(db: Session, *, product_in: ProductoCreate) -> Producto:
     """
     Crea un nuevo producto en la base de datos.
@@ -18,6 +24,15 @@ def create_product(db: Session, *, product_in: ProductoCreate) -> Producto:
     )
     try:
         db.add(db_product)
+        db.flush()
+        # Evento para que las alertas evaluen el producto nuevo
+        crud_outbox.registrar_evento(
+            db,
+            tipo_evento="producto_creado",
+            producto_id=db_product.id,
+            lote_ids=[],
+            delta=db_product.cantidad_actual or 0
+        )
         db.commit()
         db.refresh(db_product)
         logger.info(f"Producto creado con ID: {db_product.id}")
@@ -43,12 +58,19 @@ def get_product_by_sku(db: Session, sku: str) -> Producto | None:
     logger.debug(f"Buscando producto con sku: {sku}")
     return db.query(Producto).filter(Producto.sku == sku).first()
 
-def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[Producto]:
+def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[ProductoSchema]:
     """
-    Obtiene una lista de productos con paginacion.
+    Obtiene una lista de productos con paginacion. cantidad_actual es el
+    stock efectivo (incluye las ranuras de contadores aun sin consolidar).
     """
     logger.debug(f"Buscando lista de productos con skip={skip}, limit={limit}")
-    return db.query(Producto).offset(skip).limit(limit).all()
+    filas = db.execute(
+        select(Producto, crud_contador_stock.stock_efectivo_expr())
+        .order_by(Producto.id)
+        .offset(skip)
+        .limit(limit)
+    ).all()
+    return [crud_contador_stock.producto_con_stock_efectivo(p, stock) for p, stock in filas]
 
 def update_product(
     db: Session,
@@ -70,6 +92,15 @@ def update_product(
         
     try:
         db.add(db_product)
+        # Stock o stock minimo cambiados: las alertas del producto se reevaluan
+        if update_data.keys() & CAMPOS_QUE_AFECTAN_ALERTAS:
+            crud_outbox.registrar_evento(
+                db,
+                tipo_evento="producto_actualizado",
+                producto_id=db_product.id,
+                lote_ids=[],
+                delta=0
+            )
         db.commit()
         db.refresh(db_product)
         logger.info(f"Producto actualizado con ID: {db_product.id}")
@@ -0,0 +1,45 @@
+# sistema-inventarios/backend/app/crud/crud_regla_alerta.py
+import logging
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from typing import List, Optional
+
+from app.models.regla_alerta import ReglaAlerta
+from app.schemas.regla_alerta import ReglaAlertaCreate
+
+logger = logging.getLogger(__name__)
+
+def get_regla(db: Session, regla_id: int) -> Optional[ReglaAlerta]:
+    """Obtiene una regla de alerta por su ID."""
+    return db.get(ReglaAlerta, regla_id)
+
+def get_regla_by_nombre(db: Session, nombre: str) -> Optional[ReglaAlerta]:
+    """Obtiene una regla de alerta por su nombre."""
+    return db.scalars(select(ReglaAlerta).where(ReglaAlerta.nombre == nombre)).first()
+
+def get_reglas(db: Session, *, solo_activas: bool = False) -> List[ReglaAlerta]:
+    """Obtiene las reglas de alerta (opcionalmente solo las activas), por ID."""
+    stmt = select(ReglaAlerta).order_by(ReglaAlerta.id)
+    if solo_activas:
+        stmt = stmt.where(ReglaAlerta.esta_activa == True)
+    return db.scalars(stmt).all()
+
+def create_regla(db: Session, *, regla_in: ReglaAlertaCreate) -> ReglaAlerta:
+    """Crea una regla de alerta (ya validada por el servicio)."""
+    logger.info(f"Creando regla de alerta: {regla_in.nombre}")
+    db_regla = ReglaAlerta(**regla_in.model_dump())
+    try:
+        db.add(db_regla)
+        db.commit()
+        db.refresh(db_regla)
+        return db_regla
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error al crear regla de alerta {regla_in.nombre}: {e}")
+        raise e
+
+def delete_regla(db: Session, *, db_regla: ReglaAlerta) -> ReglaAlerta:
+    """Borra una regla de alerta. No comitea (el servicio cierra sus alertas en la misma transaccion)."""
+    logger.info(f"Borrando regla de alerta: {db_regla.nombre}")
+    db.delete(db_regla)
+    return db_regla
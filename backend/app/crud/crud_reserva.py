@@ -0,0 +1,164 @@
+# sistema-inventarios/backend/app/crud/crud_reserva.py
+import logging
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, bindparam
+from typing import List, Tuple
+
+from app.models.producto import Producto
+from app.models.reserva import Reserva
+from app.schemas.reserva import ReservaCreate
+import app.crud.crud_product as crud_product
+import app.crud.crud_contador_stock as crud_contador_stock
+from app.core.exceptions import InsufficientStockError, ReservationNotActiveError
+
+logger = logging.getLogger(__name__)
+
+def get_reserva(db: Session, reserva_id: int) -> Reserva | None:
+    """
+    Obtiene una reserva por su ID.
+    """
+    logger.debug(f"Buscando reserva con id: {reserva_id}")
+    return db.get(Reserva, reserva_id)
+
+def create_reserva(
+    db: Session,
+    *,
+    reserva_in: ReservaCreate,
+    fecha_expiracion: datetime
+) -> Reserva | None:
+    """
+    Crea una reserva y aparta el stock en Producto.cantidad_reservada.
+    No crea movimientos ni toca los lotes.
+
+    Lanza InsufficientStockError si el stock disponible no alcanza.
+    """
+    logger.info(
+        f"Reservando {reserva_in.cantidad} unidades "
+        f"del producto_id: {reserva_in.producto_id}"
+    )
+    db_product = crud_product.get_product(db, product_id=reserva_in.producto_id)
+    if not db_product:
+        logger.warning(f"Producto no encontrado: {reserva_in.producto_id}")
+        return None
+
+    # Con la fila del producto bloqueada se valida contra el stock libre (el
+    # que no esta apartado como cupo de las ranuras) y se aparta, sin ventana
+    # entre la lectura y la escritura.
+    if crud_contador_stock.bloquear_stock_libre(db, db_product.id, reserva_in.cantidad) is None:
+        db.rollback()
+        db.refresh(db_product)
+        disponible = crud_contador_stock.get_stock_disponible(db, db_product)
+        logger.warning(
+            f"Stock insuficiente para reservar {db_product.sku}. "
+            f"Solicitado: {reserva_in.cantidad}, Disponible: {disponible}"
+        )
+        raise InsufficientStockError(
+            item_sku=db_product.sku,
+            requested=reserva_in.cantidad,
+            available=disponible
+        )
+    db.execute(
+        update(Producto)
+        .where(Producto.id == reserva_in.producto_id)
+        .values(cantidad_reservada=Producto.cantidad_reservada + reserva_in.cantidad)
+        .execution_options(synchronize_session=False)
+    )
+
+    db_reserva = Reserva(
+        producto_id=reserva_in.producto_id,
+        cantidad=reserva_in.cantidad,
+        estado="activa",
+        fecha_expiracion=fecha_expiracion
+    )
+    db.add(db_reserva)
+    db.commit()
+    db.refresh(db_reserva)
+    logger.info(f"Reserva creada con id: {db_reserva.id} (expira: {fecha_expiracion})")
+    return db_reserva
+
+def release_reserva(
+    db: Session,
+    *,
+    db_reserva: Reserva,
+    estado_final: str = "liberada",
+    commit: bool = True
+) -> Reserva:
+    """
+    Cierra una reserva activa y devuelve su stock al disponible.
+
+    Lanza ReservationNotActiveError si la reserva ya no esta activa.
+    """
+    # Cambio de estado condicional para que dos cierres concurrentes no
+    # descuenten dos veces la cantidad reservada.
+    result = db.execute(
+        update(Reserva)
+        .where(Reserva.id == db_reserva.id, Reserva.estado == "activa")
+        .values(estado=estado_final)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.rollback()
+        db.refresh(db_reserva)
+        logger.warning(f"Reserva {db_reserva.id} no esta activa (estado: {db_reserva.estado})")
+        raise ReservationNotActiveError(reserva_id=db_reserva.id, estado=db_reserva.estado)
+
+    db.execute(
+        update(Producto)
+        .where(Producto.id == db_reserva.producto_id)
+        .values(cantidad_reservada=Producto.cantidad_reservada - db_reserva.cantidad)
+    )
+    if commit:
+        db.commit()
+    db.refresh(db_reserva)
+    logger.info(f"Reserva {db_reserva.id} cerrada con estado '{estado_final}'")
+    return db_reserva
+
+def expire_reservas(db: Session, *, ahora: datetime) -> int:
+    """
+    Expira en bloque todas las reservas activas vencidas (usa el indice
+    (estado, fecha_expiracion)) y devuelve su stock con un UPDATE por producto.
+    Devuelve el numero de reservas expiradas.
+    """
+    filas = db.execute(
+        update(Reserva)
+        .where(Reserva.estado == "activa", Reserva.fecha_expiracion <= ahora)
+        .values(estado="expirada")
+        .returning(Reserva.producto_id, Reserva.cantidad)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not filas:
+        return 0
+
+    cantidades_por_producto = defaultdict(int)
+    for producto_id, cantidad in filas:
+        cantidades_por_producto[producto_id] += cantidad
+
+    tabla = Producto.__table__
+    db.execute(
+        tabla.update()
+        .where(tabla.c.id == bindparam("b_producto_id"))
+        .values(cantidad_reservada=tabla.c.cantidad_reservada - bindparam("b_cantidad")),
+        [
+            {"b_producto_id": producto_id, "b_cantidad": cantidad}
+            for producto_id, cantidad in cantidades_por_producto.items()
+        ]
+    )
+    db.commit()
+    logger.info(
+        f"Reservas expiradas: {len(filas)} "
+        f"({len(cantidades_por_producto)} productos liberados)"
+    )
+    return len(filas)
+
+def get_vencimientos_activos(db: Session) -> List[Tuple[datetime, int]]:
+    """
+    Obtiene (fecha_expiracion, id) de todas las reservas activas.
+    """
+    return [
+        (fecha, reserva_id)
+        for fecha, reserva_id in db.execute(
+            select(Reserva.fecha_expiracion, Reserva.id).where(Reserva.estado == "activa")
+        )
+    ]
@@ -0,0 +1,79 @@
+# sistema-inventarios/backend/app/db/dialects.py
+from sqlalchemy.orm import Session
+from sqlalchemy import func, literal, cast, type_coerce, Date, DateTime, Integer, JSON
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Any, Dict
+from datetime import date
+
+# Dialectos soportados por la aplicacion (produccion y desarrollo/pruebas)
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def dialect_name(db: Session) -> str:
+    """Nombre del dialecto de la conexion de la sesion (e.g., 'postgresql', 'sqlite')."""
+    return db.get_bind().dialect.name
+
+def upsert_insert(db: Session, table):
+    """
+    Devuelve un INSERT del dialecto de la sesion, que soporta
+    on_conflict_do_nothing / on_conflict_do_update.
+    """
+    nombre = dialect_name(db)
+    if nombre not in _INSERTS:
+        raise NotImplementedError(f"INSERT ... ON CONFLICT no soportado para el dialecto '{nombre}'")
+    return _INSERTS[nombre](table)
+
+# Funcion SQL que arma un objeto JSON a partir de pares clave/valor
+_JSON_OBJETO = {
+    "postgresql": func.json_build_object,
+    "sqlite": func.json_object,
+}
+
+def json_objeto(db: Session, campos: Dict[str, Any]):
+    """
+    Expresion SQL que construye un objeto JSON con `campos`
+    ({clave: expresion}) en el dialecto de la sesion.
+    """
+    nombre = dialect_name(db)
+    if nombre not in _JSON_OBJETO:
+        raise NotImplementedError(f"Objetos JSON en SQL no soportados para el dialecto '{nombre}'")
+    argumentos = [x for clave, valor in campos.items() for x in (literal(clave), valor)]
+    return _JSON_OBJETO[nombre](*argumentos, type_=JSON)
+
+def dias_hasta(db: Session, fecha, hoy: date):
+    """
+    Expresion SQL con los dias (entero) que faltan desde `hoy` hasta la
+    columna de fecha `fecha` (negativo si ya paso), en el dialecto de la sesion.
+    """
+    nombre = dialect_name(db)
+    if nombre == "postgresql":
+        # date - date devuelve un entero de dias
+        return type_coerce(fecha - literal(hoy, Date), Integer)
+    if nombre == "sqlite":
+        return cast(func.julianday(fecha) - func.julianday(literal(hoy, Date)), Integer)
+    raise NotImplementedError(f"Diferencia de fechas no soportada para el dialecto '{nombre}'")
+
+# Periodos de agrupacion de los reportes -> unidad de date_trunc / modificadores de date()
+_PERIODOS_POSTGRES = {"dia": "day", "semana": "week", "mes": "month"}
+_PERIODOS_SQLITE = {"dia": (), "semana": ("weekday 0", "-6 days"), "mes": ("start of month",)}
+
+def truncar_fecha(db: Session, columna, periodo: str):
+    """
+    Expresion SQL con la fecha de inicio del periodo ("dia", "semana" que
+    empieza el lunes, o "mes") al que pertenece `columna`, en el dialecto
+    de la sesion. Se usa para agrupar en la BD (GROUP BY). Los periodos de
+    una columna con zona horaria se cortan en UTC.
+    """
+    nombre = dialect_name(db)
+    if nombre == "postgresql":
+        if isinstance(columna.type, DateTime) and columna.type.timezone:
+            # date_trunc de un timestamptz corta en la zona de la sesion:
+            # se pasa antes a UTC (timezone('UTC', x) = x AT TIME ZONE 'UTC')
+            columna = func.timezone("UTC", columna)
+        return cast(func.date_trunc(_PERIODOS_POSTGRES[periodo], columna), Date)
+    if nombre == "sqlite":
+        # SQLite guarda las fechas como texto, ya en UTC (sin desplazamiento)
+        return type_coerce(func.date(columna, *_PERIODOS_SQLITE[periodo]), Date)
+    raise NotImplementedError(f"Truncado de fechas no soportado para el dialecto '{nombre}'")
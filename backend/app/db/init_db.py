@@ -11,6 +11,7 @@ sys.path.append(str(backend_root))
 from sqlalchemy.orm import Session
 from app.db.session import engine, SessionLocal
 from app.db.base import Base
+from app.db.upgrade_db import upgrade_db
 
 import app.models
 
@@ -19,9 +20,10 @@ def init_db(db: Session) -> None:
     """
     Inicializa la base de datos, creando las tablas.
     """
-    # Base.metadata.create_all() es idempotente,
-    # no recreara tablas que ya existen.
-    Base.metadata.create_all(bind=engine)
+    # create_all() es idempotente, no recreara tablas que ya existen, pero
+    # tampoco les agrega columnas ni indices nuevos: upgrade_db crea las
+    # tablas y ademas actualiza las existentes.
+    upgrade_db(engine)
     print(engine.url)
     
 
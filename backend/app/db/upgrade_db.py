@@ -0,0 +1,168 @@
+# sistema-inventarios/backend/app/db/upgrade_db.py
+"""
+Actualiza el esquema de una base de datos existente al de los modelos.
+
+Base.metadata.create_all (init_db) crea las tablas que faltan, pero no
+agrega columnas ni indices a las tablas que ya existian. Este script lo
+hace de forma explicita e idempotente (se puede ejecutar en cada arranque):
+
+  1. crea las tablas nuevas,
+  2. agrega las columnas nuevas de COLUMNAS_NUEVAS con su DDL del modelo
+     (las NOT NULL llevan server_default, asi que las filas existentes
+     quedan con un valor valido),
+  3. rellena los datos derivados y desactiva las alertas activas
+     duplicadas (antes de crear el indice unico parcial),
+  4. crea los indices que falten.
+
+En PostgreSQL todo va en una transaccion: si algo falla no queda a medias.
+Uso (desde la carpeta backend):
+    python app/db/upgrade_db.py
+"""
+import sys
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+
+script_path = Path(__file__).resolve()
+backend_root = script_path.parent.parent.parent
+sys.path.append(str(backend_root))
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.db.base import Base
+import app.models
+from app.services.resumen_diario import MARCA_RESUMEN_DIARIO
+
+logger = logging.getLogger(__name__)
+
+# Columnas agregadas a tablas que ya existian, en orden: (tabla, columna)
+COLUMNAS_NUEVAS: List[Tuple[str, str]] = [
+    ("productos", "cantidad_reservada"),
+    ("productos", "cantidad_cuarentena"),
+    ("lotes", "esta_vencido"),
+    ("movimientos", "consolidado"),
+    ("alertas", "fecha_vencimiento"),
+    ("alertas", "fecha_resolucion"),
+    ("alertas", "fecha_actualizacion"),
+    ("alertas", "notificada"),
+    ("alertas", "notificacion_reclamada_hasta"),
+    ("eventos_outbox", "intentos"),
+    ("eventos_outbox", "proximo_intento"),
+    ("eventos_outbox", "fallido"),
+    ("eventos_outbox", "ultimo_error"),
+    ("contadores_stock", "cupo"),
+]
+
+# Columnas que pasaron a admitir NULL: (tabla, columna)
+COLUMNAS_NULLABLE: List[Tuple[str, str]] = [
+    ("claves_idempotencia", "codigo_estado"),
+    ("claves_idempotencia", "respuesta_json"),
+]
+
+def _ddl_columna(conn: Connection, tabla: str, columna: str) -> str:
+    """
+    DDL de la columna segun el modelo (tipo, DEFAULT y NOT NULL). SQLite no
+    admite agregar columnas con un default no constante (p. ej. now()): ahi
+    se agrega sin default ni NOT NULL y la rellena el paso de datos.
+    """
+    col = Base.metadata.tables[tabla].c[columna]
+    default = col.server_default
+    if conn.dialect.name == "sqlite" and default is not None and isinstance(default.arg, FunctionElement):
+        return f"{col.name} {col.type.compile(dialect=conn.dialect)}"
+    return str(CreateColumn(col).compile(dialect=conn.dialect))
+
+def agregar_columnas(conn: Connection) -> List[str]:
+    """Agrega las columnas de COLUMNAS_NUEVAS que falten. Devuelve las agregadas."""
+    inspector = inspect(conn)
+    agregadas = []
+    for tabla, columna in COLUMNAS_NUEVAS:
+        existentes = {c["name"] for c in inspector.get_columns(tabla)}
+        if columna in existentes:
+            continue
+        conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {_ddl_columna(conn, tabla, columna)}"))
+        agregadas.append(f"{tabla}.{columna}")
+        logger.info(f"Columna agregada: {tabla}.{columna}")
+    return agregadas
+
+def permitir_nulos(conn: Connection) -> None:
+    """Quita el NOT NULL de COLUMNAS_NULLABLE (SQLite no permite alterar columnas)."""
+    if conn.dialect.name != "postgresql":
+        return
+    inspector = inspect(conn)
+    for tabla, columna in COLUMNAS_NULLABLE:
+        info = {c["name"]: c for c in inspector.get_columns(tabla)}
+        if columna in info and not info[columna]["nullable"]:
+            conn.execute(text(f"ALTER TABLE {tabla} ALTER COLUMN {columna} DROP NOT NULL"))
+            logger.info(f"Columna {tabla}.{columna} ahora admite NULL")
+
+def rellenar_datos(conn: Connection, agregadas: List[str]) -> None:
+    """
+    Rellena las columnas recien agregadas que dependen de otros datos y
+    desactiva las alertas activas duplicadas por (tipo, entidad), dejando la
+    mas reciente, para poder crear el indice unico ux_alertas_activa_entidad.
+    """
+    if "movimientos.consolidado" in agregadas:
+        # El resumen diario ya sumaba los movimientos hasta su antigua marca
+        # de agua (marcas_agua.ultimo_id); ahora el progreso es el flag, y la
+        # marca del resumen vuelve a 0 (solo se usa durante una reconstruccion)
+        marca = {"marca": MARCA_RESUMEN_DIARIO}
+        conn.execute(
+            text(
+                "UPDATE movimientos SET consolidado = :verdadero WHERE id <= ("
+                "  SELECT coalesce(max(ultimo_id), 0) FROM marcas_agua WHERE nombre = :marca"
+                ")"
+            ),
+            {"verdadero": True, **marca}
+        )
+        conn.execute(text("UPDATE marcas_agua SET ultimo_id = 0 WHERE nombre = :marca"), marca)
+
+    if "alertas.fecha_actualizacion" in agregadas:
+        # Ultimo cambio conocido: la creacion (la sincronizacion "since" no
+        # las ve todas como cambiadas en el momento de la actualizacion)
+        conn.execute(text("UPDATE alertas SET fecha_actualizacion = fecha_creacion"))
+
+    duplicadas = conn.execute(
+        text(
+            "UPDATE alertas SET esta_activa = :falso, fecha_resolucion = :ahora "
+            "WHERE esta_activa = :verdadero AND id NOT IN ("
+            "  SELECT max(id) FROM alertas WHERE esta_activa = :verdadero"
+            "  GROUP BY tipo_alerta, entidad_tipo, entidad_id"
+            ")"
+        ),
+        {"falso": False, "verdadero": True, "ahora": datetime.now()}
+    ).rowcount
+    if duplicadas:
+        logger.info(f"Alertas activas duplicadas desactivadas: {duplicadas}")
+
+def crear_indices(conn: Connection) -> None:
+    """Crea los indices de los modelos que no existan todavia."""
+    inspector = inspect(conn)
+    for tabla in Base.metadata.sorted_tables:
+        existentes = {i["name"] for i in inspector.get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name not in existentes:
+                indice.create(bind=conn)
+                logger.info(f"Indice creado: {indice.name}")
+
+def upgrade_db(engine: Engine) -> None:
+    """Lleva el esquema de la BD al de los modelos (idempotente)."""
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        agregadas = agregar_columnas(conn)
+        permitir_nulos(conn)
+        rellenar_datos(conn, agregadas)
+        crear_indices(conn)
+
+def main() -> None:
+    from app.db.session import engine
+
+    print("Actualizando el esquema de la base de datos...")
+    upgrade_db(engine)
+    print("Esquema actualizado.")
+
+if __name__ == "__main__":
+    main()
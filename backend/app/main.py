@@ -1,14 +1,44 @@
 # sistema-inventarios/backend/app/main.py
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.api import api_router
+from app.core.config import get_settings
 from app.core.logging_setup import setup_logging
+from app.core.scheduler import ProgramadorTareas
+from app.services.group_commit import detener_cola_salidas
+from app.services.eventos_tiempo_real import difusor_eventos
+from app.services.notificaciones import despachador_notificaciones
+from app.services.tasks import registrar_tareas_de_proceso, registrar_tareas_periodicas
 
 setup_logging()
 logger = logging.getLogger(__name__)
 logger.info("Aplicacion iniciada y logger configurado.")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arranca las tareas periodicas de mantenimiento, el difusor de eventos
+    SSE y el despachador de notificaciones al iniciar la API, y los detiene
+    al apagarla.
+    """
+    difusor_eventos.iniciar(asyncio.get_running_loop())
+    programador = ProgramadorTareas()
+    registrar_tareas_de_proceso(programador)
+    if get_settings().SCHEDULER_ENABLED:
+        # Las notificaciones van con las tareas globales (un solo proceso)
+        if get_settings().NOTIFY_ENABLED:
+            despachador_notificaciones.iniciar(asyncio.get_running_loop())
+        registrar_tareas_periodicas(programador)
+    programador.iniciar()
+    yield
+    await programador.detener()
+    detener_cola_salidas()
+    despachador_notificaciones.detener()
+    difusor_eventos.detener()
+
+app = FastAPI(lifespan=lifespan)
 
 # Incluir el router principal
 app.include_router(api_router, prefix="/api") # Prefijo global /api
@@ -16,4 +46,4 @@ app.include_router(api_router, prefix="/api") # Prefijo global /api
 # Endpoint de "hello world" para verificar que la app funciona
 @app.get("/")
 def read_root():
-    return {"Hello": "World"}
\ No newline at end of file
+    return {"Hello": "World"}
@@ -2,3 +2,12 @@ from .producto import Producto
 from .lote import Lote
 from .movimiento import Movimiento
 from .alerta import Alerta
+from .idempotencia import ClaveIdempotencia
+from .reserva import Reserva
+from .contador_stock import ContadorStock
+from .snapshot_stock import CorteStock, SnapshotStockProducto, SnapshotStockLote
+from .evento_outbox import EventoOutbox
+from .alerta_historica import AlertaHistorica
+from .regla_alerta import ReglaAlerta
+from .resumen_movimientos import ResumenDiarioMovimientos, MarcaAgua
+from .evento_tiempo_real import EventoTiempoReal
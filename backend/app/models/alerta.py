@@ -1,5 +1,5 @@
 # sistema-inventarios/backend/app/models/alerta.py
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, JSON, Index, true, func
 from app.db.base import Base
 from datetime import datetime
 
@@ -7,11 +7,70 @@ class Alerta(Base):
     __tablename__ = "alertas"
 
     id = Column(Integer, primary_key=True, index=True)
-    tipo_alerta = Column(String, index=True, nullable=False) # e.g., "stock_minimo", "por_vencer"
+    tipo_alerta = Column(String, index=True, nullable=False) # e.g., "stock_minimo", "por_vencer_7"
     entidad_id = Column(Integer, nullable=False) # ID de la entidad (Producto o Lote) que genero la alerta
     entidad_tipo = Column(String, nullable=False) # "producto" o "lote"
     mensaje = Column(String, nullable=False)
     fecha_creacion = Column(DateTime, default=datetime.now, nullable=False)
     esta_activa = Column(Boolean, default=True, nullable=False)
     # metadata_json puede contener detalles como nombre de producto, SKU, fecha de vencimiento, etc.
-    metadata_json = Column(JSON, nullable=True) 
\ No newline at end of file
+    metadata_json = Column(JSON, nullable=True)
+    # Solo alertas de lotes por vencer: permite filtrar por cualquier numero de dias
+    fecha_vencimiento = Column(Date, nullable=True)
+    # Cuando se desactivo; la purga de retencion archiva las resueltas hace mas de N dias
+    fecha_resolucion = Column(DateTime, nullable=True)
+    # Ultimo cambio (creacion, nuevo mensaje o desactivacion): sincronizacion "since"
+    # (server_default para las filas que ya existian; upgrade_db las rellena con su fecha de creacion)
+    fecha_actualizacion = Column(
+        DateTime, default=datetime.now, onupdate=datetime.now, server_default=func.now(), nullable=False
+    )
+    # Notificacion: se marca tras entregar el resumen que la incluye. Las filas
+    # que ya existian cuando upgrade_db agrega la columna quedan como
+    # notificadas (server_default); las nuevas se insertan sin notificar.
+    notificada = Column(Boolean, default=False, server_default=true(), nullable=False)
+    # Reclamada por un despachador hasta este instante (reenvio si cae antes de marcarla)
+    notificacion_reclamada_hasta = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Las lecturas de la API filtran alertas activas por tipo
+        Index("ix_alertas_tipo_activa", "tipo_alerta", "esta_activa"),
+        # Listado paginado por cursor (fecha_creacion, id) de las activas
+        Index(
+            "ix_alertas_activa_creacion",
+            "fecha_creacion", "id",
+            postgresql_where=(esta_activa == True),
+            sqlite_where=(esta_activa == True)
+        ),
+        # Alertas creadas o cambiadas desde la ultima sincronizacion de un cliente
+        Index("ix_alertas_actualizacion", "fecha_actualizacion"),
+        # Alertas por vencer dentro de N dias (filtro por fecha, no por tipo)
+        Index(
+            "ix_alertas_activa_vencimiento",
+            "fecha_vencimiento",
+            postgresql_where=(esta_activa == True),
+            sqlite_where=(esta_activa == True)
+        ),
+        # La purga de retencion busca las inactivas por fecha de resolucion
+        Index(
+            "ix_alertas_inactiva_resolucion",
+            "fecha_resolucion",
+            postgresql_where=(esta_activa == False),
+            sqlite_where=(esta_activa == False)
+        ),
+        # El despachador de notificaciones reclama las pendientes por id
+        Index(
+            "ix_alertas_sin_notificar",
+            "id",
+            postgresql_where=(notificada == False),
+            sqlite_where=(notificada == False)
+        ),
+        # Como mucho una alerta activa por (tipo, entidad): dos sincronizaciones
+        # concurrentes no pueden duplicarla (INSERT ... ON CONFLICT).
+        Index(
+            "ux_alertas_activa_entidad",
+            "tipo_alerta", "entidad_tipo", "entidad_id",
+            unique=True,
+            postgresql_where=(esta_activa == True),
+            sqlite_where=(esta_activa == True)
+        ),
+    )
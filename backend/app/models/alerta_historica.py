@@ -0,0 +1,30 @@
+# sistema-inventarios/backend/app/models/alerta_historica.py
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, JSON, Index
+from app.db.base import Base
+from datetime import datetime
+
+class AlertaHistorica(Base):
+    """
+    Alerta inactiva archivada por la purga de retencion. Conserva el id y
+    los datos que tenia en `alertas`, para consultar el historial sin
+    cargar la tabla de alertas vivas.
+    """
+    __tablename__ = "alertas_historico"
+
+    id = Column(Integer, primary_key=True, autoincrement=False) # Mismo id que tenia en alertas
+    tipo_alerta = Column(String, nullable=False)
+    entidad_id = Column(Integer, nullable=False)
+    entidad_tipo = Column(String, nullable=False)
+    mensaje = Column(String, nullable=False)
+    fecha_creacion = Column(DateTime, nullable=False)
+    esta_activa = Column(Boolean, default=False, nullable=False)
+    metadata_json = Column(JSON, nullable=True)
+    fecha_vencimiento = Column(Date, nullable=True)
+    fecha_resolucion = Column(DateTime, nullable=True)
+    fecha_actualizacion = Column(DateTime, nullable=False)
+    fecha_archivado = Column(DateTime, default=datetime.now, nullable=False)
+
+    # El historial se consulta por entidad, de lo mas reciente a lo mas antiguo
+    __table_args__ = (
+        Index("ix_alertas_historico_entidad", "entidad_tipo", "entidad_id", "fecha_creacion"),
+    )
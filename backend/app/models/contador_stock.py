@@ -0,0 +1,17 @@
+# sistema-inventarios/backend/app/models/contador_stock.py
+from sqlalchemy import Column, Integer, ForeignKey
+from app.db.base import Base
+
+class ContadorStock(Base):
+    """
+    Ranura de contador de stock de un producto (modo de contadores repartidos).
+    El stock efectivo es Producto.cantidad_actual + la suma de sus ranuras.
+    """
+    __tablename__ = "contadores_stock"
+
+    producto_id = Column(Integer, ForeignKey("productos.id"), primary_key=True)
+    ranura = Column(Integer, primary_key=True)
+    delta = Column(Integer, default=0, nullable=False)
+    # Unidades del disponible apartadas para esta ranura: las salidas las
+    # descuentan de la ranura sin tocar (ni bloquear) la fila del producto
+    cupo = Column(Integer, default=0, server_default="0", nullable=False)
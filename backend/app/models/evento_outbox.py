@@ -0,0 +1,30 @@
+# sistema-inventarios/backend/app/models/evento_outbox.py
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, Index, false
+from app.db.base import Base
+from datetime import datetime
+
+class EventoOutbox(Base):
+    """
+    Evento de cambio de stock escrito en la misma transaccion que el cambio.
+    Un consumidor lo procesa despues del commit (alertas, calendario, SSE).
+    Si sus manejadores fallan se reintenta con espera creciente
+    (intentos, proximo_intento); agotados los intentos queda como fallido
+    (dead letter) y sale de la cola sin bloquear a los demas.
+    """
+    __tablename__ = "eventos_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tipo_evento = Column(String, nullable=False) # "entrada", "salida", "despacho", "importacion"
+    producto_id = Column(Integer, nullable=False)
+    lote_ids = Column(JSON, nullable=False) # Lotes afectados por el cambio
+    delta = Column(Integer, nullable=False) # Cambio neto de stock del producto (+/-)
+    fecha_creacion = Column(DateTime, default=datetime.now, nullable=False)
+    procesado = Column(Boolean, default=False, nullable=False)
+    fecha_procesado = Column(DateTime, nullable=True)
+    intentos = Column(Integer, default=0, server_default="0", nullable=False)
+    proximo_intento = Column(DateTime, nullable=True) # NULL = sin esperar
+    fallido = Column(Boolean, default=False, server_default=false(), nullable=False)
+    ultimo_error = Column(String, nullable=True)
+
+    # El consumidor lee los pendientes en orden de llegada
+    __table_args__ = (Index("ix_eventos_outbox_procesado_id", "procesado", "id"),)
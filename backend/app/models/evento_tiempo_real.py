@@ -0,0 +1,19 @@
+# sistema-inventarios/backend/app/models/evento_tiempo_real.py
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from app.db.base import Base
+from datetime import datetime
+
+class EventoTiempoReal(Base):
+    """
+    Evento para los clientes SSE (cambio de stock o de alertas), guardado al
+    comitear la transaccion que lo produce. Los ids se asignan con el cerrojo
+    de marcas_agua tomado, por lo que crecen en orden de commit: cada worker
+    de la API lee los nuevos por id y un cliente puede reanudar con
+    Last-Event-ID en cualquiera de ellos.
+    """
+    __tablename__ = "eventos_tiempo_real"
+
+    id = Column(Integer, primary_key=True)
+    tipo = Column(String, nullable=False) # "stock", "alertas"
+    datos = Column(JSON, nullable=False)
+    fecha_creacion = Column(DateTime, default=datetime.now, nullable=False, index=True)
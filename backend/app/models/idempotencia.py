@@ -0,0 +1,17 @@
+# sistema-inventarios/backend/app/models/idempotencia.py
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from app.db.base import Base
+from datetime import datetime
+
+class ClaveIdempotencia(Base):
+    __tablename__ = "claves_idempotencia"
+
+    # La llave primaria compuesta (endpoint, clave) permite una busqueda directa por indice
+    endpoint = Column(String, primary_key=True) # e.g., "entradas", "salidas", "despachar"
+    clave = Column(String, primary_key=True) # Valor de la cabecera Idempotency-Key
+    hash_peticion = Column(String, nullable=False) # Huella del cuerpo de la peticion original
+    # NULL mientras la peticion esta en curso (clave reservada, sin respuesta aun)
+    codigo_estado = Column(Integer, nullable=True)
+    respuesta_json = Column(JSON, nullable=True)
+    fecha_creacion = Column(DateTime, default=datetime.now, nullable=False)
+    fecha_expiracion = Column(DateTime, index=True, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Date, ForeignKey
+from sqlalchemy import Column, Integer, Date, Boolean, ForeignKey, Index, false
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -15,10 +15,24 @@ class Lote(Base):
     cantidad_actual = Column(Integer, nullable=False)
     
     fecha_vencimiento = Column(Date)
+    # Marcado por el barrido diario de vencidos: en cuarentena, fuera del despacho
+    # (server_default: tambien para los lotes cargados con COPY o ya existentes)
+    esta_vencido = Column(Boolean, default=False, server_default=false(), nullable=False)
 
     # Relacion con el producto (para ORM)
     producto = relationship("Producto")
 
+    # Candidatos de despacho FEFO: solo lotes con stock y no vencidos, en el
+    # orden de consumo. Los lotes salen del indice al agotarse o al vencer.
+    __table_args__ = (
+        Index(
+            "ix_lotes_despachables",
+            "producto_id", "fecha_vencimiento", "id",
+            postgresql_where=(cantidad_actual > 0) & (esta_vencido == False),
+            sqlite_where=(cantidad_actual > 0) & (esta_vencido == False)
+        ),
+    )
+
     def __init__(self, *args, **kwargs):
         """
         Sobrescribe el init para asegurar que cantidad_actual
@@ -1,5 +1,5 @@
 # sistema-inventarios/backend/app/models/movimiento.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, false, func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from datetime import datetime, timezone
@@ -15,12 +15,27 @@ class Movimiento(Base):
     tipo = Column(String, nullable=False) # 'entrada' o 'salida'
     cantidad = Column(Integer, nullable=False)
     
-    # Se autogenera al crear
-    fecha_movimiento = Column(DateTime(timezone=True), server_default=func.now())
+    # Se autogenera al crear. Indexada para reproducir movimientos por rango de fechas
+    fecha_movimiento = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    # Ya sumado al resumen diario de movimientos (lo marca la consolidacion
+    # en la misma transaccion en que suma el movimiento al resumen)
+    consolidado = Column(Boolean, default=False, server_default=false(), nullable=False)
 
     # Relacion con el lote (para ORM)
     lote = relationship("Lote")
 
+    # Movimientos pendientes de consolidar: los busca la consolidacion y los
+    # suman los reportes al resumen diario
+    __table_args__ = (
+        Index(
+            "ix_movimientos_sin_consolidar",
+            "id",
+            postgresql_where=(consolidado == False),
+            sqlite_where=(consolidado == False)
+        ),
+    )
+
     def __init__(self, *args, **kwargs):
         """
         Sobrescribe el init para manejar la fecha_movimiento 
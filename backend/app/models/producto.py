@@ -10,6 +10,10 @@ class Producto(Base):
     sku = Column(String, unique=True, index=True, nullable=False)
     precio = Column(Float, nullable=False)
     cantidad_actual = Column(Integer, default=0)
+    # Unidades apartadas por reservas activas (no disponibles para despacho)
+    cantidad_reservada = Column(Integer, default=0, server_default="0", nullable=False)
+    # Unidades en lotes vencidos (en cuarentena, no disponibles para despacho)
+    cantidad_cuarentena = Column(Integer, default=0, server_default="0", nullable=False)
     stock_minimo = Column(Integer, default=5)
 
     __table_args__ = (UniqueConstraint('sku', name='uq_sku'),)
\ No newline at end of file
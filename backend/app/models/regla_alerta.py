@@ -0,0 +1,20 @@
+# sistema-inventarios/backend/app/models/regla_alerta.py
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON
+from app.db.base import Base
+from datetime import datetime
+
+class ReglaAlerta(Base):
+    __tablename__ = "reglas_alerta"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Las alertas que genera la regla son de tipo "regla_<nombre>"
+    nombre = Column(String, unique=True, index=True, nullable=False)
+    entidad = Column(String, nullable=False) # "producto" o "lote"
+    # Lista de condiciones (AND): [{"campo", "operador", "valor", "referencia"}]
+    condiciones = Column(JSON, nullable=False)
+    # Plantilla del mensaje con {campo}; si falta se usa una generica
+    mensaje = Column(String, nullable=True)
+    # Ventana (dias) para la demanda diaria promedio de los productos
+    ventana_demanda_dias = Column(Integer, default=30, nullable=False)
+    esta_activa = Column(Boolean, default=True, nullable=False)
+    fecha_creacion = Column(DateTime, default=datetime.now, nullable=False)
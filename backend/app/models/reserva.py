@@ -0,0 +1,24 @@
+# sistema-inventarios/backend/app/models/reserva.py
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.db.base import Base
+from datetime import datetime
+
+class Reserva(Base):
+    __tablename__ = "reservas"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Llave foranea al producto reservado
+    producto_id = Column(Integer, ForeignKey("productos.id"), nullable=False, index=True)
+
+    cantidad = Column(Integer, nullable=False)
+    estado = Column(String, default="activa", nullable=False) # "activa", "liberada", "confirmada", "expirada"
+    fecha_creacion = Column(DateTime, default=datetime.now, nullable=False)
+    fecha_expiracion = Column(DateTime, nullable=False)
+
+    # Relacion con el producto (para ORM)
+    producto = relationship("Producto")
+
+    # El barrido de expiracion busca reservas activas por fecha de expiracion
+    __table_args__ = (Index("ix_reservas_estado_expiracion", "estado", "fecha_expiracion"),)
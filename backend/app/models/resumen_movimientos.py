@@ -0,0 +1,40 @@
+# sistema-inventarios/backend/app/models/resumen_movimientos.py
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index
+from app.db.base import Base
+
+class ResumenDiarioMovimientos(Base):
+    """
+    Totales de movimientos por producto y dia (UTC), mantenidos por la tarea
+    que consolida los movimientos aun no consolidados (Movimiento.consolidado).
+    El valor se calcula con el precio del producto al consolidar.
+    """
+    __tablename__ = "resumen_diario_movimientos"
+
+    producto_id = Column(Integer, ForeignKey("productos.id"), primary_key=True)
+    dia = Column(Date, primary_key=True)
+    cantidad_entradas = Column(Integer, default=0, nullable=False)
+    cantidad_salidas = Column(Integer, default=0, nullable=False)
+    cantidad_neta = Column(Integer, default=0, nullable=False)
+    num_entradas = Column(Integer, default=0, nullable=False)
+    num_salidas = Column(Integer, default=0, nullable=False)
+    valor_entradas = Column(Float, default=0, nullable=False)
+    valor_salidas = Column(Float, default=0, nullable=False)
+
+    # Los reportes filtran por rango de dias (de todos los productos)
+    __table_args__ = (
+        Index("ix_resumen_diario_movimientos_dia", "dia"),
+    )
+
+
+class MarcaAgua(Base):
+    """
+    Fila de estado y cerrojo (SELECT ... FOR UPDATE) de un proceso entre sus
+    ejecuciones. ultimo_id es el ultimo id publicado de eventos_tiempo_real;
+    en la fila del resumen diario solo indica una reconstruccion en curso
+    (el progreso de la consolidacion es Movimiento.consolidado).
+    """
+    __tablename__ = "marcas_agua"
+
+    nombre = Column(String, primary_key=True)
+    ultimo_id = Column(Integer, default=0, nullable=False)
+    fecha_actualizacion = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,46 @@
+# sistema-inventarios/backend/app/models/snapshot_stock.py
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from app.db.base import Base
+
+class CorteStock(Base):
+    """
+    Un snapshot de stock tomado a partir del libro de movimientos.
+    Las filas de detalle son dispersas: un lote o producto sin fila en el
+    corte tenia stock 0.
+    """
+    __tablename__ = "cortes_stock"
+
+    # Instante (UTC) hasta el que se incluyeron movimientos (inclusive)
+    fecha_corte = Column(DateTime(timezone=True), primary_key=True)
+    movimientos_incluidos = Column(Integer, default=0, nullable=False)
+    fecha_creacion = Column(DateTime(timezone=True), nullable=False)
+
+
+class SnapshotStockProducto(Base):
+    __tablename__ = "snapshots_stock_producto"
+
+    fecha_corte = Column(
+        DateTime(timezone=True), ForeignKey("cortes_stock.fecha_corte"), primary_key=True
+    )
+    producto_id = Column(Integer, ForeignKey("productos.id"), primary_key=True)
+    cantidad = Column(Integer, nullable=False)
+
+    # Consulta de un solo producto: ultimo corte <= fecha
+    __table_args__ = (
+        Index("ix_snapshots_stock_producto_producto_corte", "producto_id", "fecha_corte"),
+    )
+
+
+class SnapshotStockLote(Base):
+    __tablename__ = "snapshots_stock_lote"
+
+    fecha_corte = Column(
+        DateTime(timezone=True), ForeignKey("cortes_stock.fecha_corte"), primary_key=True
+    )
+    lote_id = Column(Integer, ForeignKey("lotes.id"), primary_key=True)
+    producto_id = Column(Integer, ForeignKey("productos.id"), nullable=False)
+    cantidad = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_snapshots_stock_lote_lote_corte", "lote_id", "fecha_corte"),
+    )
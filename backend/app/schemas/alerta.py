@@ -1,7 +1,7 @@
 # sistema-inventarios/backend/app/schemas/alerta.py
 from pydantic import BaseModel, ConfigDict
-from typing import Optional, Dict, Any
-from datetime import datetime
+from typing import List, Optional, Dict, Any
+from datetime import date, datetime
 
 class AlertaBase(BaseModel):
     tipo_alerta: str
@@ -10,6 +10,7 @@ class AlertaBase(BaseModel):
     mensaje: str
     esta_activa: bool = True
     metadata_json: Optional[Dict[str, Any]] = None
+    fecha_vencimiento: Optional[date] = None
 
 class AlertaCreate(AlertaBase):
     pass
@@ -20,5 +21,22 @@ class AlertaUpdate(AlertaBase):
 class AlertaInDB(AlertaBase):
     id: int
     fecha_creacion: datetime
+    fecha_resolucion: Optional[datetime] = None
+    fecha_actualizacion: Optional[datetime] = None
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class AlertaHistorial(AlertaInDB):
+    """Alerta del historial: viva o archivada (con fecha_archivado)."""
+    fecha_archivado: Optional[datetime] = None
+
+class PaginaAlertas(BaseModel):
+    """
+    Pagina del listado de alertas; `siguiente_cursor` es None en la ultima.
+    `sincronizado_hasta` (el mismo en todas las paginas de un recorrido) es
+    el `since` que el cliente debe enviar en su proxima sincronizacion: no
+    se salta cambios comiteados tarde (a costa de repetir algunos).
+    """
+    alertas: List[AlertaInDB]
+    siguiente_cursor: Optional[str] = None
+    sincronizado_hasta: datetime
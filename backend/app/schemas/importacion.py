@@ -0,0 +1,17 @@
+# sistema-inventarios/backend/app/schemas/importacion.py
+from pydantic import BaseModel
+from typing import List
+
+class ErrorImportacion(BaseModel):
+    """Error de una fila del archivo importado (fila 1 = primera fila de datos)."""
+    fila: int
+    error: str
+
+class ResumenImportacion(BaseModel):
+    """Progreso / resultado de una importacion masiva de lotes."""
+    filas_leidas: int = 0
+    filas_importadas: int = 0
+    filas_con_error: int = 0
+    bloques_confirmados: int = 0
+    errores: List[ErrorImportacion] = []
+    errores_truncados: bool = False
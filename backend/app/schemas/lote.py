@@ -18,5 +18,6 @@ class Lote(LoteBase):
     """Esquema para leer un lote (incluye campos de la BD)."""
     id: int
     cantidad_actual: int
+    esta_vencido: bool = False
 
     model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
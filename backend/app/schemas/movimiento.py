@@ -1,6 +1,6 @@
 # sistema-inventarios/backend/app/schemas/movimiento.py
 from pydantic import BaseModel, Field, ConfigDict
-from datetime import datetime
+from datetime import date, datetime
 from typing import Literal
 
 class MovimientoBase(BaseModel):
@@ -23,4 +23,12 @@ class Movimiento(MovimientoBase):
     id: int
     fecha_movimiento: datetime
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class ResumenMovimientos(BaseModel):
+    """Totales de un tipo de movimiento de un producto en un periodo."""
+    periodo: date
+    producto_id: int
+    tipo: str
+    cantidad_total: int
+    num_movimientos: int
@@ -29,5 +29,7 @@ class Producto(ProductoBase):
     """
     id: int
     cantidad_actual: int
+    cantidad_reservada: int = 0
+    cantidad_cuarentena: int = 0
 
     model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
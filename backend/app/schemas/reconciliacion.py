@@ -0,0 +1,17 @@
+# sistema-inventarios/backend/app/schemas/reconciliacion.py
+from pydantic import BaseModel
+from typing import List
+
+class DiferenciaStock(BaseModel):
+    """Un producto cuyo stock no coincide con sus lotes o con su libro de movimientos."""
+    producto_id: int
+    sku: str
+    cantidad_producto: int
+    suma_lotes: int
+    suma_movimientos: int
+
+class ReporteReconciliacion(BaseModel):
+    """Resultado de una reconciliacion de stock."""
+    productos_revisados: int
+    diferencias: List[DiferenciaStock]
+    productos_corregidos: int = 0
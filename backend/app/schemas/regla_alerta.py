@@ -0,0 +1,40 @@
+# sistema-inventarios/backend/app/schemas/regla_alerta.py
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Literal, Optional
+from datetime import datetime
+
+class CondicionRegla(BaseModel):
+    """
+    Condicion `campo operador valor`. Con `referencia`, se compara contra
+    otro campo: `campo operador valor * referencia` (p. ej. stock < 7 * demanda_diaria).
+    """
+    campo: str
+    operador: Literal["<", "<=", ">", ">=", "==", "!="]
+    valor: float = 1
+    referencia: Optional[str] = None
+
+class ReglaAlertaBase(BaseModel):
+    nombre: str = Field(..., pattern=r"^[a-z0-9_]+$", max_length=50)
+    entidad: Literal["producto", "lote"]
+    # Todas deben cumplirse (AND)
+    condiciones: List[CondicionRegla] = Field(..., min_length=1)
+    # Plantilla con {campo}, p. ej. "El producto {sku} cubre {dias_cobertura} dias"
+    mensaje: Optional[str] = None
+    ventana_demanda_dias: int = Field(30, gt=0)
+    esta_activa: bool = True
+
+class ReglaAlertaCreate(ReglaAlertaBase):
+    pass
+
+class ReglaAlerta(ReglaAlertaBase):
+    id: int
+    fecha_creacion: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ResultadoRegla(BaseModel):
+    """Resultado de evaluar una regla en un barrido, con su duracion."""
+    nombre: str
+    creadas: int
+    desactivadas: int
+    duracion_ms: float
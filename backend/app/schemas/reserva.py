@@ -0,0 +1,33 @@
+# sistema-inventarios/backend/app/schemas/reserva.py
+from pydantic import BaseModel, Field, ConfigDict
+from datetime import datetime
+from typing import Optional
+
+class ReservaBase(BaseModel):
+    """Esquema base para una reserva de stock."""
+    producto_id: int
+    cantidad: int = Field(..., gt=0) # La cantidad debe ser positiva
+
+class ReservaCreate(ReservaBase):
+    """
+    Esquema para crear una reserva.
+    Si no se indica ttl_segundos se usa RESERVATION_TTL_SECONDS.
+    """
+    ttl_segundos: Optional[int] = Field(None, gt=0)
+
+class Reserva(ReservaBase):
+    """Esquema para leer una reserva (incluye campos de la BD)."""
+    id: int
+    estado: str
+    fecha_creacion: datetime
+    fecha_expiracion: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class Disponibilidad(BaseModel):
+    """Stock disponible para prometer (ATP) de un producto."""
+    producto_id: int
+    cantidad_actual: int
+    cantidad_reservada: int
+    cantidad_cuarentena: int = 0
+    disponible: int
@@ -0,0 +1,40 @@
+# sistema-inventarios/backend/app/schemas/simulacion.py
+from pydantic import BaseModel, Field
+from typing import List
+
+from app.schemas.inventory import SmartDispatchReq
+
+class SimulacionDespachosReq(BaseModel):
+    """Pedidos candidatos a simular, en el orden en que se despacharian."""
+    pedidos: List[SmartDispatchReq] = Field(..., min_length=1)
+    # Horizonte para medir el stock por vencer que quedaria tras los despachos
+    dias_vencimiento: int = Field(30, ge=0)
+
+class AsignacionLote(BaseModel):
+    """Cantidad que un pedido tomaria de un lote."""
+    lote_id: int
+    cantidad: int
+
+class PedidoSimulado(BaseModel):
+    """Resultado simulado de un pedido."""
+    indice: int
+    producto_id: int
+    cantidad: int
+    atendido: bool
+    asignaciones: List[AsignacionLote] = []
+
+class ProductoSimulado(BaseModel):
+    """Estado de un producto antes y despues de la simulacion."""
+    producto_id: int
+    disponible_inicial: int
+    cantidad_despachada: int
+    disponible_final: int
+    stock_por_vencer_restante: int
+
+class ResultadoSimulacion(BaseModel):
+    """Resultado de una simulacion de despachos FEFO (no modifica nada)."""
+    metodo: str
+    pedidos_atendidos: int
+    pedidos_rechazados: int
+    pedidos: List[PedidoSimulado]
+    productos: List[ProductoSimulado]
@@ -0,0 +1,28 @@
+# sistema-inventarios/backend/app/schemas/snapshot_stock.py
+from datetime import datetime
+from pydantic import BaseModel
+from typing import List, Optional
+
+class CorteStock(BaseModel):
+    """Resumen de un snapshot de stock tomado."""
+    fecha_corte: datetime
+    movimientos_incluidos: int
+    productos: int
+    lotes: int
+
+class StockProductoEnFecha(BaseModel):
+    producto_id: int
+    cantidad: int
+
+class StockLoteEnFecha(BaseModel):
+    lote_id: int
+    producto_id: int
+    cantidad: int
+
+class ReporteStockEnFecha(BaseModel):
+    """Stock reconstruido a una fecha: snapshot mas cercano + movimientos posteriores."""
+    fecha: datetime
+    fecha_corte: Optional[datetime] = None
+    movimientos_reproducidos: int
+    productos: List[StockProductoEnFecha]
+    lotes: Optional[List[StockLoteEnFecha]] = None
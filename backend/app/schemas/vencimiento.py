@@ -0,0 +1,9 @@
+# sistema-inventarios/backend/app/schemas/vencimiento.py
+from datetime import date
+from pydantic import BaseModel
+
+class DiaVencimiento(BaseModel):
+    """Unidades y lotes que vencen en una fecha."""
+    fecha: date
+    cantidad: int
+    lotes: int
@@ -1,188 +1,499 @@
 # sistema-inventarios/backend/app/services/alerts.py
+import base64
 import logging
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select, and_
-from typing import List, Optional
-from datetime import date, timedelta
+import time
+from sqlalchemy.orm import Session
+from sqlalchemy import select, and_, case, cast, func, literal, String, ColumnElement
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import date, datetime, timedelta
 
 from app.models.producto import Producto as ProductoModel
 from app.models.lote import Lote as LoteModel
 from app.models.alerta import Alerta # Nueva importacion
 from app.schemas.producto import Producto as ProductoSchema
 from app.schemas.lote import Lote as LoteSchema
-from app.schemas.alerta import AlertaCreate # Nueva importacion
+from app.schemas.alerta import AlertaInDB, PaginaAlertas
+from app.core.exceptions import InvalidCursorError
 from app.crud import crud_alerta # Nueva importacion
+import app.crud.crud_contador_stock as crud_contador_stock
 from app.core.cache import cache
-from fastapi import HTTPException # Importar HTTPException
+from app.core.config import get_settings
+from app.db.dialects import json_objeto
+from app.services.eventos_tiempo_real import publicar_tras_commit, EVENTO_ALERTAS
+import app.services.reglas_alertas as reglas_alertas
+from app.schemas.regla_alerta import ResultadoRegla
 
 logger = logging.getLogger(__name__)
 
 CACHE_KEY_STOCK_MINIMO = "alert_stock_minimo"
 CACHE_KEY_LOTES_VENCIMIENTO = "alert_lotes_vencimiento"
+# Las alertas de lotes por vencer son "por_vencer_<dias del tramo>"
+PREFIJO_POR_VENCER = "por_vencer_"
+
+def _texto(valor) -> ColumnElement[str]:
+    """Convierte una expresion SQL a texto para armar mensajes."""
+    return cast(valor, String)
+
+def _sincronizar_stock_minimo(
+    db: Session, producto_ids: Optional[Set[int]] = None
+) -> Tuple[int, int]:
+    """
+    Sincroniza las alertas de stock minimo (de todos los productos o solo de
+    `producto_ids`) con dos sentencias, sin comitear:
+    - un INSERT ... SELECT ... ON CONFLICT con los productos bajo su minimo
+      (el indice unico de alertas activas evita duplicados);
+    - un UPDATE ... WHERE NOT EXISTS que desactiva las alertas resueltas.
+    Se compara el stock utilizable: las unidades en cuarentena (lotes
+    vencidos) no cuentan.
+    Devuelve (creadas o actualizadas, desactivadas).
+    """
+    stock = crud_contador_stock.stock_efectivo_expr() - ProductoModel.cantidad_cuarentena
+    bajo_stock = stock < ProductoModel.stock_minimo
+    condicion = bajo_stock
+    if producto_ids is not None:
+        condicion = and_(condicion, ProductoModel.id.in_(producto_ids))
+
+    mensaje = (
+        literal("El producto '") + ProductoModel.nombre
+        + "' (SKU: " + ProductoModel.sku + ") tiene " + _texto(stock)
+        + " unidades, por debajo del stock minimo de "
+        + _texto(ProductoModel.stock_minimo) + "."
+    )
+    creadas = crud_alerta.upsert_alertas(
+        db,
+        tipo_alerta="stock_minimo",
+        entidad_tipo="producto",
+        entidad_id=ProductoModel.id,
+        mensaje=mensaje,
+        metadata_json=json_objeto(db, {
+            "nombre": ProductoModel.nombre,
+            "sku": ProductoModel.sku,
+            "cantidad_actual": stock,
+            "stock_minimo": ProductoModel.stock_minimo,
+        }),
+        condicion=condicion
+    )
+
+    sigue_bajo_stock = (
+        select(ProductoModel.id)
+        .where(ProductoModel.id == Alerta.entidad_id, bajo_stock)
+        .exists()
+    )
+    desactivadas = crud_alerta.deactivate_alertas_resueltas(
+        db,
+        tipo_alerta="stock_minimo",
+        entidad_tipo="producto",
+        sigue_vigente=sigue_bajo_stock,
+        entidad_ids=producto_ids
+    )
+    return creadas, desactivadas
+
+def _sincronizar_vencidos(
+    db: Session, producto_ids: Optional[Set[int]] = None
+) -> Tuple[int, int]:
+    """
+    Igual que _sincronizar_stock_minimo, para la alerta consolidada "vencido":
+    una por producto con unidades en cuarentena, con el total de unidades y
+    de lotes vencidos (los marca el barrido de vencidos).
+    Devuelve (creadas o actualizadas, desactivadas).
+    """
+    en_cuarentena = ProductoModel.cantidad_cuarentena > 0
+    condicion = en_cuarentena
+    if producto_ids is not None:
+        condicion = and_(condicion, ProductoModel.id.in_(producto_ids))
+    lotes_vencidos = (
+        select(func.count(LoteModel.id))
+        .where(
+            LoteModel.producto_id == ProductoModel.id,
+            LoteModel.esta_vencido == True,
+            LoteModel.cantidad_actual > 0
+        )
+        .scalar_subquery()
+    )
+
+    mensaje = (
+        literal("El producto '") + ProductoModel.nombre
+        + "' (SKU: " + ProductoModel.sku + ") tiene "
+        + _texto(ProductoModel.cantidad_cuarentena) + " unidades en "
+        + _texto(lotes_vencidos) + " lotes vencidos, en cuarentena."
+    )
+    creadas = crud_alerta.upsert_alertas(
+        db,
+        tipo_alerta="vencido",
+        entidad_tipo="producto",
+        entidad_id=ProductoModel.id,
+        mensaje=mensaje,
+        metadata_json=json_objeto(db, {
+            "nombre": ProductoModel.nombre,
+            "sku": ProductoModel.sku,
+            "cantidad_cuarentena": ProductoModel.cantidad_cuarentena,
+            "lotes_vencidos": lotes_vencidos,
+        }),
+        condicion=condicion
+    )
+
+    sigue_en_cuarentena = (
+        select(ProductoModel.id)
+        .where(ProductoModel.id == Alerta.entidad_id, en_cuarentena)
+        .exists()
+    )
+    desactivadas = crud_alerta.deactivate_alertas_resueltas(
+        db,
+        tipo_alerta="vencido",
+        entidad_tipo="producto",
+        sigue_vigente=sigue_en_cuarentena,
+        entidad_ids=producto_ids
+    )
+    return creadas, desactivadas
+
+def tipo_alerta_por_vencer(dias_tramo: int) -> str:
+    """Tipo de alerta del tramo de severidad de `dias_tramo` dias."""
+    return f"{PREFIJO_POR_VENCER}{dias_tramo}"
+
+def _tramo_por_vencer(hoy: date, tramos: List[int]) -> ColumnElement[str]:
+    """
+    CASE que asigna a cada lote el tipo de alerta de su tramo mas estrecho
+    (el menor tramo que incluye su fecha de vencimiento).
+    """
+    return case(
+        *[
+            (LoteModel.fecha_vencimiento <= hoy + timedelta(days=dias), tipo_alerta_por_vencer(dias))
+            for dias in tramos
+        ]
+    )
+
+def _sincronizar_por_vencer(db: Session, lote_ids: Optional[Set[int]] = None) -> Tuple[int, int]:
+    """
+    Igual que _sincronizar_stock_minimo, para las alertas de lotes por vencer.
+    Todos los tramos de ALERT_EXPIRY_TIERS_DAYS se calculan en un solo
+    recorrido de los lotes: cada lote queda en su tramo mas estrecho, con
+    una sola alerta activa. Si un lote cambia de tramo, su alerta del tramo
+    anterior se desactiva.
+    Devuelve (creadas o actualizadas, desactivadas).
+    """
+    today = date.today()
+    tramos = sorted(get_settings().ALERT_EXPIRY_TIERS_DAYS)
+    tramo = _tramo_por_vencer(today, tramos)
+    por_vencer = and_(
+        LoteModel.fecha_vencimiento.isnot(None),
+        LoteModel.cantidad_actual > 0,
+        LoteModel.fecha_vencimiento > today,
+        LoteModel.fecha_vencimiento <= today + timedelta(days=tramos[-1])
+    )
+    condicion = and_(por_vencer, LoteModel.producto_id == ProductoModel.id)
+    if lote_ids is not None:
+        condicion = and_(condicion, LoteModel.id.in_(lote_ids))
+
+    mensaje = (
+        literal("El lote ID ") + _texto(LoteModel.id)
+        + " del producto '" + ProductoModel.nombre + "' (SKU: " + ProductoModel.sku
+        + ") tiene " + _texto(LoteModel.cantidad_actual)
+        + " unidades y vence el " + _texto(LoteModel.fecha_vencimiento) + "."
+    )
+    creadas = crud_alerta.upsert_alertas(
+        db,
+        tipo_alerta=tramo,
+        entidad_tipo="lote",
+        entidad_id=LoteModel.id,
+        mensaje=mensaje,
+        metadata_json=json_objeto(db, {
+            "producto_nombre": ProductoModel.nombre,
+            "producto_sku": ProductoModel.sku,
+            "cantidad_actual": LoteModel.cantidad_actual,
+            "fecha_vencimiento": _texto(LoteModel.fecha_vencimiento),
+        }),
+        condicion=condicion,
+        fecha_vencimiento=LoteModel.fecha_vencimiento
+    )
+
+    # La alerta sigue vigente si el lote sigue por vencer y en el mismo tramo;
+    # tambien cierra las alertas de tramos que ya no estan configurados.
+    sigue_en_tramo = (
+        select(LoteModel.id)
+        .where(LoteModel.id == Alerta.entidad_id, por_vencer, tramo == Alerta.tipo_alerta)
+        .exists()
+    )
+    desactivadas = crud_alerta.deactivate_alertas_resueltas(
+        db,
+        tipo_alerta=Alerta.tipo_alerta.startswith(PREFIJO_POR_VENCER),
+        entidad_tipo="lote",
+        sigue_vigente=sigue_en_tramo,
+        entidad_ids=lote_ids
+    )
+    return creadas, desactivadas
+
+def _avisar_cambios(db: Session, creadas: int, desactivadas: int) -> None:
+    """Avisa a los clientes SSE (al comitear) si cambio alguna alerta."""
+    if creadas or desactivadas:
+        publicar_tras_commit(
+            db, EVENTO_ALERTAS, {"creadas": creadas, "desactivadas": desactivadas}
+        )
 
 def check_stock_minimo(db: Session) -> None:
     """
     Servicio que gestiona las alertas de productos por debajo de su stock minimo.
-    Crea nuevas alertas o desactiva existentes segun sea necesario.
+    Crea nuevas alertas o desactiva existentes segun sea necesario,
+    en una sola transaccion.
     """
     logger.info("Gestionando alertas de stock minimo...")
     try:
-        # 1. Obtener todos los productos que estan actualmente por debajo de su stock minimo
-        productos_bajo_stock_actual = db.scalars(
-            select(ProductoModel)
-            .where(ProductoModel.cantidad_actual < ProductoModel.stock_minimo)
-        ).all()
-        
-        productos_ids_bajo_stock_actual = {p.id for p in productos_bajo_stock_actual}
-
-        # 2. Obtener todas las alertas de stock minimo activas actualmente en la BD
-        alertas_activas_db = db.scalars(
-            select(Alerta)
-            .where(
-                Alerta.tipo_alerta == "stock_minimo",
-                Alerta.entidad_tipo == "producto",
-                Alerta.esta_activa == True
-            )
-        ).all()
-        
-        alertas_activas_por_producto_id = {a.entidad_id: a for a in alertas_activas_db}
-
-        # 3. Crear nuevas alertas para productos que ahora estan bajo stock y no tienen alerta activa
-        for producto in productos_bajo_stock_actual:
-            if producto.id not in alertas_activas_por_producto_id:
-                mensaje = (
-                    f"El producto '{producto.nombre}' (SKU: {producto.sku}) "
-                    f"tiene {producto.cantidad_actual} unidades, por debajo del stock "
-                    f"minimo de {producto.stock_minimo}."
-                )
-                crud_alerta.create_alerta(
-                    db=db,
-                    alerta=AlertaCreate(
-                        tipo_alerta="stock_minimo",
-                        entidad_id=producto.id,
-                        entidad_tipo="producto",
-                        mensaje=mensaje,
-                        metadata_json={
-                            "nombre": producto.nombre,
-                            "sku": producto.sku,
-                            "cantidad_actual": producto.cantidad_actual,
-                            "stock_minimo": producto.stock_minimo,
-                        }
-                    )
-                )
-                logger.warning(f"Nueva alerta de stock minimo creada para Producto ID: {producto.id}")
-
-        # 4. Desactivar alertas para productos que ya NO estan bajo stock
-        for entidad_id, alerta_activa in alertas_activas_por_producto_id.items():
-            if entidad_id not in productos_ids_bajo_stock_actual:
-                crud_alerta.deactivate_alerta(db=db, alerta_id=alerta_activa.id)
-                logger.info(f"Alerta de stock minimo desactivada para Producto ID: {entidad_id}")
+        creadas, desactivadas = _sincronizar_stock_minimo(db)
+        _avisar_cambios(db, creadas, desactivadas)
+        db.commit()
 
         # Invalidar cache de alertas de stock minimo para asegurar que se consulte la BD
         cache.invalidate_pattern(CACHE_KEY_STOCK_MINIMO)
 
-        logger.info("Gestion de alertas de stock minimo finalizada.")
+        logger.info(
+            f"Gestion de alertas de stock minimo finalizada: "
+            f"{creadas} creadas/actualizadas, {desactivadas} desactivadas."
+        )
     except Exception as e:
+        db.rollback()
         logger.error(f"Error al gestionar alertas de stock minimo: {e}", exc_info=True)
-        # No re-raise aquí, ya que esta funcion es llamada por el read service
+        # No re-raise aquí: la tarea periodica lo reintenta en la siguiente vuelta
 
-def check_lotes_por_vencer_and_manage_alerts(db: Session, *, days_threshold: int = 30) -> None:
+def check_lotes_por_vencer_and_manage_alerts(db: Session) -> None:
     """
-    Servicio que gestiona las alertas de lotes proximos a vencer.
-    Crea nuevas alertas o desactiva existentes segun sea necesario.
+    Servicio que gestiona las alertas de lotes proximos a vencer
+    (todos los tramos de severidad). Crea nuevas alertas o desactiva
+    existentes segun sea necesario, en una sola transaccion.
     """
-    logger.info(f"Gestionando alertas de lotes por vencer (umbral: {days_threshold} dias)...")
+    logger.info("Gestionando alertas de lotes por vencer...")
     try:
-        # 1. Obtener todos los lotes que estan actualmente por vencer
-        today = date.today()
-        target_date = today + timedelta(days=days_threshold)
-        
-        lotes_por_vencer_actual = db.scalars(
-            select(LoteModel)
-            .options(joinedload(LoteModel.producto)) # Cargar producto relacionado
-            .where(
-                and_(
-                    LoteModel.fecha_vencimiento.isnot(None),
-                    LoteModel.cantidad_actual > 0,
-                    LoteModel.fecha_vencimiento > today,
-                    LoteModel.fecha_vencimiento <= target_date
-                )
-            )
-        ).all()
-        
-        lotes_ids_por_vencer_actual = {l.id for l in lotes_por_vencer_actual}
-
-        # 2. Obtener todas las alertas de lotes por vencer activas actualmente en la BD
-        alertas_activas_db = db.scalars(
-            select(Alerta)
-            .where(
-                Alerta.tipo_alerta == f"por_vencer_{days_threshold}",
-                Alerta.entidad_tipo == "lote",
-                Alerta.esta_activa == True
-            )
-        ).all()
-        
-        alertas_activas_por_lote_id = {a.entidad_id: a for a in alertas_activas_db}
-
-        # 3. Crear nuevas alertas para lotes que ahora estan por vencer y no tienen alerta activa
-        for lote in lotes_por_vencer_actual:
-            if lote.id not in alertas_activas_por_lote_id:
-                # Asegurarse de que lote.producto no es None antes de acceder a sus atributos
-                producto_nombre = lote.producto.nombre if lote.producto else "Producto Desconocido"
-                producto_sku = lote.producto.sku if lote.producto else "SKU Desconocido"
-
-                mensaje = (
-                    f"El lote ID {lote.id} del producto '{producto_nombre}' (SKU: {producto_sku}) "
-                    f"tiene {lote.cantidad_actual} unidades y vence el {lote.fecha_vencimiento}."
-                )
-                crud_alerta.create_alerta(
-                    db=db,
-                    alerta=AlertaCreate(
-                        tipo_alerta=f"por_vencer_{days_threshold}",
-                        entidad_id=lote.id,
-                        entidad_tipo="lote",
-                        mensaje=mensaje,
-                        metadata_json={
-                            "producto_nombre": producto_nombre,
-                            "producto_sku": producto_sku,
-                            "cantidad_actual": lote.cantidad_actual,
-                            "fecha_vencimiento": str(lote.fecha_vencimiento),
-                        }
-                    )
-                )
-                logger.warning(f"Nueva alerta de lote por vencer creada para Lote ID: {lote.id}")
-
-        # 4. Desactivar alertas para lotes que ya NO estan por vencer
-        for entidad_id, alerta_activa in alertas_activas_por_lote_id.items():
-            if entidad_id not in lotes_ids_por_vencer_actual:
-                crud_alerta.deactivate_alerta(db=db, alerta_id=alerta_activa.id)
-                logger.info(f"Alerta de lote por vencer desactivada para Lote ID: {entidad_id}")
+        creadas, desactivadas = _sincronizar_por_vencer(db)
+        _avisar_cambios(db, creadas, desactivadas)
+        db.commit()
 
         # Invalidar cache de alertas de lotes por vencer para asegurar que se consulte la BD
-        cache.invalidate_pattern(f"{CACHE_KEY_LOTES_VENCIMIENTO}_{days_threshold}")
+        cache.invalidate_pattern(CACHE_KEY_LOTES_VENCIMIENTO)
 
-        logger.info("Gestion de alertas de lotes por vencer finalizada.")
+        logger.info(
+            f"Gestion de alertas de lotes por vencer finalizada: "
+            f"{creadas} creadas/actualizadas, {desactivadas} desactivadas."
+        )
     except Exception as e:
+        db.rollback()
         logger.error(f"Error al gestionar alertas de lotes por vencer: {e}", exc_info=True)
-        # No re-raise aquí, ya que esta funcion es llamada por el read service
+        # No re-raise aquí: la tarea periodica lo reintenta en la siguiente vuelta
+
+def evaluar_alertas_incrementales(
+    db: Session,
+    *,
+    producto_ids: Iterable[int] = (),
+    lote_ids: Iterable[int] = ()
+) -> None:
+    """
+    Reevalua solo las alertas de los productos y lotes indicados (los tocados
+    por un cambio de stock): stock minimo y vencidos para los productos y por vencer
+    (en su tramo de ALERT_EXPIRY_TIERS_DAYS) para los lotes.
+    Trabaja en la transaccion en curso y no comitea; lo invoca el consumidor
+    del outbox. El barrido completo (sincronizar_alertas) sigue disponible
+    para reparar.
+    """
+    producto_ids = set(producto_ids)
+    lote_ids = set(lote_ids)
+    creadas = desactivadas = 0
+    if producto_ids:
+        creadas, desactivadas = _sincronizar_stock_minimo(db, producto_ids)
+        c, d = _sincronizar_vencidos(db, producto_ids)
+        creadas, desactivadas = creadas + c, desactivadas + d
+    if lote_ids:
+        c, d = _sincronizar_por_vencer(db, lote_ids)
+        creadas, desactivadas = creadas + c, desactivadas + d
+    _avisar_cambios(db, creadas, desactivadas)
+    logger.debug(
+        f"Evaluacion incremental de alertas: {len(producto_ids)} productos, "
+        f"{len(lote_ids)} lotes."
+    )
 
-def get_alertas_activas_read(db: Session, tipo_alerta: Optional[str] = None, days_threshold: Optional[int] = None) -> List[Alerta]:
+def sincronizar_alertas(db: Session) -> None:
+    """
+    Recalcula la tabla de alertas (barrido completo): stock minimo, vencidos
+    en cuarentena, lotes por vencer (todos los tramos de ALERT_EXPIRY_TIERS_DAYS)
+    y las reglas de alerta configuradas, todo en una transaccion. La ejecuta
+    la tarea periodica "sincronizar_alertas", no las lecturas.
+    """
+    logger.info("Sincronizando tabla de alertas...")
+    creadas, desactivadas = _sincronizar_stock_minimo(db)
+    for sincronizar in (_sincronizar_vencidos, _sincronizar_por_vencer):
+        c, d = sincronizar(db)
+        creadas, desactivadas = creadas + c, desactivadas + d
+    for resultado in reglas_alertas.evaluar_reglas(db):
+        creadas += resultado.creadas
+        desactivadas += resultado.desactivadas
+    _avisar_cambios(db, creadas, desactivadas)
+    db.commit()
+    cache.invalidate_pattern(CACHE_KEY_STOCK_MINIMO)
+    cache.invalidate_pattern(CACHE_KEY_LOTES_VENCIMIENTO)
+    logger.info(f"Alertas sincronizadas: {creadas} creadas/actualizadas, {desactivadas} desactivadas.")
+
+def evaluar_reglas_alertas(db: Session) -> List[ResultadoRegla]:
+    """
+    Evalua solo las reglas de alerta (sin el resto del barrido) y comitea.
+    Devuelve el resultado y la duracion de cada regla. Las reglas no se
+    evaluan en la evaluacion incremental del outbox: dependen de la demanda
+    y de la fecha, no solo del cambio de stock.
+    """
+    logger.info("Evaluando reglas de alerta...")
+    resultados = reglas_alertas.evaluar_reglas(db)
+    _avisar_cambios(
+        db,
+        sum(r.creadas for r in resultados),
+        sum(r.desactivadas for r in resultados)
+    )
+    db.commit()
+    logger.info(
+        f"Reglas de alerta evaluadas: {len(resultados)} reglas en "
+        f"{sum(r.duracion_ms for r in resultados):.1f} ms."
+    )
+    return resultados
+
+def get_alertas_activas_read(db: Session, tipo_alerta: Optional[str] = None) -> List[Alerta]:
     """
     Servicio de lectura que devuelve todas las alertas activas,
     opcionalmente filtradas por tipo de alerta.
-    Antes de devolver las alertas, se asegura de que la tabla de alertas esté actualizada.
+    Solo lee la tabla (indice (tipo_alerta, esta_activa)); la tabla la
+    mantiene la tarea periodica sincronizar_alertas.
+    """
+    logger.info(f"Solicitud de lectura de alertas activas (tipo: {tipo_alerta})...")
+    return crud_alerta.get_active_alertas(db, tipo_alerta=tipo_alerta)
+
+def get_alertas_por_vencer_read(db: Session, *, dias: int) -> List[Alerta]:
+    """
+    Servicio de lectura de las alertas activas de lotes que vencen dentro
+    de `dias` dias (cualquier valor hasta el mayor tramo): filtra por la
+    fecha de vencimiento guardada en la alerta, sin crear nuevos tipos.
+    """
+    logger.info(f"Solicitud de lectura de alertas de lotes por vencer ({dias} dias)...")
+    return crud_alerta.get_active_alertas_por_vencer(
+        db,
+        prefijo_tipo=PREFIJO_POR_VENCER,
+        hasta=date.today() + timedelta(days=dias)
+    )
+
+def purgar_alertas_inactivas(
+    db: Session,
+    *,
+    dias_retencion: Optional[float] = None,
+    archivar: Optional[bool] = None,
+    tamano_lote: Optional[int] = None,
+    pausa_segundos: Optional[float] = None
+) -> int:
+    """
+    Tarea de mantenimiento: archiva (o borra) las alertas inactivas resueltas
+    hace mas de `dias_retencion` dias. Trabaja por lotes, cada uno en su
+    transaccion corta, con una pausa entre lotes para no retener bloqueos
+    ni saturar la BD. Devuelve el total de alertas purgadas.
     """
-    logger.info("Solicitud de lectura de alertas activas. Actualizando tabla de alertas primero...")
+    settings = get_settings()
+    dias_retencion = settings.ALERT_RETENTION_DAYS if dias_retencion is None else dias_retencion
+    archivar = settings.ALERT_ARCHIVE if archivar is None else archivar
+    tamano_lote = tamano_lote or settings.ALERT_PURGE_BATCH_SIZE
+    pausa_segundos = settings.ALERT_PURGE_SLEEP_SECONDS if pausa_segundos is None else pausa_segundos
+
+    antes_de = datetime.now() - timedelta(days=dias_retencion)
+    total = 0
+    while True:
+        purgadas = crud_alerta.purgar_lote_alertas_inactivas(
+            db, antes_de=antes_de, limite=tamano_lote, archivar=archivar
+        )
+        total += purgadas
+        if purgadas < tamano_lote:
+            break
+        time.sleep(pausa_segundos)
+    if total:
+        accion = "archivadas" if archivar else "borradas"
+        logger.info(f"Purga de alertas: {total} alertas inactivas {accion}.")
+    return total
+
+def get_historial_alertas_read(
+    db: Session,
+    *,
+    entidad_tipo: Optional[str] = None,
+    entidad_id: Optional[int] = None,
+    tipo_alerta: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> List[Dict[str, Any]]:
+    """
+    Servicio de lectura del historial de alertas: las de la tabla viva
+    (activas o no) y las archivadas por la purga de retencion.
+    """
+    logger.info(
+        f"Solicitud de historial de alertas (entidad: {entidad_tipo} {entidad_id}, "
+        f"tipo: {tipo_alerta})..."
+    )
+    return crud_alerta.get_historial_alertas(
+        db,
+        entidad_tipo=entidad_tipo,
+        entidad_id=entidad_id,
+        tipo_alerta=tipo_alerta,
+        skip=skip,
+        limit=limit
+    )
+
+def _codificar_cursor(alerta: Alerta, sincronizado_hasta: datetime) -> str:
+    """
+    Cursor opaco con la clave de orden (fecha_creacion, id) de la ultima
+    alerta y el `sincronizado_hasta` del recorrido.
+    """
+    clave = f"{alerta.fecha_creacion.isoformat()}|{alerta.id}|{sincronizado_hasta.isoformat()}"
+    return base64.urlsafe_b64encode(clave.encode()).decode()
+
+def _decodificar_cursor(cursor: str) -> Tuple[datetime, int, datetime]:
     try:
-        check_stock_minimo(db)
-        # Ejecutar la gestion de lotes por vencer con un umbral por defecto si no se especifica
-        if days_threshold:
-            check_lotes_por_vencer_and_manage_alerts(db, days_threshold=days_threshold)
-        else:
-            # Por ahora, usamos 30 dias como umbral por defecto si no se da ninguno.
-            check_lotes_por_vencer_and_manage_alerts(db, days_threshold=30) 
-
-        return crud_alerta.get_active_alertas(db, tipo_alerta=tipo_alerta)
-    except Exception as e:
-        logger.error(f"Error en get_alertas_activas_read: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Error interno del servidor al obtener alertas.")
\ No newline at end of file
+        fecha, alerta_id, sincronizado_hasta = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(fecha), int(alerta_id), datetime.fromisoformat(sincronizado_hasta)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursorError(cursor)
+
+def listar_alertas(
+    db: Session,
+    *,
+    tipo_alerta: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    incluir_resueltas: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = 100
+) -> PaginaAlertas:
+    """
+    Servicio de lectura del listado de alertas paginado por cursor
+    ((fecha_creacion, id), sin OFFSET): el coste de cada pagina no depende
+    de cuantas paginas se hayan leido antes.
+    Con `desde`, solo las alertas creadas o cambiadas despues de ese instante
+    (sincronizacion incremental); con `incluir_resueltas`, tambien las ya
+    desactivadas, para que el cliente las quite. La siguiente sincronizacion
+    usa como `desde` el `sincronizado_hasta` devuelto: "ahora" menos
+    ALERT_SINCE_LAG_SECONDS, fijado en la primera pagina, porque una
+    transaccion puede comitear una fecha_actualizacion ya pasada.
+    Lanza InvalidCursorError si el cursor no es valido.
+    """
+    logger.info(
+        f"Solicitud de listado de alertas (tipo: {tipo_alerta}, desde: {desde}, "
+        f"cursor: {cursor}, limite: {limit})..."
+    )
+    if desde is not None and desde.tzinfo is not None:
+        # Las fechas de alertas se guardan en hora local sin zona
+        desde = desde.astimezone().replace(tzinfo=None)
+    despues_de = None
+    if cursor:
+        fecha, alerta_id, sincronizado_hasta = _decodificar_cursor(cursor)
+        despues_de = (fecha, alerta_id)
+    else:
+        sincronizado_hasta = datetime.now() - timedelta(seconds=get_settings().ALERT_SINCE_LAG_SECONDS)
+    alertas = crud_alerta.get_alertas_paginadas(
+        db,
+        tipo_alerta=tipo_alerta,
+        desde=desde,
+        incluir_resueltas=incluir_resueltas,
+        despues_de=despues_de,
+        limit=limit + 1
+    )
+    hay_mas = len(alertas) > limit
+    alertas = alertas[:limit]
+    return PaginaAlertas(
+        alertas=[AlertaInDB.model_validate(a) for a in alertas],
+        siguiente_cursor=_codificar_cursor(alertas[-1], sincronizado_hasta) if hay_mas else None,
+        sincronizado_hasta=sincronizado_hasta
+    )
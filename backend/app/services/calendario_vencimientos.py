@@ -0,0 +1,232 @@
+# sistema-inventarios/backend/app/services/calendario_vencimientos.py
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.core.config import get_settings
+from app.crud import crud_eventos_tiempo_real, crud_outbox
+from app.models.lote import Lote as LoteModel
+from app.services.eventos_tiempo_real import EVENTO_STOCK
+from app.schemas.vencimiento import DiaVencimiento
+
+logger = logging.getLogger(__name__)
+
+class LoteEnCalendario(NamedTuple):
+    lote_id: int
+    producto_id: int
+    cantidad: int
+    fecha_vencimiento: date
+
+
+class CalendarioVencimientos:
+    """
+    Indice en memoria de los lotes con stock, agrupados por fecha de vencimiento.
+    "Lo que vence en los proximos N dias" (para cualquier N) y el histograma
+    por dia se responden recorriendo los dias del rango, sin ir a la BD.
+
+    Cada proceso tiene el suyo. Se carga completo desde la BD en cada
+    resincronizacion periodica y se pone al dia lote a lote con los eventos
+    de stock guardados en eventos_tiempo_real (ponerse_al_dia). Su version
+    es el id del ultimo de esos eventos aplicado: como los ids crecen en
+    orden de commit, el calendario esta al dia si su version es la ultima.
+    Si nunca se cargo o la ultima resincronizacion es demasiado vieja (p. ej.
+    sin programador de tareas), `vigente()` es False y los llamadores
+    consultan la BD.
+    """
+
+    def __init__(self, intervalo_resync_segundos: float = 300, max_eventos: int = 1000):
+        self._lock = threading.Lock()
+        self._por_fecha: Dict[date, Dict[int, LoteEnCalendario]] = {}
+        self._fechas: List[date] = [] # Claves de _por_fecha, ordenadas
+        self._fecha_por_lote: Dict[int, date] = {}
+        self._intervalo_resync = intervalo_resync_segundos
+        self._max_eventos = max_eventos
+        self._ultimo_resync: Optional[float] = None
+        self._version: Optional[int] = None
+
+    def vigente(self) -> bool:
+        """True si el calendario esta cargado y resincronizado recientemente."""
+        return (
+            self._ultimo_resync is not None
+            and time.monotonic() - self._ultimo_resync <= 2 * self._intervalo_resync
+        )
+
+    def resincronizar(self, db: Session) -> None:
+        """
+        Reconstruye el calendario con todos los lotes con stock y vencimiento.
+        La version se lee antes que los lotes: la foto incluye al menos los
+        eventos hasta esa version, y los posteriores (aunque ya estuvieran
+        aplicados en el calendario anterior) se vuelven a aplicar al ponerse
+        al dia, asi que reemplazarlo nunca pierde cambios mas nuevos.
+        """
+        version = crud_eventos_tiempo_real.get_ultimo_id(db)
+        lotes = [
+            LoteEnCalendario(*fila)
+            for fila in db.execute(_consulta_lotes())
+        ]
+        por_fecha: Dict[date, Dict[int, LoteEnCalendario]] = defaultdict(dict)
+        for lote in lotes:
+            por_fecha[lote.fecha_vencimiento][lote.lote_id] = lote
+        with self._lock:
+            self._por_fecha = dict(por_fecha)
+            self._fechas = sorted(por_fecha)
+            self._fecha_por_lote = {l.lote_id: l.fecha_vencimiento for l in lotes}
+            self._version = version
+            self._ultimo_resync = time.monotonic()
+        logger.debug(
+            f"Calendario de vencimientos resincronizado: {len(lotes)} lotes "
+            f"en {len(self._fechas)} fechas (version {version})."
+        )
+
+    def ponerse_al_dia(self, db: Session) -> bool:
+        """
+        Relee de la BD los lotes de los eventos de stock guardados despues de
+        su version y los recoloca. Devuelve False si no pudo (sin cargar,
+        eventos ya purgados o demasiados: hace falta resincronizar, o una
+        resincronizacion lo cambio mientras tanto).
+        """
+        with self._lock:
+            desde = self._version
+        if desde is None or desde < crud_eventos_tiempo_real.get_purgado_hasta(db):
+            return False
+        eventos = crud_eventos_tiempo_real.get_eventos_desde(
+            db, ultimo_id=desde, limite=self._max_eventos + 1
+        )
+        if len(eventos) > self._max_eventos:
+            return False
+        if not eventos:
+            return True
+        lote_ids = {
+            lote_id for e in eventos if e.tipo == EVENTO_STOCK for lote_id in e.datos["lote_ids"]
+        }
+        actuales = {
+            fila[0]: LoteEnCalendario(*fila)
+            for fila in db.execute(_consulta_lotes().where(LoteModel.id.in_(lote_ids)))
+        } if lote_ids else {}
+        with self._lock:
+            if self._version != desde:
+                return False
+            for lote_id in lote_ids:
+                self._quitar(lote_id)
+                if lote_id in actuales:
+                    self._agregar(actuales[lote_id])
+            self._version = eventos[-1].id
+        return True
+
+    def _quitar(self, lote_id: int) -> None:
+        fecha = self._fecha_por_lote.pop(lote_id, None)
+        if fecha is None:
+            return
+        lotes = self._por_fecha[fecha]
+        del lotes[lote_id]
+        if not lotes:
+            del self._por_fecha[fecha]
+            del self._fechas[bisect.bisect_left(self._fechas, fecha)]
+
+    def _agregar(self, lote: LoteEnCalendario) -> None:
+        fecha = lote.fecha_vencimiento
+        if fecha not in self._por_fecha:
+            self._por_fecha[fecha] = {}
+            bisect.insort(self._fechas, fecha)
+        self._por_fecha[fecha][lote.lote_id] = lote
+        self._fecha_por_lote[lote.lote_id] = fecha
+
+    def _rango(self, desde: date, hasta: date) -> List[Tuple[date, List[LoteEnCalendario]]]:
+        """Dias con lotes en [desde, hasta], en orden."""
+        with self._lock:
+            inicio = bisect.bisect_left(self._fechas, desde)
+            fin = bisect.bisect_right(self._fechas, hasta)
+            return [
+                (fecha, list(self._por_fecha[fecha].values()))
+                for fecha in self._fechas[inicio:fin]
+            ]
+
+    def por_vencer(
+        self,
+        dias: int,
+        *,
+        hoy: Optional[date] = None,
+        producto_id: Optional[int] = None
+    ) -> List[LoteEnCalendario]:
+        """Lotes con stock que vencen despues de hoy y dentro de `dias` dias."""
+        hoy = hoy or date.today()
+        return [
+            lote
+            for _, lotes in self._rango(hoy + timedelta(days=1), hoy + timedelta(days=dias))
+            for lote in sorted(lotes)
+            if producto_id is None or lote.producto_id == producto_id
+        ]
+
+    def histograma(self, dias: int, *, hoy: Optional[date] = None) -> List[DiaVencimiento]:
+        """Unidades y lotes que vencen cada dia de los proximos `dias` dias."""
+        hoy = hoy or date.today()
+        return [
+            DiaVencimiento(
+                fecha=fecha,
+                cantidad=sum(l.cantidad for l in lotes),
+                lotes=len(lotes)
+            )
+            for fecha, lotes in self._rango(hoy + timedelta(days=1), hoy + timedelta(days=dias))
+        ]
+
+
+def _consulta_lotes():
+    return select(
+        LoteModel.id, LoteModel.producto_id, LoteModel.cantidad_actual, LoteModel.fecha_vencimiento
+    ).where(LoteModel.cantidad_actual > 0, LoteModel.fecha_vencimiento.isnot(None))
+
+
+calendario_vencimientos = CalendarioVencimientos(
+    intervalo_resync_segundos=get_settings().EXPIRY_CALENDAR_RESYNC_SECONDS
+)
+
+def _calendario_al_dia(db: Session) -> bool:
+    """
+    True si el calendario de este proceso refleja todos los cambios de stock
+    comiteados: esta vigente, no quedan eventos del outbox sin procesar (un
+    cambio recien comiteado aun no llego a eventos_tiempo_real) y aplico
+    todos los eventos de stock guardados. Asi quien acaba de escribir lee
+    su propio cambio en cualquier worker.
+    """
+    if not calendario_vencimientos.vigente():
+        return False
+    if crud_outbox.hay_eventos_pendientes(db):
+        return False
+    return calendario_vencimientos.ponerse_al_dia(db)
+
+def lotes_por_vencer(db: Session, *, dias: int, hoy: Optional[date] = None) -> List[LoteEnCalendario]:
+    """
+    Lotes que vencen dentro de `dias` dias: desde el calendario si esta al
+    dia, o con una consulta por rango de fechas si no.
+    """
+    hoy = hoy or date.today()
+    if _calendario_al_dia(db):
+        return calendario_vencimientos.por_vencer(dias, hoy=hoy)
+    logger.debug("Calendario de vencimientos no al dia; consultando la BD.")
+    stmt = _consulta_lotes().where(
+        LoteModel.fecha_vencimiento > hoy,
+        LoteModel.fecha_vencimiento <= hoy + timedelta(days=dias)
+    ).order_by(LoteModel.fecha_vencimiento, LoteModel.id)
+    return [LoteEnCalendario(*fila) for fila in db.execute(stmt)]
+
+def histograma_vencimientos(
+    db: Session, *, dias: int, hoy: Optional[date] = None
+) -> List[DiaVencimiento]:
+    """Histograma diario de vencimientos (calendario o BD, como lotes_por_vencer)."""
+    hoy = hoy or date.today()
+    if _calendario_al_dia(db):
+        return calendario_vencimientos.histograma(dias, hoy=hoy)
+    por_dia: Dict[date, List[int]] = defaultdict(lambda: [0, 0])
+    for lote in lotes_por_vencer(db, dias=dias, hoy=hoy):
+        por_dia[lote.fecha_vencimiento][0] += lote.cantidad
+        por_dia[lote.fecha_vencimiento][1] += 1
+    return [
+        DiaVencimiento(fecha=fecha, cantidad=cantidad, lotes=lotes)
+        for fecha, (cantidad, lotes) in sorted(por_dia.items())
+    ]
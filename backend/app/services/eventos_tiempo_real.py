@@ -0,0 +1,251 @@
+# sistema-inventarios/backend/app/services/eventos_tiempo_real.py
+import asyncio
+import json
+import logging
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from app.core.config import get_settings
+from app.crud import crud_eventos_tiempo_real
+
+logger = logging.getLogger(__name__)
+
+# Tipos de evento que se envian a los clientes
+EVENTO_STOCK = "stock"
+EVENTO_ALERTAS = "alertas"
+# Se envia al reanudar si los eventos pedidos ya no se pueden reenviar
+# (se purgaron o el id no es de esta base de datos): el cliente debe recargar todo.
+EVENTO_REINICIO = "reinicio"
+
+# Clave de Session.info donde se acumulan los eventos hasta el commit
+_CLAVE_PENDIENTES = "eventos_tiempo_real"
+
+
+class EventoTiempoReal(NamedTuple):
+    id: int
+    tipo: str
+    datos: Dict[str, Any]
+
+    def formatear_sse(self) -> str:
+        """Texto del evento en formato Server-Sent Events."""
+        return f"id: {self.id}\nevent: {self.tipo}\ndata: {json.dumps(self.datos, default=str)}\n\n"
+
+
+class DifusorEventos:
+    """
+    Reparte a los clientes SSE de este proceso los eventos de stock y alertas.
+
+    Los eventos no viven en memoria: publicar_tras_commit() los guarda en la
+    tabla eventos_tiempo_real al comitear, en el proceso que sea (API,
+    programador o consumidor del outbox). Cada worker de la API lee los
+    nuevos por id con sondear() (tarea de proceso) y los encola a sus
+    suscriptores con call_soon_threadsafe. Como los ids son globales, un
+    cliente que se reconecta con Last-Event-ID a cualquier worker recibe lo
+    que se perdio, leido de la tabla.
+    """
+
+    def __init__(
+        self,
+        tamano_cola: int = 100,
+        max_reenviados: int = 1000,
+        session_factory: Optional[Callable[[], Session]] = None
+    ):
+        self._lock = threading.Lock()
+        self._ultimo_id: Optional[int] = None # Ultimo evento leido de la tabla
+        self._tamano_cola = tamano_cola
+        self._max_reenviados = max_reenviados
+        self._session_factory = session_factory
+        self._suscriptores: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def iniciar(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Asocia el difusor al event loop de la API (al arrancar)."""
+        self._loop = loop
+
+    def detener(self) -> None:
+        """Cierra los streams abiertos (al apagar la API). Se llama desde el loop."""
+        for cola in list(self._suscriptores):
+            self._cerrar(cola)
+        self._loop = None
+
+    @property
+    def ultimo_id(self) -> int:
+        return self._ultimo_id or 0
+
+    def _sesion(self) -> Session:
+        if self._session_factory is None:
+            from app.db.session import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def _fijar_inicio(self, db: Session) -> int:
+        """
+        La primera lectura arranca en el ultimo evento guardado: lo anterior
+        solo se reenvia a quien lo pide con Last-Event-ID.
+        """
+        ultimo_id = crud_eventos_tiempo_real.get_ultimo_id(db)
+        with self._lock:
+            if self._ultimo_id is None:
+                self._ultimo_id = ultimo_id
+            return self._ultimo_id
+
+    def sondear(self, db: Session) -> int:
+        """
+        Lee de la tabla los eventos posteriores al ultimo leido y los reparte
+        a los suscriptores. Tarea de proceso (cada SSE_POLL_INTERVAL_SECONDS),
+        en un hilo. Devuelve el numero de eventos leidos.
+        """
+        if self._ultimo_id is None:
+            self._fijar_inicio(db)
+            return 0
+        total = 0
+        while True:
+            filas = crud_eventos_tiempo_real.get_eventos_desde(
+                db, ultimo_id=self._ultimo_id, limite=self._max_reenviados
+            )
+            db.rollback()
+            for fila in filas:
+                evento = EventoTiempoReal(fila.id, fila.tipo, fila.datos)
+                with self._lock:
+                    self._ultimo_id = evento.id
+                    loop = self._loop
+                if loop is not None and not loop.is_closed():
+                    try:
+                        loop.call_soon_threadsafe(self._repartir, evento)
+                    except RuntimeError:
+                        # El loop se cerro entre la comprobacion y la llamada (apagado)
+                        pass
+            total += len(filas)
+            if len(filas) < self._max_reenviados:
+                return total
+
+    def _repartir(self, evento: EventoTiempoReal) -> None:
+        """Encola el evento a cada suscriptor (en el hilo del loop)."""
+        for cola in list(self._suscriptores):
+            try:
+                cola.put_nowait(evento)
+            except asyncio.QueueFull:
+                # Cliente demasiado lento: se cierra su stream; al reconectar
+                # con Last-Event-ID recupera lo pendiente desde la tabla.
+                logger.warning("Suscriptor SSE lento; se cierra su stream.")
+                self._cerrar(cola)
+
+    def _cerrar(self, cola: asyncio.Queue) -> None:
+        self._suscriptores.discard(cola)
+        while not cola.empty():
+            cola.get_nowait()
+        cola.put_nowait(None)
+
+    def _leer_perdidos(
+        self, ultimo_id: Optional[int], hasta_id: Optional[int]
+    ) -> Tuple[int, Optional[List[EventoTiempoReal]]]:
+        """
+        Devuelve (hasta_id, eventos guardados con id en (`ultimo_id`, `hasta_id`]).
+        Los eventos son None si ya no se pueden reenviar (purgados, demasiados
+        o el id no es de esta base de datos). Si `hasta_id` es None, antes se
+        fija el inicio del difusor.
+        """
+        db = self._sesion()
+        try:
+            if hasta_id is None:
+                hasta_id = self._fijar_inicio(db)
+            if ultimo_id is None:
+                return hasta_id, []
+            if ultimo_id < crud_eventos_tiempo_real.get_purgado_hasta(db):
+                return hasta_id, None
+            if ultimo_id > crud_eventos_tiempo_real.get_ultimo_id(db):
+                return hasta_id, None
+            filas = crud_eventos_tiempo_real.get_eventos_desde(
+                db, ultimo_id=ultimo_id, hasta_id=hasta_id, limite=self._max_reenviados + 1
+            )
+            if len(filas) > self._max_reenviados:
+                return hasta_id, None
+            return hasta_id, [EventoTiempoReal(f.id, f.tipo, f.datos) for f in filas]
+        finally:
+            db.close()
+
+    async def suscribir(
+        self,
+        *,
+        ultimo_id: Optional[int] = None,
+        keepalive_segundos: float = 15
+    ) -> AsyncIterator[Optional[EventoTiempoReal]]:
+        """
+        Genera los eventos para un suscriptor: primero los perdidos desde
+        `ultimo_id` (si se indica, leidos de la tabla) y luego los nuevos.
+        Produce None cada `keepalive_segundos` sin eventos, para mantener
+        viva la conexion.
+        """
+        cola: asyncio.Queue = asyncio.Queue(maxsize=self._tamano_cola)
+        with self._lock:
+            self._suscriptores.add(cola)
+            inicio = self._ultimo_id
+        try:
+            if ultimo_id is not None or inicio is None:
+                inicio, perdidos = await asyncio.to_thread(self._leer_perdidos, ultimo_id, inicio)
+                if perdidos is None:
+                    yield EventoTiempoReal(inicio, EVENTO_REINICIO, {})
+                    ultimo_id = None
+                    perdidos = []
+                for evento in perdidos:
+                    yield evento
+            # Lo repartido hasta registrar la cola ya salio en `perdidos`; si el
+            # cliente viene de un worker mas adelantado, lo ya visto se salta
+            ultimo_enviado = max(inicio, ultimo_id or 0)
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), timeout=keepalive_segundos)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if evento is None:
+                    return
+                if evento.id > ultimo_enviado:
+                    ultimo_enviado = evento.id
+                    yield evento
+        finally:
+            self._suscriptores.discard(cola)
+
+
+difusor_eventos = DifusorEventos(
+    tamano_cola=get_settings().SSE_SUBSCRIBER_QUEUE_SIZE,
+    max_reenviados=get_settings().SSE_RESUME_MAX_EVENTS
+)
+
+
+def publicar_tras_commit(db: Session, tipo: str, datos: Dict[str, Any]) -> None:
+    """
+    Guarda el evento para los clientes SSE cuando la transaccion de `db` se
+    confirme; si se hace rollback se descarta. Evita avisar de cambios que
+    no ocurrieron.
+    """
+    db.info.setdefault(_CLAVE_PENDIENTES, []).append((tipo, datos))
+
+def marca_pendientes(db: Session) -> int:
+    """Cuantos eventos esperan el commit de la sesion (ver descartar_pendientes_desde)."""
+    return len(db.info.get(_CLAVE_PENDIENTES, []))
+
+def descartar_pendientes_desde(db: Session, marca: int) -> None:
+    """Descarta los eventos en espera agregados tras `marca` (su savepoint se deshizo)."""
+    del db.info.get(_CLAVE_PENDIENTES, [])[marca:]
+
+def purgar_eventos(db: Session) -> int:
+    """Tarea de mantenimiento: borra los eventos mas antiguos que SSE_RETENTION_SECONDS."""
+    return crud_eventos_tiempo_real.purgar_eventos(
+        db, antiguedad_segundos=get_settings().SSE_RETENTION_SECONDS
+    )
+
+@event.listens_for(Session, "before_commit")
+def _guardar_pendientes(session: Session) -> None:
+    # Al liberar un savepoint tambien se llama: se espera al commit real
+    if session.in_nested_transaction():
+        return
+    pendientes = session.info.pop(_CLAVE_PENDIENTES, None)
+    if pendientes:
+        crud_eventos_tiempo_real.registrar_eventos(session, pendientes)
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendientes(session: Session) -> None:
+    session.info.pop(_CLAVE_PENDIENTES, None)
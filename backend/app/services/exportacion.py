@@ -0,0 +1,175 @@
+# sistema-inventarios/backend/app/services/exportacion.py
+import csv
+import io
+import json
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple, Union
+
+from app.core.exceptions import ExportFormatUnavailableError
+
+FORMATOS_EXPORTACION = ("csv", "ndjson", "parquet", "arrow")
+# Formatos binarios por columnas: requieren la dependencia opcional pyarrow
+FORMATOS_COLUMNARES = ("parquet", "arrow")
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Columna exportada: (nombre, tipo) con tipo "int", "float", "str", "date" o "datetime"
+Columna = Tuple[str, str]
+
+def _valor(valor: Any) -> Any:
+    """Fechas en ISO 8601; el resto tal cual."""
+    return valor.isoformat() if hasattr(valor, "isoformat") else valor
+
+def _bloques(filas: Iterable[Sequence[Any]], filas_por_bloque: int) -> Iterator[list]:
+    filas = iter(filas)
+    while bloque := list(islice(filas, filas_por_bloque)):
+        yield bloque
+
+def generar_csv(
+    columnas: Sequence[str],
+    filas: Iterable[Sequence[Any]],
+    *,
+    filas_por_bloque: int = 1000
+) -> Iterator[str]:
+    """
+    Codifica las filas como CSV, por bloques de `filas_por_bloque` filas.
+    La cabecera sale sola al principio, antes de leer la primera fila.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(columnas)
+    yield buffer.getvalue()
+    for bloque in _bloques(filas, filas_por_bloque):
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows([_valor(v) for v in fila] for fila in bloque)
+        yield buffer.getvalue()
+
+def generar_ndjson(
+    columnas: Sequence[str],
+    filas: Iterable[Sequence[Any]],
+    *,
+    filas_por_bloque: int = 1000
+) -> Iterator[str]:
+    """Codifica las filas como NDJSON (un objeto por linea), por bloques."""
+    for bloque in _bloques(filas, filas_por_bloque):
+        yield "".join(
+            json.dumps({c: _valor(v) for c, v in zip(columnas, fila)}) + "\n" for fila in bloque
+        )
+
+def _importar_pyarrow(formato: str):
+    """Importa pyarrow (dependencia opcional) o lanza ExportFormatUnavailableError."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportFormatUnavailableError(formato, "pyarrow")
+    return pyarrow
+
+
+class _SalidaEnMemoria:
+    """
+    Destino de escritura para pyarrow que acumula los bytes escritos
+    hasta que se recogen con vaciar(), para enviarlos por partes.
+    """
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicion = 0
+        self.closed = False
+
+    def write(self, datos) -> int:
+        datos = bytes(datos)
+        self._partes.append(datos)
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def generar_columnar(
+    formato: str,
+    columnas: Sequence[Columna],
+    filas: Iterable[Sequence[Any]],
+    *,
+    filas_por_bloque: int = 1000
+) -> Iterator[bytes]:
+    """
+    Codifica las filas como Parquet (un row group por bloque) o como stream
+    Arrow IPC (un record batch por bloque). Cada bloque de filas se pasa a
+    columnas y se envia en cuanto se escribe; la memoria no depende del total.
+    Lanza ExportFormatUnavailableError (al llamarla, antes de empezar a
+    enviar) si pyarrow no esta instalado.
+    """
+    pa = _importar_pyarrow(formato)
+    tipos = {
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "str": pa.string(),
+        "date": pa.date32(),
+        "datetime": pa.timestamp("us", tz="UTC"),
+    }
+    esquema = pa.schema([(nombre, tipos[tipo]) for nombre, tipo in columnas])
+    salida = _SalidaEnMemoria()
+    if formato == "parquet":
+        escritor = pa.parquet.ParquetWriter(salida, esquema)
+    else:
+        escritor = pa.ipc.new_stream(salida, esquema)
+
+    def generar() -> Iterator[bytes]:
+        cerrado = False
+        try:
+            for bloque in _bloques(filas, filas_por_bloque):
+                valores_por_columna = list(zip(*bloque))
+                escritor.write_batch(pa.RecordBatch.from_arrays(
+                    [
+                        pa.array(valores, type=campo.type)
+                        for valores, campo in zip(valores_por_columna, esquema)
+                    ],
+                    schema=esquema
+                ))
+                datos = salida.vaciar()
+                if datos:
+                    yield datos
+            escritor.close()
+            cerrado = True
+            yield salida.vaciar()
+        finally:
+            if not cerrado:
+                escritor.close()
+
+    return generar()
+
+def generar(
+    formato: str,
+    columnas: Sequence[Columna],
+    filas: Iterable[Sequence[Any]],
+    **kwargs
+) -> Iterator[Union[str, bytes]]:
+    """Codifica las filas en el formato de exportacion indicado."""
+    if formato in FORMATOS_COLUMNARES:
+        return generar_columnar(formato, columnas, filas, **kwargs)
+    nombres = [nombre for nombre, _ in columnas]
+    if formato == "csv":
+        return generar_csv(nombres, filas, **kwargs)
+    if formato == "ndjson":
+        return generar_ndjson(nombres, filas, **kwargs)
+    raise ValueError(f"Formato de exportacion no soportado: {formato}")
@@ -0,0 +1,228 @@
+# sistema-inventarios/backend/app/services/group_commit.py
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FuturoTimeoutError
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+
+import app.crud.crud_inventory as crud_inventory
+from app.core.config import get_settings
+from app.core.exceptions import (
+    InsufficientStockError, IdempotencyKeyInProgressError, GroupCommitTimeoutError
+)
+from app.models.movimiento import Movimiento
+from app.schemas.inventory import InventoryExitRequest
+from app.schemas.movimiento import Movimiento as MovimientoSchema
+
+logger = logging.getLogger(__name__)
+
+# Callback que escribe datos ligados a la salida (p. ej. la respuesta
+# idempotente) en la misma transaccion, antes del commit
+AlAplicar = Callable[[Session, Movimiento], None]
+PeticionSalida = Tuple[InventoryExitRequest, Optional[AlAplicar], Future]
+
+class ColaSalidasAgrupadas:
+    """
+    Cola en proceso que agrupa salidas concurrentes ("group commit").
+    Un hilo de fondo toma las peticiones acumuladas durante una ventana
+    de pocos milisegundos y las aplica en una sola transaccion, de modo
+    que N salidas cuestan un solo commit (y un solo fsync).
+    Cada llamador recibe su propio resultado o su propio InsufficientStockError.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        ventana_ms: float = 5,
+        max_lote: int = 200
+    ):
+        self._session_factory = session_factory
+        self._ventana = ventana_ms / 1000
+        self._max_lote = max_lote
+        self._cola: "queue.Queue[PeticionSalida]" = queue.Queue()
+        self._hilo: Optional[threading.Thread] = None
+        self._hilo_lock = threading.Lock()
+        self._activa = threading.Event()
+
+    def iniciar(self) -> None:
+        """Arranca el hilo de fondo que procesa los lotes de salidas."""
+        with self._hilo_lock:
+            if self._hilo and self._hilo.is_alive():
+                return
+            self._activa.set()
+            self._hilo = threading.Thread(
+                target=self._bucle, name="cola-salidas-agrupadas", daemon=True
+            )
+            self._hilo.start()
+        logger.info(
+            f"Cola de salidas agrupadas iniciada (ventana: {self._ventana * 1000} ms, "
+            f"max_lote: {self._max_lote})"
+        )
+
+    def _vigilar_hilo(self) -> None:
+        """Si la cola esta activa pero su hilo murio, lo registra y lo reinicia."""
+        if self._activa.is_set() and not (self._hilo and self._hilo.is_alive()):
+            logger.error("El hilo de la cola de salidas agrupadas no esta vivo; se reinicia.")
+            self.iniciar()
+
+    def detener(self) -> None:
+        """Detiene el hilo de fondo tras procesar lo que quede en la cola."""
+        self._activa.clear()
+        if self._hilo:
+            self._hilo.join()
+            self._hilo = None
+        logger.info("Cola de salidas agrupadas detenida.")
+
+    def registrar(
+        self,
+        exit_in: InventoryExitRequest,
+        timeout: Optional[float] = None,
+        al_aplicar: Optional[AlAplicar] = None
+    ) -> Optional[MovimientoSchema]:
+        """
+        Encola una salida y espera su resultado como mucho `timeout` segundos.
+        `al_aplicar` se llama con la sesion y el movimiento antes del commit
+        que confirma la salida; si falla, la salida no se aplica.
+        Devuelve None si el lote no existe (igual que crud_inventory.register_exit).
+
+        Lanza GroupCommitTimeoutError si vence la espera. Si la salida aun no
+        se habia tomado, se cancela; si ya estaba en curso puede confirmarse
+        despues (con Idempotency-Key, al_aplicar no encuentra la reserva
+        liberada y la salida se deshace).
+        """
+        self._vigilar_hilo()
+        futuro: Future = Future()
+        self._cola.put((exit_in, al_aplicar, futuro))
+        try:
+            return futuro.result(timeout=timeout)
+        except FuturoTimeoutError:
+            cancelada = futuro.cancel()
+            logger.error(
+                f"Salida agrupada sin respuesta tras {timeout} s "
+                f"({'cancelada' if cancelada else 'en curso'}): {exit_in}"
+            )
+            self._vigilar_hilo()
+            raise GroupCommitTimeoutError(timeout=timeout)
+
+    def _bucle(self) -> None:
+        while self._activa.is_set() or not self._cola.empty():
+            try:
+                primera = self._cola.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            lote = [primera]
+            limite = time.monotonic() + self._ventana
+            while len(lote) < self._max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            # Las peticiones canceladas por timeout ya no se aplican
+            lote = [peticion for peticion in lote if peticion[2].set_running_or_notify_cancel()]
+            if not lote:
+                continue
+            try:
+                self._procesar_lote(lote)
+            except Exception as e:
+                # Un error que escapa del lote no debe matar el hilo de la cola
+                logger.error(f"Error inesperado en la cola de salidas agrupadas: {e}", exc_info=True)
+                for _, _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+
+    def _procesar_lote(self, lote: List[PeticionSalida]) -> None:
+        """
+        Aplica todas las salidas del lote en una transaccion.
+        Cada salida (con su al_aplicar) va en un savepoint, asi que un
+        InsufficientStockError o una reserva de idempotencia perdida solo
+        afecta a su peticion. Ante un error inesperado, el lote se
+        reintenta peticion por peticion para aislar al culpable.
+        """
+        logger.debug(f"Procesando lote de {len(lote)} salidas agrupadas.")
+        db = self._session_factory()
+        resultados = []
+        try:
+            for exit_in, al_aplicar, futuro in lote:
+                try:
+                    with db.begin_nested():
+                        db_movimiento = self._aplicar(db, exit_in, al_aplicar)
+                    resultados.append((futuro, db_movimiento))
+                except (InsufficientStockError, IdempotencyKeyInProgressError) as e:
+                    futuro.set_exception(e)
+            db.commit()
+            for futuro, db_movimiento in resultados:
+                futuro.set_result(
+                    MovimientoSchema.model_validate(db_movimiento) if db_movimiento else None
+                )
+        except Exception as e:
+            db.rollback()
+            logger.error(
+                f"Error en lote de salidas agrupadas, reintentando individualmente: {e}",
+                exc_info=True
+            )
+            pendientes = [peticion for peticion in lote if not peticion[2].done()]
+            self._procesar_individualmente(pendientes)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _aplicar(
+        db: Session, exit_in: InventoryExitRequest, al_aplicar: Optional[AlAplicar]
+    ) -> Optional[Movimiento]:
+        db_movimiento = crud_inventory.apply_exit(db, exit_in=exit_in)
+        if db_movimiento is not None and al_aplicar is not None:
+            al_aplicar(db, db_movimiento)
+        return db_movimiento
+
+    def _procesar_individualmente(self, lote: List[PeticionSalida]) -> None:
+        for exit_in, al_aplicar, futuro in lote:
+            db = self._session_factory()
+            try:
+                db_movimiento = self._aplicar(db, exit_in, al_aplicar)
+                db.commit()
+                futuro.set_result(
+                    MovimientoSchema.model_validate(db_movimiento) if db_movimiento else None
+                )
+            except Exception as e:
+                db.rollback()
+                futuro.set_exception(e)
+            finally:
+                db.close()
+
+
+_cola_salidas: Optional[ColaSalidasAgrupadas] = None
+_cola_lock = threading.Lock()
+
+def obtener_cola_salidas() -> ColaSalidasAgrupadas:
+    """
+    Devuelve la cola de salidas agrupadas del proceso, creandola
+    e iniciandola la primera vez segun la configuracion.
+    """
+    global _cola_salidas
+    with _cola_lock:
+        if _cola_salidas is None:
+            from app.db.session import SessionLocal
+            settings = get_settings()
+            _cola_salidas = ColaSalidasAgrupadas(
+                SessionLocal,
+                ventana_ms=settings.GROUP_COMMIT_WINDOW_MS,
+                max_lote=settings.GROUP_COMMIT_MAX_BATCH
+            )
+            _cola_salidas.iniciar()
+        return _cola_salidas
+
+def detener_cola_salidas() -> None:
+    """Detiene la cola de salidas del proceso si fue creada."""
+    global _cola_salidas
+    with _cola_lock:
+        if _cola_salidas is not None:
+            _cola_salidas.detener()
+            _cola_salidas = None
@@ -0,0 +1,131 @@
+# sistema-inventarios/backend/app/services/idempotency.py
+import hashlib
+import json
+import logging
+from datetime import datetime
+from sqlalchemy.orm import Session
+from typing import Optional, Dict, Any
+from pydantic import BaseModel
+
+from app.crud import crud_idempotencia
+from app.core.cache import cache
+from app.core.config import get_settings
+from app.core.exceptions import IdempotencyKeyConflictError, IdempotencyKeyInProgressError
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_IDEMPOTENCIA = "idempotencia"
+
+def _cache_key(endpoint: str, clave: str) -> str:
+    return f"{CACHE_KEY_IDEMPOTENCIA}_{endpoint}_{clave}"
+
+def calcular_hash_peticion(peticion: BaseModel) -> str:
+    """
+    Calcula una huella estable del cuerpo de la peticion para detectar
+    reutilizaciones de la misma clave con datos distintos.
+    """
+    contenido = json.dumps(peticion.model_dump(mode="json"), sort_keys=True)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+def _guardada_o_error(guardada: Dict[str, Any], *, endpoint: str, clave: str, hash_peticion: str) -> Dict[str, Any]:
+    if guardada["hash_peticion"] != hash_peticion:
+        logger.warning(f"Clave de idempotencia reutilizada con otro cuerpo: {endpoint}/{clave}")
+        raise IdempotencyKeyConflictError(clave=clave, endpoint=endpoint)
+    if guardada["codigo_estado"] is None:
+        logger.warning(f"Clave de idempotencia en curso: {endpoint}/{clave}")
+        raise IdempotencyKeyInProgressError(clave=clave, endpoint=endpoint)
+    logger.info(f"Repeticion idempotente detectada para {endpoint}/{clave}")
+    return guardada
+
+# Clave de Session.info con las reservas hechas por la peticion: {(endpoint, clave): fecha}
+_CLAVE_RESERVAS = "claves_idempotencia_reservadas"
+
+def reservar_o_repetir(
+    db: Session,
+    *,
+    endpoint: str,
+    clave: str,
+    peticion: BaseModel
+) -> Optional[Dict[str, Any]]:
+    """
+    Reserva (endpoint, clave) antes de ejecutar la operacion y devuelve None;
+    si la clave ya existia, devuelve la respuesta guardada sin ejecutar nada.
+    Primero consulta el cache en memoria (solo guarda respuestas comiteadas).
+
+    Lanza IdempotencyKeyConflictError si la clave se uso con otro cuerpo e
+    IdempotencyKeyInProgressError si otra peticion con la clave aun no termino.
+    """
+    hash_peticion = calcular_hash_peticion(peticion)
+    guardada = cache.get(_cache_key(endpoint, clave))
+    if guardada is not None:
+        return _guardada_o_error(guardada, endpoint=endpoint, clave=clave, hash_peticion=hash_peticion)
+
+    reservada_en = crud_idempotencia.reservar_clave(
+        db,
+        endpoint=endpoint,
+        clave=clave,
+        hash_peticion=hash_peticion,
+        ttl_seconds=get_settings().IDEMPOTENCY_PENDING_TTL_SECONDS
+    )
+    if reservada_en is not None:
+        db.info.setdefault(_CLAVE_RESERVAS, {})[(endpoint, clave)] = reservada_en
+        return None
+
+    db_clave = crud_idempotencia.get_clave_vigente(db, endpoint=endpoint, clave=clave)
+    if db_clave is None:
+        # Expiro o se libero entre el INSERT y la lectura: se reintenta la reserva
+        return reservar_o_repetir(db, endpoint=endpoint, clave=clave, peticion=peticion)
+    guardada = {
+        "hash_peticion": db_clave.hash_peticion,
+        "codigo_estado": db_clave.codigo_estado,
+        "respuesta": db_clave.respuesta_json,
+    }
+    if db_clave.codigo_estado is not None:
+        # La respuesta ya esta comiteada: se cachea hasta que expire la clave
+        vigencia = int((db_clave.fecha_expiracion - datetime.now()).total_seconds())
+        if vigencia > 0:
+            cache.set(_cache_key(endpoint, clave), guardada, ttl_seconds=vigencia)
+    return _guardada_o_error(guardada, endpoint=endpoint, clave=clave, hash_peticion=hash_peticion)
+
+def guardar_respuesta(
+    db: Session,
+    *,
+    endpoint: str,
+    clave: str,
+    codigo_estado: int,
+    respuesta: Dict[str, Any],
+    db_operacion: Optional[Session] = None
+) -> None:
+    """
+    Guarda el resultado de una peticion idempotente (clave reservada con
+    reservar_o_repetir en `db`) sin comitear: se escribe en la transaccion
+    de la operacion (`db_operacion`, por defecto `db`) y se confirma con
+    ella. Si la operacion se deshace, la clave sigue pendiente y
+    liberar_clave la borra.
+
+    Lanza IdempotencyKeyInProgressError si la reserva vencio y otro
+    reintento la tomo: la operacion no se debe confirmar.
+    """
+    reservada_en = db.info.get(_CLAVE_RESERVAS, {}).get((endpoint, clave))
+    if reservada_en is None or not crud_idempotencia.completar_clave(
+        db_operacion or db,
+        endpoint=endpoint,
+        clave=clave,
+        reservada_en=reservada_en,
+        codigo_estado=codigo_estado,
+        respuesta=respuesta,
+        ttl_seconds=get_settings().IDEMPOTENCY_TTL_SECONDS
+    ):
+        logger.warning(f"Reserva de idempotencia perdida antes de guardar la respuesta: {endpoint}/{clave}")
+        raise IdempotencyKeyInProgressError(clave=clave, endpoint=endpoint)
+
+def liberar_clave(db: Session, *, endpoint: str, clave: str) -> None:
+    """
+    Libera la clave de una operacion que fallo: deshace la transaccion en
+    curso y borra la reserva de esta peticion para que el reintento la ejecute.
+    """
+    reservada_en = db.info.get(_CLAVE_RESERVAS, {}).pop((endpoint, clave), None)
+    if reservada_en is None:
+        db.rollback()
+        return
+    crud_idempotencia.liberar_clave(db, endpoint=endpoint, clave=clave, reservada_en=reservada_en)
@@ -0,0 +1,268 @@
+# sistema-inventarios/backend/app/services/importacion.py
+import csv
+import io
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import islice
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, text, bindparam
+from pydantic import ValidationError
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from app.core.config import get_settings
+from app.db.dialects import dialect_name
+from app.models.producto import Producto as ProductoModel
+from app.models.lote import Lote as LoteModel
+from app.models.movimiento import Movimiento as MovimientoModel
+from app.models.evento_outbox import EventoOutbox
+from app.schemas.lote import LoteCreate
+from app.schemas.importacion import ResumenImportacion, ErrorImportacion
+
+logger = logging.getLogger(__name__)
+
+FORMATOS_IMPORTACION = ("csv", "ndjson")
+
+FilaLeida = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+def leer_filas(archivo: TextIO, formato: str) -> Iterator[FilaLeida]:
+    """
+    Recorre el archivo fila a fila sin cargarlo completo.
+    Produce (numero_fila, datos, error_de_parseo).
+    """
+    if formato == "csv":
+        for numero, fila in enumerate(csv.DictReader(archivo), start=1):
+            # En CSV una celda vacia significa "sin valor"
+            yield numero, {k: (v if v != "" else None) for k, v in fila.items()}, None
+    elif formato == "ndjson":
+        numero = 0
+        for linea in archivo:
+            if not linea.strip():
+                continue
+            numero += 1
+            try:
+                datos = json.loads(linea)
+            except json.JSONDecodeError as e:
+                yield numero, None, f"JSON invalido: {e}"
+                continue
+            if not isinstance(datos, dict):
+                yield numero, None, "Se esperaba un objeto JSON por linea"
+                continue
+            yield numero, datos, None
+    else:
+        raise ValueError(f"Formato de importacion no soportado: {formato}")
+
+def _insertar_bloque_generico(db: Session, lotes: List[LoteCreate], ahora: datetime) -> List[int]:
+    """
+    Inserta el bloque con executemany (SQLite y otros dialectos).
+    Devuelve los IDs de los lotes en el orden de `lotes`.
+    """
+    lote_ids = db.scalars(
+        insert(LoteModel).returning(LoteModel.id, sort_by_parameter_order=True),
+        [
+            {
+                "producto_id": lote.producto_id,
+                "cantidad_recibida": lote.cantidad_recibida,
+                "cantidad_actual": lote.cantidad_recibida,
+                "fecha_vencimiento": lote.fecha_vencimiento,
+            }
+            for lote in lotes
+        ]
+    ).all()
+    db.execute(
+        insert(MovimientoModel),
+        [
+            {
+                "lote_id": lote_id,
+                "tipo": "entrada",
+                "cantidad": lote.cantidad_recibida,
+                "fecha_movimiento": ahora,
+            }
+            for lote_id, lote in zip(lote_ids, lotes)
+        ]
+    )
+    return lote_ids
+
+# Columnas que escribe el COPY (no pasa por los defaults del ORM: las demas
+# columnas NOT NULL necesitan server_default)
+COLUMNAS_COPY_LOTES = (
+    "id", "producto_id", "cantidad_recibida", "cantidad_actual", "fecha_vencimiento", "esta_vencido"
+)
+COLUMNAS_COPY_MOVIMIENTOS = ("lote_id", "tipo", "cantidad", "fecha_movimiento")
+
+def _insertar_bloque_postgres(db: Session, lotes: List[LoteCreate], ahora: datetime) -> List[int]:
+    """
+    Inserta el bloque con COPY. Los IDs de los lotes se reservan antes con
+    nextval para poder escribir sus movimientos en el mismo COPY.
+    """
+    lote_ids = db.scalars(
+        text("SELECT nextval(pg_get_serial_sequence('lotes', 'id')) FROM generate_series(1, :n)"),
+        {"n": len(lotes)}
+    ).all()
+
+    buffer_lotes = io.StringIO()
+    buffer_movimientos = io.StringIO()
+    escritor_lotes = csv.writer(buffer_lotes)
+    escritor_movimientos = csv.writer(buffer_movimientos)
+    for lote_id, lote in zip(lote_ids, lotes):
+        escritor_lotes.writerow([
+            lote_id,
+            lote.producto_id,
+            lote.cantidad_recibida,
+            lote.cantidad_recibida,
+            lote.fecha_vencimiento.isoformat() if lote.fecha_vencimiento else "",
+            "false",
+        ])
+        escritor_movimientos.writerow([lote_id, "entrada", lote.cantidad_recibida, ahora.isoformat()])
+    buffer_lotes.seek(0)
+    buffer_movimientos.seek(0)
+
+    # La conexion DBAPI es la misma de la sesion, asi que el COPY va en su transaccion
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY lotes ({', '.join(COLUMNAS_COPY_LOTES)}) "
+            "FROM STDIN WITH (FORMAT csv, NULL '')",
+            buffer_lotes
+        )
+        cursor.copy_expert(
+            f"COPY movimientos ({', '.join(COLUMNAS_COPY_MOVIMIENTOS)}) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer_movimientos
+        )
+    finally:
+        cursor.close()
+    return lote_ids
+
+def _importar_bloque(
+    db: Session,
+    bloque: List[FilaLeida],
+    resumen: ResumenImportacion,
+    max_errores: int
+) -> None:
+    """Valida un bloque de filas e inserta las validas en una transaccion."""
+    def registrar_error(fila: int, error: str) -> None:
+        resumen.filas_con_error += 1
+        if len(resumen.errores) < max_errores:
+            resumen.errores.append(ErrorImportacion(fila=fila, error=error))
+        else:
+            resumen.errores_truncados = True
+
+    validos: List[Tuple[int, LoteCreate]] = []
+    for numero, datos, error in bloque:
+        resumen.filas_leidas += 1
+        if error:
+            registrar_error(numero, error)
+            continue
+        try:
+            validos.append((numero, LoteCreate.model_validate(datos)))
+        except ValidationError as e:
+            detalle = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            registrar_error(numero, detalle)
+
+    if not validos:
+        return
+
+    # Una sola consulta por bloque para validar los productos referenciados
+    ids_solicitados = {lote.producto_id for _, lote in validos}
+    ids_existentes = set(db.scalars(
+        select(ProductoModel.id).where(ProductoModel.id.in_(ids_solicitados))
+    ))
+    lotes = []
+    for numero, lote in validos:
+        if lote.producto_id in ids_existentes:
+            lotes.append(lote)
+        else:
+            registrar_error(numero, f"Producto no encontrado: {lote.producto_id}")
+    if not lotes:
+        return
+
+    ahora = datetime.now(timezone.utc)
+    if dialect_name(db) == "postgresql":
+        lote_ids = _insertar_bloque_postgres(db, lotes, ahora)
+    else:
+        lote_ids = _insertar_bloque_generico(db, lotes, ahora)
+
+    # Stock de productos: un UPDATE por producto del bloque, en un executemany
+    cantidades_por_producto = defaultdict(int)
+    lotes_por_producto = defaultdict(list)
+    for lote_id, lote in zip(lote_ids, lotes):
+        cantidades_por_producto[lote.producto_id] += lote.cantidad_recibida
+        lotes_por_producto[lote.producto_id].append(lote_id)
+    tabla = ProductoModel.__table__
+    db.execute(
+        tabla.update()
+        .where(tabla.c.id == bindparam("b_producto_id"))
+        .values(cantidad_actual=tabla.c.cantidad_actual + bindparam("b_cantidad")),
+        [
+            {"b_producto_id": producto_id, "b_cantidad": cantidad}
+            for producto_id, cantidad in cantidades_por_producto.items()
+        ]
+    )
+    # Un evento de outbox por producto del bloque, en la misma transaccion
+    db.execute(
+        insert(EventoOutbox),
+        [
+            {
+                "tipo_evento": "importacion",
+                "producto_id": producto_id,
+                "lote_ids": lotes_por_producto[producto_id],
+                "delta": cantidad,
+            }
+            for producto_id, cantidad in cantidades_por_producto.items()
+        ]
+    )
+    db.commit()
+    resumen.filas_importadas += len(lotes)
+    resumen.bloques_confirmados += 1
+
+def importar_lotes(
+    db: Session,
+    archivo: TextIO,
+    *,
+    formato: str = "csv",
+    tamano_bloque: Optional[int] = None,
+    on_progreso: Optional[Callable[[ResumenImportacion], None]] = None
+) -> ResumenImportacion:
+    """
+    Importa lotes desde un archivo CSV o NDJSON leyendolo en streaming.
+    Cada bloque de filas se valida contra LoteCreate y se inserta con su
+    movimiento de entrada en un commit propio (COPY en PostgreSQL,
+    executemany en otros motores). La memoria usada depende del tamano
+    del bloque, no del tamano del archivo.
+    """
+    settings = get_settings()
+    tamano_bloque = tamano_bloque or settings.IMPORT_BATCH_SIZE
+    resumen = ResumenImportacion()
+    logger.info(f"Iniciando importacion de lotes ({formato}, bloques de {tamano_bloque} filas)...")
+
+    filas = leer_filas(archivo, formato)
+    while True:
+        bloque = list(islice(filas, tamano_bloque))
+        if not bloque:
+            break
+        try:
+            _importar_bloque(db, bloque, resumen, settings.IMPORT_MAX_REPORTED_ERRORS)
+        except Exception:
+            db.rollback()
+            logger.error(
+                f"Error al importar el bloque que empieza en la fila {bloque[0][0]}. "
+                f"Bloques ya confirmados: {resumen.bloques_confirmados}",
+                exc_info=True
+            )
+            raise
+        logger.info(
+            f"Progreso de importacion: {resumen.filas_leidas} filas leidas, "
+            f"{resumen.filas_importadas} importadas, {resumen.filas_con_error} con error."
+        )
+        if on_progreso:
+            on_progreso(resumen)
+
+    logger.info(
+        f"Importacion finalizada: {resumen.filas_importadas} lotes importados, "
+        f"{resumen.filas_con_error} filas con error."
+    )
+    return resumen
@@ -0,0 +1,350 @@
+# sistema-inventarios/backend/app/services/notificaciones.py
+import asyncio
+import json
+import logging
+import smtplib
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+from email.message import EmailMessage
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+from app.core.config import Settings, get_settings
+from app.crud import crud_alerta
+from app.models.alerta import Alerta
+
+logger = logging.getLogger(__name__)
+
+
+class Digesto(NamedTuple):
+    """Resumen de las alertas nuevas de una ventana para un destinatario."""
+    destinatario: str
+    desde: datetime
+    hasta: datetime
+    alertas: List[Dict[str, Any]]
+
+    def asunto(self) -> str:
+        return f"[Inventario] {len(self.alertas)} alertas nuevas"
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            "destinatario": self.destinatario,
+            "desde": self.desde.isoformat(),
+            "hasta": self.hasta.isoformat(),
+            "alertas": self.alertas,
+        }
+
+
+class SumideroNotificaciones:
+    """
+    Canal de entrega de los resumenes. enviar() es bloqueante (se ejecuta
+    en un hilo) y lanza una excepcion si la entrega falla, para reintentar.
+    """
+    nombre = "base"
+
+    def enviar(self, digesto: Digesto) -> None:
+        raise NotImplementedError
+
+
+class SumideroArchivo(SumideroNotificaciones):
+    """Agrega cada resumen como una linea JSON a un archivo."""
+    nombre = "archivo"
+
+    def __init__(self, ruta: str):
+        self._ruta = ruta
+
+    def enviar(self, digesto: Digesto) -> None:
+        with open(self._ruta, "a", encoding="utf-8") as archivo:
+            archivo.write(json.dumps(digesto.como_dict(), ensure_ascii=False) + "\n")
+
+
+class SumideroWebhook(SumideroNotificaciones):
+    """Envia cada resumen por POST (JSON) a un webhook HTTP local."""
+    nombre = "webhook"
+
+    def __init__(self, url: str, timeout_segundos: float = 5):
+        self._url = url
+        self._timeout = timeout_segundos
+
+    def enviar(self, digesto: Digesto) -> None:
+        peticion = urllib.request.Request(
+            self._url,
+            data=json.dumps(digesto.como_dict()).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        # urlopen lanza HTTPError con las respuestas 4xx/5xx
+        with urllib.request.urlopen(peticion, timeout=self._timeout):
+            pass
+
+
+class SumideroSMTP(SumideroNotificaciones):
+    """
+    Envia cada resumen como correo por SMTP sin autenticacion (pensado para
+    un servidor de pruebas local, p. ej. `python -m aiosmtpd -n -l localhost:1025`).
+    """
+    nombre = "smtp"
+
+    def __init__(self, host: str, puerto: int, remitente: str, timeout_segundos: float = 10):
+        self._host = host
+        self._puerto = puerto
+        self._remitente = remitente
+        self._timeout = timeout_segundos
+
+    def enviar(self, digesto: Digesto) -> None:
+        correo = EmailMessage()
+        correo["Subject"] = digesto.asunto()
+        correo["From"] = self._remitente
+        correo["To"] = digesto.destinatario
+        correo.set_content("\n".join(f"- {a['mensaje']}" for a in digesto.alertas))
+        with smtplib.SMTP(self._host, self._puerto, timeout=self._timeout) as servidor:
+            servidor.send_message(correo)
+
+
+def crear_sumideros(settings: Settings) -> List[SumideroNotificaciones]:
+    """Instancia los canales de NOTIFY_SINKS."""
+    fabricas = {
+        "archivo": lambda: SumideroArchivo(settings.NOTIFY_FILE_PATH),
+        "webhook": lambda: SumideroWebhook(
+            settings.NOTIFY_WEBHOOK_URL, settings.NOTIFY_WEBHOOK_TIMEOUT_SECONDS
+        ),
+        "smtp": lambda: SumideroSMTP(
+            settings.NOTIFY_SMTP_HOST, settings.NOTIFY_SMTP_PORT, settings.NOTIFY_SMTP_FROM
+        ),
+    }
+    sumideros = []
+    for nombre in settings.NOTIFY_SINKS:
+        if nombre not in fabricas:
+            logger.warning(f"Canal de notificacion desconocido: '{nombre}' (se ignora).")
+            continue
+        sumideros.append(fabricas[nombre]())
+    return sumideros
+
+
+class DespachadorNotificaciones:
+    """
+    Envia las alertas nuevas como resumenes por ventana de tiempo y destinatario.
+
+    - recoger_alertas_nuevas() (tarea periodica global, en un hilo) reclama
+      en la BD alertas aun no notificadas y las encola; solo reclama tantas
+      como huecos tenga la cola, de modo que si los envios se atrasan las
+      demas esperan en la BD (contrapresion, sin perder ninguna).
+    - Una tarea asyncio consume la cola: junta las alertas de una ventana,
+      las agrupa por destinatario y entrega cada resumen a cada canal en un
+      hilo, con reintentos y espera exponencial. Un solo consumidor: una
+      tormenta de alertas produce pocos resumenes, no un envio por alerta,
+      y nunca ocupa los workers de la API.
+    - Solo tras entregar sus resumenes se marcan las alertas como
+      notificadas. Las que no se entregan (o si el proceso cae) se vuelven a
+      reclamar al vencer el reclamo (`duracion_reclamo_segundos`).
+
+    Corre en el proceso de las tareas globales (un programador por
+    despliegue); el reclamo con SKIP LOCKED evita duplicados aun asi.
+    """
+
+    def __init__(
+        self,
+        *,
+        rutas: Dict[str, List[str]],
+        sumideros: Optional[List[SumideroNotificaciones]] = None,
+        tamano_cola: int = 1000,
+        ventana_segundos: float = 60,
+        max_alertas_digesto: int = 500,
+        max_reintentos: int = 3,
+        espera_reintento_segundos: float = 2,
+        duracion_reclamo_segundos: float = 600,
+        session_factory: Optional[Callable[[], Session]] = None
+    ):
+        self._rutas = rutas
+        self._sumideros: List[SumideroNotificaciones] = list(sumideros or [])
+        self._tamano_cola = tamano_cola
+        self._ventana = ventana_segundos
+        self._max_alertas = max_alertas_digesto
+        self._max_reintentos = max_reintentos
+        self._espera_reintento = espera_reintento_segundos
+        self._duracion_reclamo = duracion_reclamo_segundos
+        self._session_factory = session_factory
+        self._cola: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._consumidor: Optional[asyncio.Task] = None
+        self.estadisticas = {"encoladas": 0, "descartadas": 0, "enviados": 0, "fallidos": 0}
+
+    def agregar_sumidero(self, sumidero: SumideroNotificaciones) -> None:
+        """Agrega un canal de entrega (antes o despues de iniciar)."""
+        self._sumideros.append(sumidero)
+
+    def iniciar(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Crea la cola y lanza el consumidor en el event loop de la API (al arrancar)."""
+        self._loop = loop
+        self._cola = asyncio.Queue(maxsize=self._tamano_cola)
+        self._consumidor = loop.create_task(self._consumir(), name="despachador-notificaciones")
+
+    def detener(self) -> None:
+        """
+        Cancela el consumidor (al apagar). Las alertas no entregadas siguen sin
+        notificar y se reenvian cuando vence su reclamo.
+        """
+        if self._consumidor is not None:
+            self._consumidor.cancel()
+        self._consumidor = None
+        self._loop = None
+
+    def destinatarios(self, tipo_alerta: str) -> List[str]:
+        """Destinatarios cuyas rutas incluyen el tipo de alerta."""
+        return [
+            destinatario
+            for destinatario, prefijos in self._rutas.items()
+            if any(p == "*" or tipo_alerta.startswith(p) for p in prefijos)
+        ]
+
+    def recoger_alertas_nuevas(self, db: Session) -> int:
+        """
+        Tarea periodica: reclama y encola alertas sin notificar, como mucho
+        los huecos libres de la cola. Sin el consumidor iniciado no hace nada.
+        Devuelve el numero de alertas encoladas.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return 0
+        huecos = self._tamano_cola - self._cola.qsize()
+        if huecos <= 0:
+            logger.warning("Cola de notificaciones llena; las alertas nuevas esperan a la siguiente vuelta.")
+            return 0
+
+        alertas = crud_alerta.reclamar_alertas_por_notificar(
+            db, limite=huecos, duracion_segundos=self._duracion_reclamo
+        )
+        lote = [_alerta_como_dict(a) for a in alertas]
+        db.commit()
+        if not lote:
+            return 0
+        try:
+            loop.call_soon_threadsafe(self._encolar, lote)
+        except RuntimeError:
+            # El loop se cerro entre la comprobacion y la llamada (apagado):
+            # las alertas se vuelven a reclamar al vencer el reclamo
+            return 0
+        return len(lote)
+
+    def _encolar(self, lote: List[Dict[str, Any]]) -> None:
+        """Encola las alertas (en el hilo del loop)."""
+        for alerta in lote:
+            try:
+                self._cola.put_nowait(alerta)
+                self.estadisticas["encoladas"] += 1
+            except asyncio.QueueFull:
+                self.estadisticas["descartadas"] += 1
+                logger.warning(
+                    f"Cola de notificaciones llena; la alerta {alerta['id']} "
+                    f"se reenviara al vencer su reclamo."
+                )
+
+    def _marcar_notificadas(self, alerta_ids: Set[int]) -> None:
+        """Marca en la BD las alertas entregadas (en un hilo, con su sesion)."""
+        if self._session_factory is None:
+            from app.db.session import SessionLocal
+            self._session_factory = SessionLocal
+        db = self._session_factory()
+        try:
+            crud_alerta.marcar_alertas_notificadas(db, alerta_ids)
+        finally:
+            db.close()
+
+    def _agrupar(self, alertas: List[Dict[str, Any]], desde: datetime) -> List[Digesto]:
+        """Un resumen por destinatario con sus alertas de la ventana."""
+        por_destinatario: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for alerta in alertas:
+            for destinatario in self.destinatarios(alerta["tipo_alerta"]):
+                por_destinatario[destinatario].append(alerta)
+        hasta = datetime.now()
+        return [
+            Digesto(destinatario, desde, hasta, lista)
+            for destinatario, lista in por_destinatario.items()
+        ]
+
+    async def _consumir(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            alertas = [await self._cola.get()]
+            desde = datetime.now()
+            limite = loop.time() + self._ventana
+            while len(alertas) < self._max_alertas:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    alertas.append(await asyncio.wait_for(self._cola.get(), timeout=restante))
+                except asyncio.TimeoutError:
+                    break
+            # Una alerta queda notificada si todos sus resumenes llegaron a
+            # todos los canales (las que no tienen destinatario, sin mas)
+            entregadas = {a["id"] for a in alertas}
+            for digesto in self._agrupar(alertas, desde):
+                for sumidero in list(self._sumideros):
+                    if not await self._entregar(sumidero, digesto):
+                        entregadas -= {a["id"] for a in digesto.alertas}
+            if entregadas:
+                try:
+                    await asyncio.to_thread(self._marcar_notificadas, entregadas)
+                except Exception as e:
+                    logger.error(
+                        f"No se pudieron marcar {len(entregadas)} alertas como notificadas "
+                        f"(se reenviaran): {e}", exc_info=True
+                    )
+
+    async def _entregar(self, sumidero: SumideroNotificaciones, digesto: Digesto) -> bool:
+        """
+        Entrega un resumen a un canal, con reintentos y espera exponencial.
+        Devuelve False si no se pudo entregar.
+        """
+        for intento in range(self._max_reintentos + 1):
+            try:
+                await asyncio.to_thread(sumidero.enviar, digesto)
+                self.estadisticas["enviados"] += 1
+                logger.info(
+                    f"Resumen de {len(digesto.alertas)} alertas enviado a "
+                    f"{digesto.destinatario} por '{sumidero.nombre}'."
+                )
+                return True
+            except Exception as e:
+                if intento == self._max_reintentos:
+                    self.estadisticas["fallidos"] += 1
+                    logger.error(
+                        f"No se pudo enviar el resumen a {digesto.destinatario} por "
+                        f"'{sumidero.nombre}' tras {intento + 1} intentos: {e}"
+                    )
+                    return False
+                espera = self._espera_reintento * 2 ** intento
+                logger.warning(
+                    f"Fallo el envio por '{sumidero.nombre}' ({e}); reintento en {espera}s."
+                )
+                await asyncio.sleep(espera)
+
+
+def _alerta_como_dict(alerta: Alerta) -> Dict[str, Any]:
+    return {
+        "id": alerta.id,
+        "tipo_alerta": alerta.tipo_alerta,
+        "entidad_tipo": alerta.entidad_tipo,
+        "entidad_id": alerta.entidad_id,
+        "mensaje": alerta.mensaje,
+        "fecha_creacion": alerta.fecha_creacion.isoformat(),
+    }
+
+
+def _crear_despachador() -> DespachadorNotificaciones:
+    settings = get_settings()
+    return DespachadorNotificaciones(
+        rutas=settings.NOTIFY_ROUTES,
+        sumideros=crear_sumideros(settings),
+        tamano_cola=settings.NOTIFY_QUEUE_SIZE,
+        ventana_segundos=settings.NOTIFY_DIGEST_WINDOW_SECONDS,
+        max_alertas_digesto=settings.NOTIFY_DIGEST_MAX_ALERTS,
+        max_reintentos=settings.NOTIFY_MAX_RETRIES,
+        espera_reintento_segundos=settings.NOTIFY_RETRY_BACKOFF_SECONDS,
+        duracion_reclamo_segundos=settings.NOTIFY_CLAIM_SECONDS
+    )
+
+
+despachador_notificaciones = _crear_despachador()
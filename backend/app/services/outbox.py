@@ -0,0 +1,152 @@
+# sistema-inventarios/backend/app/services/outbox.py
+import logging
+import time
+from sqlalchemy.orm import Session
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import get_settings
+from app.crud import crud_outbox
+from app.models.evento_outbox import EventoOutbox
+import app.services.alerts as alerts_service
+import app.services.eventos_tiempo_real as eventos_tiempo_real
+from app.services.eventos_tiempo_real import EVENTO_STOCK
+
+logger = logging.getLogger(__name__)
+
+# Un manejador recibe un lote de eventos y hace su trabajo en la sesion
+# dada, SIN comitear: el consumidor confirma su trabajo junto con la
+# marca de procesado, de modo que un fallo deja los eventos pendientes.
+ManejadorEventos = Callable[[Session, List[EventoOutbox]], None]
+
+_manejadores: Dict[str, ManejadorEventos] = {}
+
+def registrar_manejador(nombre: str, manejador: ManejadorEventos) -> None:
+    """Registra (o reemplaza) un manejador de eventos de stock."""
+    _manejadores[nombre] = manejador
+    logger.debug(f"Manejador de outbox registrado: {nombre}")
+
+def _aplicar_manejadores(db: Session, eventos: List[EventoOutbox]) -> Optional[Exception]:
+    """
+    Pasa los eventos por todos los manejadores dentro de un savepoint.
+    Si alguno falla se deshace solo su trabajo (y los avisos SSE que dejo
+    en espera) y se devuelve la excepcion; si no, None.
+    """
+    marca = eventos_tiempo_real.marca_pendientes(db)
+    try:
+        with db.begin_nested():
+            for nombre, manejador in _manejadores.items():
+                logger.debug(f"Outbox: '{nombre}' procesando {len(eventos)} eventos.")
+                manejador(db, eventos)
+    except Exception as e:
+        eventos_tiempo_real.descartar_pendientes_desde(db, marca)
+        return e
+    return None
+
+def procesar_lote(db: Session, *, tamano_lote: Optional[int] = None) -> int:
+    """
+    Procesa un lote de eventos pendientes en una transaccion.
+    Devuelve el numero de eventos leidos (0 si no habia pendientes).
+    Los manejadores reciben el lote entero; si fallan, se reprocesa evento a
+    evento (cada uno en su savepoint) para aislar al culpable: los demas se
+    marcan procesados y el que falla se reintenta mas tarde (registrar_fallo)
+    hasta quedar como fallido. Un evento roto nunca bloquea la cola.
+    """
+    settings = get_settings()
+    tamano_lote = tamano_lote or settings.OUTBOX_BATCH_SIZE
+    eventos = crud_outbox.get_eventos_pendientes(db, limite=tamano_lote)
+    if not eventos:
+        db.rollback()
+        return 0
+
+    error = _aplicar_manejadores(db, eventos)
+    if error is None:
+        procesados = [e.id for e in eventos]
+    else:
+        logger.warning(
+            f"Lote de outbox (eventos {eventos[0].id}..{eventos[-1].id}) fallo: {error}"
+        )
+        procesados = []
+        for evento in eventos:
+            # Con un solo evento ya se sabe cual falla
+            if len(eventos) > 1:
+                error = _aplicar_manejadores(db, [evento])
+            if error is None:
+                procesados.append(evento.id)
+            else:
+                crud_outbox.registrar_fallo(
+                    db,
+                    evento,
+                    error=repr(error),
+                    max_intentos=settings.OUTBOX_MAX_ATTEMPTS,
+                    espera_base_segundos=settings.OUTBOX_RETRY_BACKOFF_SECONDS
+                )
+    if procesados:
+        crud_outbox.marcar_procesados(db, evento_ids=procesados)
+    db.commit()
+    return len(eventos)
+
+def consumir_outbox(db: Session, *, tamano_lote: Optional[int] = None) -> int:
+    """
+    Drena el outbox lote a lote hasta dejarlo vacio.
+    Devuelve el total de eventos procesados.
+    """
+    total = 0
+    while True:
+        procesados = procesar_lote(db, tamano_lote=tamano_lote)
+        total += procesados
+        if procesados == 0:
+            break
+    if total:
+        logger.info(f"Outbox: {total} eventos de stock procesados.")
+    return total
+
+def consumir_continuamente(
+    db: Session,
+    *,
+    intervalo_segundos: Optional[float] = None,
+    tamano_lote: Optional[int] = None
+) -> None:
+    """
+    Bucle para un consumidor en un proceso separado (ver cli.py).
+    Un error (p. ej. de conexion) deja el lote pendiente y se reintenta en
+    la siguiente vuelta.
+    """
+    intervalo_segundos = intervalo_segundos or get_settings().OUTBOX_POLL_INTERVAL_SECONDS
+    logger.info(f"Consumidor de outbox iniciado (cada {intervalo_segundos}s).")
+    while True:
+        try:
+            consumir_outbox(db, tamano_lote=tamano_lote)
+        except Exception as e:
+            logger.error(f"Error en el consumidor de outbox: {e}", exc_info=True)
+        time.sleep(intervalo_segundos)
+
+def purgar_eventos(db: Session) -> int:
+    """Tarea de mantenimiento: borra los eventos procesados antiguos."""
+    return crud_outbox.purgar_eventos_procesados(
+        db, antiguedad_segundos=get_settings().OUTBOX_RETENTION_SECONDS
+    )
+
+
+def _evaluar_alertas(db: Session, eventos: List[EventoOutbox]) -> None:
+    """Reevalua las alertas de los productos y lotes tocados por los eventos."""
+    alerts_service.evaluar_alertas_incrementales(
+        db,
+        producto_ids={e.producto_id for e in eventos},
+        lote_ids={lote_id for e in eventos for lote_id in e.lote_ids}
+    )
+
+def _publicar_cambios_stock(db: Session, eventos: List[EventoOutbox]) -> None:
+    """
+    Guarda cada cambio de stock en eventos_tiempo_real al comitear el lote:
+    lo leen los clientes SSE y el calendario de vencimientos de cada worker.
+    """
+    for e in eventos:
+        eventos_tiempo_real.publicar_tras_commit(db, EVENTO_STOCK, {
+            "tipo_evento": e.tipo_evento,
+            "producto_id": e.producto_id,
+            "lote_ids": e.lote_ids,
+            "delta": e.delta,
+        })
+
+registrar_manejador("evaluar_alertas", _evaluar_alertas)
+registrar_manejador("publicar_cambios_stock", _publicar_cambios_stock)
@@ -0,0 +1,129 @@
+# sistema-inventarios/backend/app/services/reconciliation.py
+import logging
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, func, case, or_
+from typing import List
+
+from app.models.producto import Producto as ProductoModel
+from app.models.lote import Lote as LoteModel
+from app.models.movimiento import Movimiento as MovimientoModel
+import app.crud.crud_contador_stock as crud_contador_stock
+from app.schemas.reconciliacion import DiferenciaStock, ReporteReconciliacion
+
+logger = logging.getLogger(__name__)
+
+def _suma_lotes_por_producto():
+    """Subconsulta: stock total de los lotes de cada producto."""
+    return (
+        select(
+            LoteModel.producto_id,
+            func.sum(LoteModel.cantidad_actual).label("suma_lotes")
+        )
+        .group_by(LoteModel.producto_id)
+        .subquery()
+    )
+
+def _suma_movimientos_por_producto():
+    """Subconsulta: entradas menos salidas del libro de movimientos de cada producto."""
+    cantidad_con_signo = case(
+        (MovimientoModel.tipo == "entrada", MovimientoModel.cantidad),
+        else_=-MovimientoModel.cantidad
+    )
+    return (
+        select(
+            LoteModel.producto_id,
+            func.sum(cantidad_con_signo).label("suma_movimientos")
+        )
+        .join(LoteModel, MovimientoModel.lote_id == LoteModel.id)
+        .group_by(LoteModel.producto_id)
+        .subquery()
+    )
+
+def calcular_diferencias(db: Session) -> List[DiferenciaStock]:
+    """
+    Compara el stock del producto (incluidas las ranuras de contadores aun no
+    consolidadas) con la suma de sus lotes y con su libro de movimientos
+    usando dos agregados agrupados. Solo viajan a Python las filas de los
+    productos que no coinciden.
+    """
+    lotes = _suma_lotes_por_producto()
+    movimientos = _suma_movimientos_por_producto()
+    cantidad_producto = crud_contador_stock.stock_efectivo_expr()
+    suma_lotes = func.coalesce(lotes.c.suma_lotes, 0)
+    suma_movimientos = func.coalesce(movimientos.c.suma_movimientos, 0)
+
+    stmt = (
+        select(
+            ProductoModel.id,
+            ProductoModel.sku,
+            cantidad_producto,
+            suma_lotes,
+            suma_movimientos
+        )
+        .outerjoin(lotes, lotes.c.producto_id == ProductoModel.id)
+        .outerjoin(movimientos, movimientos.c.producto_id == ProductoModel.id)
+        .where(or_(cantidad_producto != suma_lotes, cantidad_producto != suma_movimientos))
+        .order_by(ProductoModel.id)
+        .execution_options(yield_per=1000)
+    )
+    return [
+        DiferenciaStock(
+            producto_id=producto_id,
+            sku=sku,
+            cantidad_producto=cantidad,
+            suma_lotes=total_lotes,
+            suma_movimientos=total_movimientos
+        )
+        for producto_id, sku, cantidad, total_lotes, total_movimientos in db.execute(stmt)
+    ]
+
+def corregir_stock_productos(db: Session) -> int:
+    """
+    Iguala el stock efectivo de cada producto a la suma de sus lotes con un
+    unico UPDATE correlacionado. Los lotes son la fuente de verdad porque son
+    lo que el despacho consume. Devuelve el numero de productos corregidos.
+    """
+    suma_lotes = (
+        select(func.coalesce(func.sum(LoteModel.cantidad_actual), 0))
+        .where(LoteModel.producto_id == ProductoModel.id)
+        .scalar_subquery()
+    )
+    pendiente = crud_contador_stock.stock_pendiente_expr()
+    result = db.execute(
+        update(ProductoModel)
+        .where(crud_contador_stock.stock_efectivo_expr() != suma_lotes)
+        .values(cantidad_actual=suma_lotes - pendiente)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        # El stock corregido pudo quedar por debajo de los cupos de las ranuras
+        crud_contador_stock.liberar_cupos(db)
+    db.commit()
+    logger.info(f"Stock corregido en {result.rowcount} productos.")
+    return result.rowcount
+
+def reconciliar_stock(db: Session, *, corregir: bool = False) -> ReporteReconciliacion:
+    """
+    Servicio de reconciliacion: reporta los productos cuyo stock no coincide
+    y, opcionalmente, los corrige con una actualizacion masiva.
+    """
+    logger.info(f"Iniciando reconciliacion de stock (corregir={corregir})...")
+    productos_revisados = db.scalar(select(func.count(ProductoModel.id)))
+    diferencias = calcular_diferencias(db)
+    for diferencia in diferencias:
+        logger.warning(
+            f"Diferencia de stock en {diferencia.sku}: producto={diferencia.cantidad_producto}, "
+            f"lotes={diferencia.suma_lotes}, movimientos={diferencia.suma_movimientos}"
+        )
+
+    productos_corregidos = corregir_stock_productos(db) if corregir and diferencias else 0
+
+    logger.info(
+        f"Reconciliacion finalizada: {productos_revisados} productos revisados, "
+        f"{len(diferencias)} con diferencias, {productos_corregidos} corregidos."
+    )
+    return ReporteReconciliacion(
+        productos_revisados=productos_revisados,
+        diferencias=diferencias,
+        productos_corregidos=productos_corregidos
+    )
@@ -0,0 +1,316 @@
+# sistema-inventarios/backend/app/services/reglas_alertas.py
+import logging
+import operator
+import string
+import time
+from sqlalchemy.orm import Session
+from sqlalchemy import select, and_, cast, false, func, literal, Numeric, String, ColumnElement, FromClause
+from sqlalchemy.exc import SQLAlchemyError
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+from datetime import date, datetime, timedelta, timezone
+
+from app.models.producto import Producto as ProductoModel
+from app.models.lote import Lote as LoteModel
+from app.models.movimiento import Movimiento as MovimientoModel
+from app.models.alerta import Alerta
+from app.models.regla_alerta import ReglaAlerta as ReglaAlertaModel
+from app.schemas.regla_alerta import ReglaAlertaBase, ReglaAlertaCreate, ResultadoRegla
+from app.core.exceptions import InvalidAlertRuleError
+from app.crud import crud_alerta
+import app.crud.crud_regla_alerta as crud_regla_alerta
+import app.crud.crud_contador_stock as crud_contador_stock
+from app.db.dialects import dias_hasta, json_objeto
+
+logger = logging.getLogger(__name__)
+
+# Las alertas generadas por una regla son "regla_<nombre>"
+PREFIJO_REGLA = "regla_"
+
+_OPERADORES = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Campos que solo sirven para el mensaje (no se comparan)
+_CAMPOS_TEXTO = {"nombre", "sku", "fecha_vencimiento"}
+# Campos con decimales: se redondean a 2 en el mensaje
+_CAMPOS_DECIMALES = {"precio", "valor", "valor_stock", "demanda_diaria", "dias_cobertura"}
+# Campos que requieren unir la demanda agregada de movimientos
+_CAMPOS_DEMANDA = {"demanda_diaria", "dias_cobertura"}
+
+
+class ReglaCompilada(NamedTuple):
+    """Expresiones SQL de una regla, listas para el upsert de alertas."""
+    tipo_alerta: str
+    entidad_tipo: str
+    entidad_id: ColumnElement[int]
+    desde: FromClause
+    condicion: ColumnElement[bool]
+    mensaje: ColumnElement[str]
+    metadata_json: ColumnElement
+
+
+def tipo_alerta_regla(nombre: str) -> str:
+    """Tipo de alerta de la regla `nombre`."""
+    return f"{PREFIJO_REGLA}{nombre}"
+
+def _demanda(ventana_dias: int):
+    """
+    Subconsulta agregada con las salidas por producto en la ventana:
+    un solo GROUP BY sobre movimientos, no una consulta por producto.
+    """
+    inicio = datetime.now(timezone.utc) - timedelta(days=ventana_dias)
+    return (
+        select(
+            LoteModel.producto_id.label("producto_id"),
+            func.sum(MovimientoModel.cantidad).label("total")
+        )
+        .join(LoteModel, MovimientoModel.lote_id == LoteModel.id)
+        .where(MovimientoModel.tipo == "salida", MovimientoModel.fecha_movimiento >= inicio)
+        .group_by(LoteModel.producto_id)
+        .subquery("demanda")
+    )
+
+def _campos(
+    db: Session, entidad: str, demanda, ventana_dias: int, hoy: date
+) -> Dict[str, ColumnElement]:
+    """Expresion SQL de cada campo de la entidad."""
+    demanda_diaria = func.coalesce(demanda.c.total, 0) * 1.0 / ventana_dias
+    campos = {
+        "nombre": ProductoModel.nombre,
+        "sku": ProductoModel.sku,
+        "precio": ProductoModel.precio,
+        "demanda_diaria": demanda_diaria,
+    }
+    if entidad == "producto":
+        stock = crud_contador_stock.stock_efectivo_expr() - ProductoModel.cantidad_cuarentena
+        campos.update({
+            "stock": stock,
+            "stock_minimo": ProductoModel.stock_minimo,
+            "cantidad_reservada": ProductoModel.cantidad_reservada,
+            "cantidad_cuarentena": ProductoModel.cantidad_cuarentena,
+            "valor_stock": stock * ProductoModel.precio,
+            # NULL sin demanda: las comparaciones no se cumplen
+            "dias_cobertura": stock / func.nullif(demanda_diaria, 0),
+        })
+    else:
+        campos.update({
+            "lote_id": LoteModel.id,
+            "cantidad": LoteModel.cantidad_actual,
+            "fecha_vencimiento": LoteModel.fecha_vencimiento,
+            "dias_para_vencer": dias_hasta(db, LoteModel.fecha_vencimiento, hoy),
+            "valor": LoteModel.cantidad_actual * ProductoModel.precio,
+            # Dias que tardaria en venderse el lote al ritmo de la demanda
+            "dias_cobertura": LoteModel.cantidad_actual / func.nullif(demanda_diaria, 0),
+        })
+    return campos
+
+def _usados(regla: ReglaAlertaBase) -> Set[str]:
+    """Campos que la regla usa en sus condiciones."""
+    usados = set()
+    for condicion in regla.condiciones:
+        usados.add(condicion.campo)
+        if condicion.referencia:
+            usados.add(condicion.referencia)
+    return usados
+
+def _campos_mensaje(regla: ReglaAlertaBase) -> Set[str]:
+    """Campos que la regla usa en la plantilla del mensaje."""
+    if not regla.mensaje:
+        return set()
+    return {campo for _, campo, _, _ in string.Formatter().parse(regla.mensaje) if campo}
+
+def _mensaje(regla: ReglaAlertaBase, campos: Dict[str, ColumnElement]) -> ColumnElement[str]:
+    """Compila la plantilla del mensaje a una concatenacion SQL."""
+    plantilla = regla.mensaje
+    if not plantilla:
+        sujeto = "el producto" if regla.entidad == "producto" else "el lote {lote_id} del producto"
+        plantilla = f"Regla '{regla.nombre}': {sujeto} '{{nombre}}' (SKU: {{sku}})."
+    try:
+        partes = list(string.Formatter().parse(plantilla))
+    except ValueError as e:
+        raise InvalidAlertRuleError(regla.nombre, f"plantilla de mensaje invalida ({e})")
+
+    mensaje = literal("")
+    for texto, campo, _, _ in partes:
+        if texto:
+            mensaje = mensaje + texto
+        if campo is None:
+            continue
+        if campo not in campos:
+            raise InvalidAlertRuleError(regla.nombre, f"campo '{campo}' desconocido en el mensaje")
+        valor = campos[campo]
+        if campo in _CAMPOS_DECIMALES:
+            # round(double precision, integer) no existe en PostgreSQL
+            valor = func.round(cast(valor, Numeric), 2)
+        mensaje = mensaje + func.coalesce(cast(valor, String), "-")
+    return mensaje
+
+def compilar_regla(
+    db: Session,
+    regla: Union[ReglaAlertaBase, ReglaAlertaModel],
+    *,
+    hoy: Optional[date] = None
+) -> ReglaCompilada:
+    """
+    Compila una regla declarativa a expresiones SQL: el FROM (la entidad, con
+    su producto y la demanda agregada solo si la regla la usa), la condicion
+    (AND de las condiciones), el mensaje y la metadata. Con ellas la regla se
+    evalua para todas las entidades con un solo INSERT ... SELECT.
+    Lanza InvalidAlertRuleError si usa campos u operaciones desconocidas.
+    """
+    regla = ReglaAlertaBase.model_validate(regla, from_attributes=True)
+    hoy = hoy or date.today()
+    demanda = _demanda(regla.ventana_demanda_dias)
+    campos = _campos(db, regla.entidad, demanda, regla.ventana_demanda_dias, hoy)
+
+    condiciones = []
+    for c in regla.condiciones:
+        for campo in filter(None, (c.campo, c.referencia)):
+            if campo not in campos:
+                raise InvalidAlertRuleError(
+                    regla.nombre, f"campo '{campo}' desconocido (disponibles: {', '.join(sorted(campos))})"
+                )
+            if campo in _CAMPOS_TEXTO:
+                raise InvalidAlertRuleError(regla.nombre, f"el campo '{campo}' no es numerico")
+        derecha = literal(c.valor)
+        if c.referencia:
+            derecha = derecha * campos[c.referencia]
+        condiciones.append(_OPERADORES[c.operador](campos[c.campo], derecha))
+
+    if regla.entidad == "producto":
+        desde = ProductoModel.__table__
+        entidad_id = ProductoModel.id
+    else:
+        desde = LoteModel.__table__.join(ProductoModel, LoteModel.producto_id == ProductoModel.id)
+        entidad_id = LoteModel.id
+        # Solo lotes con stock y fuera de cuarentena
+        condiciones = [LoteModel.cantidad_actual > 0, LoteModel.esta_vencido == False] + condiciones
+
+    mensaje = _mensaje(regla, campos)
+    usados = _usados(regla)
+    usa_demanda = bool((usados | _campos_mensaje(regla)) & _CAMPOS_DEMANDA)
+    if usa_demanda:
+        desde = desde.outerjoin(demanda, demanda.c.producto_id == ProductoModel.id)
+
+    metadata = {"regla": literal(regla.nombre), "nombre": ProductoModel.nombre, "sku": ProductoModel.sku}
+    metadata.update({campo: campos[campo] for campo in sorted(usados)})
+    return ReglaCompilada(
+        tipo_alerta=tipo_alerta_regla(regla.nombre),
+        entidad_tipo=regla.entidad,
+        entidad_id=entidad_id,
+        desde=desde,
+        condicion=and_(*condiciones),
+        mensaje=mensaje,
+        metadata_json=json_objeto(db, metadata)
+    )
+
+def _sincronizar_regla(db: Session, compilada: ReglaCompilada) -> Tuple[int, int]:
+    """
+    Sincroniza las alertas de una regla con dos sentencias, sin comitear:
+    el upsert de las entidades que la cumplen y el UPDATE que desactiva las
+    que ya no. El IN (SELECT ...) no esta correlacionado con la alerta: el
+    conjunto de entidades que cumplen se calcula una vez, no por alerta.
+    """
+    creadas = crud_alerta.upsert_alertas(
+        db,
+        tipo_alerta=compilada.tipo_alerta,
+        entidad_tipo=compilada.entidad_tipo,
+        entidad_id=compilada.entidad_id,
+        mensaje=compilada.mensaje,
+        metadata_json=compilada.metadata_json,
+        condicion=compilada.condicion,
+        desde=compilada.desde
+    )
+    cumplen = select(compilada.entidad_id).select_from(compilada.desde).where(compilada.condicion)
+    desactivadas = crud_alerta.deactivate_alertas_resueltas(
+        db,
+        tipo_alerta=compilada.tipo_alerta,
+        entidad_tipo=compilada.entidad_tipo,
+        sigue_vigente=Alerta.entidad_id.in_(cumplen)
+    )
+    return creadas, desactivadas
+
+def cerrar_alertas_regla(db: Session, regla: ReglaAlertaModel) -> int:
+    """Desactiva todas las alertas activas de una regla (inactiva o borrada). No comitea."""
+    return crud_alerta.deactivate_alertas_resueltas(
+        db,
+        tipo_alerta=tipo_alerta_regla(regla.nombre),
+        entidad_tipo=regla.entidad,
+        sigue_vigente=false()
+    )
+
+def evaluar_reglas(db: Session, *, hoy: Optional[date] = None) -> List[ResultadoRegla]:
+    """
+    Evalua todas las reglas de alerta: cada regla activa con sus dos
+    sentencias set-based; las inactivas cierran sus alertas. Mide cuanto
+    tarda cada regla (compilacion y sentencias) para detectar las costosas.
+    Cada regla corre en su savepoint: una que no compila o falla en la BD
+    se registra y se salta sin deshacer las demas. No comitea.
+    """
+    resultados = []
+    for regla in crud_regla_alerta.get_reglas(db):
+        inicio = time.perf_counter()
+        nombre = regla.nombre
+        try:
+            with db.begin_nested():
+                if not regla.esta_activa:
+                    creadas, desactivadas = 0, cerrar_alertas_regla(db, regla)
+                else:
+                    creadas, desactivadas = _sincronizar_regla(db, compilar_regla(db, regla, hoy=hoy))
+        except InvalidAlertRuleError as e:
+            logger.error(e.message)
+            continue
+        except SQLAlchemyError as e:
+            logger.error(f"Error al evaluar la regla de alerta '{nombre}': {e}", exc_info=True)
+            continue
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        logger.debug(
+            f"Regla '{nombre}': {creadas} creadas/actualizadas, "
+            f"{desactivadas} desactivadas en {duracion_ms:.1f} ms."
+        )
+        resultados.append(ResultadoRegla(
+            nombre=nombre,
+            creadas=creadas,
+            desactivadas=desactivadas,
+            duracion_ms=round(duracion_ms, 3)
+        ))
+    return resultados
+
+def _probar_regla(db: Session, nombre: str, compilada: ReglaCompilada) -> None:
+    """
+    Ejecuta una vez la consulta de la regla (condicion, mensaje y metadata,
+    LIMIT 1) en un savepoint, para que la BD rechace ahora lo que fallaria
+    en cada evaluacion (tipos o funciones que el dialecto no acepta).
+    """
+    try:
+        with db.begin_nested():
+            db.execute(
+                select(compilada.entidad_id, compilada.mensaje, compilada.metadata_json)
+                .select_from(compilada.desde)
+                .where(compilada.condicion)
+                .limit(1)
+            )
+    except SQLAlchemyError as e:
+        raise InvalidAlertRuleError(nombre, f"la base de datos no puede evaluarla ({e.__class__.__name__})")
+
+def crear_regla(db: Session, *, regla_in: ReglaAlertaCreate) -> ReglaAlertaModel:
+    """
+    Crea una regla de alerta tras comprobar que compila a SQL y que la
+    consulta compilada se ejecuta.
+    Lanza InvalidAlertRuleError si no compila o no se puede ejecutar.
+    """
+    _probar_regla(db, regla_in.nombre, compilar_regla(db, regla_in))
+    return crud_regla_alerta.create_regla(db, regla_in=regla_in)
+
+def borrar_regla(db: Session, *, db_regla: ReglaAlertaModel) -> ReglaAlertaModel:
+    """Borra una regla y cierra sus alertas activas en la misma transaccion."""
+    cerradas = cerrar_alertas_regla(db, db_regla)
+    crud_regla_alerta.delete_regla(db, db_regla=db_regla)
+    db.commit()
+    logger.info(f"Regla '{db_regla.nombre}' borrada ({cerradas} alertas cerradas).")
+    return db_regla
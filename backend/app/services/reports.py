@@ -1,65 +1,113 @@
 # sistema-inventarios/backend/app/services/reports.py
 import logging
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select, and_
-from typing import List
+from sqlalchemy import select, and_, func, literal, union_all
+from typing import Iterator, List, Optional, Tuple
 import pandas as pd
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta, timezone
 
 from app.models.producto import Producto as ProductoModel
 from app.models.lote import Lote as LoteModel 
 from app.models.movimiento import Movimiento as MovimientoModel # Nueva importacion
+from app.models.resumen_movimientos import ResumenDiarioMovimientos
 from app.schemas.producto import Producto as ProductoSchema 
 from app.schemas.lote import Lote as LoteSchema 
-from app.schemas.movimiento import Movimiento as MovimientoSchema # Nueva importacion
+from app.schemas.movimiento import Movimiento as MovimientoSchema, ResumenMovimientos
+from app.schemas.vencimiento import DiaVencimiento
+import app.services.calendario_vencimientos as calendario_service
+from app.db.dialects import truncar_fecha
+from app.core.config import get_settings
+import app.crud.crud_contador_stock as crud_contador_stock
 
 logger = logging.getLogger(__name__)
 
-def get_top_available_products(db: Session, *, top_n: int = 5) -> pd.DataFrame:
+def get_top_available_products(db: Session, *, top_n: int = 5) -> List[ProductoSchema]:
     """
-    Servicio que devuelve los N productos con mayor cantidad_actual.
+    Servicio que devuelve los N productos con mayor stock efectivo
+    (cantidad_actual mas las ranuras de contadores aun sin consolidar).
     """
     logger.info(f"Obteniendo los {top_n} productos con mayor disponibilidad...")
-    productos_orm = db.scalars(
-        select(ProductoModel)
-        .order_by(ProductoModel.cantidad_actual.desc(), ProductoModel.nombre.asc())
+    stock = crud_contador_stock.stock_efectivo_expr()
+    filas = db.execute(
+        select(ProductoModel, stock)
+        .order_by(stock.desc(), ProductoModel.nombre.asc())
         .limit(top_n)
-    )
-    productos_schemas = [ProductoSchema.model_validate(p) for p in productos_orm]
+    ).all()
+    productos_schemas = [
+        crud_contador_stock.producto_con_stock_efectivo(p, stock_efectivo)
+        for p, stock_efectivo in filas
+    ]
     logger.info(f"Reporte de top {top_n} productos disponibles generado para {len(productos_schemas)} productos.")
     return productos_schemas
 
 def get_current_stock_per_product(db: Session) -> List[ProductoSchema]:
     """
-    Servicio que devuelve el stock actual de todos los productos.
+    Servicio que devuelve el stock actual (efectivo) de todos los productos.
     """
     logger.info("Obteniendo stock actual por producto...")
-    productos_orm = db.scalars(select(ProductoModel)).all()
+    filas = db.execute(select(ProductoModel, crud_contador_stock.stock_efectivo_expr())).all()
     
     # Convertir a Pydantic Schema para asegurar que los datos sean serializables
     # y no arrastren objetos ORM.
-    productos_schemas = [ProductoSchema.model_validate(p) for p in productos_orm]
+    productos_schemas = [
+        crud_contador_stock.producto_con_stock_efectivo(p, stock_efectivo)
+        for p, stock_efectivo in filas
+    ]
     
     logger.info(f"Reporte de stock generado para {len(productos_schemas)} productos.")
     return productos_schemas
 
+# Columnas de la exportacion del inventario basico
+COLUMNAS_INVENTARIO = (
+    ("id", "int"),
+    ("nombre", "str"),
+    ("sku", "str"),
+    ("precio", "float"),
+    ("cantidad_actual", "int"),
+    ("cantidad_reservada", "int"),
+    ("cantidad_cuarentena", "int"),
+    ("stock_minimo", "int"),
+)
+
+def iter_inventory_rows(db: Session, *, tamano_lote: Optional[int] = None) -> Iterator[Tuple]:
+    """
+    Servicio que recorre el stock actual de todos los productos (columnas de
+    COLUMNAS_INVENTARIO) como filas Core leidas con yield_per, sin pasar por
+    objetos ORM ni schemas Pydantic.
+    """
+    tamano_lote = tamano_lote or get_settings().EXPORT_BATCH_SIZE
+    logger.info("Exportando stock actual por producto...")
+    stmt = (
+        select(*(
+            crud_contador_stock.stock_efectivo_expr().label(nombre) if nombre == "cantidad_actual"
+            else getattr(ProductoModel, nombre)
+            for nombre, _ in COLUMNAS_INVENTARIO
+        ))
+        .order_by(ProductoModel.id.asc())
+        .execution_options(yield_per=tamano_lote)
+    )
+    total = 0
+    for fila in db.execute(stmt):
+        total += 1
+        yield tuple(fila)
+    logger.info(f"Exportacion de inventario finalizada: {total} productos.")
+
 def get_expiring_lotes_report(db: Session, *, days_threshold: int = 30) -> List[LoteSchema]:
     """
     Servicio que devuelve una lista de lotes que estan por vencer,
     incluyendo la informacion del producto asociado.
     """
     logger.info(f"Generando reporte de lotes por vencer (umbral: {days_threshold} dias)...")
-    today = date.today()
-    target_date = today + timedelta(days=days_threshold)
-    
+    # El calendario de vencimientos (o, si no esta vigente, una consulta por
+    # rango) da los lotes; luego se cargan por llave primaria con su producto.
+    lote_ids = [
+        l.lote_id for l in calendario_service.lotes_por_vencer(db, dias=days_threshold)
+    ]
+    if not lote_ids:
+        return []
     stmt = select(LoteModel).options(joinedload(LoteModel.producto)).where(
-        and_(
-            LoteModel.fecha_vencimiento.isnot(None),
-            LoteModel.cantidad_actual > 0,
-            LoteModel.fecha_vencimiento > today,
-            LoteModel.fecha_vencimiento <= target_date
-        )
-    ).order_by(LoteModel.fecha_vencimiento.asc())
+        LoteModel.id.in_(lote_ids)
+    ).order_by(LoteModel.fecha_vencimiento.asc(), LoteModel.id.asc())
 
     lotes_orm = db.scalars(stmt).all()
 
@@ -69,22 +117,40 @@ def get_expiring_lotes_report(db: Session, *, days_threshold: int = 30) -> List[
     logger.info(f"Reporte de lotes por vencer generado para {len(lotes_schemas)} lotes.")
     return lotes_schemas
 
+def get_expiry_histogram(db: Session, *, dias: int = 30) -> List[DiaVencimiento]:
+    """
+    Servicio que devuelve, para cada dia de los proximos `dias` dias,
+    cuantas unidades y lotes vencen.
+    """
+    logger.info(f"Generando histograma de vencimientos ({dias} dias)...")
+    return calendario_service.histograma_vencimientos(db, dias=dias)
+
+# Columnas de la exportacion de movimientos: (nombre, tipo en exportacion.generar)
+COLUMNAS_MOVIMIENTOS = (
+    ("id", "int"),
+    ("fecha_movimiento", "datetime"),
+    ("producto_id", "int"),
+    ("lote_id", "int"),
+    ("tipo", "str"),
+    ("cantidad", "int"),
+)
+
+def _filtro_rango_movimientos(fecha_inicio: date, fecha_fin: date):
+    return [
+        MovimientoModel.fecha_movimiento >= fecha_inicio,
+        MovimientoModel.fecha_movimiento <= fecha_fin
+    ]
+
 def get_movement_report_by_date_range(db: Session, fecha_inicio: date, fecha_fin: date) -> List[MovimientoSchema]:
     """
     Servicio que devuelve una lista de movimientos de inventario dentro de un rango de fechas,
-    incluyendo la informacion del producto y lote asociado.
+    incluyendo la informacion del lote asociado.
     """
     logger.info(f"Generando reporte de movimientos entre {fecha_inicio} y {fecha_fin}...")
 
     stmt = select(MovimientoModel)\
-        .options(
-            joinedload(MovimientoModel.producto),
-            joinedload(MovimientoModel.lote)
-        )\
-        .where(
-            MovimientoModel.fecha_movimiento >= fecha_inicio,
-            MovimientoModel.fecha_movimiento <= fecha_fin
-        )\
+        .options(joinedload(MovimientoModel.lote))\
+        .where(*_filtro_rango_movimientos(fecha_inicio, fecha_fin))\
         .order_by(MovimientoModel.fecha_movimiento.asc())
     
     movimientos_orm = db.scalars(stmt).all()
@@ -93,4 +159,125 @@ def get_movement_report_by_date_range(db: Session, fecha_inicio: date, fecha_fin
     movimientos_schemas = [MovimientoSchema.model_validate(m) for m in movimientos_orm]
 
     logger.info(f"Reporte de movimientos generado para {len(movimientos_schemas)} movimientos.")
-    return movimientos_schemas
\ No newline at end of file
+    return movimientos_schemas
+
+def iter_movement_rows(
+    db: Session,
+    *,
+    fecha_inicio: date,
+    fecha_fin: date,
+    tamano_lote: Optional[int] = None
+) -> Iterator[Tuple]:
+    """
+    Servicio que recorre los movimientos del rango (columnas de
+    COLUMNAS_MOVIMIENTOS) sin cargarlos todos: filas Core, no objetos ORM,
+    leidas con yield_per (cursor del servidor en PostgreSQL) de
+    `tamano_lote` en `tamano_lote`. La memoria no depende del tamano del rango.
+    """
+    tamano_lote = tamano_lote or get_settings().EXPORT_BATCH_SIZE
+    logger.info(f"Exportando movimientos entre {fecha_inicio} y {fecha_fin}...")
+    stmt = (
+        select(
+            MovimientoModel.id,
+            MovimientoModel.fecha_movimiento,
+            LoteModel.producto_id,
+            MovimientoModel.lote_id,
+            MovimientoModel.tipo,
+            MovimientoModel.cantidad
+        )
+        .join(LoteModel, MovimientoModel.lote_id == LoteModel.id)
+        .where(*_filtro_rango_movimientos(fecha_inicio, fecha_fin))
+        .order_by(MovimientoModel.fecha_movimiento.asc(), MovimientoModel.id.asc())
+        .execution_options(yield_per=tamano_lote)
+    )
+    total = 0
+    for fila in db.execute(stmt):
+        total += 1
+        yield tuple(fila)
+    logger.info(f"Exportacion de movimientos finalizada: {total} movimientos.")
+
+def get_movement_summary(
+    db: Session,
+    *,
+    fecha_inicio: date,
+    fecha_fin: date,
+    periodo: str = "dia",
+    producto_id: Optional[int] = None
+) -> List[ResumenMovimientos]:
+    """
+    Servicio que devuelve los totales de movimientos por periodo ("dia",
+    "semana" o "mes"), producto y tipo entre dos fechas (ambas incluidas).
+    Lee el resumen diario (una fila por producto y dia) y le suma solo los
+    movimientos aun no consolidados, en una unica consulta agregada en la BD
+    (una sola lectura consistente: cada movimiento esta en una de las dos).
+    Los periodos se cortan en UTC.
+    """
+    logger.info(
+        f"Generando resumen de movimientos por {periodo} entre {fecha_inicio} y {fecha_fin}..."
+    )
+    periodo_resumen = truncar_fecha(db, ResumenDiarioMovimientos.dia, periodo)
+    en_rango_resumen = [
+        ResumenDiarioMovimientos.dia >= fecha_inicio,
+        ResumenDiarioMovimientos.dia <= fecha_fin,
+    ]
+    if producto_id is not None:
+        en_rango_resumen.append(ResumenDiarioMovimientos.producto_id == producto_id)
+    consolidados = [
+        select(
+            periodo_resumen.label("periodo"),
+            ResumenDiarioMovimientos.producto_id.label("producto_id"),
+            literal(tipo).label("tipo"),
+            cantidad.label("cantidad"),
+            num.label("num")
+        ).where(*en_rango_resumen, num > 0)
+        for tipo, cantidad, num in (
+            ("entrada", ResumenDiarioMovimientos.cantidad_entradas, ResumenDiarioMovimientos.num_entradas),
+            ("salida", ResumenDiarioMovimientos.cantidad_salidas, ResumenDiarioMovimientos.num_salidas),
+        )
+    ]
+    # Movimientos aun no consolidados
+    recientes = (
+        select(
+            truncar_fecha(db, MovimientoModel.fecha_movimiento, periodo),
+            LoteModel.producto_id,
+            MovimientoModel.tipo,
+            MovimientoModel.cantidad,
+            literal(1)
+        )
+        .join(LoteModel, MovimientoModel.lote_id == LoteModel.id)
+        .where(
+            MovimientoModel.consolidado == False,
+            MovimientoModel.fecha_movimiento >= datetime.combine(fecha_inicio, time.min, tzinfo=timezone.utc),
+            MovimientoModel.fecha_movimiento < datetime.combine(
+                fecha_fin + timedelta(days=1), time.min, tzinfo=timezone.utc
+            )
+        )
+    )
+    if producto_id is not None:
+        recientes = recientes.where(LoteModel.producto_id == producto_id)
+
+    fuente = union_all(*consolidados, recientes).subquery()
+    stmt = (
+        select(
+            fuente.c.periodo,
+            fuente.c.producto_id,
+            fuente.c.tipo,
+            func.sum(fuente.c.cantidad).label("cantidad_total"),
+            func.sum(fuente.c.num).label("num_movimientos")
+        )
+        .group_by(fuente.c.periodo, fuente.c.producto_id, fuente.c.tipo)
+        .order_by(fuente.c.periodo, fuente.c.producto_id, fuente.c.tipo)
+    )
+
+    resumen = [
+        ResumenMovimientos(
+            periodo=fila.periodo,
+            producto_id=fila.producto_id,
+            tipo=fila.tipo,
+            cantidad_total=fila.cantidad_total,
+            num_movimientos=fila.num_movimientos
+        )
+        for fila in db.execute(stmt)
+    ]
+    logger.info(f"Resumen de movimientos generado con {len(resumen)} grupos.")
+    return resumen
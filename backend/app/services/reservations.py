@@ -0,0 +1,130 @@
+# sistema-inventarios/backend/app/services/reservations.py
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+
+import app.crud.crud_inventory as crud_inventory
+import app.crud.crud_product as crud_product
+import app.crud.crud_contador_stock as crud_contador_stock
+from app.crud import crud_reserva
+from app.core.config import get_settings
+from app.models.movimiento import Movimiento
+from app.models.reserva import Reserva
+from app.schemas.inventory import SmartDispatchReq
+from app.schemas.reserva import ReservaCreate, Disponibilidad
+
+logger = logging.getLogger(__name__)
+
+class ExpiradorReservas:
+    """
+    Seguimiento en memoria de los vencimientos de reservas (min-heap).
+    El barrido periodico consulta el heap en O(1) y solo va a la tabla
+    (indice (estado, fecha_expiracion)) cuando hay algo vencido.
+    El heap se recarga desde la BD cada cierto tiempo para incluir las
+    reservas creadas por otros procesos.
+    """
+
+    def __init__(self, intervalo_resync_segundos: float = 300):
+        self._heap: List[Tuple[datetime, int]] = []
+        self._lock = threading.Lock()
+        self._intervalo_resync = intervalo_resync_segundos
+        self._ultimo_resync: Optional[float] = None
+
+    def programar(self, db_reserva: Reserva) -> None:
+        """Agrega el vencimiento de una reserva recien creada."""
+        with self._lock:
+            heapq.heappush(self._heap, (db_reserva.fecha_expiracion, db_reserva.id))
+
+    def resincronizar(self, db: Session) -> None:
+        """Reconstruye el heap a partir de las reservas activas en la BD."""
+        vencimientos = crud_reserva.get_vencimientos_activos(db)
+        heapq.heapify(vencimientos)
+        with self._lock:
+            self._heap = vencimientos
+            self._ultimo_resync = time.monotonic()
+        logger.debug(f"Heap de reservas resincronizado: {len(vencimientos)} activas")
+
+    def barrer(self, db: Session, ahora: Optional[datetime] = None) -> int:
+        """
+        Expira las reservas vencidas. Devuelve el numero de reservas expiradas.
+        """
+        ahora = ahora or datetime.now()
+        if (
+            self._ultimo_resync is None
+            or time.monotonic() - self._ultimo_resync >= self._intervalo_resync
+        ):
+            self.resincronizar(db)
+
+        with self._lock:
+            if not self._heap or self._heap[0][0] > ahora:
+                return 0
+            # Sacar del heap todo lo vencido (incluye reservas ya cerradas)
+            while self._heap and self._heap[0][0] <= ahora:
+                heapq.heappop(self._heap)
+
+        return crud_reserva.expire_reservas(db, ahora=ahora)
+
+
+expirador_reservas = ExpiradorReservas(
+    intervalo_resync_segundos=get_settings().RESERVATION_RESYNC_SECONDS
+)
+
+def crear_reserva(db: Session, *, reserva_in: ReservaCreate) -> Reserva | None:
+    """
+    Crea una reserva con su TTL y la registra en el heap de vencimientos.
+    """
+    ttl = reserva_in.ttl_segundos or get_settings().RESERVATION_TTL_SECONDS
+    db_reserva = crud_reserva.create_reserva(
+        db,
+        reserva_in=reserva_in,
+        fecha_expiracion=datetime.now() + timedelta(seconds=ttl)
+    )
+    if db_reserva:
+        expirador_reservas.programar(db_reserva)
+    return db_reserva
+
+def confirmar_reserva(db: Session, *, db_reserva: Reserva) -> List[Movimiento]:
+    """
+    Convierte una reserva en un despacho FEFO real. La liberacion de la
+    reserva y el despacho se comitean juntos: si el despacho falla,
+    la reserva sigue activa.
+    """
+    logger.info(f"Confirmando reserva {db_reserva.id}...")
+    crud_reserva.release_reserva(
+        db, db_reserva=db_reserva, estado_final="confirmada", commit=False
+    )
+    try:
+        return crud_inventory.smart_dispatch_fefo(
+            db,
+            dispatch_in=SmartDispatchReq(
+                producto_id=db_reserva.producto_id,
+                cantidad=db_reserva.cantidad
+            )
+        )
+    except Exception:
+        db.rollback()
+        raise
+
+def get_disponibilidad(db: Session, *, producto_id: int) -> Disponibilidad | None:
+    """
+    Stock disponible para prometer de un producto: una lectura por llave primaria
+    (mas, con contadores repartidos, sus N ranuras pendientes). Las unidades
+    reservadas y las de lotes vencidos (cuarentena) no estan disponibles.
+    """
+    db_product = crud_product.get_product(db, product_id=producto_id)
+    if not db_product:
+        return None
+    cantidad_actual = crud_contador_stock.get_stock_efectivo(db, db_product)
+    return Disponibilidad(
+        producto_id=db_product.id,
+        cantidad_actual=cantidad_actual,
+        cantidad_reservada=db_product.cantidad_reservada,
+        cantidad_cuarentena=db_product.cantidad_cuarentena,
+        disponible=(
+            cantidad_actual - db_product.cantidad_reservada - db_product.cantidad_cuarentena
+        )
+    )
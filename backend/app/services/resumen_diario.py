@@ -0,0 +1,182 @@
+# sistema-inventarios/backend/app/services/resumen_diario.py
+import logging
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete, func, case
+from typing import List, Optional
+
+from app.core.config import get_settings
+from app.crud.crud_marca_agua import bloquear_marca
+from app.db.dialects import truncar_fecha, upsert_insert
+from app.models.lote import Lote as LoteModel
+from app.models.movimiento import Movimiento as MovimientoModel
+from app.models.producto import Producto as ProductoModel
+from app.models.resumen_movimientos import ResumenDiarioMovimientos, MarcaAgua
+
+logger = logging.getLogger(__name__)
+
+# Fila de marcas_agua del resumen: cerrojo entre consolidaciones y reconstruccion.
+# Su ultimo_id no es una marca de consolidacion (eso es Movimiento.consolidado):
+# vale 0, salvo durante una reconstruccion, en que es el mayor id que esta cubre.
+MARCA_RESUMEN_DIARIO = "resumen_diario_movimientos"
+
+# Columnas acumulables del resumen (se suman al consolidar)
+_COLUMNAS_SUMA = [
+    "cantidad_entradas", "cantidad_salidas", "cantidad_neta",
+    "num_entradas", "num_salidas", "valor_entradas", "valor_salidas",
+]
+
+def _bloquear_resumen(db: Session) -> MarcaAgua:
+    """
+    Toma el cerrojo del resumen: la fila de marcas_agua, creada si falta y
+    bloqueada (SELECT ... FOR UPDATE) hasta el fin de la transaccion. Asi una
+    reconstruccion no se solapa con una consolidacion de otro proceso.
+    """
+    return bloquear_marca(db, MARCA_RESUMEN_DIARIO)
+
+def _marcar_pendientes(db: Session, tamano_lote: int, *, desde_id: int = 0) -> List[int]:
+    """
+    Marca como consolidados hasta `tamano_lote` movimientos pendientes (con
+    id > `desde_id`) y devuelve sus ids. El UPDATE repite la condicion
+    consolidado = false, asi que un movimiento nunca se marca (ni se suma)
+    dos veces. Un movimiento cuya transaccion comitea tarde, aunque tenga un
+    id menor, sigue pendiente y entra en una consolidacion posterior.
+    No comitea.
+    """
+    pendientes = (
+        select(MovimientoModel.id)
+        .where(MovimientoModel.consolidado == False, MovimientoModel.id > desde_id)
+        .order_by(MovimientoModel.id)
+        .limit(tamano_lote)
+    )
+    return db.scalars(
+        update(MovimientoModel)
+        .where(
+            MovimientoModel.id.in_(pendientes.scalar_subquery()),
+            MovimientoModel.consolidado == False
+        )
+        .values(consolidado=True)
+        .returning(MovimientoModel.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+def _consolidar_movimientos(db: Session, ids: List[int]) -> None:
+    """
+    Suma al resumen los movimientos indicados con un
+    INSERT ... SELECT ... GROUP BY ... ON CONFLICT DO UPDATE (acumula sobre
+    las filas de producto y dia ya existentes). No comitea.
+    """
+    es_entrada = MovimientoModel.tipo == "entrada"
+    entradas = case((es_entrada, MovimientoModel.cantidad), else_=0)
+    salidas = case((es_entrada, 0), else_=MovimientoModel.cantidad)
+    dia = truncar_fecha(db, MovimientoModel.fecha_movimiento, "dia")
+    origen = (
+        select(
+            LoteModel.producto_id,
+            dia,
+            func.sum(entradas),
+            func.sum(salidas),
+            func.sum(entradas - salidas),
+            func.sum(case((es_entrada, 1), else_=0)),
+            func.sum(case((es_entrada, 0), else_=1)),
+            func.sum(entradas * ProductoModel.precio),
+            func.sum(salidas * ProductoModel.precio)
+        )
+        .join(LoteModel, MovimientoModel.lote_id == LoteModel.id)
+        .join(ProductoModel, LoteModel.producto_id == ProductoModel.id)
+        .where(MovimientoModel.id.in_(ids))
+        .group_by(LoteModel.producto_id, dia)
+    )
+    tabla = ResumenDiarioMovimientos.__table__
+    stmt = upsert_insert(db, tabla).from_select(["producto_id", "dia"] + _COLUMNAS_SUMA, origen)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tabla.c.producto_id, tabla.c.dia],
+        set_={c: tabla.c[c] + stmt.excluded[c] for c in _COLUMNAS_SUMA}
+    )
+    db.execute(stmt)
+
+def consolidar_resumen_diario(db: Session, *, tamano_lote: Optional[int] = None) -> int:
+    """
+    Tarea periodica: suma al resumen diario los movimientos pendientes
+    (consolidado = false), en lotes de `tamano_lote` movimientos. Cada lote
+    va en su transaccion: se marcan los movimientos y se suman al resumen a
+    la vez, por lo que los reportes (resumen + pendientes) nunca cuentan un
+    movimiento dos veces ni lo pierden. Durante una reconstruccion solo
+    consolida los movimientos posteriores a los que ella cubre.
+    Devuelve el numero de movimientos consolidados.
+    """
+    tamano_lote = tamano_lote or get_settings().MOVEMENT_ROLLUP_BATCH_SIZE
+
+    total = 0
+    while True:
+        marca = _bloquear_resumen(db)
+        ids = _marcar_pendientes(db, tamano_lote, desde_id=marca.ultimo_id)
+        if not ids:
+            db.rollback()
+            break
+        _consolidar_movimientos(db, ids)
+        db.execute(
+            update(MarcaAgua)
+            .where(MarcaAgua.nombre == MARCA_RESUMEN_DIARIO)
+            .values(fecha_actualizacion=datetime.now(timezone.utc))
+        )
+        db.commit()
+        total += len(ids)
+        if len(ids) < tamano_lote:
+            break
+    if total:
+        logger.info(f"Resumen diario: {total} movimientos consolidados.")
+    return total
+
+def reconstruir_resumen_diario(db: Session, *, tamano_lote: Optional[int] = None) -> int:
+    """
+    Borra el resumen diario y lo reconstruye con todos los movimientos
+    (p. ej. tras corregir movimientos o cambiar precios), por rangos de id de
+    `tamano_lote` movimientos, cada rango en su transaccion: se marcan todos
+    sus movimientos como consolidados (lo estuvieran o no) y se suman al
+    resumen. No hay un UPDATE sobre toda la tabla.
+
+    El borrado fija en la fila del cerrojo el mayor id existente (ultimo_id):
+    mientras tanto, las consolidaciones periodicas solo toman movimientos
+    posteriores, asi que ninguno se suma dos veces. Hasta que termina, los
+    reportes no cuentan los movimientos ya consolidados de los rangos aun no
+    reconstruidos. Si se interrumpe, hay que volver a ejecutarla.
+    Devuelve el numero de movimientos consolidados.
+    """
+    tamano_lote = tamano_lote or get_settings().MOVEMENT_ROLLUP_BATCH_SIZE
+    logger.info("Reconstruyendo el resumen diario de movimientos...")
+
+    marca = _bloquear_resumen(db)
+    db.execute(delete(ResumenDiarioMovimientos))
+    desde_id, hasta_id = db.execute(
+        select(func.coalesce(func.min(MovimientoModel.id) - 1, 0), func.coalesce(func.max(MovimientoModel.id), 0))
+    ).one()
+    marca.ultimo_id = hasta_id
+    marca.fecha_actualizacion = datetime.now(timezone.utc)
+    db.commit()
+
+    total = 0
+    while desde_id < hasta_id:
+        _bloquear_resumen(db)
+        fin = min(desde_id + tamano_lote, hasta_id)
+        ids = db.scalars(
+            update(MovimientoModel)
+            .where(MovimientoModel.id > desde_id, MovimientoModel.id <= fin)
+            .values(consolidado=True)
+            .returning(MovimientoModel.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if ids:
+            _consolidar_movimientos(db, ids)
+        db.commit()
+        total += len(ids)
+        desde_id = fin
+
+    # Fin de la reconstruccion: las consolidaciones vuelven a tomar todo lo pendiente
+    marca = _bloquear_resumen(db)
+    marca.ultimo_id = 0
+    marca.fecha_actualizacion = datetime.now(timezone.utc)
+    db.commit()
+    total += consolidar_resumen_diario(db, tamano_lote=tamano_lote)
+    logger.info(f"Resumen diario reconstruido con {total} movimientos.")
+    return total
@@ -0,0 +1,261 @@
+# sistema-inventarios/backend/app/services/simulacion.py
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+
+import app.crud.crud_contador_stock as crud_contador_stock
+from app.crud.crud_inventory import ORDEN_FEFO, lote_despachable, planificar_fefo
+from app.models.producto import Producto
+from app.models.lote import Lote
+from app.schemas.inventory import SmartDispatchReq
+from app.schemas.simulacion import (
+    AsignacionLote,
+    PedidoSimulado,
+    ProductoSimulado,
+    ResultadoSimulacion,
+    SimulacionDespachosReq,
+)
+
+logger = logging.getLogger(__name__)
+
+# A partir de este numero de pedidos se usa la asignacion vectorizada
+UMBRAL_VECTORIZADO = 200
+
+# (producto_id, lote_id, cantidad_actual, fecha_vencimiento), en orden FEFO por producto
+FilaLote = Tuple[int, int, int, Optional[date]]
+
+def _cargar_estado(
+    db: Session, producto_ids: List[int]
+) -> Tuple[Dict[int, int], List[FilaLote]]:
+    """
+    Lee una sola vez el disponible de los productos y sus lotes despachables.
+    Como en smart_dispatch_fefo, el disponible no puede superar lo que hay
+    en lotes despachables (no vencidos).
+    """
+    disponibles = {
+        producto_id: disponible
+        for producto_id, disponible in db.execute(
+            select(
+                Producto.id,
+                crud_contador_stock.stock_efectivo_expr()
+                - Producto.cantidad_reservada - Producto.cantidad_cuarentena
+            ).where(Producto.id.in_(producto_ids))
+        )
+    }
+    lotes = [
+        tuple(fila)
+        for fila in db.execute(
+            select(Lote.producto_id, Lote.id, Lote.cantidad_actual, Lote.fecha_vencimiento)
+            .where(Lote.producto_id.in_(producto_ids), lote_despachable())
+            .order_by(Lote.producto_id, *ORDEN_FEFO)
+        )
+    ]
+    en_lotes: Dict[int, int] = defaultdict(int)
+    for producto_id, _, cantidad, _ in lotes:
+        en_lotes[producto_id] += cantidad
+    disponibles = {
+        producto_id: min(disponible, en_lotes[producto_id])
+        for producto_id, disponible in disponibles.items()
+    }
+    return disponibles, lotes
+
+def _decidir_atendidos(
+    pedidos: List[SmartDispatchReq], disponibles: Dict[int, int]
+) -> List[bool]:
+    """
+    Aplica la misma regla que smart_dispatch_fefo: un pedido se atiende solo
+    si el disponible restante del producto alcanza. Es un recorrido O(n)
+    sobre enteros; el reparto entre lotes es lo costoso.
+    """
+    restantes = dict(disponibles)
+    atendidos = []
+    for pedido in pedidos:
+        disponible = restantes.get(pedido.producto_id)
+        atendido = disponible is not None and disponible >= pedido.cantidad
+        if atendido:
+            restantes[pedido.producto_id] = disponible - pedido.cantidad
+        atendidos.append(atendido)
+    return atendidos
+
+def asignar_secuencial(
+    pedidos: List[SmartDispatchReq],
+    atendidos: List[bool],
+    lotes: List[FilaLote]
+) -> Tuple[List[List[Tuple[int, int]]], Dict[int, int]]:
+    """
+    Reparte los pedidos atendidos con planificar_fefo, pedido por pedido.
+    Devuelve las asignaciones de cada pedido y el consumo por lote.
+    """
+    estado_por_producto: Dict[int, List[List[int]]] = defaultdict(list)
+    for producto_id, lote_id, cantidad, _ in lotes:
+        estado_por_producto[producto_id].append([lote_id, cantidad])
+
+    asignaciones: List[List[Tuple[int, int]]] = []
+    consumo: Dict[int, int] = defaultdict(int)
+    for pedido, atendido in zip(pedidos, atendidos):
+        if not atendido:
+            asignaciones.append([])
+            continue
+        estado = estado_por_producto[pedido.producto_id]
+        plan = planificar_fefo([(l[0], l[1]) for l in estado], pedido.cantidad)
+        cantidades = dict(plan)
+        for lote in estado:
+            lote[1] -= cantidades.get(lote[0], 0)
+        # Los lotes agotados quedan al frente; se descartan para el siguiente pedido
+        estado_por_producto[pedido.producto_id] = [l for l in estado if l[1] > 0]
+        for lote_id, cantidad in plan:
+            consumo[lote_id] += cantidad
+        asignaciones.append(plan)
+    return asignaciones, consumo
+
+def asignar_vectorizado(
+    pedidos: List[SmartDispatchReq],
+    atendidos: List[bool],
+    lotes: List[FilaLote]
+) -> Tuple[List[List[Tuple[int, int]]], Dict[int, int]]:
+    """
+    Reparte los pedidos atendidos con sumas acumuladas, sin recorrer lote a lote.
+
+    Para cada producto, la demanda acumulada de sus pedidos y el stock
+    acumulado de sus lotes (en orden FEFO) son dos particiones del mismo eje;
+    cada solapamiento entre el intervalo de un pedido y el de un lote es una
+    asignacion. Los productos se colocan en ventanas disjuntas del eje para
+    resolverlos todos en una sola pasada.
+    """
+    n_pedidos = len(pedidos)
+    asignaciones: List[List[Tuple[int, int]]] = [[] for _ in range(n_pedidos)]
+    if not lotes or not any(atendidos):
+        return asignaciones, {}
+
+    # Pedidos atendidos, agrupados por producto (orden estable dentro del producto)
+    ped_idx = np.flatnonzero(np.asarray(atendidos))
+    ped_prod = np.array([pedidos[i].producto_id for i in ped_idx], dtype=np.int64)
+    ped_cant = np.array([pedidos[i].cantidad for i in ped_idx], dtype=np.int64)
+    orden = np.argsort(ped_prod, kind="stable")
+    ped_idx, ped_prod, ped_cant = ped_idx[orden], ped_prod[orden], ped_cant[orden]
+
+    lote_prod = np.array([fila[0] for fila in lotes], dtype=np.int64)
+    lote_id = np.array([fila[1] for fila in lotes], dtype=np.int64)
+    lote_cant = np.array([fila[2] for fila in lotes], dtype=np.int64)
+
+    # Ventana de cada producto en el eje global: max(demanda, stock) del producto
+    productos = np.union1d(ped_prod, lote_prod)
+    demanda = np.zeros(len(productos), dtype=np.int64)
+    stock = np.zeros(len(productos), dtype=np.int64)
+    np.add.at(demanda, np.searchsorted(productos, ped_prod), ped_cant)
+    np.add.at(stock, np.searchsorted(productos, lote_prod), lote_cant)
+    ancho = np.maximum(demanda, stock)
+    base = np.concatenate(([0], np.cumsum(ancho)[:-1]))
+
+    def intervalos(prod: np.ndarray, cant: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Suma acumulada global menos la acumulada al inicio de cada grupo
+        fin_global = np.cumsum(cant)
+        inicio_grupo = np.r_[True, prod[1:] != prod[:-1]]
+        acumulado_previo = np.repeat((fin_global - cant)[inicio_grupo], np.diff(
+            np.r_[np.flatnonzero(inicio_grupo), len(prod)]
+        ))
+        fin = fin_global - acumulado_previo + base[np.searchsorted(productos, prod)]
+        return fin - cant, fin
+
+    ped_ini, ped_fin = intervalos(ped_prod, ped_cant)
+    lote_ini, lote_fin = intervalos(lote_prod, lote_cant)
+
+    # Cada tramo entre dos cortes consecutivos pertenece a un solo (pedido, lote)
+    cortes = np.unique(np.concatenate((ped_ini, ped_fin, lote_ini, lote_fin)))
+    tramo_ini, tramo_fin = cortes[:-1], cortes[1:]
+    i_ped = np.searchsorted(ped_fin, tramo_ini, side="right")
+    i_lote = np.searchsorted(lote_fin, tramo_ini, side="right")
+    validos = (i_ped < len(ped_fin)) & (i_lote < len(lote_fin))
+    i_ped, i_lote = i_ped[validos], i_lote[validos]
+    tramo_ini, tramo_fin = tramo_ini[validos], tramo_fin[validos]
+    validos = (ped_ini[i_ped] <= tramo_ini) & (lote_ini[i_lote] <= tramo_ini)
+    i_ped, i_lote = i_ped[validos], i_lote[validos]
+    longitudes = (tramo_fin - tramo_ini)[validos]
+
+    # Los tramos salen ordenados por el eje, es decir por pedido y luego en orden FEFO
+    for pedido, lote, cantidad in zip(
+        ped_idx[i_ped].tolist(), lote_id[i_lote].tolist(), longitudes.tolist()
+    ):
+        asignaciones[pedido].append((lote, cantidad))
+
+    consumo_por_lote = np.bincount(i_lote, weights=longitudes, minlength=len(lote_id))
+    consumo = {
+        int(lote): int(cantidad)
+        for lote, cantidad in zip(lote_id, consumo_por_lote)
+        if cantidad > 0
+    }
+    return asignaciones, consumo
+
+def simular_despachos(
+    db: Session,
+    *,
+    simulacion_in: SimulacionDespachosReq,
+    hoy: Optional[date] = None
+) -> ResultadoSimulacion:
+    """
+    Simula en memoria una serie de despachos FEFO sobre el estado actual de
+    los lotes, sin escribir nada. El estado se lee una sola vez; las corridas
+    grandes usan la asignacion vectorizada.
+    """
+    pedidos = simulacion_in.pedidos
+    hoy = hoy or date.today()
+    limite_vencimiento = hoy + timedelta(days=simulacion_in.dias_vencimiento)
+    producto_ids = sorted({p.producto_id for p in pedidos})
+
+    disponibles, lotes = _cargar_estado(db, producto_ids)
+    atendidos = _decidir_atendidos(pedidos, disponibles)
+
+    vectorizado = len(pedidos) >= UMBRAL_VECTORIZADO
+    asignar = asignar_vectorizado if vectorizado else asignar_secuencial
+    asignaciones, consumo = asignar(pedidos, atendidos, lotes)
+
+    despachado: Dict[int, int] = defaultdict(int)
+    for pedido, atendido in zip(pedidos, atendidos):
+        if atendido:
+            despachado[pedido.producto_id] += pedido.cantidad
+
+    por_vencer: Dict[int, int] = defaultdict(int)
+    for producto_id, lote_id, cantidad, fecha_vencimiento in lotes:
+        if fecha_vencimiento is not None and fecha_vencimiento <= limite_vencimiento:
+            por_vencer[producto_id] += cantidad - consumo.get(lote_id, 0)
+
+    resultado = ResultadoSimulacion(
+        metodo="vectorizado" if vectorizado else "secuencial",
+        pedidos_atendidos=sum(atendidos),
+        pedidos_rechazados=len(pedidos) - sum(atendidos),
+        pedidos=[
+            PedidoSimulado(
+                indice=i,
+                producto_id=pedido.producto_id,
+                cantidad=pedido.cantidad,
+                atendido=atendido,
+                asignaciones=[
+                    AsignacionLote(lote_id=lote_id, cantidad=cantidad)
+                    for lote_id, cantidad in asignacion
+                ]
+            )
+            for i, (pedido, atendido, asignacion) in enumerate(
+                zip(pedidos, atendidos, asignaciones)
+            )
+        ],
+        productos=[
+            ProductoSimulado(
+                producto_id=producto_id,
+                disponible_inicial=disponibles[producto_id],
+                cantidad_despachada=despachado[producto_id],
+                disponible_final=disponibles[producto_id] - despachado[producto_id],
+                stock_por_vencer_restante=por_vencer[producto_id]
+            )
+            for producto_id in producto_ids
+            if producto_id in disponibles
+        ]
+    )
+    logger.info(
+        f"Simulacion FEFO ({resultado.metodo}): {len(pedidos)} pedidos, "
+        f"{resultado.pedidos_atendidos} atendidos, {resultado.pedidos_rechazados} rechazados."
+    )
+    return resultado
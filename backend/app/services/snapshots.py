@@ -0,0 +1,223 @@
+# sistema-inventarios/backend/app/services/snapshots.py
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, func, case, literal, union_all
+from typing import Dict, Optional, Tuple
+
+from app.core.config import get_settings
+from app.models.lote import Lote as LoteModel
+from app.models.movimiento import Movimiento as MovimientoModel
+from app.models.snapshot_stock import CorteStock, SnapshotStockProducto, SnapshotStockLote
+from app.schemas.snapshot_stock import (
+    CorteStock as CorteStockSchema,
+    ReporteStockEnFecha,
+    StockLoteEnFecha,
+    StockProductoEnFecha,
+)
+
+logger = logging.getLogger(__name__)
+
+def cantidad_con_signo():
+    """Expresion SQL de un movimiento como delta de stock (+entrada, -salida)."""
+    return case(
+        (MovimientoModel.tipo == "entrada", MovimientoModel.cantidad),
+        else_=-MovimientoModel.cantidad
+    )
+
+def _a_utc(fecha: datetime) -> datetime:
+    """Las fechas sin zona horaria se interpretan como UTC (SQLite no guarda la zona)."""
+    if fecha.tzinfo is None:
+        return fecha.replace(tzinfo=timezone.utc)
+    return fecha.astimezone(timezone.utc)
+
+def ultimo_corte(db: Session, *, hasta: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Fecha del snapshot mas reciente con fecha_corte <= `hasta`
+    (o del ultimo, si no se indica). Usa la llave primaria de cortes_stock.
+    """
+    stmt = select(func.max(CorteStock.fecha_corte))
+    if hasta is not None:
+        stmt = stmt.where(CorteStock.fecha_corte <= hasta)
+    fecha = db.scalar(stmt)
+    return _a_utc(fecha) if fecha is not None else None
+
+def _filtro_rango(desde: Optional[datetime], hasta: datetime):
+    condiciones = [MovimientoModel.fecha_movimiento <= hasta]
+    if desde is not None:
+        condiciones.append(MovimientoModel.fecha_movimiento > desde)
+    return condiciones
+
+def tomar_snapshot(db: Session, *, fecha_corte: Optional[datetime] = None) -> CorteStockSchema:
+    """
+    Toma un snapshot de stock por lote y por producto al instante `fecha_corte`
+    (por defecto, ahora menos SNAPSHOT_LAG_SECONDS).
+
+    Se construye con dos INSERT ... SELECT: el snapshot anterior mas los
+    movimientos posteriores agrupados por lote, y luego la suma por producto.
+    Solo se leen los movimientos nuevos desde el corte anterior.
+    """
+    if fecha_corte is None:
+        fecha_corte = datetime.now(timezone.utc) - timedelta(
+            seconds=get_settings().SNAPSHOT_LAG_SECONDS
+        )
+    fecha_corte = _a_utc(fecha_corte)
+    anterior = ultimo_corte(db, hasta=fecha_corte)
+    if anterior == fecha_corte:
+        logger.info(f"Ya existe un snapshot de stock para {fecha_corte}.")
+        return resumen_corte(db, fecha_corte)
+
+    logger.info(f"Tomando snapshot de stock a {fecha_corte} (anterior: {anterior})...")
+    movimientos_nuevos = db.scalar(
+        select(func.count()).select_from(MovimientoModel)
+        .where(*_filtro_rango(anterior, fecha_corte))
+    )
+    db.add(CorteStock(
+        fecha_corte=fecha_corte,
+        movimientos_incluidos=movimientos_nuevos,
+        fecha_creacion=datetime.now(timezone.utc)
+    ))
+    db.flush()
+
+    corte = literal(fecha_corte, CorteStock.fecha_corte.type)
+    deltas = (
+        select(
+            MovimientoModel.lote_id,
+            LoteModel.producto_id,
+            cantidad_con_signo().label("cantidad")
+        )
+        .join(LoteModel, MovimientoModel.lote_id == LoteModel.id)
+        .where(*_filtro_rango(anterior, fecha_corte))
+    )
+    if anterior is not None:
+        previos = select(
+            SnapshotStockLote.lote_id,
+            SnapshotStockLote.producto_id,
+            SnapshotStockLote.cantidad
+        ).where(SnapshotStockLote.fecha_corte == anterior)
+        fuente = union_all(previos, deltas).subquery()
+    else:
+        fuente = deltas.subquery()
+
+    total_lote = func.sum(fuente.c.cantidad)
+    db.execute(
+        insert(SnapshotStockLote).from_select(
+            ["fecha_corte", "lote_id", "producto_id", "cantidad"],
+            select(corte, fuente.c.lote_id, fuente.c.producto_id, total_lote)
+            .group_by(fuente.c.lote_id, fuente.c.producto_id)
+            .having(total_lote != 0)
+        )
+    )
+
+    total_producto = func.sum(SnapshotStockLote.cantidad)
+    db.execute(
+        insert(SnapshotStockProducto).from_select(
+            ["fecha_corte", "producto_id", "cantidad"],
+            select(corte, SnapshotStockLote.producto_id, total_producto)
+            .where(SnapshotStockLote.fecha_corte == fecha_corte)
+            .group_by(SnapshotStockLote.producto_id)
+            .having(total_producto != 0)
+        )
+    )
+    db.commit()
+
+    resumen = resumen_corte(db, fecha_corte)
+    logger.info(
+        f"Snapshot de stock tomado: {resumen.productos} productos, {resumen.lotes} lotes, "
+        f"{resumen.movimientos_incluidos} movimientos nuevos."
+    )
+    return resumen
+
+def resumen_corte(db: Session, fecha_corte: datetime) -> CorteStockSchema:
+    """Resumen (conteos) de un snapshot existente."""
+    movimientos = db.scalar(
+        select(CorteStock.movimientos_incluidos).where(CorteStock.fecha_corte == fecha_corte)
+    )
+    productos = db.scalar(
+        select(func.count()).select_from(SnapshotStockProducto)
+        .where(SnapshotStockProducto.fecha_corte == fecha_corte)
+    )
+    lotes = db.scalar(
+        select(func.count()).select_from(SnapshotStockLote)
+        .where(SnapshotStockLote.fecha_corte == fecha_corte)
+    )
+    return CorteStockSchema(
+        fecha_corte=fecha_corte,
+        movimientos_incluidos=movimientos or 0,
+        productos=productos,
+        lotes=lotes
+    )
+
+def stock_en_fecha(
+    db: Session,
+    *,
+    fecha: datetime,
+    producto_id: Optional[int] = None,
+    detalle_lotes: bool = False
+) -> ReporteStockEnFecha:
+    """
+    Stock por producto (y opcionalmente por lote) al instante `fecha`.
+    Parte del snapshot mas cercano anterior a la fecha y reproduce solo los
+    movimientos entre ese corte y la fecha, asi que el costo no depende del
+    largo total del historial sino de la distancia al ultimo snapshot.
+    """
+    fecha = _a_utc(fecha)
+    corte = ultimo_corte(db, hasta=fecha)
+    logger.info(f"Calculando stock a {fecha} desde el snapshot {corte}...")
+
+    por_lote: Dict[int, Tuple[int, int]] = {}
+    por_producto: Dict[int, int] = defaultdict(int)
+
+    if corte is not None:
+        base_productos = select(
+            SnapshotStockProducto.producto_id, SnapshotStockProducto.cantidad
+        ).where(SnapshotStockProducto.fecha_corte == corte)
+        if producto_id is not None:
+            base_productos = base_productos.where(SnapshotStockProducto.producto_id == producto_id)
+        for pid, cantidad in db.execute(base_productos):
+            por_producto[pid] += cantidad
+
+        if detalle_lotes:
+            base_lotes = select(
+                SnapshotStockLote.lote_id, SnapshotStockLote.producto_id, SnapshotStockLote.cantidad
+            ).where(SnapshotStockLote.fecha_corte == corte)
+            if producto_id is not None:
+                base_lotes = base_lotes.where(SnapshotStockLote.producto_id == producto_id)
+            for lote_id, pid, cantidad in db.execute(base_lotes):
+                por_lote[lote_id] = (pid, cantidad)
+
+    # Delta: movimientos entre el corte y la fecha, agrupados por lote
+    delta = func.sum(cantidad_con_signo())
+    stmt = (
+        select(MovimientoModel.lote_id, LoteModel.producto_id, delta, func.count())
+        .join(LoteModel, MovimientoModel.lote_id == LoteModel.id)
+        .where(*_filtro_rango(corte, fecha))
+        .group_by(MovimientoModel.lote_id, LoteModel.producto_id)
+    )
+    if producto_id is not None:
+        stmt = stmt.where(LoteModel.producto_id == producto_id)
+
+    reproducidos = 0
+    for lote_id, pid, cantidad, n in db.execute(stmt):
+        reproducidos += n
+        por_producto[pid] += cantidad
+        if detalle_lotes:
+            _, previo = por_lote.get(lote_id, (pid, 0))
+            por_lote[lote_id] = (pid, previo + cantidad)
+
+    return ReporteStockEnFecha(
+        fecha=fecha,
+        fecha_corte=corte,
+        movimientos_reproducidos=reproducidos,
+        productos=[
+            StockProductoEnFecha(producto_id=pid, cantidad=cantidad)
+            for pid, cantidad in sorted(por_producto.items())
+            if cantidad != 0
+        ],
+        lotes=[
+            StockLoteEnFecha(lote_id=lote_id, producto_id=pid, cantidad=cantidad)
+            for lote_id, (pid, cantidad) in sorted(por_lote.items())
+            if cantidad != 0
+        ] if detalle_lotes else None
+    )
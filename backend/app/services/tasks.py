@@ -0,0 +1,109 @@
+# sistema-inventarios/backend/app/services/tasks.py
+import logging
+
+from app.core.config import get_settings
+from app.core.scheduler import ProgramadorTareas
+from app.crud import crud_idempotencia
+from app.crud import crud_contador_stock
+from app.services.reservations import expirador_reservas
+from app.services.snapshots import tomar_snapshot
+from app.services import outbox
+from app.services.alerts import sincronizar_alertas, purgar_alertas_inactivas
+from app.services.calendario_vencimientos import calendario_vencimientos
+from app.services import eventos_tiempo_real
+from app.services.vencidos import barrer_lotes_vencidos
+from app.services.notificaciones import despachador_notificaciones
+from app.services.resumen_diario import consolidar_resumen_diario
+
+logger = logging.getLogger(__name__)
+
+def registrar_tareas_de_proceso(programador: ProgramadorTareas) -> None:
+    """
+    Registra las tareas que mantienen el estado en memoria de cada proceso de
+    la API (heap de reservas, calendario de vencimientos, clientes SSE).
+    Corren en todos los workers; sus escrituras son condicionales y pueden
+    repetirse.
+    """
+    settings = get_settings()
+    programador.registrar(
+        "expirar_reservas",
+        settings.RESERVATION_SWEEP_INTERVAL_SECONDS,
+        expirador_reservas.barrer
+    )
+    programador.registrar(
+        "resincronizar_calendario_vencimientos",
+        settings.EXPIRY_CALENDAR_RESYNC_SECONDS,
+        calendario_vencimientos.resincronizar
+    )
+    programador.registrar(
+        "difundir_eventos_tiempo_real",
+        settings.SSE_POLL_INTERVAL_SECONDS,
+        eventos_tiempo_real.difusor_eventos.sondear
+    )
+
+def registrar_tareas_periodicas(programador: ProgramadorTareas) -> None:
+    """
+    Registra en el programador las tareas de mantenimiento globales. Deben
+    correr en un solo proceso por despliegue (`python app/cli.py programador`,
+    o la API con SCHEDULER_ENABLED y un unico worker).
+    """
+    settings = get_settings()
+    programador.registrar(
+        "purgar_claves_idempotencia",
+        3600,
+        crud_idempotencia.purgar_claves_expiradas
+    )
+    programador.registrar(
+        "consumir_outbox",
+        settings.OUTBOX_POLL_INTERVAL_SECONDS,
+        outbox.consumir_outbox
+    )
+    programador.registrar(
+        "purgar_outbox",
+        3600,
+        outbox.purgar_eventos
+    )
+    programador.registrar(
+        "purgar_eventos_tiempo_real",
+        3600,
+        eventos_tiempo_real.purgar_eventos
+    )
+    programador.registrar(
+        "sincronizar_alertas",
+        settings.ALERT_SYNC_INTERVAL_SECONDS,
+        sincronizar_alertas
+    )
+    programador.registrar(
+        "purgar_alertas",
+        settings.ALERT_PURGE_INTERVAL_SECONDS,
+        purgar_alertas_inactivas
+    )
+    programador.registrar(
+        "barrer_lotes_vencidos",
+        settings.EXPIRED_SWEEP_INTERVAL_SECONDS,
+        barrer_lotes_vencidos
+    )
+    programador.registrar(
+        "consolidar_resumen_diario",
+        settings.MOVEMENT_ROLLUP_INTERVAL_SECONDS,
+        consolidar_resumen_diario
+    )
+    programador.registrar(
+        "snapshot_stock",
+        settings.SNAPSHOT_INTERVAL_SECONDS,
+        tomar_snapshot
+    )
+
+    if settings.NOTIFY_ENABLED:
+        programador.registrar(
+            "recoger_alertas_notificar",
+            settings.NOTIFY_POLL_INTERVAL_SECONDS,
+            despachador_notificaciones.recoger_alertas_nuevas
+        )
+
+    if settings.STOCK_COUNTER_SHARDS > 0:
+        programador.registrar(
+            "consolidar_contadores_stock",
+            settings.STOCK_COUNTER_FOLD_INTERVAL_SECONDS,
+            crud_contador_stock.consolidar_contadores
+        )
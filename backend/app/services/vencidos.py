@@ -0,0 +1,53 @@
+# sistema-inventarios/backend/app/services/vencidos.py
+import logging
+from datetime import date
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.core.config import get_settings
+import app.crud.crud_inventory as crud_inventory
+import app.services.alerts as alerts_service
+
+logger = logging.getLogger(__name__)
+
+def barrer_lotes_vencidos(
+    db: Session,
+    *,
+    hoy: Optional[date] = None,
+    tamano_lote: Optional[int] = None
+) -> int:
+    """
+    Tarea diaria: pone en cuarentena los lotes con stock cuya fecha de
+    vencimiento ya paso. Por bloques de `tamano_lote` lotes, cada uno en su
+    transaccion: marca los lotes (salen del indice de despacho), suma sus
+    unidades a la cuarentena del producto y actualiza la alerta consolidada
+    "vencido" de esos productos.
+    Devuelve el numero de lotes puestos en cuarentena.
+    """
+    hoy = hoy or date.today()
+    tamano_lote = tamano_lote or get_settings().EXPIRED_SWEEP_BATCH_SIZE
+    total_lotes = total_unidades = 0
+    while True:
+        try:
+            lotes, unidades_por_producto = crud_inventory.marcar_lotes_vencidos(
+                db, hoy=hoy, limite=tamano_lote
+            )
+            if lotes:
+                alerts_service.evaluar_alertas_incrementales(
+                    db, producto_ids=unidades_por_producto.keys()
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        total_lotes += lotes
+        total_unidades += sum(unidades_por_producto.values())
+        # Los lotes marcados dejan de ser candidatos: el siguiente bloque avanza
+        if lotes < tamano_lote:
+            break
+    if total_lotes:
+        logger.info(
+            f"Barrido de vencidos: {total_lotes} lotes en cuarentena "
+            f"({total_unidades} unidades)."
+        )
+    return total_lotes
@@ -1,12 +1,13 @@
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 
 from app.models.producto import Producto
 from app.models.lote import Lote
 from app.models.alerta import Alerta # Nuevo import
 from app.crud import crud_alerta # Nuevo import
 from app.schemas.alerta import AlertaCreate # Nuevo import
+from app.services.alerts import sincronizar_alertas
 
 def test_get_low_stock_alert(
     test_client: TestClient, 
@@ -28,12 +29,15 @@ def test_get_low_stock_alert(
     db_session.commit()
     db_session.refresh(producto_bajo_stock)
 
-    # La primera llamada al endpoint activara la gestion de alertas
-    # para crear la alerta de stock minimo
+    # El GET solo lee: sin sincronizar todavia no hay alerta para el producto
     response = test_client.get("/api/v1/alertas/stock-minimo")
     assert response.status_code == 200
+    assert producto_bajo_stock.id not in [a["entidad_id"] for a in response.json()]
+
+    # La tarea periodica es la que crea la alerta de stock minimo
+    sincronizar_alertas(db_session)
     
-    # ETAPA 2: LA PRUEBA - Llamar al endpoint nuevamente para obtener la alerta generada
+    # ETAPA 2: LA PRUEBA - Llamar al endpoint para obtener la alerta generada
     response = test_client.get("/api/v1/alertas/stock-minimo")
 
     assert response.status_code == 200
@@ -89,12 +93,10 @@ def test_get_expiring_lotes_alert(
     db_session.commit()
     db_session.refresh(lote_expirando)
 
-    # La primera llamada al endpoint activara la gestion de alertas
-    # para crear la alerta de lote por vencer
-    response = test_client.get("/api/v1/alertas/por-vencer?days=30")
-    assert response.status_code == 200
+    # La tarea periodica es la que crea la alerta de lote por vencer
+    sincronizar_alertas(db_session)
 
-    # ETAPA 2: LA PRUEBA - Llamar al endpoint nuevamente para obtener la alerta generada
+    # ETAPA 2: LA PRUEBA - Llamar al endpoint para obtener la alerta generada
     response = test_client.get("/api/v1/alertas/por-vencer?days=30")
 
     assert response.status_code == 200
@@ -108,7 +110,7 @@ def test_get_expiring_lotes_alert(
     found_alert = False
     for alerta_dict in data:
         if (
-            alerta_dict["tipo_alerta"] == "por_vencer_30"
+            alerta_dict["tipo_alerta"] == "por_vencer_15"
             and alerta_dict["entidad_id"] == lote_expirando.id
             and alerta_dict["entidad_tipo"] == "lote"
             and alerta_dict["esta_activa"] == True
@@ -117,4 +119,133 @@ def test_get_expiring_lotes_alert(
             assert "Lote Vencimiento" in alerta_dict["mensaje"]
             assert alerta_dict["metadata_json"]["producto_sku"] == "SKU-LOTE-VENCE"
             break
-    assert found_alert, "No se encontro la alerta de lote por vencer para el lote creado"
\ No newline at end of file
+    assert found_alert, "No se encontro la alerta de lote por vencer para el lote creado"
+
+
+def test_get_expiring_lotes_alert_rejects_threshold_beyond_tiers(test_client: TestClient):
+    """
+    Prueba que un umbral mayor que el mayor tramo de alerta devuelve 400.
+    GET /api/v1/alertas/por-vencer?days=61
+    """
+    response = test_client.get("/api/v1/alertas/por-vencer?days=61")
+
+    assert response.status_code == 400
+    assert "fuera de los tramos" in response.json()["detail"]
+
+
+def test_expiring_alerts_use_tightest_tier_and_filter_by_date(
+    test_client: TestClient,
+    db_session: Session
+):
+    """
+    Prueba que cada lote tiene una sola alerta, en su tramo mas estrecho,
+    que cambia de tramo al acercarse el vencimiento, y que cualquier
+    umbral de dias se responde filtrando por fecha.
+    """
+    # ETAPA 1: SETUP - Lotes a 3, 12, 45 y 90 dias
+    producto = Producto(nombre="Tramos", sku="SKU-TRAMOS", precio=1.0, stock_minimo=0)
+    db_session.add(producto)
+    db_session.commit()
+    lotes = [
+        Lote(producto_id=producto.id, cantidad_recibida=5, fecha_vencimiento=date.today() + timedelta(days=d))
+        for d in (3, 12, 45, 90)
+    ]
+    db_session.add_all(lotes)
+    db_session.commit()
+    sincronizar_alertas(db_session)
+
+    def tipos_activos():
+        return {
+            a.entidad_id: a.tipo_alerta
+            for a in db_session.query(Alerta).filter(Alerta.entidad_tipo == "lote", Alerta.esta_activa == True)
+        }
+
+    # ETAPA 2: Un tipo por tramo, ninguna alerta fuera del mayor tramo
+    assert tipos_activos() == {
+        lotes[0].id: "por_vencer_7",
+        lotes[1].id: "por_vencer_15",
+        lotes[2].id: "por_vencer_60",
+    }
+
+    # ETAPA 3: Umbrales arbitrarios sin nuevos tipos de alerta
+    response = test_client.get("/api/v1/alertas/por-vencer?days=12")
+    assert response.status_code == 200
+    assert [a["entidad_id"] for a in response.json()] == [lotes[0].id, lotes[1].id]
+    assert response.json()[0]["fecha_vencimiento"] == str(lotes[0].fecha_vencimiento)
+
+    # ETAPA 4: El lote a 45 dias pasa a vencer en 20 -> cambia a tramo 30
+    lotes[2].fecha_vencimiento = date.today() + timedelta(days=20)
+    db_session.commit()
+    sincronizar_alertas(db_session)
+    assert tipos_activos()[lotes[2].id] == "por_vencer_30"
+    assert db_session.query(Alerta).filter(
+        Alerta.entidad_id == lotes[2].id, Alerta.tipo_alerta == "por_vencer_60"
+    ).one().esta_activa == False
+
+
+def test_list_alerts_cursor_pagination_and_since(
+    test_client: TestClient,
+    db_session: Session
+):
+    """
+    Prueba el listado paginado por cursor (fecha_creacion, id), con empates
+    de fecha, y el filtro `since` por fecha de ultimo cambio.
+    GET /api/v1/alertas
+    """
+    # ETAPA 1: SETUP - 5 alertas, dos con la misma fecha de creacion
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    fechas = [base, base + timedelta(minutes=1), base + timedelta(minutes=1),
+              base + timedelta(minutes=2), base + timedelta(minutes=3)]
+    alertas = [
+        Alerta(tipo_alerta="stock_minimo", entidad_id=i, entidad_tipo="producto",
+               mensaje=f"Alerta {i}", fecha_creacion=f, fecha_actualizacion=f)
+        for i, f in enumerate(fechas)
+    ]
+    db_session.add_all(alertas)
+    db_session.commit()
+
+    # ETAPA 2: Recorrer todas las paginas (todas con el mismo sincronizado_hasta)
+    vistas, cursor, paginas, marcas = [], None, 0, set()
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        pagina = test_client.get("/api/v1/alertas", params=params).json()
+        vistas += [a["id"] for a in pagina["alertas"]]
+        marcas.add(pagina["sincronizado_hasta"])
+        paginas += 1
+        cursor = pagina["siguiente_cursor"]
+        if cursor is None:
+            break
+    assert paginas == 3
+    assert vistas == [a.id for a in alertas]
+    assert len(marcas) == 1
+
+    # ETAPA 3: Sincronizacion incremental - una alerta se resuelve despues
+    crud_alerta.deactivate_alerta(db_session, alertas[1].id)
+    since = (base + timedelta(minutes=5)).isoformat()
+    activas = test_client.get("/api/v1/alertas", params={"since": since}).json()
+    assert activas["alertas"] == []
+    cambios = test_client.get(
+        "/api/v1/alertas", params={"since": since, "incluir_resueltas": True}
+    ).json()
+    assert [(a["id"], a["esta_activa"]) for a in cambios["alertas"]] == [(alertas[1].id, False)]
+
+    # ETAPA 4: Un cambio fechado antes de la respuesta pero comiteado despues
+    # entra en la sincronizacion siguiente (since = sincronizado_hasta)
+    sincronizado_hasta = datetime.fromisoformat(
+        test_client.get("/api/v1/alertas").json()["sincronizado_hasta"]
+    )
+    tardia = Alerta(
+        tipo_alerta="stock_minimo", entidad_id=99, entidad_tipo="producto", mensaje="Tardia",
+        fecha_creacion=sincronizado_hasta + timedelta(seconds=1),
+        fecha_actualizacion=sincronizado_hasta + timedelta(seconds=1)
+    )
+    db_session.add(tardia)
+    db_session.commit()
+    siguiente = test_client.get(
+        "/api/v1/alertas", params={"since": sincronizado_hasta.isoformat()}
+    ).json()
+    assert [a["id"] for a in siguiente["alertas"]] == [tardia.id]
+
+    # ETAPA 5: Cursor invalido
+    response = test_client.get("/api/v1/alertas", params={"cursor": "no-es-un-cursor"})
+    assert response.status_code == 400
@@ -1,7 +1,13 @@
 # sistema-inventarios/backend/tests/api/test_inventory.py
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
 from datetime import date, timedelta
 
+from app.crud import crud_idempotencia
+from app.schemas.inventory import SmartDispatchReq
+from app.services.idempotency import calcular_hash_peticion
+
 def test_register_inventory_entry(test_client: TestClient, product_in_db: dict):
     """
     Prueba para POST /api/v1/entradas (Task 3.1).
@@ -214,4 +220,182 @@ def test_fefo_smart_dispatch(test_client: TestClient, product_in_db: dict):
     
     # 3.3: Producto debe tener 30 en total
     product_response = test_client.get(f"/api/v1/productos/{product_id}")
-    assert product_response.json()["cantidad_actual"] == 30 # 100 - 70
\ No newline at end of file
+    assert product_response.json()["cantidad_actual"] == 30 # 100 - 70
+
+def test_idempotent_entry_replay(test_client: TestClient, product_in_db: dict):
+    """
+    Prueba que un reintento con la misma Idempotency-Key devuelve
+    la respuesta original sin crear un segundo lote.
+    """
+    product_id = product_in_db["id"]
+    entry_data = {
+        "producto_id": product_id,
+        "cantidad_recibida": 40,
+        "fecha_vencimiento": (date.today() + timedelta(days=30)).isoformat()
+    }
+    headers = {"Idempotency-Key": "test-entrada-idem-001"}
+
+    # ETAPA 1: Primera peticion y su reintento
+    first = test_client.post("/api/v1/inventario/entradas", json=entry_data, headers=headers)
+    assert first.status_code == 201
+    replay = test_client.post("/api/v1/inventario/entradas", json=entry_data, headers=headers)
+
+    # ETAPA 2: VERIFICACION
+    assert replay.status_code == 201
+    assert replay.json() == first.json()
+    assert replay.headers["Idempotent-Replayed"] == "true"
+
+    # El stock solo se sumo una vez
+    product_response = test_client.get(f"/api/v1/productos/{product_id}")
+    assert product_response.json()["cantidad_actual"] == 40
+
+
+def test_idempotent_dispatch_replay_and_conflict(test_client: TestClient, product_in_db: dict):
+    """
+    Prueba la idempotencia del despacho FEFO y el rechazo (422) de una clave
+    reutilizada con un cuerpo distinto.
+    """
+    product_id = product_in_db["id"]
+    entry_data = {"producto_id": product_id, "cantidad_recibida": 50}
+    assert test_client.post("/api/v1/inventario/entradas", json=entry_data).status_code == 201
+
+    headers = {"Idempotency-Key": "test-despacho-idem-001"}
+    dispatch_data = {"producto_id": product_id, "cantidad": 20}
+
+    first = test_client.post("/api/v1/inventario/despachar", json=dispatch_data, headers=headers)
+    assert first.status_code == 200
+    replay = test_client.post("/api/v1/inventario/despachar", json=dispatch_data, headers=headers)
+    assert replay.status_code == 200
+    assert replay.json() == first.json()
+
+    product_response = test_client.get(f"/api/v1/productos/{product_id}")
+    assert product_response.json()["cantidad_actual"] == 30 # 50 - 20, una sola vez
+
+    conflict = test_client.post(
+        "/api/v1/inventario/despachar",
+        json={"producto_id": product_id, "cantidad": 5},
+        headers=headers
+    )
+    assert conflict.status_code == 422
+
+
+def test_idempotency_key_reserved_before_mutation(
+    test_client: TestClient, db_session: Session, product_in_db: dict
+):
+    """
+    Prueba que la clave se reserva antes de la operacion: un duplicado
+    mientras la original sigue en curso recibe 409, y una operacion que
+    falla (stock insuficiente) libera la clave para el reintento.
+    """
+    product_id = product_in_db["id"]
+    dispatch_data = {"producto_id": product_id, "cantidad": 10}
+    headers = {"Idempotency-Key": "test-despacho-idem-002"}
+
+    # ETAPA 1: Sin stock -> 400 y la clave queda libre
+    fallida = test_client.post("/api/v1/inventario/despachar", json=dispatch_data, headers=headers)
+    assert fallida.status_code == 400
+    assert crud_idempotencia.get_clave_vigente(
+        db_session, endpoint="despachar", clave=headers["Idempotency-Key"]
+    ) is None
+
+    # ETAPA 2: Con stock, el reintento con la misma clave se ejecuta
+    entry_data = {"producto_id": product_id, "cantidad_recibida": 50}
+    assert test_client.post("/api/v1/inventario/entradas", json=entry_data).status_code == 201
+    assert test_client.post("/api/v1/inventario/despachar", json=dispatch_data, headers=headers).status_code == 200
+
+    # ETAPA 3: Una clave reservada por otra peticion aun en curso -> 409, sin aplicar la salida
+    assert crud_idempotencia.reservar_clave(
+        db_session,
+        endpoint="despachar",
+        clave="test-despacho-idem-003",
+        hash_peticion=calcular_hash_peticion(SmartDispatchReq(**dispatch_data)),
+        ttl_seconds=60
+    )
+    en_curso = test_client.post(
+        "/api/v1/inventario/despachar",
+        json=dispatch_data,
+        headers={"Idempotency-Key": "test-despacho-idem-003"}
+    )
+    assert en_curso.status_code == 409
+    product_response = test_client.get(f"/api/v1/productos/{product_id}")
+    assert product_response.json()["cantidad_actual"] == 40
+
+
+def test_idempotent_response_commits_with_the_mutation(
+    test_client: TestClient, db_session: Session, product_in_db: dict, monkeypatch
+):
+    """
+    Prueba que la respuesta idempotente se guarda en la misma transaccion
+    que la operacion: si falla al guardarla, la entrada se deshace y la
+    clave se libera, asi que el reintento la ejecuta una sola vez.
+    """
+    product_id = product_in_db["id"]
+    entry_data = {"producto_id": product_id, "cantidad_recibida": 10}
+    headers = {"Idempotency-Key": "test-entrada-idem-atomica"}
+
+    # ETAPA 1: Falla al guardar la respuesta (despues de aplicar la entrada)
+    def completar_con_error(*args, **kwargs):
+        raise RuntimeError("Fallo simulado al guardar la respuesta")
+    with monkeypatch.context() as m:
+        m.setattr(crud_idempotencia, "completar_clave", completar_con_error)
+        with pytest.raises(RuntimeError):
+            test_client.post("/api/v1/inventario/entradas", json=entry_data, headers=headers)
+
+    product_response = test_client.get(f"/api/v1/productos/{product_id}")
+    assert product_response.json()["cantidad_actual"] == 0
+    assert crud_idempotencia.get_clave_vigente(
+        db_session, endpoint="entradas", clave=headers["Idempotency-Key"]
+    ) is None
+
+    # ETAPA 2: El reintento se ejecuta y su repeticion ya no
+    assert test_client.post("/api/v1/inventario/entradas", json=entry_data, headers=headers).status_code == 201
+    replay = test_client.post("/api/v1/inventario/entradas", json=entry_data, headers=headers)
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    product_response = test_client.get(f"/api/v1/productos/{product_id}")
+    assert product_response.json()["cantidad_actual"] == 10
+
+
+def test_idempotency_reservation_of_a_dead_request_expires(
+    test_client: TestClient, db_session: Session, product_in_db: dict
+):
+    """
+    Prueba que la reserva de una peticion que murio sin responder no
+    bloquea la clave: pasada su vigencia corta el reintento se ejecuta, y
+    la peticion original (si siguiera viva) ya no puede confirmar su
+    operacion con una reserva que otro tomo.
+    """
+    product_id = product_in_db["id"]
+    entry_data = {"producto_id": product_id, "cantidad_recibida": 50}
+    assert test_client.post("/api/v1/inventario/entradas", json=entry_data).status_code == 201
+    dispatch_data = {"producto_id": product_id, "cantidad": 10}
+    clave = "test-despacho-idem-vencida"
+
+    # ETAPA 1: Reserva de una peticion interrumpida, ya vencida
+    reservada_en = crud_idempotencia.reservar_clave(
+        db_session,
+        endpoint="despachar",
+        clave=clave,
+        hash_peticion=calcular_hash_peticion(SmartDispatchReq(**dispatch_data)),
+        ttl_seconds=0
+    )
+    assert reservada_en is not None
+
+    # ETAPA 2: El reintento la reemplaza y se ejecuta
+    reintento = test_client.post(
+        "/api/v1/inventario/despachar", json=dispatch_data, headers={"Idempotency-Key": clave}
+    )
+    assert reintento.status_code == 200
+
+    # ETAPA 3: La reserva original ya no es suya
+    assert not crud_idempotencia.completar_clave(
+        db_session,
+        endpoint="despachar",
+        clave=clave,
+        reservada_en=reservada_en,
+        codigo_estado=200,
+        respuesta=[],
+        ttl_seconds=60
+    )
+    db_session.rollback()
+    product_response = test_client.get(f"/api/v1/productos/{product_id}")
+    assert product_response.json()["cantidad_actual"] == 40
@@ -1,8 +1,16 @@
+import json
+import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 
 from app.models.producto import Producto
+from app.models.lote import Lote
+from app.models.movimiento import Movimiento
+from app.core.config import get_settings
+from app.core.exceptions import ExportFormatUnavailableError
+import app.services.exportacion as exportacion
+import app.services.reports as reports_service
 
 def test_top_available_products_response(test_client: TestClient, db_session: Session):
     """
@@ -29,4 +37,164 @@ def test_top_available_products_response(test_client: TestClient, db_session: Se
     assert len(data) == 3
     assert data[0]["sku"] == "SKU-C"  # Cantidad 80
     assert data[1]["sku"] == "SKU-A"  # Cantidad 50
-    assert data[2]["sku"] == "SKU-B"  # Cantidad 20
\ No newline at end of file
+    assert data[2]["sku"] == "SKU-B"  # Cantidad 20
+
+def test_movement_summary_groups_in_database(test_client: TestClient, db_session: Session):
+    """
+    Prueba el resumen de movimientos agrupado por dia y por mes, y que el
+    reporte detallado de movimientos responde con las filas del rango.
+    GET /api/v1/reportes/movimientos-resumen
+    """
+    # ETAPA 1: SETUP - Movimientos en tres dias de dos meses
+    producto = Producto(nombre="Resumen", sku="SKU-RESUMEN", precio=1.0, cantidad_actual=0, stock_minimo=0)
+    db_session.add(producto)
+    db_session.flush()
+    lote = Lote(producto_id=producto.id, cantidad_recibida=100)
+    db_session.add(lote)
+    db_session.flush()
+    movimientos = [
+        ("entrada", 100, datetime(2025, 1, 30, 9, 0)),
+        ("salida", 10, datetime(2025, 1, 30, 18, 0)),
+        ("salida", 5, datetime(2025, 1, 31, 12, 0)),
+        ("salida", 7, datetime(2025, 2, 3, 8, 0)),
+    ]
+    db_session.add_all([
+        Movimiento(lote_id=lote.id, tipo=tipo, cantidad=cantidad, fecha_movimiento=fecha)
+        for tipo, cantidad, fecha in movimientos
+    ])
+    db_session.commit()
+    rango = f"fecha_inicio=2025-01-30&fecha_fin=2025-02-03&producto_id={producto.id}"
+
+    # ETAPA 2 y 3: Por dia (fecha_fin incluida)
+    response = test_client.get(f"/api/v1/reportes/movimientos-resumen?{rango}")
+    assert response.status_code == 200
+    assert [(r["periodo"], r["tipo"], r["cantidad_total"], r["num_movimientos"]) for r in response.json()] == [
+        ("2025-01-30", "entrada", 100, 1),
+        ("2025-01-30", "salida", 10, 1),
+        ("2025-01-31", "salida", 5, 1),
+        ("2025-02-03", "salida", 7, 1),
+    ]
+
+    # Por semana (lunes) y por mes
+    semanas = test_client.get(f"/api/v1/reportes/movimientos-resumen?{rango}&periodo=semana").json()
+    assert [(r["periodo"], r["tipo"], r["cantidad_total"]) for r in semanas] == [
+        ("2025-01-27", "entrada", 100), ("2025-01-27", "salida", 15), ("2025-02-03", "salida", 7)
+    ]
+    meses = test_client.get(f"/api/v1/reportes/movimientos-resumen?{rango}&periodo=mes").json()
+    assert [(r["periodo"], r["tipo"], r["cantidad_total"], r["num_movimientos"]) for r in meses] == [
+        ("2025-01-01", "entrada", 100, 1), ("2025-01-01", "salida", 15, 2), ("2025-02-01", "salida", 7, 1)
+    ]
+
+    # Rango invertido
+    response = test_client.get(
+        "/api/v1/reportes/movimientos-resumen?fecha_inicio=2025-02-03&fecha_fin=2025-01-30"
+    )
+    assert response.status_code == 400
+
+    # El reporte detallado tambien responde
+    response = test_client.get(
+        "/api/v1/reportes/movimientos-por-rango-fecha?fecha_inicio=2025-01-30&fecha_fin=2025-02-01"
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+
+def test_movement_report_streaming_export(test_client: TestClient, db_session: Session, monkeypatch):
+    """
+    Prueba la exportacion en streaming (CSV y NDJSON) del reporte de
+    movimientos, leyendo y enviando por bloques pequenos.
+    GET /api/v1/reportes/movimientos-por-rango-fecha?formato=csv|ndjson
+    """
+    # ETAPA 1: SETUP - Cinco salidas y bloques de 2 filas
+    monkeypatch.setattr(get_settings(), "EXPORT_BATCH_SIZE", 2)
+    producto = Producto(nombre="Export", sku="SKU-EXPORT", precio=1.0, cantidad_actual=0, stock_minimo=0)
+    db_session.add(producto)
+    db_session.flush()
+    lote = Lote(producto_id=producto.id, cantidad_recibida=50)
+    db_session.add(lote)
+    db_session.flush()
+    db_session.add_all([
+        Movimiento(lote_id=lote.id, tipo="salida", cantidad=i + 1, fecha_movimiento=datetime(2025, 5, 1, 8 + i))
+        for i in range(5)
+    ])
+    db_session.commit()
+    rango = "fecha_inicio=2025-05-01&fecha_fin=2025-05-02"
+
+    # ETAPA 2 y 3: CSV
+    response = test_client.get(f"/api/v1/reportes/movimientos-por-rango-fecha?{rango}&formato=csv")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "movimientos_2025-05-01_2025-05-02.csv" in response.headers["content-disposition"]
+    lineas = response.text.splitlines()
+    assert lineas[0] == "id,fecha_movimiento,producto_id,lote_id,tipo,cantidad"
+    assert [linea.split(",")[-1] for linea in lineas[1:]] == ["1", "2", "3", "4", "5"]
+    assert lineas[1].split(",")[1] == "2025-05-01T08:00:00"
+
+    # NDJSON
+    response = test_client.get(f"/api/v1/reportes/movimientos-por-rango-fecha?{rango}&formato=ndjson")
+    assert response.status_code == 200
+    filas = [json.loads(linea) for linea in response.text.splitlines()]
+    assert [f["cantidad"] for f in filas] == [1, 2, 3, 4, 5]
+    assert all(f["producto_id"] == producto.id and f["tipo"] == "salida" for f in filas)
+
+
+def test_export_encoders_emit_chunks():
+    """Prueba que los codificadores envian la cabecera sola y luego un bloque por cada N filas."""
+    filas = [(i, datetime(2025, 1, 1, i)) for i in range(5)]
+    bloques = list(exportacion.generar_csv(("id", "fecha"), iter(filas), filas_por_bloque=2))
+    assert bloques[0] == "id,fecha\r\n"
+    assert len(bloques) == 4
+    assert list(exportacion.generar_ndjson(("id", "fecha"), [], filas_por_bloque=2)) == []
+
+
+def test_columnar_report_export(test_client: TestClient, db_session: Session, monkeypatch):
+    """
+    Prueba la exportacion en Parquet y Arrow IPC (un row group / record
+    batch por bloque) y el 501 cuando pyarrow no esta instalado.
+    GET /api/v1/reportes/{inventario-basico,movimientos-por-rango-fecha}?formato=parquet|arrow
+    """
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    # ETAPA 1: SETUP - Tres salidas y bloques de 2 filas
+    monkeypatch.setattr(get_settings(), "EXPORT_BATCH_SIZE", 2)
+    producto = Producto(nombre="Columnar", sku="SKU-COLUMNAR", precio=1.5, cantidad_actual=7, stock_minimo=0)
+    db_session.add(producto)
+    db_session.flush()
+    lote = Lote(producto_id=producto.id, cantidad_recibida=50)
+    db_session.add(lote)
+    db_session.flush()
+    db_session.add_all([
+        Movimiento(lote_id=lote.id, tipo="salida", cantidad=i + 1, fecha_movimiento=datetime(2025, 6, 1, 8 + i))
+        for i in range(3)
+    ])
+    db_session.commit()
+    rango = "fecha_inicio=2025-06-01&fecha_fin=2025-06-02"
+
+    # ETAPA 2: Arrow IPC -> dos record batches
+    response = test_client.get(f"/api/v1/reportes/movimientos-por-rango-fecha?{rango}&formato=arrow")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    lector = pyarrow.ipc.open_stream(response.content)
+    tabla = lector.read_all()
+    assert tabla.column_names == [nombre for nombre, _ in reports_service.COLUMNAS_MOVIMIENTOS]
+    assert len(tabla.to_batches()) == 2
+    assert tabla.column("cantidad").to_pylist() == [1, 2, 3]
+    assert tabla.schema.field("fecha_movimiento").type == pa.timestamp("us", tz="UTC")
+
+    # ETAPA 3: Parquet del inventario
+    response = test_client.get("/api/v1/reportes/inventario-basico?formato=parquet")
+    assert response.status_code == 200
+    archivo = pyarrow.parquet.ParquetFile(pa.BufferReader(response.content))
+    df = archivo.read().to_pandas()
+    fila = df[df["sku"] == "SKU-COLUMNAR"].iloc[0]
+    assert (fila["precio"], fila["cantidad_actual"]) == (1.5, 7)
+
+    # ETAPA 4: Sin pyarrow -> 501
+    def sin_pyarrow(formato):
+        raise ExportFormatUnavailableError(formato, "pyarrow")
+    monkeypatch.setattr(exportacion, "_importar_pyarrow", sin_pyarrow)
+    response = test_client.get("/api/v1/reportes/inventario-basico?formato=arrow")
+    assert response.status_code == 501
+    assert "pyarrow" in response.json()["detail"]
@@ -0,0 +1,111 @@
+# sistema-inventarios/backend/tests/api/test_reservations.py
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+
+from app.models.producto import Producto
+from app.models.reserva import Reserva
+from app.services.reservations import ExpiradorReservas
+
+
+def _stock_inicial(test_client: TestClient, product_id: int, cantidad: int) -> None:
+    entry_data = {"producto_id": product_id, "cantidad_recibida": cantidad}
+    assert test_client.post("/api/v1/inventario/entradas", json=entry_data).status_code == 201
+
+
+def test_reservation_reduces_available_stock(test_client: TestClient, product_in_db: dict):
+    """
+    Prueba que una reserva reduce el disponible sin crear movimientos
+    y que el despacho FEFO y las salidas por lote respetan las reservas.
+    """
+    product_id = product_in_db["id"]
+    _stock_inicial(test_client, product_id, 100)
+
+    # ETAPA 1: Reservar 70 unidades
+    response = test_client.post("/api/v1/reservas/", json={"producto_id": product_id, "cantidad": 70})
+    assert response.status_code == 201
+    reserva = response.json()
+    assert reserva["estado"] == "activa"
+
+    # ETAPA 2: VERIFICACION del disponible
+    atp = test_client.get(f"/api/v1/inventario/disponibilidad/{product_id}").json()
+    assert atp == {
+        "producto_id": product_id,
+        "cantidad_actual": 100,
+        "cantidad_reservada": 70,
+        "cantidad_cuarentena": 0,
+        "disponible": 30
+    }
+
+    # No se puede despachar ni reservar por encima del disponible
+    dispatch = test_client.post("/api/v1/inventario/despachar", json={"producto_id": product_id, "cantidad": 31})
+    assert dispatch.status_code == 400
+    lote_id = test_client.get("/api/v1/inventario/lotes").json()[0]["id"]
+    salida = test_client.post("/api/v1/inventario/salidas", json={"lote_id": lote_id, "cantidad": 31})
+    assert salida.status_code == 400
+    assert test_client.get("/api/v1/inventario/lotes").json()[0]["cantidad_actual"] == 100
+    salida = test_client.post("/api/v1/inventario/salidas", json={"lote_id": lote_id, "cantidad": 30})
+    assert salida.status_code == 201
+    dispatch = test_client.post("/api/v1/inventario/despachar", json={"producto_id": product_id, "cantidad": 1})
+    assert dispatch.status_code == 400
+    second = test_client.post("/api/v1/reservas/", json={"producto_id": product_id, "cantidad": 31})
+    assert second.status_code == 400
+
+    # ETAPA 3: Liberar la reserva devuelve el disponible
+    release = test_client.delete(f"/api/v1/reservas/{reserva['id']}")
+    assert release.status_code == 200
+    assert release.json()["estado"] == "liberada"
+    atp = test_client.get(f"/api/v1/inventario/disponibilidad/{product_id}").json()
+    assert atp["disponible"] == 70
+
+    # Una reserva cerrada no se puede liberar de nuevo
+    assert test_client.delete(f"/api/v1/reservas/{reserva['id']}").status_code == 409
+
+
+def test_confirm_reservation_dispatches(test_client: TestClient, product_in_db: dict):
+    """
+    Prueba que confirmar una reserva la cierra y despacha su cantidad con FEFO.
+    """
+    product_id = product_in_db["id"]
+    _stock_inicial(test_client, product_id, 50)
+    reserva = test_client.post("/api/v1/reservas/", json={"producto_id": product_id, "cantidad": 20}).json()
+
+    response = test_client.post(f"/api/v1/reservas/{reserva['id']}/confirmar")
+    assert response.status_code == 200
+    assert sum(m["cantidad"] for m in response.json()) == 20
+
+    atp = test_client.get(f"/api/v1/inventario/disponibilidad/{product_id}").json()
+    assert atp == {
+        "producto_id": product_id,
+        "cantidad_actual": 30,
+        "cantidad_reservada": 0,
+        "cantidad_cuarentena": 0,
+        "disponible": 30
+    }
+    assert test_client.get(f"/api/v1/reservas/{reserva['id']}").json()["estado"] == "confirmada"
+
+
+def test_expired_reservations_are_swept(db_session: Session, product_model_in_db: Producto):
+    """
+    Prueba que el barrido expira las reservas vencidas y libera su stock.
+    """
+    # ETAPA 1: SETUP - Una reserva vencida y otra vigente
+    product_model_in_db.cantidad_actual = 100
+    product_model_in_db.cantidad_reservada = 30
+    ahora = datetime.now()
+    vencida = Reserva(producto_id=product_model_in_db.id, cantidad=10, fecha_expiracion=ahora - timedelta(seconds=1))
+    vigente = Reserva(producto_id=product_model_in_db.id, cantidad=20, fecha_expiracion=ahora + timedelta(hours=1))
+    db_session.add_all([vencida, vigente])
+    db_session.commit()
+
+    # ETAPA 2: LA PRUEBA
+    expirador = ExpiradorReservas()
+    assert expirador.barrer(db_session, ahora=ahora) == 1
+    # Un segundo barrido no encuentra nada vencido (y no consulta la tabla)
+    assert expirador.barrer(db_session, ahora=ahora) == 0
+
+    # ETAPA 3: VERIFICACION
+    db_session.expire_all()
+    assert db_session.get(Reserva, vencida.id).estado == "expirada"
+    assert db_session.get(Reserva, vigente.id).estado == "activa"
+    assert db_session.get(Producto, product_model_in_db.id).cantidad_reservada == 20
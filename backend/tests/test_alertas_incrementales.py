@@ -0,0 +1,57 @@
+# sistema-inventarios/backend/tests/test_alertas_incrementales.py
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.alerta import Alerta
+from app.services.outbox import consumir_outbox
+
+
+def _activas(db_session: Session, tipo_alerta: str, entidad_id: int):
+    return db_session.query(Alerta).filter(
+        Alerta.tipo_alerta == tipo_alerta,
+        Alerta.entidad_id == entidad_id,
+        Alerta.esta_activa == True
+    ).all()
+
+
+def test_stock_changes_update_alerts_incrementally(test_client: TestClient, db_session: Session):
+    """
+    Prueba que los eventos de stock abren y cierran las alertas de los
+    productos y lotes afectados sin barrido completo.
+    """
+    # ETAPA 1: SETUP - Producto nuevo bajo su stock minimo
+    producto = test_client.post("/api/v1/productos/", json={
+        "nombre": "Incremental", "sku": "SKU-INC-1", "precio": 1.0,
+        "cantidad_actual": 0, "stock_minimo": 10
+    }).json()
+    consumir_outbox(db_session)
+    assert len(_activas(db_session, "stock_minimo", producto["id"])) == 1
+
+    # ETAPA 2: Entrada con un lote que vence pronto -> cierra stock minimo, abre por vencer
+    lote = test_client.post("/api/v1/inventario/entradas", json={
+        "producto_id": producto["id"],
+        "cantidad_recibida": 12,
+        "fecha_vencimiento": str(date.today() + timedelta(days=10))
+    }).json()
+    consumir_outbox(db_session)
+    assert _activas(db_session, "stock_minimo", producto["id"]) == []
+    assert len(_activas(db_session, "por_vencer_15", lote["id"])) == 1
+
+    # ETAPA 3: Salida que agota el lote -> cierra por vencer, reabre stock minimo
+    test_client.post("/api/v1/inventario/salidas", json={"lote_id": lote["id"], "cantidad": 12})
+    consumir_outbox(db_session)
+    assert _activas(db_session, "por_vencer_15", lote["id"]) == []
+    assert len(_activas(db_session, "stock_minimo", producto["id"])) == 1
+
+    # ETAPA 4: Con 5 unidades sigue bajo el minimo; bajar el minimo a 3
+    # via update_product cierra la alerta
+    test_client.post("/api/v1/inventario/entradas", json={
+        "producto_id": producto["id"], "cantidad_recibida": 5
+    })
+    consumir_outbox(db_session)
+    assert len(_activas(db_session, "stock_minimo", producto["id"])) == 1
+    response = test_client.put(f"/api/v1/productos/{producto['id']}", json={"stock_minimo": 3})
+    assert response.status_code == 200
+    consumir_outbox(db_session)
+    assert _activas(db_session, "stock_minimo", producto["id"]) == []
@@ -0,0 +1,130 @@
+# sistema-inventarios/backend/tests/test_calendario_vencimientos.py
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.producto import Producto
+from app.models.lote import Lote
+import app.services.calendario_vencimientos as calendario_service
+from app.services.calendario_vencimientos import CalendarioVencimientos
+from app.services.eventos_tiempo_real import publicar_tras_commit, EVENTO_STOCK
+from app.services.outbox import consumir_outbox
+
+HOY = date.today()
+
+
+def _lotes(db_session: Session) -> list[Lote]:
+    """Producto con lotes que vencen a 3, 3, 10 y 40 dias, uno vencido y uno sin stock."""
+    producto = Producto(nombre="Cal", sku="SKU-CAL-1", precio=1.0)
+    db_session.add(producto)
+    db_session.flush()
+    lotes = [
+        Lote(producto_id=producto.id, cantidad_recibida=5, fecha_vencimiento=HOY + timedelta(days=3)),
+        Lote(producto_id=producto.id, cantidad_recibida=7, fecha_vencimiento=HOY + timedelta(days=3)),
+        Lote(producto_id=producto.id, cantidad_recibida=2, fecha_vencimiento=HOY + timedelta(days=10)),
+        Lote(producto_id=producto.id, cantidad_recibida=9, fecha_vencimiento=HOY + timedelta(days=40)),
+        Lote(producto_id=producto.id, cantidad_recibida=4, fecha_vencimiento=HOY - timedelta(days=1)),
+        Lote(producto_id=producto.id, cantidad_recibida=0, fecha_vencimiento=HOY + timedelta(days=5)),
+    ]
+    db_session.add_all(lotes)
+    db_session.commit()
+    return lotes
+
+
+def test_calendar_matches_database_for_any_threshold(db_session: Session):
+    """
+    Prueba que el calendario en memoria responde igual que la consulta
+    a la BD para distintos umbrales, y que se pone al dia por lote con los
+    eventos de stock guardados.
+    """
+    # ETAPA 1: SETUP
+    lotes = _lotes(db_session)
+    calendario = CalendarioVencimientos()
+    assert not calendario.vigente()
+    calendario.resincronizar(db_session)
+    assert calendario.vigente()
+
+    # ETAPA 2: Cualquier umbral, sin ir a la BD
+    for dias in (1, 3, 15, 60):
+        esperado = calendario_service.lotes_por_vencer(db_session, dias=dias, hoy=HOY)
+        assert calendario.por_vencer(dias, hoy=HOY) == esperado
+    assert [l.lote_id for l in calendario.por_vencer(15, hoy=HOY)] == [l.id for l in lotes[:3]]
+    histograma = calendario.histograma(60, hoy=HOY)
+    assert [(d.fecha, d.cantidad, d.lotes) for d in histograma] == [
+        (HOY + timedelta(days=3), 12, 2),
+        (HOY + timedelta(days=10), 2, 1),
+        (HOY + timedelta(days=40), 9, 1),
+    ]
+    assert histograma == calendario_service.histograma_vencimientos(db_session, dias=60, hoy=HOY)
+
+    # ETAPA 3: Un lote se agota y otro cambia de fecha (el evento de stock
+    # lo guarda el consumidor del outbox, en otro proceso)
+    lotes[0].cantidad_actual = 0
+    lotes[3].fecha_vencimiento = HOY + timedelta(days=3)
+    publicar_tras_commit(db_session, EVENTO_STOCK, {"lote_ids": [lotes[0].id, lotes[3].id]})
+    db_session.commit()
+    assert calendario.ponerse_al_dia(db_session)
+
+    # ETAPA 4: Verificar
+    assert [(d.fecha, d.cantidad, d.lotes) for d in calendario.histograma(60, hoy=HOY)] == [
+        (HOY + timedelta(days=3), 16, 2),
+        (HOY + timedelta(days=10), 2, 1),
+    ]
+
+
+def test_expiring_report_endpoints_without_calendar(test_client: TestClient, db_session: Session):
+    """
+    Prueba que sin calendario cargado (no hay programador en las pruebas)
+    los reportes consultan la BD.
+    """
+    # ETAPA 1: SETUP
+    lotes = _lotes(db_session)
+    assert not calendario_service.calendario_vencimientos.vigente()
+
+    # ETAPA 2: Ejecutar
+    response_lotes = test_client.get("/api/v1/reportes/lotes-por-vencer", params={"days_threshold": 15})
+    response_hist = test_client.get("/api/v1/reportes/vencimientos-por-dia", params={"dias": 15})
+
+    # ETAPA 3: Verificar
+    assert response_lotes.status_code == 200
+    assert [l["id"] for l in response_lotes.json()] == [l.id for l in lotes[:3]]
+    assert response_hist.status_code == 200
+    assert response_hist.json() == [
+        {"fecha": (HOY + timedelta(days=3)).isoformat(), "cantidad": 12, "lotes": 2},
+        {"fecha": (HOY + timedelta(days=10)).isoformat(), "cantidad": 2, "lotes": 1},
+    ]
+
+
+def test_expiring_report_reads_own_writes_with_a_loaded_calendar(
+    test_client: TestClient, db_session: Session, monkeypatch
+):
+    """
+    Prueba que con el calendario cargado un lote recien recibido aparece en
+    el reporte en cuanto se comitea: mientras su evento del outbox esta
+    pendiente se consulta la BD, y despues el calendario se pone al dia.
+    """
+    # ETAPA 1: SETUP - Calendario de este proceso cargado
+    lotes = _lotes(db_session)
+    calendario = CalendarioVencimientos()
+    monkeypatch.setattr(calendario_service, "calendario_vencimientos", calendario)
+    consumir_outbox(db_session)
+    calendario.resincronizar(db_session)
+
+    # ETAPA 2: Entrada que vence en 5 dias
+    nuevo = test_client.post("/api/v1/inventario/entradas", json={
+        "producto_id": lotes[0].producto_id,
+        "cantidad_recibida": 6,
+        "fecha_vencimiento": (HOY + timedelta(days=5)).isoformat()
+    }).json()
+    esperado = [lotes[0].id, lotes[1].id, nuevo["id"], lotes[2].id]
+
+    # ETAPA 3: Evento pendiente -> BD; procesado -> calendario al dia
+    def reporte():
+        response = test_client.get("/api/v1/reportes/lotes-por-vencer", params={"days_threshold": 15})
+        return [l["id"] for l in response.json()]
+
+    assert reporte() == esperado
+    assert nuevo["id"] not in [l.lote_id for l in calendario.por_vencer(15)]
+    consumir_outbox(db_session)
+    assert reporte() == esperado
+    assert nuevo["id"] in [l.lote_id for l in calendario.por_vencer(15)]
@@ -0,0 +1,161 @@
+# sistema-inventarios/backend/tests/test_contador_stock.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+import app.crud.crud_contador_stock as crud_contador_stock
+from app.crud.crud_contador_stock import consolidar_contadores
+from app.crud.crud_inventory import smart_dispatch_fefo, planificar_fefo
+import app.crud.crud_inventory as crud_inventory
+from app.models.contador_stock import ContadorStock
+from app.models.lote import Lote
+from app.models.producto import Producto
+from app.schemas.inventory import SmartDispatchReq
+from app.services.reconciliation import reconciliar_stock
+
+
+@pytest.fixture
+def sharded_counters(monkeypatch):
+    """
+    Activa el modo de contadores repartidos con 4 ranuras; la ranura elegida
+    es siempre la 0 para que la prueba sea determinista.
+    """
+    monkeypatch.setattr(get_settings(), "STOCK_COUNTER_SHARDS", 4)
+    monkeypatch.setattr(crud_contador_stock.random, "randrange", lambda n: 0)
+
+
+def _sentencias_sobre_productos(db_session: Session):
+    """Registra las sentencias que escriben o bloquean la fila de productos."""
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        sql = " ".join(statement.split()).upper()
+        if sql.startswith("UPDATE PRODUCTOS") or "FOR UPDATE" in sql:
+            sentencias.append(sql)
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", registrar)
+    return sentencias, lambda: event.remove(db_session.get_bind(), "before_cursor_execute", registrar)
+
+
+def test_sharded_counters_defer_product_row_updates(
+    sharded_counters, test_client: TestClient, db_session: Session, product_in_db: dict, mocker
+):
+    """
+    Prueba que en modo repartido las entradas y los despachos que caben en
+    el cupo de la ranura no tocan ni bloquean la fila del producto, que el
+    disponible suma las ranuras y que la consolidacion vuelca el delta de
+    las ranuras en Producto.cantidad_actual conservando los cupos.
+    """
+    product_id = product_in_db["id"]
+    bloquear = mocker.spy(crud_contador_stock, "bloquear_stock_libre")
+
+    # ETAPA 1: Entradas y despacho con contadores repartidos
+    sentencias, dejar_de_registrar = _sentencias_sobre_productos(db_session)
+    try:
+        for _ in range(3):
+            entry = {"producto_id": product_id, "cantidad_recibida": 10}
+            assert test_client.post("/api/v1/inventario/entradas", json=entry).status_code == 201
+        dispatch = {"producto_id": product_id, "cantidad": 25}
+        assert test_client.post("/api/v1/inventario/despachar", json=dispatch).status_code == 200
+    finally:
+        dejar_de_registrar()
+    assert sentencias == []
+    assert bloquear.call_count == 0
+
+    # No se puede despachar mas de lo que suman las ranuras
+    dispatch = {"producto_id": product_id, "cantidad": 6}
+    assert test_client.post("/api/v1/inventario/despachar", json=dispatch).status_code == 400
+
+    # ETAPA 2: VERIFICACION antes de consolidar
+    assert db_session.get(Producto, product_id).cantidad_actual == 0
+    assert db_session.query(ContadorStock).count() > 0
+    atp = test_client.get(f"/api/v1/inventario/disponibilidad/{product_id}").json()
+    assert atp["disponible"] == 5
+    assert reconciliar_stock(db_session).diferencias == []
+    # Listado y reportes leen (y ordenan por) el stock efectivo
+    listado = test_client.get("/api/v1/productos/").json()
+    assert [p["cantidad_actual"] for p in listado if p["id"] == product_id] == [5]
+    top = test_client.get("/api/v1/reportes/top-productos-disponibles?top_n=1").json()
+    assert (top[0]["id"], top[0]["cantidad_actual"]) == (product_id, 5)
+    inventario = test_client.get("/api/v1/reportes/inventario-basico").json()
+    assert [p["cantidad_actual"] for p in inventario if p["id"] == product_id] == [5]
+    csv = test_client.get("/api/v1/reportes/inventario-basico?formato=csv").text
+    assert f"{product_id},Producto Fixture,SKU-FIXTURE-001,123.45,5,0,0,5" in csv.splitlines()
+    assert db_session.get(Producto, product_id).cantidad_actual == 0
+
+    # ETAPA 3: Consolidar (el delta pasa al producto; el cupo sigue en la ranura)
+    assert consolidar_contadores(db_session) == 1
+    db_session.expire_all()
+    assert db_session.get(Producto, product_id).cantidad_actual == 5
+    ranuras = db_session.query(ContadorStock).all()
+    assert [(r.delta, r.cupo) for r in ranuras] == [(0, 5)]
+    assert reconciliar_stock(db_session).diferencias == []
+
+
+def test_reservation_reclaims_slot_headroom(
+    sharded_counters, test_client: TestClient, db_session: Session, product_in_db: dict
+):
+    """
+    Prueba que una reserva puede tomar unidades apartadas como cupo de una
+    ranura (las recupera con la fila del producto bloqueada) y que despues
+    las salidas por ranura ya no pueden sacar las unidades reservadas.
+    """
+    product_id = product_in_db["id"]
+    entry = {"producto_id": product_id, "cantidad_recibida": 10}
+    assert test_client.post("/api/v1/inventario/entradas", json=entry).status_code == 201
+
+    # Todo el disponible es cupo de la ranura 0: la reserva lo recupera
+    reserva = test_client.post("/api/v1/reservas/", json={"producto_id": product_id, "cantidad": 8})
+    assert reserva.status_code == 201
+    assert db_session.query(ContadorStock).one().cupo == 0
+
+    # Solo quedan 2 disponibles
+    dispatch = {"producto_id": product_id, "cantidad": 3}
+    assert test_client.post("/api/v1/inventario/despachar", json=dispatch).status_code == 400
+    dispatch = {"producto_id": product_id, "cantidad": 2}
+    assert test_client.post("/api/v1/inventario/despachar", json=dispatch).status_code == 200
+    atp = test_client.get(f"/api/v1/inventario/disponibilidad/{product_id}").json()
+    assert atp["disponible"] == 0
+
+
+def test_fefo_dispatch_replans_when_a_lot_changes(db_session: Session, monkeypatch):
+    """
+    Prueba que si otra salida descuenta un lote entre la planificacion y el
+    descuento, el despacho FEFO no pisa su cambio: deshace lo descontado,
+    vuelve a planificar y toma el resto del lote siguiente.
+    """
+    # ETAPA 1: SETUP (dos lotes de 10)
+    producto = Producto(nombre="FEFO", sku="SKU-FEFO-CONC", precio=1.0, cantidad_actual=20)
+    db_session.add(producto)
+    db_session.flush()
+    lote_a = Lote(producto_id=producto.id, cantidad_recibida=10)
+    lote_b = Lote(producto_id=producto.id, cantidad_recibida=10)
+    db_session.add_all([lote_a, lote_b])
+    db_session.commit()
+
+    # ETAPA 2: La primera planificacion usa datos viejos (otra salida se
+    # lleva 4 unidades del lote A justo despues de leerlo)
+    planes = []
+
+    def planificar_con_salida_concurrente(lotes, cantidad):
+        if not planes:
+            db_session.execute(
+                update(Lote).where(Lote.id == lote_a.id).values(cantidad_actual=Lote.cantidad_actual - 4)
+            )
+            db_session.execute(
+                update(Producto).where(Producto.id == producto.id).values(cantidad_actual=16)
+            )
+        planes.append(planificar_fefo(lotes, cantidad))
+        return planes[-1]
+
+    monkeypatch.setattr(crud_inventory, "planificar_fefo", planificar_con_salida_concurrente)
+    smart_dispatch_fefo(db_session, dispatch_in=SmartDispatchReq(producto_id=producto.id, cantidad=8))
+
+    # ETAPA 3: VERIFICACION
+    assert planes == [[(lote_a.id, 8)], [(lote_a.id, 6), (lote_b.id, 2)]]
+    db_session.expire_all()
+    assert db_session.get(Lote, lote_a.id).cantidad_actual == 0
+    assert db_session.get(Lote, lote_b.id).cantidad_actual == 8
+    assert db_session.get(Producto, producto.id).cantidad_actual == 8
@@ -0,0 +1,114 @@
+# sistema-inventarios/backend/tests/test_eventos_tiempo_real.py
+import asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.crud import crud_eventos_tiempo_real
+from app.models.evento_tiempo_real import EventoTiempoReal as EventoTiempoRealModel
+from app.services.eventos_tiempo_real import (
+    DifusorEventos, publicar_tras_commit, EVENTO_STOCK, EVENTO_REINICIO
+)
+from app.services.outbox import consumir_outbox
+
+
+async def _recibir(suscripcion, n: int):
+    return [await suscripcion.__anext__() for _ in range(n)]
+
+
+def test_every_worker_fans_out_from_the_database(db_session: Session):
+    """
+    Prueba que un evento comiteado en cualquier proceso llega a los
+    suscriptores de todos los workers (cada uno lee la tabla), que se puede
+    reanudar con el id en otro worker y que se envia keepalive (None) y
+    "reinicio" cuando corresponde.
+    """
+    sesiones = sessionmaker(bind=db_session.get_bind())
+
+    def publicar(producto_id: int) -> None:
+        publicar_tras_commit(db_session, EVENTO_STOCK, {"producto_id": producto_id})
+        db_session.commit()
+
+    async def escenario():
+        # Dos workers, cada uno con un suscriptor
+        worker_a = DifusorEventos(max_reenviados=2, session_factory=sesiones)
+        worker_b = DifusorEventos(max_reenviados=2, session_factory=sesiones)
+        for worker in (worker_a, worker_b):
+            worker.iniciar(asyncio.get_running_loop())
+        a = worker_a.suscribir(keepalive_segundos=0.05)
+        b = worker_b.suscribir(keepalive_segundos=0.05)
+
+        # Keepalive sin eventos (la suscripcion empieza con la primera lectura);
+        # luego un evento comiteado por otro proceso, leido por ambos workers
+        assert await a.__anext__() is None
+        assert await b.__anext__() is None
+        publicar(1)
+        assert worker_a.sondear(db_session) == 1
+        assert worker_b.sondear(db_session) == 1
+        evento_a = await a.__anext__()
+        assert await b.__anext__() == evento_a
+        assert (evento_a.id, evento_a.tipo, evento_a.datos) == (1, EVENTO_STOCK, {"producto_id": 1})
+        assert "id: 1\nevent: stock\n" in evento_a.formatear_sse()
+
+        # Reanudar (con el id visto en el worker A) en el worker B: lo perdido
+        # sale de la tabla y lo nuevo llega por el sondeo
+        publicar(2)
+        publicar(3)
+        worker_a.sondear(db_session)
+        worker_b.sondear(db_session)
+        c = worker_b.suscribir(ultimo_id=1, keepalive_segundos=0.05)
+        assert [e.id for e in await _recibir(c, 2)] == [2, 3]
+        publicar(4)
+        worker_b.sondear(db_session)
+        assert (await c.__anext__()).id == 4
+
+        # Faltan mas eventos de los que se reenvian, o el id es de otra BD -> reinicio
+        d = worker_a.suscribir(ultimo_id=0, keepalive_segundos=0.05)
+        assert (await d.__anext__()).tipo == EVENTO_REINICIO
+        e = worker_a.suscribir(ultimo_id=99, keepalive_segundos=0.05)
+        assert (await e.__anext__()).tipo == EVENTO_REINICIO
+
+        # Al detener, los streams terminan
+        for worker in (worker_a, worker_b):
+            worker.detener()
+        for suscripcion in (a, b, c, d, e):
+            await suscripcion.aclose()
+
+    asyncio.run(escenario())
+
+    # Al purgar, la marca guarda el ultimo id borrado (reanudar antes pide recargar)
+    assert crud_eventos_tiempo_real.purgar_eventos(db_session, antiguedad_segundos=-1) == 4
+    assert crud_eventos_tiempo_real.get_purgado_hasta(db_session) == 4
+    assert crud_eventos_tiempo_real.get_ultimo_id(db_session) == 4
+
+
+def test_events_saved_only_on_commit(test_client: TestClient, db_session: Session):
+    """
+    Prueba que los cambios de stock procesados del outbox se guardan al
+    comitear, y que lo pendiente de una transaccion revertida se descarta.
+    """
+    # ETAPA 1: SETUP
+    consumir_outbox(db_session)
+    producto = test_client.post("/api/v1/productos/", json={
+        "nombre": "SSE", "sku": "SKU-SSE-1", "precio": 1.0, "stock_minimo": 10
+    }).json()
+    ultimo_id = crud_eventos_tiempo_real.get_ultimo_id(db_session)
+
+    # ETAPA 2: Rollback -> nada guardado
+    publicar_tras_commit(db_session, EVENTO_STOCK, {"producto_id": -1})
+    db_session.rollback()
+    assert crud_eventos_tiempo_real.get_ultimo_id(db_session) == ultimo_id
+
+    # ETAPA 3: Entrada (queda bajo el minimo) procesada por el outbox
+    test_client.post("/api/v1/inventario/entradas", json={
+        "producto_id": producto["id"], "cantidad_recibida": 4
+    })
+    consumir_outbox(db_session)
+
+    # ETAPA 4: Verificar
+    guardados = db_session.query(EventoTiempoRealModel).filter(
+        EventoTiempoRealModel.id > ultimo_id
+    ).order_by(EventoTiempoRealModel.id).all()
+    stock = [e.datos for e in guardados if e.tipo == EVENTO_STOCK]
+    assert stock[-1]["producto_id"] == producto["id"]
+    assert stock[-1]["delta"] == 4
+    assert any(e.tipo == "alertas" for e in guardados)
@@ -0,0 +1,179 @@
+# sistema-inventarios/backend/tests/test_group_commit.py
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models.lote import Lote
+from app.models.producto import Producto
+from app.models.movimiento import Movimiento
+from app.schemas.inventory import InventoryExitRequest
+from app.core.config import get_settings
+from app.crud import crud_idempotencia
+from app.core.exceptions import (
+    InsufficientStockError, IdempotencyKeyInProgressError, GroupCommitTimeoutError
+)
+import app.services.group_commit as group_commit_service
+from app.services.group_commit import ColaSalidasAgrupadas
+
+def _session_factory(db_session: Session) -> sessionmaker:
+    """Crea una fabrica de sesiones sobre el mismo engine de pruebas."""
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+
+
+def test_group_commit_applies_batch_in_single_transaction(
+    db_session: Session, lote_model_in_db: Lote, product_model_in_db: Producto
+):
+    """
+    Prueba que las salidas concurrentes se agrupan en pocos commits
+    y que cada llamador recibe su propio resultado o su propio error.
+    """
+    # ETAPA 1: SETUP - El lote del fixture tiene 50 unidades
+    product_model_in_db.cantidad_actual = 50
+    db_session.commit()
+    lote_id = lote_model_in_db.id
+
+    engine = db_session.get_bind()
+    commits = []
+    def contar_commit(conn):
+        commits.append(1)
+    event.listen(engine, "commit", contar_commit)
+
+    cola = ColaSalidasAgrupadas(_session_factory(db_session), ventana_ms=50, max_lote=100)
+    cola.iniciar()
+    try:
+        # ETAPA 2: LA PRUEBA - 10 salidas de 5 unidades (agotan el lote) + 1 que sobra
+        peticiones = [InventoryExitRequest(lote_id=lote_id, cantidad=5) for _ in range(11)]
+        with ThreadPoolExecutor(max_workers=11) as pool:
+            futuros = [pool.submit(cola.registrar, p, 5) for p in peticiones]
+        resultados, errores = [], []
+        for futuro in futuros:
+            try:
+                resultados.append(futuro.result())
+            except InsufficientStockError as e:
+                errores.append(e)
+    finally:
+        cola.detener()
+        event.remove(engine, "commit", contar_commit)
+
+    # ETAPA 3: VERIFICACION
+    assert len(resultados) == 10
+    assert len(errores) == 1
+    assert all(r.tipo == "salida" and r.cantidad == 5 for r in resultados)
+    assert len(commits) < 11 # Menos commits que salidas
+
+    db_session.expire_all()
+    assert db_session.get(Lote, lote_id).cantidad_actual == 0
+    assert db_session.get(Producto, product_model_in_db.id).cantidad_actual == 0
+    assert db_session.query(Movimiento).count() == 10
+
+
+def test_group_commit_missing_lote_returns_none(db_session: Session):
+    """
+    Prueba que una salida sobre un lote inexistente devuelve None,
+    igual que register_exit.
+    """
+    cola = ColaSalidasAgrupadas(_session_factory(db_session), ventana_ms=1)
+    cola.iniciar()
+    try:
+        assert cola.registrar(InventoryExitRequest(lote_id=999, cantidad=1), timeout=5) is None
+    finally:
+        cola.detener()
+
+
+def test_group_commit_al_aplicar_runs_in_the_shared_transaction(
+    db_session: Session, lote_model_in_db: Lote, product_model_in_db: Producto
+):
+    """
+    Prueba que al_aplicar escribe en la transaccion compartida y que, si
+    falla, solo se deshace la salida de su peticion.
+    """
+    product_model_in_db.cantidad_actual = 50
+    db_session.commit()
+    lote_id = lote_model_in_db.id
+    vistos = []
+
+    def registrar_movimiento(db, db_movimiento):
+        vistos.append(db_movimiento.cantidad)
+
+    def reserva_perdida(db, db_movimiento):
+        raise IdempotencyKeyInProgressError(clave="k", endpoint="salidas")
+
+    cola = ColaSalidasAgrupadas(_session_factory(db_session), ventana_ms=50)
+    cola.iniciar()
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            ok = pool.submit(cola.registrar, InventoryExitRequest(lote_id=lote_id, cantidad=5), 5, registrar_movimiento)
+            perdida = pool.submit(cola.registrar, InventoryExitRequest(lote_id=lote_id, cantidad=7), 5, reserva_perdida)
+        assert ok.result().cantidad == 5
+        with pytest.raises(IdempotencyKeyInProgressError):
+            perdida.result()
+    finally:
+        cola.detener()
+
+    assert vistos == [5]
+    db_session.expire_all()
+    assert db_session.get(Lote, lote_id).cantidad_actual == 45
+    assert db_session.query(Movimiento).count() == 1
+
+
+def test_group_commit_timeout_cancels_pending_exit(db_session: Session, lote_model_in_db: Lote):
+    """
+    Prueba que si la cola no responde a tiempo se lanza
+    GroupCommitTimeoutError y la salida, aun sin tomar, ya no se aplica.
+    """
+    lote_id = lote_model_in_db.id
+    cola = ColaSalidasAgrupadas(_session_factory(db_session), ventana_ms=1)
+
+    # El hilo aun no arranco: la espera vence
+    with pytest.raises(GroupCommitTimeoutError):
+        cola.registrar(InventoryExitRequest(lote_id=lote_id, cantidad=5), timeout=0.05)
+
+    cola.iniciar()
+    cola.detener()
+    db_session.expire_all()
+    assert db_session.get(Lote, lote_id).cantidad_actual == 50
+    assert db_session.query(Movimiento).count() == 0
+
+
+def test_group_commit_restarts_dead_worker(db_session: Session):
+    """
+    Prueba que registrar reinicia el hilo de la cola si esta activa
+    pero su hilo ya no vive.
+    """
+    cola = ColaSalidasAgrupadas(_session_factory(db_session), ventana_ms=1)
+    cola.iniciar()
+    hilo_muerto = cola._hilo
+    cola._activa.clear()
+    hilo_muerto.join()
+    cola._activa.set()
+    try:
+        assert cola.registrar(InventoryExitRequest(lote_id=999, cantidad=1), timeout=5) is None
+        assert cola._hilo is not hilo_muerto and cola._hilo.is_alive()
+    finally:
+        cola.detener()
+
+
+def test_grouped_exit_endpoint_returns_503_on_timeout(
+    test_client: TestClient, db_session: Session, lote_model_in_db: Lote, monkeypatch
+):
+    """
+    Prueba que POST /salidas responde 503 si la cola agrupada no responde
+    y que libera la Idempotency-Key para el reintento.
+    """
+    monkeypatch.setattr(get_settings(), "GROUP_COMMIT_ENABLED", True)
+    monkeypatch.setattr(get_settings(), "GROUP_COMMIT_TIMEOUT_SECONDS", 0.05)
+    cola_detenida = ColaSalidasAgrupadas(_session_factory(db_session))
+    monkeypatch.setattr(group_commit_service, "obtener_cola_salidas", lambda: cola_detenida)
+
+    response = test_client.post(
+        "/api/v1/inventario/salidas",
+        json={"lote_id": lote_model_in_db.id, "cantidad": 5},
+        headers={"Idempotency-Key": "test-salida-timeout"}
+    )
+
+    assert response.status_code == 503
+    assert crud_idempotencia.get_clave_vigente(
+        db_session, endpoint="salidas", clave="test-salida-timeout"
+    ) is None
@@ -0,0 +1,131 @@
+# sistema-inventarios/backend/tests/test_notificaciones.py
+import asyncio
+import json
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models.alerta import Alerta
+from app.models.producto import Producto
+from app.services.alerts import sincronizar_alertas
+from app.services.notificaciones import (
+    DespachadorNotificaciones, SumideroArchivo, SumideroNotificaciones
+)
+
+
+class SumideroCaido(SumideroNotificaciones):
+    """Canal que nunca entrega."""
+    nombre = "caido"
+
+    def enviar(self, digesto):
+        raise ConnectionError("canal caido")
+
+
+def _crear_alertas(db_session: Session, n: int) -> None:
+    """`n` productos bajo su minimo -> `n` alertas nuevas."""
+    db_session.add_all([
+        Producto(nombre=f"Notif {i}", sku=f"SKU-NOTIF-{i}", precio=1.0, cantidad_actual=0, stock_minimo=5)
+        for i in range(n)
+    ])
+    db_session.commit()
+    sincronizar_alertas(db_session)
+
+
+class SumideroDePrueba(SumideroNotificaciones):
+    """Guarda los resumenes recibidos; el primer envio falla."""
+    nombre = "prueba"
+
+    def __init__(self):
+        self.recibidos = []
+        self.intentos = 0
+
+    def enviar(self, digesto):
+        self.intentos += 1
+        if self.intentos == 1:
+            raise ConnectionError("canal caido")
+        self.recibidos.append(digesto)
+
+
+def test_dispatcher_sends_digests_with_backpressure_and_retries(db_session: Session, tmp_path):
+    """
+    Prueba que las alertas nuevas se entregan en resumenes por destinatario,
+    que con la cola llena el resto espera a la siguiente vuelta (sin perder
+    alertas), que un envio fallido se reintenta y que las alertas se
+    marcan como notificadas solo tras entregarse.
+    """
+    async def escenario():
+        sumidero = SumideroDePrueba()
+        ruta = tmp_path / "notificaciones.jsonl"
+        despachador = DespachadorNotificaciones(
+            rutas={"compras": ["stock_minimo"], "calidad": ["por_vencer_"], "todos": ["*"]},
+            sumideros=[sumidero, SumideroArchivo(str(ruta))],
+            tamano_cola=2,
+            ventana_segundos=0.05,
+            max_reintentos=2,
+            espera_reintento_segundos=0.01,
+            session_factory=sessionmaker(bind=db_session.get_bind())
+        )
+        despachador.iniciar(asyncio.get_running_loop())
+
+        # ETAPA 1: Sin alertas no hay nada que enviar
+        assert despachador.recoger_alertas_nuevas(db_session) == 0
+
+        # ETAPA 2: Tres productos bajo su minimo -> tres alertas nuevas
+        _crear_alertas(db_session, 3)
+
+        # ETAPA 3: Cola de 2 -> dos ahora, la tercera en la siguiente vuelta
+        assert despachador.recoger_alertas_nuevas(db_session) == 2
+        await asyncio.sleep(0.3)
+        assert despachador.recoger_alertas_nuevas(db_session) == 1
+        await asyncio.sleep(0.3)
+        assert despachador.recoger_alertas_nuevas(db_session) == 0
+        despachador.detener()
+        return sumidero, ruta, despachador
+
+    sumidero, ruta, despachador = asyncio.run(escenario())
+
+    # ETAPA 4: Verificar
+    por_destinatario = {}
+    for digesto in sumidero.recibidos:
+        por_destinatario.setdefault(digesto.destinatario, []).extend(digesto.alertas)
+    assert set(por_destinatario) == {"compras", "todos"}
+    assert len(por_destinatario["compras"]) == 3
+    assert all(a["tipo_alerta"] == "stock_minimo" for a in por_destinatario["todos"])
+    assert sumidero.intentos == len(sumidero.recibidos) + 1
+    lineas = [json.loads(linea) for linea in ruta.read_text(encoding="utf-8").splitlines()]
+    assert sum(len(l["alertas"]) for l in lineas if l["destinatario"] == "todos") == 3
+    assert despachador.estadisticas["descartadas"] == 0
+    assert despachador.estadisticas["fallidos"] == 0
+    db_session.expire_all()
+    assert db_session.query(Alerta).filter(Alerta.notificada == False).count() == 0
+
+
+def test_undelivered_alerts_stay_pending_and_are_reclaimed(db_session: Session):
+    """
+    Prueba que una alerta cuyo resumen no se entrega no se marca como
+    notificada: no se reclama de nuevo mientras dura el reclamo y si despues.
+    """
+    async def escenario():
+        despachador = DespachadorNotificaciones(
+            rutas={"todos": ["*"]},
+            sumideros=[SumideroCaido()],
+            ventana_segundos=0.05,
+            max_reintentos=0,
+            duracion_reclamo_segundos=600,
+            session_factory=sessionmaker(bind=db_session.get_bind())
+        )
+        despachador.iniciar(asyncio.get_running_loop())
+        _crear_alertas(db_session, 2)
+
+        # ETAPA 1: Se reclaman, el envio falla; el reclamo vigente evita reenviarlas
+        assert despachador.recoger_alertas_nuevas(db_session) == 2
+        await asyncio.sleep(0.2)
+        assert despachador.estadisticas["fallidos"] == 1
+        assert despachador.recoger_alertas_nuevas(db_session) == 0
+
+        # ETAPA 2: Vencido el reclamo, se vuelven a reclamar
+        db_session.query(Alerta).update({"notificacion_reclamada_hasta": None})
+        db_session.commit()
+        assert despachador.recoger_alertas_nuevas(db_session) == 2
+        despachador.detener()
+
+    asyncio.run(escenario())
+    assert db_session.query(Alerta).filter(Alerta.notificada == False).count() == 2
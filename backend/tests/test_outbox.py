@@ -0,0 +1,93 @@
+# sistema-inventarios/backend/tests/test_outbox.py
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.crud import crud_outbox
+import app.services.outbox as outbox_service
+from app.models.evento_outbox import EventoOutbox
+
+
+def test_stock_changes_write_outbox_events(
+    test_client: TestClient, db_session: Session, product_in_db: dict, monkeypatch
+):
+    """
+    Prueba que entrada, salida y despacho escriben su evento en el outbox
+    y que el consumidor los entrega a los manejadores y los marca procesados.
+    """
+    # ETAPA 1: SETUP - Outbox vacio (el alta del producto ya genero su evento)
+    # y un manejador de prueba que registra lo recibido
+    outbox_service.consumir_outbox(db_session)
+    recibidos = []
+    monkeypatch.setitem(
+        outbox_service._manejadores,
+        "prueba",
+        lambda db, eventos: recibidos.extend((e.tipo_evento, e.delta) for e in eventos)
+    )
+    producto_id = product_in_db["id"]
+
+    # ETAPA 2: Tres cambios de stock
+    lote = test_client.post(
+        "/api/v1/inventario/entradas",
+        json={"producto_id": producto_id, "cantidad_recibida": 10}
+    ).json()
+    test_client.post("/api/v1/inventario/salidas", json={"lote_id": lote["id"], "cantidad": 3})
+    test_client.post("/api/v1/inventario/despachar", json={"producto_id": producto_id, "cantidad": 2})
+
+    pendientes = db_session.query(EventoOutbox).filter(EventoOutbox.procesado == False).all()
+    assert [(e.tipo_evento, e.lote_ids, e.delta) for e in pendientes] == [
+        ("entrada", [lote["id"]], 10),
+        ("salida", [lote["id"]], -3),
+        ("despacho", [lote["id"]], -2),
+    ]
+
+    # ETAPA 3: Consumir y verificar
+    assert outbox_service.consumir_outbox(db_session, tamano_lote=2) == 3
+    assert recibidos == [("entrada", 10), ("salida", -3), ("despacho", -2)]
+    assert db_session.query(EventoOutbox).filter(EventoOutbox.procesado == False).count() == 0
+
+
+def test_failed_event_is_isolated_retried_and_dead_lettered(
+    test_client: TestClient, db_session: Session, product_in_db: dict, monkeypatch
+):
+    """
+    Prueba que un evento cuyo manejador falla no bloquea a los demas del lote:
+    se reintenta con espera y, agotados los intentos, queda como fallido.
+    """
+    def manejador_roto(db, eventos):
+        if any(e.delta == 5 for e in eventos):
+            raise RuntimeError("fallo de prueba")
+        recibidos.extend(e.delta for e in eventos)
+
+    # ETAPA 1: SETUP - Outbox vacio, un manejador que falla con el evento de 5
+    # unidades y sin espera entre reintentos
+    outbox_service.consumir_outbox(db_session)
+    recibidos = []
+    monkeypatch.setitem(outbox_service._manejadores, "roto", manejador_roto)
+    monkeypatch.setattr(get_settings(), "OUTBOX_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(get_settings(), "OUTBOX_RETRY_BACKOFF_SECONDS", 0)
+    for cantidad in (5, 7):
+        test_client.post(
+            "/api/v1/inventario/entradas",
+            json={"producto_id": product_in_db["id"], "cantidad_recibida": cantidad}
+        )
+
+    # ETAPA 2: Primer intento - el evento sano se procesa, el roto se reintentara
+    assert outbox_service.procesar_lote(db_session) == 2
+    assert recibidos == [7]
+    roto = db_session.query(EventoOutbox).filter(EventoOutbox.procesado == False).one()
+    assert (roto.delta, roto.intentos, roto.fallido) == (5, 1, False)
+    assert "fallo de prueba" in roto.ultimo_error
+
+    # ETAPA 3: Segundo intento - agota los intentos y sale de la cola
+    assert outbox_service.procesar_lote(db_session) == 1
+    db_session.refresh(roto)
+    assert (roto.intentos, roto.fallido, roto.procesado) == (2, True, False)
+    assert outbox_service.consumir_outbox(db_session) == 0
+
+    # ETAPA 4: Reactivado tras corregir la causa, se procesa
+    monkeypatch.delitem(outbox_service._manejadores, "roto")
+    assert crud_outbox.reactivar_fallidos(db_session) == 1
+    assert outbox_service.consumir_outbox(db_session) == 1
+    db_session.refresh(roto)
+    assert roto.procesado
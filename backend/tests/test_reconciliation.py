@@ -0,0 +1,57 @@
+# sistema-inventarios/backend/tests/test_reconciliation.py
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.producto import Producto
+from app.models.lote import Lote
+from app.models.movimiento import Movimiento
+from app.services.reconciliation import reconciliar_stock
+
+
+def test_reconciliation_reports_and_fixes_drift(db_session: Session):
+    """
+    Prueba que la reconciliacion detecta un producto desalineado
+    y lo corrige con la suma de sus lotes.
+    """
+    # ETAPA 1: SETUP - Un producto consistente y otro con stock desalineado
+    ok = Producto(nombre="OK", sku="SKU-REC-OK", precio=1.0, cantidad_actual=10)
+    malo = Producto(nombre="Malo", sku="SKU-REC-BAD", precio=1.0, cantidad_actual=99)
+    db_session.add_all([ok, malo])
+    db_session.flush()
+    lote_ok = Lote(producto_id=ok.id, cantidad_recibida=10)
+    lote_malo = Lote(producto_id=malo.id, cantidad_recibida=20)
+    db_session.add_all([lote_ok, lote_malo])
+    db_session.flush()
+    db_session.add_all([
+        Movimiento(lote_id=lote_ok.id, tipo="entrada", cantidad=10),
+        Movimiento(lote_id=lote_malo.id, tipo="entrada", cantidad=20),
+    ])
+    db_session.commit()
+
+    # ETAPA 2: Solo reporte
+    reporte = reconciliar_stock(db_session)
+    assert reporte.productos_revisados == 2
+    assert len(reporte.diferencias) == 1
+    diferencia = reporte.diferencias[0]
+    assert diferencia.sku == "SKU-REC-BAD"
+    assert (diferencia.cantidad_producto, diferencia.suma_lotes, diferencia.suma_movimientos) == (99, 20, 20)
+    assert reporte.productos_corregidos == 0
+
+    # ETAPA 3: Corregir
+    reporte = reconciliar_stock(db_session, corregir=True)
+    assert reporte.productos_corregidos == 1
+    db_session.expire_all()
+    assert db_session.get(Producto, malo.id).cantidad_actual == 20
+    assert reconciliar_stock(db_session).diferencias == []
+
+
+def test_reconciliation_endpoint(test_client: TestClient, product_in_db: dict):
+    """
+    Prueba GET /api/v1/inventario/reconciliacion con datos creados por la API.
+    """
+    entry_data = {"producto_id": product_in_db["id"], "cantidad_recibida": 15}
+    assert test_client.post("/api/v1/inventario/entradas", json=entry_data).status_code == 201
+
+    response = test_client.get("/api/v1/inventario/reconciliacion")
+    assert response.status_code == 200
+    assert response.json() == {"productos_revisados": 1, "diferencias": [], "productos_corregidos": 0}
@@ -0,0 +1,137 @@
+# sistema-inventarios/backend/tests/test_reglas_alertas.py
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.models.producto import Producto
+from app.models.lote import Lote
+from app.models.movimiento import Movimiento
+from app.models.alerta import Alerta
+from app.schemas.regla_alerta import ReglaAlertaCreate
+from app.services import reglas_alertas
+
+HOY = date.today()
+
+
+def _alertas_activas(db_session: Session, tipo_alerta: str) -> dict:
+    return {
+        a.entidad_id: a
+        for a in db_session.query(Alerta).filter(
+            Alerta.tipo_alerta == tipo_alerta, Alerta.esta_activa == True
+        )
+    }
+
+
+def test_rules_compile_to_alerts_with_timings(test_client: TestClient, db_session: Session):
+    """
+    Prueba que una regla de cobertura de demanda y una de valor + vencimiento
+    se evaluan para todas las entidades, devuelven su duracion y cierran sus
+    alertas cuando dejan de cumplirse o se borra la regla.
+    """
+    # ETAPA 1: SETUP - 60 salidas en la ventana de 30 dias -> demanda de 2/dia
+    rapido = Producto(nombre="Rapido", sku="SKU-REGLA-1", precio=10.0, cantidad_actual=20, stock_minimo=1)
+    lento = Producto(nombre="Lento", sku="SKU-REGLA-2", precio=1.0, cantidad_actual=20, stock_minimo=1)
+    db_session.add_all([rapido, lento])
+    db_session.flush()
+    caro = Lote(producto_id=rapido.id, cantidad_recibida=20, fecha_vencimiento=HOY + timedelta(days=10))
+    barato = Lote(producto_id=lento.id, cantidad_recibida=20, fecha_vencimiento=HOY + timedelta(days=10))
+    db_session.add_all([caro, barato])
+    db_session.flush()
+    db_session.add(Movimiento(lote_id=caro.id, tipo="salida", cantidad=60))
+    db_session.commit()
+
+    reglas = [
+        {
+            "nombre": "cobertura_baja",
+            "entidad": "producto",
+            "condiciones": [
+                {"campo": "stock", "operador": "<", "valor": 14, "referencia": "demanda_diaria"}
+            ],
+            "mensaje": "{sku}: stock para {dias_cobertura} dias"
+        },
+        {
+            "nombre": "lote_caro_por_vencer",
+            "entidad": "lote",
+            "condiciones": [
+                {"campo": "valor", "operador": ">", "valor": 100},
+                {"campo": "dias_para_vencer", "operador": "<=", "valor": 15}
+            ]
+        },
+    ]
+    for regla in reglas:
+        response = test_client.post("/api/v1/alertas/reglas", json=regla)
+        assert response.status_code == 201
+
+    # Duplicada o con campos desconocidos: rechazadas
+    assert test_client.post("/api/v1/alertas/reglas", json=reglas[0]).status_code == 409
+    invalida = dict(reglas[0], nombre="invalida", condiciones=[{"campo": "peso", "operador": ">"}])
+    response = test_client.post("/api/v1/alertas/reglas", json=invalida)
+    assert response.status_code == 400
+    assert "peso" in response.json()["detail"]
+
+    # ETAPA 2: Evaluar
+    response = test_client.post("/api/v1/alertas/reglas/evaluar")
+    assert response.status_code == 200
+    resultados = {r["nombre"]: r for r in response.json()}
+    assert set(resultados) == {"cobertura_baja", "lote_caro_por_vencer"}
+    assert all(r["duracion_ms"] >= 0 for r in resultados.values())
+
+    # ETAPA 3: Verificar - solo el producto con demanda y el lote valioso
+    cobertura = _alertas_activas(db_session, "regla_cobertura_baja")
+    assert set(cobertura) == {rapido.id}
+    assert cobertura[rapido.id].mensaje == "SKU-REGLA-1: stock para 10.0 dias"
+    assert cobertura[rapido.id].metadata_json["regla"] == "cobertura_baja"
+    lotes = _alertas_activas(db_session, "regla_lote_caro_por_vencer")
+    assert set(lotes) == {caro.id}
+    assert f"el lote {caro.id} del producto 'Rapido'" in lotes[caro.id].mensaje
+
+    # ETAPA 4: Deja de cumplirse -> se cierra; borrar la regla cierra las suyas
+    db_session.query(Producto).filter(Producto.id == rapido.id).update({"cantidad_actual": 100})
+    db_session.commit()
+    resultados = {r["nombre"]: r for r in test_client.post("/api/v1/alertas/reglas/evaluar").json()}
+    assert resultados["cobertura_baja"]["desactivadas"] == 1
+    assert _alertas_activas(db_session, "regla_cobertura_baja") == {}
+
+    regla_lote = next(
+        r for r in test_client.get("/api/v1/alertas/reglas").json()
+        if r["nombre"] == "lote_caro_por_vencer"
+    )
+    assert test_client.delete(f"/api/v1/alertas/reglas/{regla_lote['id']}").status_code == 200
+    db_session.expire_all()
+    assert _alertas_activas(db_session, "regla_lote_caro_por_vencer") == {}
+    assert test_client.delete(f"/api/v1/alertas/reglas/{regla_lote['id']}").status_code == 404
+
+
+def test_failing_rule_does_not_abort_the_others(db_session: Session, monkeypatch):
+    """
+    Prueba que una regla que falla en la BD se registra y se salta (en su
+    savepoint) sin deshacer las alertas de las demas reglas.
+    """
+    # ETAPA 1: SETUP - Un producto bajo y dos reglas que lo cumplen
+    producto = Producto(nombre="Aislada", sku="SKU-REGLA-3", precio=2.5, cantidad_actual=1, stock_minimo=1)
+    db_session.add(producto)
+    db_session.commit()
+    for nombre in ("rota", "sana"):
+        reglas_alertas.crear_regla(db_session, regla_in=ReglaAlertaCreate(
+            nombre=nombre,
+            entidad="producto",
+            condiciones=[{"campo": "stock", "operador": "<", "valor": 5}],
+            mensaje="{sku} vale {valor_stock}"
+        ))
+
+    # ETAPA 2: La regla "rota" falla al sincronizar
+    sincronizar = reglas_alertas._sincronizar_regla
+    def sincronizar_o_fallar(db, compilada):
+        if compilada.tipo_alerta == "regla_rota":
+            sincronizar(db, compilada)
+            raise OperationalError("INSERT", {}, Exception("fallo simulado"))
+        return sincronizar(db, compilada)
+    monkeypatch.setattr(reglas_alertas, "_sincronizar_regla", sincronizar_o_fallar)
+    resultados = reglas_alertas.evaluar_reglas(db_session)
+    db_session.commit()
+
+    # ETAPA 3: Verificar
+    assert [r.nombre for r in resultados] == ["sana"]
+    assert _alertas_activas(db_session, "regla_rota") == {}
+    assert _alertas_activas(db_session, "regla_sana")[producto.id].mensaje == "SKU-REGLA-3 vale 2.5"
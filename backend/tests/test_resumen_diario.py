@@ -0,0 +1,117 @@
+# sistema-inventarios/backend/tests/test_resumen_diario.py
+from datetime import date, datetime
+from sqlalchemy.orm import Session
+
+from app.models.producto import Producto
+from app.models.lote import Lote
+from app.models.movimiento import Movimiento
+from app.crud.crud_marca_agua import bloquear_marca
+from app.models.resumen_movimientos import ResumenDiarioMovimientos, MarcaAgua
+from app.services import resumen_diario
+from app.services.reports import get_movement_summary
+
+
+def _resumen(db_session: Session, periodo: str = "dia"):
+    return [
+        (r.periodo, r.tipo, r.cantidad_total, r.num_movimientos)
+        for r in get_movement_summary(
+            db_session, fecha_inicio=date(2025, 3, 1), fecha_fin=date(2025, 3, 31), periodo=periodo
+        )
+    ]
+
+
+def test_daily_rollup_folds_incrementally_and_rebuilds(db_session: Session):
+    """
+    Prueba que la consolidacion por lotes acumula entradas, salidas, neto y
+    valor por producto y dia, que el reporte da lo mismo antes y despues de
+    consolidar (resumen + movimientos pendientes), que un movimiento que
+    comitea tarde no se pierde y que la reconstruccion deja el mismo resumen.
+    """
+    # ETAPA 1: SETUP - Cuatro movimientos en dos dias (ids 11 a 14)
+    producto = Producto(nombre="Rollup", sku="SKU-ROLLUP", precio=2.5, cantidad_actual=0, stock_minimo=0)
+    db_session.add(producto)
+    db_session.flush()
+    lote = Lote(producto_id=producto.id, cantidad_recibida=100)
+    db_session.add(lote)
+    db_session.flush()
+    db_session.add_all([
+        Movimiento(id=11, lote_id=lote.id, tipo="entrada", cantidad=100, fecha_movimiento=datetime(2025, 3, 3, 8)),
+        Movimiento(id=12, lote_id=lote.id, tipo="salida", cantidad=10, fecha_movimiento=datetime(2025, 3, 3, 12)),
+        Movimiento(id=13, lote_id=lote.id, tipo="salida", cantidad=5, fecha_movimiento=datetime(2025, 3, 3, 19)),
+        Movimiento(id=14, lote_id=lote.id, tipo="salida", cantidad=20, fecha_movimiento=datetime(2025, 3, 4, 9)),
+    ])
+    db_session.commit()
+    esperado = [
+        (date(2025, 3, 3), "entrada", 100, 1),
+        (date(2025, 3, 3), "salida", 15, 2),
+        (date(2025, 3, 4), "salida", 20, 1),
+    ]
+    assert _resumen(db_session) == esperado
+
+    # ETAPA 2: Consolidar en lotes de 3 -> dos transacciones
+    assert resumen_diario.consolidar_resumen_diario(db_session, tamano_lote=3) == 4
+    filas = {
+        f.dia: f for f in db_session.query(ResumenDiarioMovimientos)
+        .filter(ResumenDiarioMovimientos.producto_id == producto.id)
+    }
+    dia_3 = filas[date(2025, 3, 3)]
+    assert (dia_3.cantidad_entradas, dia_3.cantidad_salidas, dia_3.cantidad_neta) == (100, 15, 85)
+    assert (dia_3.num_entradas, dia_3.num_salidas) == (1, 2)
+    assert dia_3.valor_salidas == 37.5
+    assert filas[date(2025, 3, 4)].cantidad_neta == -20
+    assert _resumen(db_session) == esperado
+    assert resumen_diario.consolidar_resumen_diario(db_session) == 0
+
+    # ETAPA 3: Un movimiento que comitea tarde con un id menor (p. ej. una
+    # importacion larga) se cuenta en el reporte y se consolida despues
+    db_session.add(Movimiento(
+        id=5, lote_id=lote.id, tipo="salida", cantidad=1, fecha_movimiento=datetime(2025, 3, 4, 10)
+    ))
+    db_session.commit()
+    esperado_mes = [
+        (date(2025, 3, 1), "entrada", 100, 1),
+        (date(2025, 3, 1), "salida", 36, 4),
+    ]
+    assert _resumen(db_session, "mes") == esperado_mes
+    assert resumen_diario.consolidar_resumen_diario(db_session) == 1
+    assert _resumen(db_session, "mes") == esperado_mes
+
+    # ETAPA 4: Reconstruir da el mismo resultado
+    assert resumen_diario.reconstruir_resumen_diario(db_session) == db_session.query(Movimiento).count()
+    assert _resumen(db_session, "mes") == esperado_mes
+    assert db_session.get(ResumenDiarioMovimientos, (producto.id, date(2025, 3, 4))).cantidad_salidas == 21
+
+
+def test_consolidation_during_rebuild_skips_rebuilt_range(db_session: Session):
+    """
+    Prueba que durante una reconstruccion (marca del resumen con el mayor id
+    que cubre) la consolidacion periodica solo toma movimientos posteriores,
+    y que la reconstruccion por rangos de id no cuenta ninguno dos veces.
+    """
+    # ETAPA 1: SETUP - Tres movimientos pendientes el mismo dia
+    producto = Producto(nombre="Rebuild", sku="SKU-REBUILD", precio=1.0, cantidad_actual=0, stock_minimo=0)
+    db_session.add(producto)
+    db_session.flush()
+    lote = Lote(producto_id=producto.id, cantidad_recibida=100)
+    db_session.add(lote)
+    db_session.flush()
+    db_session.add_all([
+        Movimiento(id=movimiento_id, lote_id=lote.id, tipo="entrada", cantidad=10,
+                   fecha_movimiento=datetime(2025, 3, 5, 8))
+        for movimiento_id in (1, 2, 3)
+    ])
+    db_session.commit()
+
+    # ETAPA 2: Reconstruccion en curso que cubre hasta el id 2
+    bloquear_marca(db_session, resumen_diario.MARCA_RESUMEN_DIARIO).ultimo_id = 2
+    db_session.commit()
+    assert resumen_diario.consolidar_resumen_diario(db_session) == 1
+
+    # ETAPA 3: Reconstruir por rangos de un movimiento
+    assert resumen_diario.reconstruir_resumen_diario(db_session, tamano_lote=1) == 3
+
+    # ETAPA 4: VERIFICACION
+    fila = db_session.get(ResumenDiarioMovimientos, (producto.id, date(2025, 3, 5)))
+    assert (fila.cantidad_entradas, fila.num_entradas) == (30, 3)
+    assert db_session.get(MarcaAgua, resumen_diario.MARCA_RESUMEN_DIARIO).ultimo_id == 0
+    assert _resumen(db_session) == [(date(2025, 3, 5), "entrada", 30, 3)]
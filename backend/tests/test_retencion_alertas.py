@@ -0,0 +1,76 @@
+# sistema-inventarios/backend/tests/test_retencion_alertas.py
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.alerta import Alerta
+from app.models.alerta_historica import AlertaHistorica
+from app.services.alerts import purgar_alertas_inactivas
+
+AHORA = datetime.now()
+
+
+def _alerta(entidad_id: int, *, activa: bool, resuelta_hace_dias: float | None = None) -> Alerta:
+    return Alerta(
+        tipo_alerta="stock_minimo",
+        entidad_id=entidad_id,
+        entidad_tipo="producto",
+        mensaje=f"Alerta {entidad_id}",
+        metadata_json={"sku": f"SKU-{entidad_id}"},
+        fecha_creacion=AHORA - timedelta(days=200),
+        esta_activa=activa,
+        fecha_resolucion=(
+            AHORA - timedelta(days=resuelta_hace_dias) if resuelta_hace_dias is not None else None
+        )
+    )
+
+
+def test_purge_archives_old_inactive_alerts_in_batches(test_client: TestClient, db_session: Session):
+    """
+    Prueba que la purga archiva por lotes solo las alertas inactivas
+    resueltas antes de la retencion, y que el historial las sigue mostrando.
+    """
+    # ETAPA 1: SETUP - 5 viejas resueltas, 1 sin fecha de resolucion (antigua),
+    # 1 resuelta hace poco y 1 activa
+    alertas = [_alerta(i, activa=False, resuelta_hace_dias=120) for i in range(1, 6)]
+    alertas += [
+        _alerta(6, activa=False),
+        _alerta(7, activa=False, resuelta_hace_dias=5),
+        _alerta(8, activa=True),
+    ]
+    db_session.add_all(alertas)
+    db_session.commit()
+
+    # ETAPA 2: Purga en lotes de 2
+    total = purgar_alertas_inactivas(
+        db_session, dias_retencion=90, archivar=True, tamano_lote=2, pausa_segundos=0
+    )
+
+    # ETAPA 3: Verificar
+    assert total == 6
+    vivas = {a.entidad_id for a in db_session.query(Alerta)}
+    assert vivas == {7, 8}
+    archivadas = db_session.query(AlertaHistorica).order_by(AlertaHistorica.id).all()
+    assert [a.entidad_id for a in archivadas] == [1, 2, 3, 4, 5, 6]
+    assert archivadas[0].metadata_json == {"sku": "SKU-1"}
+
+    response = test_client.get("/api/v1/alertas/historial", params={"entidad_tipo": "producto", "entidad_id": 1})
+    assert response.status_code == 200
+    historial = response.json()
+    assert len(historial) == 1
+    assert historial[0]["fecha_archivado"] is not None
+    assert historial[0]["metadata_json"] == {"sku": "SKU-1"}
+    response = test_client.get("/api/v1/alertas/historial", params={"limit": 10})
+    assert len(response.json()) == 8
+
+
+def test_purge_can_delete_without_archiving(db_session: Session):
+    """
+    Prueba que con archivar=False las alertas se borran sin copiarse.
+    """
+    db_session.add(_alerta(1, activa=False, resuelta_hace_dias=120))
+    db_session.commit()
+
+    assert purgar_alertas_inactivas(db_session, dias_retencion=90, archivar=False, pausa_segundos=0) == 1
+    assert db_session.query(Alerta).count() == 0
+    assert db_session.query(AlertaHistorica).count() == 0
@@ -1,4 +1,6 @@
 # sistema-inventarios/backend/tests/test_services.py
+import pytest
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models.producto import Producto
 from app.models.lote import Lote
@@ -108,7 +110,7 @@ def test_check_expiring_lotes_service(db_session: Session, product_model_in_db:
         fecha_vencimiento=(date.today() + timedelta(days=15))
     )
     
-    # Lote B: Expira en 60 dias (NO debe generar alerta con umbral de 30)
+    # Lote B: Expira en 60 dias (alerta del tramo de 60, no del de 15)
     lote_ok = Lote(
         producto_id=product_model_in_db.id,
         cantidad_recibida=10,
@@ -134,13 +136,13 @@ def test_check_expiring_lotes_service(db_session: Session, product_model_in_db:
 
     # --- PRIMERA EJECUCION: DEBE CREAR UNA ALERTA ---
     # Asegurarse de que el cache esta limpio al inicio para la primera ejecucion
-    cache.delete("alert_lotes_vencimiento_30") 
-    check_lotes_por_vencer_and_manage_alerts(db=db_session, days_threshold=30)
+    cache.invalidate_pattern("alert_lotes_vencimiento") 
+    check_lotes_por_vencer_and_manage_alerts(db=db_session)
 
     # VERIFICACION 1: Se ha creado una alerta para el lote expirando
     alertas_creadas = db_session.query(Alerta).filter(
         Alerta.entidad_id == lote_expirando.id,
-        Alerta.tipo_alerta == "por_vencer_30",
+        Alerta.tipo_alerta == "por_vencer_15",
         Alerta.entidad_tipo == "lote",
         Alerta.esta_activa == True
     ).all()
@@ -151,11 +153,11 @@ def test_check_expiring_lotes_service(db_session: Session, product_model_in_db:
     assert alertas_creadas[0].metadata_json["producto_sku"] == product_model_in_db.sku
 
     # --- SEGUNDA EJECUCION: NO DEBE CREAR ALERTAS DUPLICADAS ---
-    cache.delete("alert_lotes_vencimiento_30") 
-    check_lotes_por_vencer_and_manage_alerts(db=db_session, days_threshold=30)
+    cache.invalidate_pattern("alert_lotes_vencimiento") 
+    check_lotes_por_vencer_and_manage_alerts(db=db_session)
     alertas_duplicadas = db_session.query(Alerta).filter(
         Alerta.entidad_id == lote_expirando.id,
-        Alerta.tipo_alerta == "por_vencer_30",
+        Alerta.tipo_alerta == "por_vencer_15",
         Alerta.entidad_tipo == "lote",
         Alerta.esta_activa == True
     ).all()
@@ -168,8 +170,8 @@ def test_check_expiring_lotes_service(db_session: Session, product_model_in_db:
     db_session.commit()
     db_session.refresh(lote_expirando)
 
-    cache.delete("alert_lotes_vencimiento_30") 
-    check_lotes_por_vencer_and_manage_alerts(db=db_session, days_threshold=30)
+    cache.invalidate_pattern("alert_lotes_vencimiento") 
+    check_lotes_por_vencer_and_manage_alerts(db=db_session)
 
     # VERIFICACION 3: La alerta original debe estar desactivada
     alerta_desactivada = db_session.query(Alerta).filter(
@@ -180,23 +182,59 @@ def test_check_expiring_lotes_service(db_session: Session, product_model_in_db:
     # VERIFICACION 4: No debe haber alertas activas para este lote
     alertas_activas_final = db_session.query(Alerta).filter(
         Alerta.entidad_id == lote_expirando.id,
-        Alerta.tipo_alerta == "por_vencer_30",
+        Alerta.tipo_alerta == "por_vencer_15",
         Alerta.entidad_tipo == "lote",
         Alerta.esta_activa == True
     ).all()
     assert len(alertas_activas_final) == 0
 
-    # Asegurarse de que los lotes "OK" nunca tuvieron alertas para este umbral
+    # El lote a 60 dias solo tiene alerta en su tramo (el mas estrecho que lo incluye)
     alertas_lote_ok = db_session.query(Alerta).filter(
         Alerta.entidad_id == lote_ok.id,
-        Alerta.tipo_alerta == "por_vencer_30",
         Alerta.entidad_tipo == "lote",
     ).all()
-    assert len(alertas_lote_ok) == 0
+    assert [a.tipo_alerta for a in alertas_lote_ok] == ["por_vencer_60"]
     
     alertas_lote_sin_fecha = db_session.query(Alerta).filter(
         Alerta.entidad_id == lote_sin_fecha.id,
-        Alerta.tipo_alerta == "por_vencer_30",
         Alerta.entidad_tipo == "lote",
     ).all()
-    assert len(alertas_lote_sin_fecha) == 0
\ No newline at end of file
+    assert len(alertas_lote_sin_fecha) == 0
+
+def test_active_alert_unique_and_refreshed_by_upsert(db_session: Session):
+    """
+    Prueba que no puede haber dos alertas activas para la misma entidad
+    y que una nueva sincronizacion actualiza el mensaje en lugar de duplicar.
+    """
+    from app.services.alerts import check_stock_minimo
+
+    # ETAPA 1: SETUP
+    producto = Producto(
+        nombre="Producto Upsert", sku="SKU-UPS-001", precio=1.0,
+        cantidad_actual=5, stock_minimo=10
+    )
+    db_session.add(producto)
+    db_session.commit()
+    check_stock_minimo(db=db_session)
+
+    # ETAPA 2: Un segundo "sincronizador" que inserta a ciegas choca con el indice unico
+    with pytest.raises(IntegrityError):
+        crud_alerta.create_alerta(db_session, AlertaCreate(
+            tipo_alerta="stock_minimo", entidad_id=producto.id,
+            entidad_tipo="producto", mensaje="duplicada"
+        ))
+    db_session.rollback()
+
+    # ETAPA 3: Cambia el stock (sigue bajo el minimo) y se vuelve a sincronizar
+    producto.cantidad_actual = 3
+    db_session.commit()
+    check_stock_minimo(db=db_session)
+
+    activas = db_session.query(Alerta).filter(
+        Alerta.entidad_id == producto.id,
+        Alerta.tipo_alerta == "stock_minimo",
+        Alerta.esta_activa == True
+    ).all()
+    assert len(activas) == 1
+    assert "tiene 3 unidades" in activas[0].mensaje
+    assert activas[0].metadata_json["cantidad_actual"] == 3
@@ -0,0 +1,102 @@
+# sistema-inventarios/backend/tests/test_simulacion.py
+import random
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.producto import Producto
+from app.models.lote import Lote
+from app.models.movimiento import Movimiento
+from app.schemas.inventory import SmartDispatchReq
+from app.services.simulacion import (
+    _cargar_estado,
+    _decidir_atendidos,
+    asignar_secuencial,
+    asignar_vectorizado,
+)
+
+
+def test_simulate_dispatches_does_not_write(test_client: TestClient, db_session: Session):
+    """
+    Prueba que la simulacion reparte en orden FEFO, rechaza lo que no
+    alcanza y no modifica lotes ni movimientos.
+    """
+    # ETAPA 1: SETUP - Un producto con dos lotes (el de 5 dias vence primero)
+    hoy = date.today()
+    producto = Producto(nombre="Sim", sku="SKU-SIM-1", precio=1.0, cantidad_actual=30)
+    db_session.add(producto)
+    db_session.flush()
+    pronto = Lote(producto_id=producto.id, cantidad_recibida=10, fecha_vencimiento=hoy + timedelta(days=5))
+    tarde = Lote(producto_id=producto.id, cantidad_recibida=20, fecha_vencimiento=hoy + timedelta(days=90))
+    db_session.add_all([tarde, pronto])
+    db_session.commit()
+    movimientos_antes = db_session.query(Movimiento).count()
+
+    # ETAPA 2: Simular 3 pedidos; el tercero ya no alcanza
+    response = test_client.post("/api/v1/inventario/simular-despachos", json={
+        "pedidos": [
+            {"producto_id": producto.id, "cantidad": 4},
+            {"producto_id": producto.id, "cantidad": 12},
+            {"producto_id": producto.id, "cantidad": 20},
+        ],
+        "dias_vencimiento": 30
+    })
+
+    # ETAPA 3: Verificar
+    assert response.status_code == 200
+    data = response.json()
+    assert data["metodo"] == "secuencial"
+    assert data["pedidos_atendidos"] == 2
+    assert data["pedidos"][0]["asignaciones"] == [{"lote_id": pronto.id, "cantidad": 4}]
+    assert data["pedidos"][1]["asignaciones"] == [
+        {"lote_id": pronto.id, "cantidad": 6},
+        {"lote_id": tarde.id, "cantidad": 6},
+    ]
+    assert data["pedidos"][2]["atendido"] is False
+    assert data["productos"][0]["disponible_final"] == 14
+    assert data["productos"][0]["stock_por_vencer_restante"] == 0
+
+    db_session.expire_all()
+    assert db_session.get(Lote, pronto.id).cantidad_actual == 10
+    assert db_session.query(Movimiento).count() == movimientos_antes
+
+
+def test_vectorized_allocation_matches_sequential(db_session: Session):
+    """
+    Prueba que la asignacion vectorizada produce exactamente el mismo
+    reparto que la secuencial (la logica de smart_dispatch_fefo).
+    """
+    # ETAPA 1: SETUP - Varios productos con lotes aleatorios
+    aleatorio = random.Random(42)
+    hoy = date.today()
+    productos = []
+    for i in range(5):
+        producto = Producto(nombre=f"P{i}", sku=f"SKU-SIM-V{i}", precio=1.0, cantidad_actual=0)
+        db_session.add(producto)
+        db_session.flush()
+        for _ in range(aleatorio.randint(1, 6)):
+            cantidad = aleatorio.randint(1, 40)
+            db_session.add(Lote(
+                producto_id=producto.id,
+                cantidad_recibida=cantidad,
+                fecha_vencimiento=hoy + timedelta(days=aleatorio.randint(1, 120))
+            ))
+            producto.cantidad_actual += cantidad
+        productos.append(producto)
+    db_session.commit()
+
+    pedidos = [
+        SmartDispatchReq(producto_id=aleatorio.choice(productos).id, cantidad=aleatorio.randint(1, 25))
+        for _ in range(300)
+    ]
+
+    # ETAPA 2: Ejecutar ambos metodos sobre el mismo estado
+    disponibles, lotes = _cargar_estado(db_session, [p.id for p in productos])
+    atendidos = _decidir_atendidos(pedidos, disponibles)
+    secuencial = asignar_secuencial(pedidos, atendidos, lotes)
+    vectorizado = asignar_vectorizado(pedidos, atendidos, lotes)
+
+    # ETAPA 3: Verificar
+    assert any(atendidos) and not all(atendidos)
+    assert vectorizado[0] == secuencial[0]
+    assert vectorizado[1] == dict(secuencial[1])
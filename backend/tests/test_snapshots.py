@@ -0,0 +1,81 @@
+# sistema-inventarios/backend/tests/test_snapshots.py
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.producto import Producto
+from app.models.lote import Lote
+from app.models.movimiento import Movimiento
+from app.services.snapshots import tomar_snapshot, stock_en_fecha
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _ledger(db_session: Session) -> Producto:
+    """Producto con dos lotes y movimientos repartidos en 4 dias."""
+    producto = Producto(nombre="Snap", sku="SKU-SNAP-1", precio=1.0, cantidad_actual=0)
+    db_session.add(producto)
+    db_session.flush()
+    lote_a = Lote(producto_id=producto.id, cantidad_recibida=10)
+    lote_b = Lote(producto_id=producto.id, cantidad_recibida=5)
+    db_session.add_all([lote_a, lote_b])
+    db_session.flush()
+    db_session.add_all([
+        Movimiento(lote_id=lote_a.id, tipo="entrada", cantidad=10, fecha_movimiento=T0),
+        Movimiento(lote_id=lote_a.id, tipo="salida", cantidad=4, fecha_movimiento=T0 + timedelta(days=1)),
+        Movimiento(lote_id=lote_b.id, tipo="entrada", cantidad=5, fecha_movimiento=T0 + timedelta(days=2)),
+        Movimiento(lote_id=lote_a.id, tipo="salida", cantidad=6, fecha_movimiento=T0 + timedelta(days=3)),
+    ])
+    db_session.commit()
+    return producto
+
+
+def test_stock_at_date_uses_snapshot_plus_delta(db_session: Session):
+    """
+    Prueba que el stock en fecha coincide con reproducir todo el libro,
+    y que con snapshots solo se reproducen los movimientos posteriores al corte.
+    """
+    # ETAPA 1: SETUP
+    producto = _ledger(db_session)
+    consulta = T0 + timedelta(days=3, hours=12)
+    sin_snapshot = stock_en_fecha(db_session, fecha=consulta, detalle_lotes=True)
+    assert sin_snapshot.fecha_corte is None
+    assert sin_snapshot.movimientos_reproducidos == 4
+
+    # ETAPA 2: Dos snapshots encadenados
+    primero = tomar_snapshot(db_session, fecha_corte=T0 + timedelta(days=1, hours=12))
+    segundo = tomar_snapshot(db_session, fecha_corte=T0 + timedelta(days=2, hours=12))
+    assert (primero.movimientos_incluidos, primero.lotes) == (2, 1)
+    assert (segundo.movimientos_incluidos, segundo.lotes) == (1, 2)
+
+    # ETAPA 3: Verificar
+    con_snapshot = stock_en_fecha(db_session, fecha=consulta, detalle_lotes=True)
+    assert con_snapshot.fecha_corte == T0 + timedelta(days=2, hours=12)
+    assert con_snapshot.movimientos_reproducidos == 1
+    assert con_snapshot.productos == sin_snapshot.productos
+    assert con_snapshot.lotes == sin_snapshot.lotes
+    assert [p.cantidad for p in con_snapshot.productos] == [5]
+
+    # Una fecha anterior usa el primer snapshot
+    pasado = stock_en_fecha(db_session, fecha=T0 + timedelta(days=1, hours=18), producto_id=producto.id)
+    assert pasado.fecha_corte == T0 + timedelta(days=1, hours=12)
+    assert [p.cantidad for p in pasado.productos] == [6]
+
+
+def test_stock_at_date_endpoint(test_client: TestClient, db_session: Session):
+    """
+    Prueba el endpoint GET /reportes/stock-en-fecha (fecha sin zona = UTC).
+    """
+    producto = _ledger(db_session)
+    tomar_snapshot(db_session, fecha_corte=T0 + timedelta(days=1, hours=12))
+
+    response = test_client.get(
+        "/api/v1/reportes/stock-en-fecha",
+        params={"fecha": "2026-01-03T12:00:00", "producto_id": producto.id}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["movimientos_reproducidos"] == 1
+    assert data["productos"] == [{"producto_id": producto.id, "cantidad": 11}]
+    assert data["lotes"] is None
@@ -0,0 +1,122 @@
+# sistema-inventarios/backend/tests/test_upgrade_db.py
+from datetime import datetime
+from sqlalchemy import create_engine, inspect, select, text, StaticPool
+from sqlalchemy.orm import Session
+
+from app.db.upgrade_db import upgrade_db
+from app.models.alerta import Alerta
+from app.models.lote import Lote
+from app.models.movimiento import Movimiento
+from app.models.producto import Producto
+from app.models.resumen_movimientos import MarcaAgua
+
+# Esquema de las tablas tal como lo creaba la version original (create_all)
+ESQUEMA_ORIGINAL = [
+    "CREATE TABLE productos (id INTEGER PRIMARY KEY, nombre VARCHAR NOT NULL, "
+    "sku VARCHAR NOT NULL, precio FLOAT NOT NULL, cantidad_actual INTEGER, "
+    "stock_minimo INTEGER, CONSTRAINT uq_sku UNIQUE (sku))",
+    "CREATE TABLE lotes (id INTEGER PRIMARY KEY, producto_id INTEGER NOT NULL "
+    "REFERENCES productos (id), cantidad_recibida INTEGER NOT NULL, "
+    "cantidad_actual INTEGER NOT NULL, fecha_vencimiento DATE)",
+    "CREATE TABLE movimientos (id INTEGER PRIMARY KEY, lote_id INTEGER NOT NULL "
+    "REFERENCES lotes (id), tipo VARCHAR NOT NULL, cantidad INTEGER NOT NULL, "
+    "fecha_movimiento DATETIME DEFAULT (CURRENT_TIMESTAMP))",
+    "CREATE TABLE alertas (id INTEGER PRIMARY KEY, tipo_alerta VARCHAR NOT NULL, "
+    "entidad_id INTEGER NOT NULL, entidad_tipo VARCHAR NOT NULL, mensaje VARCHAR NOT NULL, "
+    "fecha_creacion DATETIME NOT NULL, esta_activa BOOLEAN NOT NULL, metadata_json JSON)",
+]
+
+
+def test_upgrade_existing_database():
+    """
+    Prueba que upgrade_db lleva una BD con el esquema original al actual:
+    agrega las columnas nuevas (con valor en las filas existentes),
+    desactiva las alertas activas duplicadas, crea los indices (incluido el
+    unico parcial) y se puede volver a ejecutar sin cambios.
+    """
+    # ETAPA 1: BD con el esquema y datos de la version original
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    creada = datetime(2024, 1, 1, 12, 0)
+    with engine.begin() as conn:
+        for ddl in ESQUEMA_ORIGINAL:
+            conn.execute(text(ddl))
+        conn.execute(text(
+            "INSERT INTO productos (id, nombre, sku, precio, cantidad_actual, stock_minimo) "
+            "VALUES (1, 'P', 'SKU-1', 1.0, 10, 5)"
+        ))
+        conn.execute(text(
+            "INSERT INTO lotes (id, producto_id, cantidad_recibida, cantidad_actual) VALUES (1, 1, 10, 10)"
+        ))
+        conn.execute(text("INSERT INTO movimientos (lote_id, tipo, cantidad) VALUES (1, 'entrada', 10)"))
+        for alerta_id in (1, 2, 3):
+            conn.execute(
+                text(
+                    "INSERT INTO alertas (id, tipo_alerta, entidad_id, entidad_tipo, mensaje, "
+                    "fecha_creacion, esta_activa) VALUES (:id, 'stock_minimo', :entidad, "
+                    "'producto', 'bajo', :creada, 1)"
+                ),
+                {"id": alerta_id, "entidad": 1 if alerta_id < 3 else 2, "creada": creada}
+            )
+
+    # ETAPA 2: Actualizar (dos veces: es idempotente)
+    upgrade_db(engine)
+    upgrade_db(engine)
+
+    # ETAPA 3: VERIFICACION
+    indices = {i["name"] for i in inspect(engine).get_indexes("alertas")}
+    assert {"ux_alertas_activa_entidad", "ix_alertas_sin_notificar"} <= indices
+    with Session(engine) as db:
+        producto = db.get(Producto, 1)
+        assert (producto.cantidad_reservada, producto.cantidad_cuarentena) == (0, 0)
+        assert db.get(Lote, 1).esta_vencido is False
+        assert db.scalar(select(Movimiento.consolidado)) is False
+        alertas = db.scalars(select(Alerta).order_by(Alerta.id)).all()
+        assert [a.esta_activa for a in alertas] == [False, True, True]
+        assert alertas[0].fecha_resolucion is not None
+        assert all(a.notificada for a in alertas)
+        assert alertas[2].fecha_actualizacion == creada
+
+
+def test_upgrade_keeps_movements_already_in_the_daily_rollup():
+    """
+    Prueba que, en una BD de la version con marca de agua del resumen
+    diario, los movimientos hasta la marca quedan consolidados (ya estan en
+    el resumen) y la marca del resumen vuelve a 0.
+    """
+    # ETAPA 1: Resumen consolidado hasta el movimiento 2 (de 3)
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    with engine.begin() as conn:
+        for ddl in ESQUEMA_ORIGINAL:
+            conn.execute(text(ddl))
+        conn.execute(text(
+            "CREATE TABLE marcas_agua (nombre VARCHAR PRIMARY KEY, ultimo_id INTEGER NOT NULL, "
+            "fecha_actualizacion DATETIME NOT NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO marcas_agua VALUES ('resumen_diario_movimientos', 2, '2024-01-01 00:00:00')"
+        ))
+        conn.execute(text(
+            "INSERT INTO productos (id, nombre, sku, precio, cantidad_actual, stock_minimo) "
+            "VALUES (1, 'P', 'SKU-1', 1.0, 10, 5)"
+        ))
+        conn.execute(text(
+            "INSERT INTO lotes (id, producto_id, cantidad_recibida, cantidad_actual) VALUES (1, 1, 10, 10)"
+        ))
+        for movimiento_id in (1, 2, 3):
+            conn.execute(
+                text("INSERT INTO movimientos (id, lote_id, tipo, cantidad) VALUES (:id, 1, 'entrada', 1)"),
+                {"id": movimiento_id}
+            )
+
+    # ETAPA 2: Actualizar
+    upgrade_db(engine)
+
+    # ETAPA 3: VERIFICACION
+    with Session(engine) as db:
+        consolidados = db.scalars(select(Movimiento.consolidado).order_by(Movimiento.id)).all()
+        assert consolidados == [True, True, False]
+        assert db.scalar(select(MarcaAgua.ultimo_id)) == 0
@@ -0,0 +1,90 @@
+# sistema-inventarios/backend/tests/test_vencidos.py
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.producto import Producto
+from app.models.lote import Lote
+from app.models.alerta import Alerta
+from app.services.outbox import consumir_outbox
+from app.services.vencidos import barrer_lotes_vencidos
+
+HOY = date.today()
+
+
+def _producto_con_lotes(db_session: Session, dias: list, cantidades: list) -> tuple[Producto, list[Lote]]:
+    producto = Producto(
+        nombre="Vencidos", sku="SKU-VENC-1", precio=1.0,
+        cantidad_actual=sum(cantidades), stock_minimo=1
+    )
+    db_session.add(producto)
+    db_session.flush()
+    lotes = [
+        Lote(
+            producto_id=producto.id,
+            cantidad_recibida=cantidad,
+            fecha_vencimiento=HOY + timedelta(days=d) if d is not None else None
+        )
+        for d, cantidad in zip(dias, cantidades)
+    ]
+    db_session.add_all(lotes)
+    db_session.commit()
+    return producto, lotes
+
+
+def _alerta_vencido(db_session: Session, producto_id: int):
+    return db_session.query(Alerta).filter(
+        Alerta.tipo_alerta == "vencido",
+        Alerta.entidad_id == producto_id,
+        Alerta.esta_activa == True
+    ).one_or_none()
+
+
+def test_sweep_quarantines_expired_lots(test_client: TestClient, db_session: Session):
+    """
+    Prueba que el barrido marca por bloques los lotes vencidos con stock,
+    los saca del despacho FEFO y mantiene la alerta consolidada "vencido".
+    """
+    # ETAPA 1: SETUP - 2 lotes vencidos con stock, uno vigente y uno sin fecha
+    producto, lotes = _producto_con_lotes(db_session, [-1, -2, 10, None], [5, 3, 4, 2])
+    consumir_outbox(db_session)
+
+    # ETAPA 2: Barrido en bloques de 1 lote; un segundo barrido no encuentra nada
+    assert barrer_lotes_vencidos(db_session, tamano_lote=1) == 2
+    assert barrer_lotes_vencidos(db_session, tamano_lote=1) == 0
+
+    # ETAPA 3: Verificar cuarentena, alerta y disponibilidad
+    db_session.refresh(producto)
+    assert producto.cantidad_cuarentena == 8
+    assert [l.esta_vencido for l in lotes] == [True, True, False, False]
+    alerta = _alerta_vencido(db_session, producto.id)
+    assert "8 unidades en 2 lotes vencidos" in alerta.mensaje
+
+    atp = test_client.get(f"/api/v1/inventario/disponibilidad/{producto.id}").json()
+    assert (atp["cantidad_cuarentena"], atp["disponible"]) == (8, 6)
+    response = test_client.post("/api/v1/inventario/despachar", json={"producto_id": producto.id, "cantidad": 7})
+    assert response.status_code == 400
+    response = test_client.post("/api/v1/inventario/despachar", json={"producto_id": producto.id, "cantidad": 6})
+    assert response.status_code == 200
+    assert {m["lote_id"] for m in response.json()} == {lotes[2].id, lotes[3].id}
+
+    # ETAPA 4: Descartar los lotes vencidos vacia la cuarentena y cierra la alerta
+    for lote in lotes[:2]:
+        test_client.post("/api/v1/inventario/salidas", json={"lote_id": lote.id, "cantidad": lote.cantidad_recibida})
+    consumir_outbox(db_session)
+    db_session.refresh(producto)
+    assert producto.cantidad_cuarentena == 0
+    assert _alerta_vencido(db_session, producto.id) is None
+
+
+def test_fefo_skips_lots_expired_since_last_sweep(test_client: TestClient, db_session: Session):
+    """
+    Prueba que un lote vencido aun no marcado por el barrido tampoco
+    se despacha: el stock del producto alcanza pero sus lotes no.
+    """
+    producto, _ = _producto_con_lotes(db_session, [-1, 5], [10, 3])
+
+    response = test_client.post("/api/v1/inventario/despachar", json={"producto_id": producto.id, "cantidad": 5})
+
+    assert response.status_code == 400
+    assert "Disponible: 3" in response.json()["detail"]
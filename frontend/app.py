@@ -23,5 +23,6 @@ app.layout = html.Div([
 if __name__ == '__main__':
     import os
     port = int(os.environ.get("PORT", 8050))
+    callbacks.escucha_eventos.iniciar()
     logger.info(f"Iniciando servidor de Dash en http://0.0.0.0:{port}")
     app.run(debug=False, host="0.0.0.0", port=port)
\ No newline at end of file
@@ -6,6 +6,7 @@ from dash import callback, Output, Input, State, no_update, html
 from typing import List
 from ui_config import get_frontend_settings, THEMES
 from callbacks_resources.reports_fetch import fetch_top_available_products
+from callbacks_resources.eventos_api import EscuchaEventos
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +14,9 @@ settings = get_frontend_settings()
 API_BASE_URL = settings.API_BASE_URL
 logger.info(f"Conectando a la API en: {API_BASE_URL}")
 
+# Stream de cambios de la API: los intervalos solo recargan si algo cambio
+escucha_eventos = EscuchaEventos(API_BASE_URL)
+
 @callback(
     Output("products-table", "data"), 
     Output("products-table-status", "children"), 
@@ -35,6 +39,9 @@ def update_products_table(n_clicks: int, n_intervals: int) -> tuple[list, str]:
         f"Callback 'update_products_table' disparado por: {trigger_id} "
         f"(clicks={n_clicks}, intervals={n_intervals})"
     )
+    if trigger_id == "products-interval" and not escucha_eventos.hay_cambios("products-table", "stock"):
+        logger.debug("Sin cambios de stock desde la ultima carga; no se consulta la API.")
+        return no_update, no_update
     try:
         api_url = f"{API_BASE_URL}/productos"
         logger.debug(f"Haciendo peticion GET a: {api_url}")
@@ -227,6 +234,9 @@ def update_lotes_table(n_clicks: int, n_intervals: int) -> tuple[list, str]:
         f"Callback 'update_lotes_table' disparado por: {trigger_id} "
         f"(clicks={n_clicks}, intervals={n_intervals})"
     )
+    if trigger_id == "lotes-interval" and not escucha_eventos.hay_cambios("lotes-table", "stock"):
+        logger.debug("Sin cambios de stock desde la ultima carga; no se consulta la API.")
+        return no_update, no_update
     try:
         api_url = f"{API_BASE_URL}/inventario/lotes"
         logger.debug(f"Haciendo peticion GET a: {api_url}")
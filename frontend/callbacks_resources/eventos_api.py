@@ -0,0 +1,94 @@
+import logging
+import threading
+import time
+import requests
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class EscuchaEventos:
+    """
+    Escucha en segundo plano el stream SSE de la API (/eventos) y lleva un
+    contador de cambios por tipo de evento ("stock", "alertas").
+    Los callbacks con intervalo consultan hay_cambios() y solo vuelven a
+    pedir datos a la API si algo cambio desde su ultima carga.
+    Mientras no hay conexion con el stream, hay_cambios() devuelve True
+    (se vuelve al refresco periodico de siempre). Aun conectado, cada
+    `recarga_maxima_segundos` se recarga igual, por si se perdio un evento.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        reintento_segundos: float = 5,
+        recarga_maxima_segundos: float = 60
+    ):
+        self._url = f"{api_url}/eventos"
+        self._reintento = reintento_segundos
+        self._recarga_maxima = recarga_maxima_segundos
+        self._lock = threading.Lock()
+        self._versiones: Dict[str, int] = {}
+        self._vistas: Dict[str, Tuple[int, float]] = {} # vista -> (version, momento de la carga)
+        self._ultimo_id: Optional[str] = None
+        self._conectado = False
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> None:
+        """Arranca el hilo que escucha el stream (se reconecta solo)."""
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._escuchar, name="escucha-eventos", daemon=True)
+            self._hilo.start()
+
+    def hay_cambios(self, clave: str, tipo: str) -> bool:
+        """
+        True si hubo eventos de `tipo` desde la ultima vez que `clave`
+        (p. ej. el id de una tabla) recargo, si esa carga tiene mas de
+        `recarga_maxima_segundos` o si no hay conexion.
+        """
+        with self._lock:
+            if not self._conectado:
+                return True
+            vista = f"{clave}:{tipo}"
+            version = self._versiones.get(tipo, 0)
+            ahora = time.monotonic()
+            vista_version, cargada = self._vistas.get(vista, (None, 0.0))
+            if vista_version == version and ahora - cargada < self._recarga_maxima:
+                return False
+            self._vistas[vista] = (version, ahora)
+            return True
+
+    def _registrar(self, tipo: str) -> None:
+        with self._lock:
+            if tipo == "reinicio":
+                # Se perdieron eventos: todo se considera cambiado
+                for t in list(self._versiones):
+                    self._versiones[t] += 1
+                self._vistas.clear()
+            else:
+                self._versiones[tipo] = self._versiones.get(tipo, 0) + 1
+
+    def _escuchar(self) -> None:
+        while True:
+            try:
+                headers = {"Last-Event-ID": self._ultimo_id} if self._ultimo_id else {}
+                with requests.get(self._url, stream=True, headers=headers, timeout=(5, 60)) as response:
+                    response.raise_for_status()
+                    logger.info(f"Conectado al stream de eventos: {self._url}")
+                    with self._lock:
+                        self._conectado = True
+                    tipo = None
+                    for linea in response.iter_lines(decode_unicode=True):
+                        if linea.startswith("id:"):
+                            self._ultimo_id = linea[3:].strip()
+                        elif linea.startswith("event:"):
+                            tipo = linea[6:].strip()
+                        elif linea == "" and tipo:
+                            self._registrar(tipo)
+                            tipo = None
+            except Exception as e:
+                logger.warning(f"Stream de eventos no disponible ({e}); reintentando en {self._reintento}s.")
+            with self._lock:
+                # Sin conexion se pudo perder algo: se recarga en el siguiente intervalo
+                self._conectado = False
+                self._vistas.clear()
+            time.sleep(self._reintento)
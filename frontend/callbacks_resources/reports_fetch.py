@@ -1,6 +1,9 @@
+import io
 import logging
 import requests
 import pandas as pd
+from datetime import date
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +31,69 @@ def fetch_top_available_products(api_url: str, top_n: int = 5) -> pd.DataFrame:
     
     return df
 
+def _formato_columnar_disponible() -> bool:
+    """pyarrow es opcional en el cliente: sin el se pide el reporte en JSON."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def fetch_report_dataframe(
+    api_url: str,
+    ruta: str,
+    params: Optional[dict] = None,
+    formato: str = "arrow"
+) -> pd.DataFrame:
+    """
+    Función que descarga un reporte en formato columnar (arrow o parquet)
+    y lo lee directo a un DataFrame, sin pasar por JSON.
+    Si pyarrow no esta instalado aqui, o el servidor responde 501 (no lo
+    tiene), repite la llamada en JSON.
+    """
+    endpoint = f"{api_url}/reportes/{ruta}"
+    params = dict(params or {})
+    if formato != "json" and not _formato_columnar_disponible():
+        logger.warning("pyarrow no esta instalado; se pide el reporte en JSON.")
+        formato = "json"
+
+    logger.info(f"Llamando al endpoint {endpoint} ({formato}) con {params}...")
+    response = requests.get(endpoint, params={**params, "formato": formato})
+    if response.status_code == 501 and formato != "json":
+        logger.warning(f"El servidor no soporta el formato {formato}; se pide el reporte en JSON.")
+        return fetch_report_dataframe(api_url, ruta, params, formato="json")
+    if response.status_code != 200:
+        logger.error(f"Error al llamar al endpoint: {response.status_code} - {response.text}")
+        response.raise_for_status()
+
+    if formato == "parquet":
+        df = pd.read_parquet(io.BytesIO(response.content))
+    elif formato == "arrow":
+        import pyarrow.ipc
+        df = pyarrow.ipc.open_stream(response.content).read_pandas()
+    else:
+        df = pd.DataFrame(response.json())
+    logger.info(f"DataFrame creado con {df.shape[0]} filas y {df.shape[1]} columnas.")
+    return df
+
+def fetch_inventory_dataframe(api_url: str, formato: str = "arrow") -> pd.DataFrame:
+    """Stock actual por producto como DataFrame."""
+    return fetch_report_dataframe(api_url, "inventario-basico", formato=formato)
+
+def fetch_movements_dataframe(
+    api_url: str,
+    fecha_inicio: date,
+    fecha_fin: date,
+    formato: str = "arrow"
+) -> pd.DataFrame:
+    """Movimientos de un rango de fechas como DataFrame."""
+    return fetch_report_dataframe(
+        api_url,
+        "movimientos-por-rango-fecha",
+        {"fecha_inicio": fecha_inicio.isoformat(), "fecha_fin": fecha_fin.isoformat()},
+        formato=formato
+    )
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
 
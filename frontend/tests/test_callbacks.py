@@ -245,4 +245,60 @@ def test_register_fefo_dispatch_callback(mock_api_client):
     mock_post.assert_called_once()
     assert "Salida FEFO registrada con éxito" in result_message
     assert result_color == "success"
-        
\ No newline at end of file
+        
+
+def test_escucha_eventos_hay_cambios():
+    """
+    Prueba que los intervalos solo recargan cuando llega un evento del
+    tipo indicado o vence la recarga maxima, y siempre si no hay conexion
+    con el stream.
+    """
+    from callbacks_resources.eventos_api import EscuchaEventos
+
+    escucha = EscuchaEventos("http://api")
+    assert escucha.hay_cambios("tabla", "stock")  # Sin conexion: siempre recarga
+
+    escucha._conectado = True
+    assert escucha.hay_cambios("tabla", "stock")  # Primera carga
+    assert not escucha.hay_cambios("tabla", "stock")
+    escucha._registrar("alertas")
+    assert not escucha.hay_cambios("tabla", "stock")
+    escucha._registrar("stock")
+    assert escucha.hay_cambios("tabla", "stock")
+    assert not escucha.hay_cambios("tabla", "stock")
+    escucha._registrar("reinicio")
+    assert escucha.hay_cambios("tabla", "stock")
+
+    # Conectado pero sin eventos: se recarga igual al vencer la recarga maxima
+    escucha._recarga_maxima = 0
+    assert escucha.hay_cambios("tabla", "stock")
+
+
+def test_fetch_report_dataframe_reads_arrow_and_falls_back_to_json(mocker):
+    """
+    Prueba que el reporte en Arrow IPC se lee directo a un DataFrame y que,
+    si el servidor responde 501, se repite la llamada en JSON.
+    """
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    from callbacks_resources import reports_fetch
+
+    tabla = pa.table({"id": [1, 2], "sku": ["A", "B"]})
+    sumidero = pa.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sumidero, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    respuesta_arrow = mocker.Mock(status_code=200, content=sumidero.getvalue().to_pybytes())
+    respuesta_501 = mocker.Mock(status_code=501, text="sin pyarrow")
+    respuesta_json = mocker.Mock(status_code=200)
+    respuesta_json.json.return_value = [{"id": 1, "sku": "A"}]
+    get = mocker.patch(
+        "callbacks_resources.reports_fetch.requests.get",
+        side_effect=[respuesta_arrow, respuesta_501, respuesta_json]
+    )
+
+    df = reports_fetch.fetch_inventory_dataframe("http://api")
+    assert df["sku"].tolist() == ["A", "B"]
+
+    df = reports_fetch.fetch_inventory_dataframe("http://api")
+    assert df.to_dict("records") == [{"id": 1, "sku": "A"}]
+    assert [c.kwargs["params"]["formato"] for c in get.call_args_list] == ["arrow", "arrow", "json"]